@@ -0,0 +1,124 @@
+"""
+Benchmark de l'export Excel des parcelles
+
+Compare l'ancien chemin (toutes les parcelles chargées en ORM, propriétaire
+chargé parcelle par parcelle, classeur en mémoire avec une police et une
+bordure par cellule) à l'export en flux de ReportService (requête jointe lue
+par curseur serveur, classeur write_only). Chaque mesure tourne dans un
+processus séparé pour isoler le pic de mémoire (RSS maximal).
+
+Usage:
+    python -m backend.benchmarks.excel_export [--rows 10000 100000 500000] [--legacy-max 100000]
+"""
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.parcel import Parcel
+from backend.models.user import User
+
+
+def _seed(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {'id': f'u{i}', 'username': f'user{i}', 'email': f'user{i}@siu.bf', 'password_hash': 'x',
+             'first_name': 'Prénom', 'last_name': f'Nom{i}'}
+            for i in range(1000)
+        ])
+        for start in range(0, rows, 50000):
+            connection.execute(insert(Parcel), [
+                {'id': f'p{i:07d}', 'reference_cadastrale': f'REF{i:07d}', 'coordinates_lat': 12.37,
+                 'coordinates_lng': -1.52, 'area': 250.0 + i % 500, 'address': f'Secteur {i % 30}, Ouagadougou',
+                 'category': 'Habitation', 'zone': f'Zone {i % 12}', 'owner_id': f'u{i % 1000}',
+                 'created_at': datetime(2026, 1, 1 + i % 28)}
+                for i in range(start, min(start + 50000, rows))
+            ])
+    engine.dispose()
+
+
+def _legacy(db) -> bytes:
+    """Ancien export : query.all(), propriétaire paresseux, styles posés cellule par cellule"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Border, Font, PatternFill, Side
+
+    parcels = db.query(Parcel).all()
+    workbook = Workbook()
+    sheet = workbook.active
+    thin = Side(style='thin')
+    for col, header in enumerate(['ID', 'Référence', 'Adresse', 'Superficie (m²)',
+                                  'Zone', 'Statut', 'Propriétaire', 'Date création'], 1):
+        cell = sheet.cell(row=1, column=col, value=header)
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='673AB7', end_color='673AB7', fill_type='solid')
+    for row, parcel in enumerate(parcels, 2):
+        owner = parcel.owner
+        values = [parcel.id, parcel.reference_cadastrale, parcel.address, parcel.area, parcel.zone,
+                  parcel.category, f"{owner.first_name} {owner.last_name}" if owner else 'N/A',
+                  parcel.created_at.isoformat()]
+        for col, value in enumerate(values, 1):
+            cell = sheet.cell(row=row, column=col, value=value)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def _run_case(case: str, path: str):
+    from backend.services.report_service import ReportService
+
+    db = sessionmaker(bind=create_engine(f"sqlite:///{path}"))()
+    start = time.perf_counter()
+    content = _legacy(db) if case == 'legacy' else ReportService(db).export_parcels_excel()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {peak:.1f} {len(content) / (1024 * 1024):.1f}")
+
+
+def _measure(case: str, path: str) -> tuple:
+    output = subprocess.run(
+        [sys.executable, '-m', 'backend.benchmarks.excel_export', '--case', case, '--db', path],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    return tuple(float(value) for value in output[-3:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000], help="Tailles d'export")
+    parser.add_argument('--legacy-max', type=int, default=100000,
+                        help="Ancien chemin mesuré jusqu'à cette taille seulement")
+    parser.add_argument('--case', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        _run_case(args.case, args.db)
+        return
+
+    print(f"{'Lignes':>8} | {'Chemin':<9} | {'Durée':>8} | {'Pic RSS':>9} | {'Fichier':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in args.rows:
+            path = os.path.join(folder, f'parcelles_{rows}.db')
+            _seed(path, rows)
+            for case in ('legacy', 'streaming'):
+                if case == 'legacy' and rows > args.legacy_max:
+                    print(f"{rows:>8} | {case:<9} | {'ignoré':>8} |")
+                    continue
+                elapsed, peak, size = _measure(case, path)
+                print(f"{rows:>8} | {case:<9} | {elapsed:>7.1f}s | {peak:>6.0f} Mo | {size:>5.1f} Mo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark du surcoût des middlewares d'audit, de rate limiting et de sécurité
+
+Appelle directement l'application ASGI (sans serveur ni client HTTP) et mesure
+le nombre de requêtes par seconde :
+- sans middleware ;
+- avec AuditMiddleware, RateLimitMiddleware et SecurityMiddleware.
+
+Les requêtes sont des GET réussis (non audités) envoyés depuis des IP distinctes
+pour ne pas déclencher les limites de débit.
+
+Usage:
+    python -m backend.benchmarks.middleware_overhead [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from backend.middleware.audit_middleware import AuditMiddleware
+from backend.middleware.rate_limit_middleware import RateLimitMiddleware
+from backend.middleware.security_middleware import SecurityMiddleware
+
+
+def _build_app(with_middlewares: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id, "name": f"item-{item_id}"}
+
+    if with_middlewares:
+        app.add_middleware(SecurityMiddleware)
+        app.add_middleware(RateLimitMiddleware)
+        app.add_middleware(AuditMiddleware)
+    return app
+
+
+async def _request(app, index: int) -> int:
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': f'/api/items/{index}', 'raw_path': b'',
+        'root_path': '', 'query_string': b'', 'headers': [(b'host', b'localhost'), (b'user-agent', b'bench')],
+        'client': (f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}', 50000),
+        'server': ('localhost', 80),
+    }
+    status = []
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Comme un serveur : plus rien à lire tant que le client reste connecté
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _requests_per_second(app, count: int) -> float:
+    # Échauffement (construction de la pile de middlewares, imports paresseux)
+    for index in range(100):
+        await _request(app, index)
+    start = time.perf_counter()
+    for index in range(count):
+        assert await _request(app, index) == 200
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=20000, help="Nombre de requêtes mesurées")
+    args = parser.parse_args()
+
+    bare = asyncio.run(_requests_per_second(_build_app(False), args.requests))
+    stacked = asyncio.run(_requests_per_second(_build_app(True), args.requests))
+
+    print(f"Sans middleware          : {bare:10.0f} req/s")
+    print(f"Audit + rate limit + sécu: {stacked:10.0f} req/s ({(1 / stacked - 1 / bare) * 1e6:.0f} µs/requête de surcoût)")
+
+
+if __name__ == '__main__':
+    main()
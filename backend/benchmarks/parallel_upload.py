@@ -0,0 +1,67 @@
+"""
+Benchmark du traitement parallèle des uploads multiples
+
+Mesure le débit de DocumentService.prepare_uploads (réception en flux,
+validation, SHA-256, écriture disque et miniatures), séquentiel puis avec un
+pool de threads, sur un lot mêlant des images PNG et des PDF volumineux.
+La phase base de données, séquentielle dans les deux cas, n'est pas mesurée.
+
+Usage:
+    python -m backend.benchmarks.parallel_upload [--files 16] [--workers 4]
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from backend.services.document_service_new import DocumentService, PreparedUpload
+from backend.services.storage_service import StorageService
+
+
+def _build_files(count: int) -> list:
+    files = []
+    for index in range(count):
+        if index % 2:
+            buffer = io.BytesIO()
+            Image.frombytes('RGB', (1600, 1200), os.urandom(1600 * 1200 * 3)).save(buffer, format='PNG')
+            files.append((buffer.getvalue(), f'photo_{index}.png'))
+        else:
+            files.append((b'%PDF-1.4\n' + os.urandom(8 * 1024 * 1024), f'plan_{index}.pdf'))
+    return files
+
+
+def _throughput(service: DocumentService, files: list, workers: int) -> float:
+    batch = [(io.BytesIO(data), filename) for data, filename in files]
+    start = time.perf_counter()
+    prepared = service.prepare_uploads(batch, max_workers=workers)
+    elapsed = time.perf_counter() - start
+    for item in prepared:
+        assert isinstance(item, PreparedUpload), item
+        service.storage.discard_upload(item.staged)
+    return sum(len(data) for data, _ in files) / (1024 * 1024) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=16, help="Nombre de fichiers du lot")
+    parser.add_argument('--workers', type=int, default=4, help="Taille du pool de threads")
+    args = parser.parse_args()
+
+    files = _build_files(args.files)
+    with tempfile.TemporaryDirectory() as folder:
+        service = DocumentService(None)
+        service.storage = StorageService(folder)
+        _throughput(service, files[:2], 1)  # Échauffement
+
+        sequential = _throughput(service, files, 1)
+        parallel = _throughput(service, files, args.workers)
+
+    print(f"Séquentiel           : {sequential:8.1f} Mo/s")
+    print(f"Parallèle ({args.workers} threads) : {parallel:8.1f} Mo/s (x{parallel / sequential:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark du coût de la vérification de révocation par requête
+
+Compare, sur une base SQLite temporaire contenant N révocations :
+- la vérification via TokenRevocationStore (filtre de Bloom puis base si positif) ;
+- une requête en base à chaque vérification (sans filtre).
+
+Usage:
+    python -m backend.benchmarks.token_revocation [--revoked 10000] [--checks 20000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.revoked_token import RevokedToken
+from backend.core.token_revocation import TokenRevocationStore, token_digest
+
+
+def _time_per_call(func, tokens) -> float:
+    start = time.perf_counter()
+    for token in tokens:
+        func(token)
+    return (time.perf_counter() - start) / len(tokens) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--revoked', type=int, default=10000, help="Nombre de tokens révoqués en base")
+    parser.add_argument('--checks', type=int, default=20000, help="Nombre de vérifications mesurées")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+
+        expires_at = datetime.utcnow() + timedelta(hours=1)
+        revoked = [f"revoked-{i}" for i in range(args.revoked)]
+        db = factory()
+        db.bulk_insert_mappings(RevokedToken, [
+            {'token_hash': token_digest(token).hex(), 'expires_at': expires_at} for token in revoked
+        ])
+        db.commit()
+        db.close()
+
+        store = TokenRevocationStore(factory, sync_interval=1)
+        store.is_revoked('warm-up')
+        valid = [f"valid-{i}" for i in range(args.checks)]
+        revoked_sample = revoked[:min(len(revoked), args.checks // 10 or 1)]
+
+        def query_every_time(token):
+            session = factory()
+            try:
+                return session.query(RevokedToken.id).filter(
+                    RevokedToken.token_hash == token_digest(token).hex()
+                ).first() is not None
+            finally:
+                session.close()
+
+        print(f"{args.revoked} tokens révoqués en base, {args.checks} vérifications")
+        print(f"Token valide, filtre de Bloom : {_time_per_call(store.is_revoked, valid):8.2f} µs/requête")
+        print(f"Token valide, requête en base : {_time_per_call(query_every_time, valid):8.2f} µs/requête")
+        print(f"Token révoqué, filtre + base  : {_time_per_call(store.is_revoked, revoked_sample):8.2f} µs/requête")
+        false_positives = sum(token_digest(token) in store.bloom for token in valid)
+        print(f"Faux positifs du filtre (requête en base inutile) : {false_positives}/{len(valid)}")
+
+
+if __name__ == '__main__':
+    main()
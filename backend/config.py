@@ -52,6 +52,13 @@ UPLOAD_FOLDER = "uploads"
 MAX_FILE_SIZE_MB = 50
 MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024  # 50 MB
 THUMBNAIL_SIZE = (200, 200)
+# Lecture des uploads en flux : taille des blocs et octets examinés pour détecter le type réel
+UPLOAD_CHUNK_SIZE = int(os.getenv('SIU_UPLOAD_CHUNK_SIZE', str(64 * 1024)))
+UPLOAD_SNIFF_SIZE = int(os.getenv('SIU_UPLOAD_SNIFF_SIZE', str(16 * 1024)))
+# Nombre de fichiers traités en parallèle lors d'un upload multiple
+UPLOAD_WORKERS = int(os.getenv('SIU_UPLOAD_WORKERS', '4'))
+# Délai avant suppression d'un blob de document qui n'est plus référencé (secondes)
+BLOB_SWEEP_GRACE = int(os.getenv('SIU_BLOB_SWEEP_GRACE', '3600'))
 DOCUMENT_RETENTION_DAYS = 365
 
 # Allowed file extensions (étendu)
@@ -133,13 +140,84 @@ def get_extension(filename: str) -> str:
 # Performance settings
 ENABLE_QUERY_MONITORING = True
 CACHE_TIMEOUT = 300  # 5 minutes
+CACHE_MAX_ENTRIES = int(os.getenv('SIU_CACHE_MAX_ENTRIES', '1024'))
+# Backend de cache partagé entre workers (ex: redis://localhost:6379/0), vide = cache en mémoire
+CACHE_URL = os.getenv('SIU_CACHE_URL', '')
+
+# Cache des utilisateurs authentifiés (secondes, 0 = désactivé)
+AUTH_CACHE_TTL = int(os.getenv('SIU_AUTH_CACHE_TTL', '60'))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv('SIU_AUTH_CACHE_MAX_ENTRIES', '10000'))
+
+# Révocation des tokens : délai max de propagation entre workers et purge des tokens expirés (secondes)
+TOKEN_REVOCATION_SYNC_INTERVAL = float(os.getenv('SIU_TOKEN_REVOCATION_SYNC_INTERVAL', '1'))
+TOKEN_REVOCATION_PURGE_INTERVAL = int(os.getenv('SIU_TOKEN_REVOCATION_PURGE_INTERVAL', '3600'))
+# Fenêtre de recouvrement de la synchronisation (secondes) : une révocation validée
+# après une révocation d'id supérieur déjà synchronisée est encore relue pendant ce délai
+TOKEN_REVOCATION_SYNC_OVERLAP = float(os.getenv('SIU_TOKEN_REVOCATION_SYNC_OVERLAP', '30'))
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.getenv('SIU_TOKEN_REVOCATION_BLOOM_CAPACITY', '100000'))
+
+# Écriture asynchrone des logs d'audit : taille de file, lots, intervalle de flush (secondes)
+# Politique de débordement : spool (fichier disque), block, drop_oldest, drop_newest
+AUDIT_QUEUE_MAX_SIZE = int(os.getenv('SIU_AUDIT_QUEUE_MAX_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('SIU_AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('SIU_AUDIT_FLUSH_INTERVAL', '1'))
+AUDIT_OVERFLOW_POLICY = os.getenv('SIU_AUDIT_OVERFLOW_POLICY', 'spool')
+AUDIT_BLOCK_TIMEOUT = float(os.getenv('SIU_AUDIT_BLOCK_TIMEOUT', '5'))
+AUDIT_SPOOL_PATH = os.getenv('SIU_AUDIT_SPOOL_PATH', 'audit_spool.jsonl')
+
+# Diffusion WebSocket : file d'envoi par connexion, politique des clients lents
+# (coalesce, drop_oldest, disconnect) et délai max d'un envoi (secondes)
+WS_SEND_QUEUE_SIZE = int(os.getenv('SIU_WS_SEND_QUEUE_SIZE', '256'))
+WS_SLOW_CONSUMER_POLICY = os.getenv('SIU_WS_SLOW_CONSUMER_POLICY', 'coalesce')
+WS_SEND_TIMEOUT = float(os.getenv('SIU_WS_SEND_TIMEOUT', '10'))
+# Fenêtre de fusion des mises à jour répétées d'une même entité (secondes, 0 = désactivée)
+WS_COALESCE_WINDOW = float(os.getenv('SIU_WS_COALESCE_WINDOW', '0.2'))
+
+# Bus d'événements temps réel entre workers : database (table partagée) ou memory (un seul worker)
+EVENT_BUS_BACKEND = os.getenv('SIU_EVENT_BUS', 'database')
+EVENT_BUS_POLL_INTERVAL = float(os.getenv('SIU_EVENT_BUS_POLL_INTERVAL', '0.5'))
+EVENT_BUS_RETENTION = int(os.getenv('SIU_EVENT_BUS_RETENTION', '3600'))
+# Fenêtre de recouvrement des relevés (secondes) : un événement de numéro inférieur
+# validé après un numéro supérieur déjà relevé est encore vu pendant ce délai
+EVENT_BUS_POLL_OVERLAP = float(os.getenv('SIU_EVENT_BUS_POLL_OVERLAP', '5'))
+# Nombre max d'événements rejoués à un client qui se reconnecte
+EVENT_BUS_REPLAY_LIMIT = int(os.getenv('SIU_EVENT_BUS_REPLAY_LIMIT', '500'))
+
+# Boîte d'envoi des notifications temps réel : taille max, lots, essais et délai initial (secondes)
+NOTIFICATION_OUTBOX_MAX_SIZE = int(os.getenv('SIU_NOTIFICATION_OUTBOX_MAX_SIZE', '10000'))
+NOTIFICATION_BATCH_SIZE = int(os.getenv('SIU_NOTIFICATION_BATCH_SIZE', '100'))
+NOTIFICATION_MAX_RETRIES = int(os.getenv('SIU_NOTIFICATION_MAX_RETRIES', '3'))
+NOTIFICATION_RETRY_DELAY = float(os.getenv('SIU_NOTIFICATION_RETRY_DELAY', '0.5'))
+
+# Génération des rapports PDF/Excel : processus de rendu, cache disque des résultats
+REPORT_WORKERS = int(os.getenv('SIU_REPORT_WORKERS', '2'))
+# Nombre de rapports rendus par un processus avant son remplacement (libère la mémoire de matplotlib,
+# Python 3.11+ ; ignoré sur les versions antérieures)
+REPORT_MAX_TASKS_PER_CHILD = int(os.getenv('SIU_REPORT_MAX_TASKS_PER_CHILD', '50'))
+REPORT_CACHE_DIR = os.getenv('SIU_REPORT_CACHE_DIR', 'report_cache')
+REPORT_CACHE_TTL = int(os.getenv('SIU_REPORT_CACHE_TTL', '86400'))
+# Attente max d'un rapport par les endpoints de téléchargement direct (au-delà : 202 + job_id)
+REPORT_WAIT_TIMEOUT = float(os.getenv('SIU_REPORT_WAIT_TIMEOUT', '60'))
+REPORT_SCHEDULER_INTERVAL = float(os.getenv('SIU_REPORT_SCHEDULER_INTERVAL', '60'))
+
+# Exports en flux (CSV, GeoJSON, KML) : lignes lues par lot via un curseur serveur,
+# taille des blocs envoyés et niveau de compression gzip (1-9)
+EXPORT_BATCH_SIZE = int(os.getenv('SIU_EXPORT_BATCH_SIZE', '1000'))
+EXPORT_CHUNK_SIZE = int(os.getenv('SIU_EXPORT_CHUNK_SIZE', str(64 * 1024)))
+EXPORT_GZIP_LEVEL = int(os.getenv('SIU_EXPORT_GZIP_LEVEL', '6'))
+
+# Intervalle de réconciliation des statistiques matérialisées (secondes, 0 = désactivée)
+STATS_RECONCILE_INTERVAL = int(os.getenv('SIU_STATS_RECONCILE_INTERVAL', '3600'))
 
 # Connection pool settings
-DB_POOL_SIZE = 10
-DB_MAX_OVERFLOW = 20
-DB_POOL_TIMEOUT = 30
-DB_POOL_RECYCLE = 3600
+DB_POOL_SIZE = int(os.getenv('SIU_DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('SIU_DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('SIU_DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('SIU_DB_POOL_RECYCLE', '3600'))
+DB_POOL_PRE_PING = os.getenv('SIU_DB_POOL_PRE_PING', 'true').lower() == 'true'
 
 # Request limits
 MAX_PAGE_SIZE = 1000
 DEFAULT_PAGE_SIZE = 100
+# Durée de conservation des totaux de pagination mis en cache (mode 'cached'), en secondes
+PAGINATION_COUNT_TTL = int(os.getenv('SIU_PAGINATION_COUNT_TTL', '60'))
@@ -15,7 +15,8 @@ from backend.core.repository_interfaces import (
     IRoleRepository,
     IAuditLogRepository,
     IMutationRepository,
-    IDocumentRepository
+    IDocumentRepository,
+    IParcelStatsRepository
 )
 
 # Repositories
@@ -29,6 +30,7 @@ from backend.infrastructure.repositories.role_repository import SqlRoleRepositor
 from backend.infrastructure.repositories.audit_log_repository import SqlAuditLogRepository
 from backend.infrastructure.repositories.mutation_repository import SqlMutationRepository
 from backend.infrastructure.repositories.document_repository import SqlDocumentRepository
+from backend.infrastructure.repositories.parcel_stats_repository import SqlParcelStatsRepository
 
 # Services
 from backend.services.parcel_service import ParcelService
@@ -44,15 +46,14 @@ from backend.services.workflow_service import WorkflowService
 from backend.services.document_service import DocumentService
 from backend.services.mutation_service import MutationService
 
-from backend.database import get_db
+from backend.database import get_request_session
 
 def configure_container():
     """Enregistre toutes les dépendances de l'application."""
 
-    # Les sessions de DB sont gérées par `get_db` de FastAPI,
-    # qui est injecté directement dans les constructeurs des repositories.
-    # Le conteneur résoudra cela automatiquement.
-    container.register_factory(Session, lambda: next(get_db()))
+    # Une session par requête HTTP (unité de travail ouverte par UnitOfWorkMiddleware),
+    # partagée par tous les repositories et services résolus pendant la requête.
+    container.register_factory(Session, get_request_session)
 
     # Repositories
     container.register_transient(IParcelRepository, SqlParcelRepository)
@@ -65,6 +66,7 @@ def configure_container():
     container.register_transient(IAuditLogRepository, SqlAuditLogRepository)
     container.register_transient(IMutationRepository, SqlMutationRepository)
     container.register_transient(IDocumentRepository, SqlDocumentRepository)
+    container.register_transient(IParcelStatsRepository, SqlParcelStatsRepository)
 
     # Services
     container.register_transient(AdminService, AdminService)
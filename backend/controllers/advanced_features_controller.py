@@ -1,14 +1,19 @@
 """
 Endpoints pour les fonctionnalités avancées de recherche
 """
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 
 from backend.dependencies import get_db, get_current_user
 from backend.models.user import User
+from backend.core.exceptions import SIUException
+from backend.core.pagination import TOTAL_MODE_PATTERN
 from backend.services.search_service import SearchService
 from backend.services.analytics_service import AnalyticsService
+from backend.core.response_cache import cached_response
+from backend.core.streaming_export import export_response
 from backend.services.workflow_service import WorkflowService
 from backend.services.document_service import DocumentService
 from backend.services.mutation_service import MutationService
@@ -27,11 +32,15 @@ def advanced_search(
     radius_km: Optional[float] = Query(None, ge=0.1, le=50.0),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=512),
+    total_mode: str = Query('cached', alias="total", pattern=TOTAL_MODE_PATTERN),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Recherche avancée avec tous les critères possibles
+
+    La page suivante s'obtient avec `cursor` = next_cursor de la réponse précédente.
     """
     from backend.container_config import get_search_service
     search_service = get_search_service()
@@ -44,7 +53,9 @@ def advanced_search(
         'min_area': min_area,
         'max_area': max_area,
         'page': page,
-        'page_size': page_size
+        'page_size': page_size,
+        'cursor': cursor,
+        'total_mode': total_mode
     }
     
     if coordinates and radius_km:
@@ -55,8 +66,10 @@ def advanced_search(
         except ValueError:
             raise HTTPException(status_code=400, detail="Coordonnées invalides. Format attendu: lat,lng")
     
-    results = search_service.advanced_search(filters)
-    return results
+    try:
+        return search_service.advanced_search(filters)
+    except SIUException as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
 
 @router.get("/geocode")
@@ -151,7 +164,7 @@ def search_within_geometry(
     
     try:
         results = search_service.search_within_geometry(
-            geometry=geometry.get('coordinates', []),
+            geometry=geometry,
             category=category,
             status=status
         )
@@ -159,6 +172,8 @@ def search_within_geometry(
             "results": results[:limit],
             "total": len(results)
         }
+    except SIUException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de recherche dans la géométrie: {str(e)}")
 
@@ -180,7 +195,7 @@ def search_intersect_geometry(
     
     try:
         results = search_service.search_intersecting(
-            geometry=geometry.get('coordinates', []),
+            geometry=geometry,
             category=category,
             status=status
         )
@@ -188,11 +203,14 @@ def search_intersect_geometry(
             "results": results[:limit],
             "total": len(results)
         }
+    except SIUException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de recherche d'intersection: {str(e)}")
 
 
 @router.get("/analytics/dashboard-stats")
+@cached_response()
 def get_dashboard_stats(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -232,6 +250,7 @@ def get_dashboard_stats(
 
 
 @router.get("/analytics/parcels-by-category")
+@cached_response()
 def get_parcels_by_category(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -257,6 +276,7 @@ def get_parcels_by_category(
 
 
 @router.get("/analytics/parcels-by-status")
+@cached_response()
 def get_parcels_by_status(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -282,6 +302,7 @@ def get_parcels_by_status(
 
 
 @router.get("/analytics/parcels-by-zone")
+@cached_response()
 def get_parcels_by_zone(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -307,6 +328,7 @@ def get_parcels_by_zone(
 
 
 @router.get("/analytics/area-distribution")
+@cached_response()
 def get_area_distribution(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -447,6 +469,7 @@ def generate_excel_report(
 @router.post("/reports/{report_type}/csv")
 def generate_csv_report(
     report_type: str,
+    request: Request,
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
@@ -460,7 +483,7 @@ def generate_csv_report(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Génère un rapport CSV
+    Génère un rapport CSV, envoyé en flux (compressé en gzip si le client l'accepte)
     """
     from backend.container_config import get_analytics_service
     analytics_service = get_analytics_service()
@@ -481,8 +504,12 @@ def generate_csv_report(
     filters = {k: v for k, v in filters.items() if v is not None}
     
     try:
-        report_blob = analytics_service.generate_csv_report(report_type, filters)
-        return report_blob
+        return export_response(
+            analytics_service.iter_csv_report(report_type, filters),
+            f"rapport_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            "text/csv",
+            request
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de génération du rapport CSV: {str(e)}")
 
@@ -929,6 +956,7 @@ def search_documents_by_tags(
 
 
 @router.get("/analytics/geographic-trends")
+@cached_response()
 def get_geographic_trends(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -1038,6 +1066,7 @@ def get_predictions(
 
 @router.post("/analytics/export-raw")
 def export_raw_data(
+    request: Request,
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
@@ -1051,7 +1080,7 @@ def export_raw_data(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Exporte les données brutes
+    Exporte les données brutes (CSV des parcelles filtrées), en flux
     """
     from backend.container_config import get_analytics_service
     analytics_service = get_analytics_service()
@@ -1072,13 +1101,18 @@ def export_raw_data(
     filters = {k: v for k, v in filters.items() if v is not None}
     
     try:
-        raw_data = analytics_service.export_raw_data(filters)
-        return raw_data
+        return export_response(
+            analytics_service.iter_raw_data(filters),
+            f"donnees_brutes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            "text/csv",
+            request
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur d'export des données brutes: {str(e)}")
 
 
 @router.get("/analytics/stats-by-period")
+@cached_response()
 def get_stats_by_period(
     period: str = Query(..., regex="^(daily|weekly|monthly|quarterly|yearly)$"),
     start_date: Optional[str] = Query(None),
@@ -1114,6 +1148,7 @@ def get_stats_by_period(
 
 
 @router.get("/analytics/comparisons")
+@cached_response()
 def get_comparisons(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -1148,6 +1183,7 @@ def get_comparisons(
 
 
 @router.get("/analytics/owners-distribution")
+@cached_response()
 def get_owners_distribution(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -1180,6 +1216,7 @@ def get_owners_distribution(
 
 
 @router.get("/analytics/documents-distribution")
+@cached_response()
 def get_documents_distribution(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
@@ -9,12 +9,14 @@ import re
 
 from backend.dependencies import get_current_user, get_db, require_admin
 from backend.services.analytics_service import AnalyticsService
+from backend.core.response_cache import cached_response
 from backend.models.user import User
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics Charts"])
 
 
 @router.get("/parcels/status", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcel_status_distribution(
     current_user: User = Depends(require_admin),
     db = Depends(get_db)
@@ -25,22 +27,11 @@ def get_parcel_status_distribution(
     **Requires**: Admin role
     """
     try:
-        cursor = db.cursor()
-        
-        # Compter les parcelles par statut
-        cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN status IS NULL THEN 'available'
-                    ELSE status 
-                END as status,
-                COUNT(*) as count
-            FROM parcels
-            GROUP BY status
-        """)
-        
-        rows = cursor.fetchall()
-        
+        from backend.container_config import get_analytics_service
+
+        # Lecture des compteurs matérialisés (parcel_stats)
+        by_status = get_analytics_service().get_breakdown('status')
+
         # Initialiser les compteurs
         result = {
             "available": 0,
@@ -48,13 +39,12 @@ def get_parcel_status_distribution(
             "disputed": 0,
             "reserved": 0
         }
-        
+
         # Remplir les résultats
-        for row in rows:
-            status_key = row[0]
+        for status_key, count in by_status.items():
             if status_key in result:
-                result[status_key] = row[1]
-        
+                result[status_key] = count
+
         return result
         
     except Exception as e:
@@ -65,6 +55,7 @@ def get_parcel_status_distribution(
 
 
 @router.get("/parcels/trends", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcel_trends(
     days: int = Query(30, ge=1, le=365, description="Nombre de jours à analyser"),
     current_user: User = Depends(require_admin),
@@ -134,6 +125,7 @@ def get_parcel_trends(
 
 
 @router.get("/documents/types", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_document_types_distribution(
     current_user: User = Depends(require_admin),
     db = Depends(get_db)
@@ -230,6 +222,7 @@ def get_user_activity(
 
 
 @router.get("/parcels/geographic", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_geographic_distribution(
     current_user: User = Depends(require_admin),
     db = Depends(get_db)
@@ -11,6 +11,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from backend.dependencies import get_current_user, get_db, require_admin
 from backend.services.analytics_service import AnalyticsService
+from backend.core.response_cache import cached_response, DEFAULT_DEPENDENCIES
 from backend.models.user import User
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
@@ -34,6 +35,7 @@ class AnalyticsSummary(BaseModel):
 
 
 @router.get("/timeseries", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_time_series_data(
     period: str = Query("30d", description="Période: 7d, 30d, 90d, 1y"),
     current_user: User = Depends(require_admin),
@@ -87,6 +89,7 @@ def get_time_series_data(
 
 
 @router.get("/summary", status_code=status.HTTP_200_OK)
+@cached_response(depends_on=DEFAULT_DEPENDENCIES + ('users',))
 def get_analytics_summary(
     current_user: User = Depends(require_admin),
     db = Depends(get_db)
@@ -249,6 +252,7 @@ def get_performance_metrics(
             detail=f"Erreur lors de la récupération des métriques de performance : {str(e)}"
         )
 @router.get("/dashboard", status_code=status.HTTP_200_OK)
+@cached_response(depends_on=DEFAULT_DEPENDENCIES + ('users',))
 def get_dashboard_analytics(
     db_session: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -311,6 +315,7 @@ def get_dashboard_analytics(
         )
 
 @router.get("/parcels-by-category", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcels_by_category(
     db_session: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -336,6 +341,7 @@ def get_parcels_by_category(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/parcels-by-status", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcels_by_status(
     db_session: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -361,6 +367,7 @@ def get_parcels_by_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/parcels-by-zone", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcels_by_zone(
     db_session: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -386,6 +393,7 @@ def get_parcels_by_zone(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/area-distribution", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_area_distribution(
     db_session: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -13,6 +13,9 @@ import json
 
 from backend.dependencies import get_current_user, get_db, require_admin
 from backend.services.audit_service import AuditService
+from backend.container_config import get_audit_service
+from backend.core.exceptions import InvalidDataException
+from backend.core.pagination import TOTAL_MODE_PATTERN
 from backend.models.user import User
 
 router = APIRouter(prefix="/api/audit", tags=["Audit"])
@@ -23,21 +26,25 @@ def get_audit_logs(
     action: Optional[str] = None,
     entity_type: Optional[str] = None,
     entity_id: Optional[str] = None,
-    user_id: Optional[int] = None,
+    user_id: Optional[str] = None,
     status_filter: Optional[str] = Query(None, alias="status"),
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
     is_sensitive: Optional[bool] = None,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, max_length=512),
+    total_mode: str = Query('none', alias="total", pattern=TOTAL_MODE_PATTERN),
     current_user: User = Depends(require_admin),
-    db = Depends(get_db)
+    audit_service: AuditService = Depends(get_audit_service)
 ):
     """
-    Récupère les audit logs avec filtres
+    Récupère les audit logs avec filtres, du plus récent au plus ancien
 
     **Requires**: Admin role
     **Filters**: action, entity_type, entity_id, user_id, status, dates, is_sensitive
+    **Pagination**: `cursor` (next_cursor de la réponse précédente, coût constant quelle
+    que soit la profondeur) ou `offset` ; `total` = exact, cached, estimate ou none
     """
     try:
         # Validation des paramètres pour prévenir les injections
@@ -65,30 +72,37 @@ def get_audit_logs(
                 detail="Status invalide"
             )
 
-        audit_service = AuditService(db)
-
-        logs = audit_service.get_audit_logs(
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            user_id=user_id,
-            status=status_filter,
-            date_from=date_from,
-            date_to=date_to,
-            is_sensitive=is_sensitive,
+        page = audit_service.get_audit_logs_page(
+            {
+                'action': action,
+                'entity_type': entity_type,
+                'entity_id': entity_id,
+                'user_id': user_id,
+                'status': status_filter,
+                'date_from': date_from,
+                'date_to': date_to,
+                'is_sensitive': is_sensitive
+            },
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            total_mode=total_mode
         )
 
         return {
-            'logs': logs,
-            'total': len(logs),
+            'logs': page['items'],
+            # Sans total demandé : nombre de logs de la page, comme auparavant
+            'total': page['total'] if page['total'] is not None else len(page['items']),
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more']
         }
 
     except HTTPException:
         raise
+    except InvalidDataException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -8,12 +8,14 @@ from datetime import datetime
 
 from backend.dependencies import get_current_user, get_db
 from backend.services.analytics_service import AnalyticsService
+from backend.core.response_cache import cached_response, DEFAULT_DEPENDENCIES
 from backend.models.user import User
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
 
 @router.get("/stats", status_code=status.HTTP_200_OK)
+@cached_response(depends_on=DEFAULT_DEPENDENCIES + ('users',))
 def get_dashboard_stats(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -39,6 +41,7 @@ def get_dashboard_stats(
 
 
 @router.get("/summary", status_code=status.HTTP_200_OK)
+@cached_response(depends_on=DEFAULT_DEPENDENCIES + ('users',))
 def get_dashboard_summary(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -111,6 +114,7 @@ def get_recent_activity(
 
 
 @router.get("/charts/parcels-by-zone", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcels_by_zone_chart(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -133,6 +137,7 @@ def get_parcels_by_zone_chart(
 
 
 @router.get("/charts/parcels-by-category", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_parcels_by_category_chart(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -155,6 +160,7 @@ def get_parcels_by_category_chart(
 
 
 @router.get("/charts/documents-by-type", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_documents_by_type_chart(
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
@@ -178,6 +184,7 @@ def get_documents_by_type_chart(
 
 
 @router.get("/charts/time-series", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_time_series_chart(
     period: str = Query('30d', regex='^(7d|30d|90d|1y)$'),
     metric: str = Query('parcels', regex='^(parcels|documents)$'),
@@ -226,6 +233,7 @@ def get_time_series_chart(
 
 
 @router.get("/top-zones", status_code=status.HTTP_200_OK)
+@cached_response()
 def get_top_zones(
     limit: int = Query(5, ge=1, le=20),
     current_user: User = Depends(get_current_user),
@@ -238,31 +246,17 @@ def get_top_zones(
         limit: Nombre de zones à retourner (1-20)
     """
     try:
-        # Appel direct sans passer par AnalyticsService
-        from sqlalchemy import func
-        from backend.models.parcel import Parcel
-        
-        query = db.query(
-            Parcel.zone,
-            func.count(Parcel.id).label('parcel_count')
-        ).filter(
-            Parcel.zone.isnot(None),
-            Parcel.zone != ''
-        ).group_by(
-            Parcel.zone
-        ).order_by(
-            func.count(Parcel.id).desc()
-        ).limit(limit)
-        
-        results = query.all()
-        
-        zones = []
-        for zone, count in results:
-            zones.append({
-                'name': zone,
-                'parcel_count': count
-            })
-        
+        from backend.container_config import get_analytics_service
+        from backend.core.repository_interfaces import PARCEL_STATISTICS_DIMENSIONS
+
+        # Compteurs matérialisés, déjà triés par effectif décroissant
+        by_zone = get_analytics_service().get_breakdown('zone')
+        zones = [
+            {'name': zone, 'parcel_count': count}
+            for zone, count in by_zone.items()
+            if zone != PARCEL_STATISTICS_DIMENSIONS['zone']
+        ][:limit]
+
         return {
             'zones': zones,
             'total': len(zones)
@@ -6,6 +6,7 @@ Story 6.1: Gestion des documents liés aux parcelles
 import re
 from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 from backend.services.document_service import DocumentService
 from backend.services.admin_service import AdminService
@@ -76,8 +77,10 @@ async def upload_document(
             detail="Parcel ID too long"
         )
 
-    # Validation du type de document
-    allowed_types = ['pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx', 'xls', 'xlsx', 'tif', 'tiff', 'txt', 'rtf']
+    # Validation du type de document (valeur 'survey_plan' ou nom 'SURVEY_PLAN')
+    # Le format du fichier (PDF, JPG...) est contrôlé par le service à la réception
+    from backend.models.document import DocumentType
+    allowed_types = [doc_type.value for doc_type in DocumentType]
     if document_type.lower() not in allowed_types:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -102,11 +105,13 @@ async def upload_document(
     # Remarque: FastAPI ne permet pas de lire la taille directement sans lire le contenu
     # Nous devons donc limiter cela dans la configuration du serveur ou dans le service
 
-    # Create service with DB session
-    document_service = DocumentService(db)
+    # Validation, hachage et stockage adressé par contenu : service documentaire complet
+    from backend.services.document_service_new import DocumentService as UploadDocumentService
+    document_service = UploadDocumentService(db)
 
     # Upload document - Pass the file object directly, not the read content
-    result = document_service.upload_document(
+    result = await run_in_threadpool(
+        document_service.upload_document,
         file=file.file,  # Use the underlying file object
         parcel_id=parcel_id or "",  # Keep as string to match document model, handle None
         title=file.filename or "Document sans titre",  # Use filename as title
@@ -340,32 +345,27 @@ async def upload_multiple_documents(
     
     **Requires**: Admin or Manager role
     """
-    document_service = DocumentService(db)
-    results = {"success": [], "errors": []}
-    
-    for file in files:
-        result = document_service.upload_document(
-            file=file.file,  # Use the underlying file object
-            parcel_id=parcel_id,  # Keep as string to match document model
-            title=file.filename or "Document sans titre",  # Use filename as title
-            filename=file.filename or "unknown_file",
-            document_type=document_type,
-            uploaded_by=current_user.id,  # User ID is string
-            description=""
-        )
-        
-        if result.get('success'):
-            results["success"].append({
-                "filename": file.filename,
-                "document": result.get('document')
-            })
-        else:
-            results["errors"].append({
-                "filename": file.filename,
-                "error": result.get('error')
-            })
-    
-    return results
+    # Traitement parallèle et stockage adressé par contenu : service documentaire complet
+    from backend.services.document_service_new import DocumentService as UploadDocumentService
+    document_service = UploadDocumentService(db)
+
+    # Fichiers traités en parallèle, métadonnées enregistrées dans une seule transaction
+    result = await run_in_threadpool(
+        document_service.upload_multiple_documents,
+        files=[(file.file, file.filename or "unknown_file") for file in files],
+        parcel_id=parcel_id,  # Keep as string to match document model
+        document_type=document_type,
+        uploaded_by=current_user.id  # User ID is string
+    )
+
+    return {
+        "success": [
+            {"filename": item["filename"], "document": item["document"]}
+            for item in result["results"] if item["success"]
+        ],
+        "errors": result["errors"],
+        "stats": result["stats"]
+    }
 
 
 @router.get("/search", status_code=status.HTTP_200_OK)
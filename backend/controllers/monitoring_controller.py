@@ -4,6 +4,7 @@ Monitoring Controller - Métriques système et health checks
 
 import re
 from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
 from datetime import datetime, timedelta
 import psutil
 import os
@@ -232,6 +233,113 @@ async def get_database_stats(current_user: User = Depends(require_admin)):
         }
 
 
+@router.get("/db-pool", status_code=status.HTTP_200_OK)
+async def get_db_pool_stats(current_user: User = Depends(require_admin)):
+    """
+    État du pool de connexions à la base de données
+
+    **Requires**: Admin role
+    """
+    from backend.database import get_pool_stats
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "pool": get_pool_stats()
+    }
+
+
+@router.get("/db-pool/metrics", response_class=PlainTextResponse)
+async def get_db_pool_metrics():
+    """
+    Métriques du pool de connexions au format Prometheus
+
+    **Public endpoint** - Destiné aux scrapers (aucune donnée sensible)
+    """
+    from backend.database import get_pool_stats
+
+    lines = []
+    for name, value in get_pool_stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metric = f"siu_db_pool_{name}"
+            metric_type = "counter" if name.endswith('_total') else "gauge"
+            lines.append(f"# TYPE {metric} {metric_type}")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+async def get_cache_stats(current_user: User = Depends(require_admin)):
+    """
+    Statistiques du cache des réponses (hits, miss, taux de succès)
+
+    **Requires**: Admin role
+    """
+    from backend.core.response_cache import response_cache
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "cache": response_cache.get_stats()
+    }
+
+
+@router.delete("/cache", status_code=status.HTTP_200_OK)
+async def clear_cache(current_user: User = Depends(require_admin)):
+    """
+    Vide le cache des réponses
+
+    **Requires**: Admin role
+    """
+    from backend.core.response_cache import response_cache
+
+    response_cache.clear()
+    return {"message": "Cache vidé"}
+
+
+@router.get("/audit-writer", status_code=status.HTTP_200_OK)
+async def get_audit_writer_stats(current_user: User = Depends(require_admin)):
+    """
+    État de la file d'écriture des logs d'audit (file, lots écrits, spool, pertes)
+
+    **Requires**: Admin role
+    """
+    from backend.core.audit_writer import audit_writer
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "audit_writer": audit_writer.get_stats()
+    }
+
+
+@router.get("/notifications", status_code=status.HTTP_200_OK)
+async def get_notification_stats(current_user: User = Depends(require_admin)):
+    """
+    Débit et pertes des notifications temps réel (déposées, délivrées, réessayées, perdues)
+
+    **Requires**: Admin role
+    """
+    from backend.core.notification_outbox import notification_outbox
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "notifications": notification_outbox.get_stats()
+    }
+
+
+@router.get("/report-jobs", status_code=status.HTTP_200_OK)
+async def get_report_job_stats(current_user: User = Depends(require_admin)):
+    """
+    File de génération des rapports (soumis, servis depuis le cache, rendus, en échec, en cours)
+
+    **Requires**: Admin role
+    """
+    from backend.core.report_jobs import report_jobs
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "report_jobs": report_jobs.get_stats()
+    }
+
+
 def get_uptime() -> str:
     """Calcule l'uptime du système"""
     boot_time = datetime.fromtimestamp(psutil.boot_time())
@@ -3,7 +3,7 @@ Contrôleur FastAPI pour la gestion des mutations de parcelles
 """
 
 import re
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
@@ -11,6 +11,9 @@ from datetime import datetime
 from datetime import datetime
 
 from backend.services.mutation_service import MutationService
+from backend.container_config import get_mutation_service
+from backend.core.exceptions import InvalidDataException
+from backend.core.pagination import TOTAL_MODE_PATTERN
 from backend.dependencies import get_current_user, get_db, require_admin
 from backend.models.user import User
 
@@ -79,28 +82,37 @@ async def create_mutation(
         raise HTTPException(status_code=500, detail=f"Erreur lors de la création: {str(e)}")
 
 @router.get("/", response_model=dict)
-async def get_mutations(
+def get_mutations(
     status: Optional[str] = None,
-    page: int = 1,
-    page_size: int = 20,
-    db = Depends(get_db),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, max_length=512),
+    total_mode: str = Query('cached', alias="total", pattern=TOTAL_MODE_PATTERN),
+    service: MutationService = Depends(get_mutation_service),
     current_user: User = Depends(require_admin)
 ):
     """
     Récupère toutes les mutations avec pagination
+
+    La page suivante s'obtient avec `cursor` = next_cursor de la réponse précédente
+    (coût constant quelle que soit la profondeur) ; `page` reste accepté.
     """
     try:
-        service = MutationService(db)
         offset = (page - 1) * page_size
         result = service.get_all_mutations(
             status=status,
             limit=page_size,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            total_mode=total_mode
         )
         
         # Convertir les mutations en dict
         result['items'] = [m.to_dict() for m in result['items']]
+        result['page'] = None if cursor else page
         return result
+    except InvalidDataException as e:
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
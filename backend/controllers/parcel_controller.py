@@ -2,7 +2,8 @@
 Parcel controller for managing land parcels
 """
 import re
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+import hashlib
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Header, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
@@ -15,6 +16,7 @@ from backend.models.user import User, UserRole
 from backend.dependencies import get_current_user, require_admin
 from backend.container_config import get_parcel_service, get_availability_service, get_alert_service, get_admin_service
 from backend.core.exceptions import SIUException
+from backend.core.pagination import TOTAL_MODE_PATTERN
 from backend.database import get_db
 from sqlalchemy.orm import Session
 
@@ -116,31 +118,31 @@ def get_parcel(
 def get_all_parcels(
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, max_length=512),
+    total_mode: str = Query('cached', alias="total", pattern=TOTAL_MODE_PATTERN),
     parcel_service: ParcelService = Depends(get_parcel_service)
 ):
-    parcels = parcel_service.get_all_parcels()
-    total = len(parcels)
-    start_idx = (page - 1) * page_size
-    items = parcels[start_idx : start_idx + page_size]
-    return {
-        "items": items,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size if total > 0 else 1
-    }
+    try:
+        return parcel_service.search_parcels({'page': page, 'page_size': page_size}, cursor=cursor, total_mode=total_mode)
+    except SIUException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
 
 @router.post("/search", status_code=status.HTTP_200_OK)
 def search_parcels(
     search_request: ParcelSearchRequest,
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, max_length=512),
+    total_mode: str = Query('cached', alias="total", pattern=TOTAL_MODE_PATTERN),
     parcel_service: ParcelService = Depends(get_parcel_service)
 ):
     search_criteria = search_request.model_dump()
     search_criteria['page'] = page
     search_criteria['page_size'] = page_size
-    return parcel_service.search_parcels(search_criteria)
+    try:
+        return parcel_service.search_parcels(search_criteria, cursor=cursor, total_mode=total_mode)
+    except SIUException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
 
 @router.put("/{parcel_id}", status_code=status.HTTP_200_OK)
 def update_parcel(
@@ -183,31 +185,72 @@ def assign_owner(
 @router.get("/map/geojson", status_code=status.HTTP_200_OK)
 def get_parcels_geojson(
     bbox: Optional[str] = Query(None),
+    z: Optional[int] = Query(None, ge=0, le=22),
+    x: Optional[int] = Query(None, ge=0),
+    y: Optional[int] = Query(None, ge=0),
     category: Optional[str] = Query(None),
     owner_id: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     parcel_service: ParcelService = Depends(get_parcel_service)
 ):
-    parcels = parcel_service.get_all_parcels_for_map(current_user)
+    """
+    GeoJSON des parcelles de la carte, limité à une emprise (bbox) ou à une tuile z/x/y
+    """
+    tile = [z, x, y]
+    if any(v is not None for v in tile) and not all(v is not None for v in tile):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tile mode requires z, x and y")
+    if bbox and z is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either bbox or z/x/y, not both")
+
+    bounds = None
     if bbox:
         try:
-            coords = [float(x) for x in bbox.split(',')]
-            # Create an instance of MapService to call instance methods
-            map_service = MapService()
-            parcels = map_service.filter_parcels_by_bbox(parcels, tuple(coords))
-        except (ValueError, IndexError):
+            bounds = tuple(float(v) for v in bbox.split(','))
+            if len(bounds) != 4:
+                raise ValueError(bbox)
+        except ValueError:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid bbox format. Use minLat,minLng,maxLat,maxLng")
+    elif z is not None:
+        try:
+            bounds = MapService.tile_to_bbox(z, x, y)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    if category:
-        # La catégorie est stockée comme chaîne dans la base de données
-        parcels = [p for p in parcels if p.category == category]
-    if owner_id:
-        parcels = [p for p in parcels if p.owner_id == owner_id]
+    parcels = parcel_service.get_parcels_for_map(current_user, bbox=bounds, category=category, owner_id=owner_id)
 
     # Create an instance of MapService to call instance methods
     map_service = MapService()
     return map_service.generate_geojson(parcels, include_owner_info=True)
 
+@router.get("/tiles/{z}/{x}/{y}.mvt", status_code=status.HTTP_200_OK)
+def get_parcels_vector_tile(
+    z: int,
+    x: int,
+    y: int,
+    category: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    parcel_service: ParcelService = Depends(get_parcel_service)
+):
+    """
+    Tuile vectorielle Mapbox (MVT) des parcelles, simplifiée selon le zoom
+    """
+    if not 0 <= z <= 22:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Zoom must be between 0 and 22")
+    try:
+        tile = parcel_service.get_vector_tile(current_user, z, x, y, category=category)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # La tuile dépend des droits de l'utilisateur : cache privé, revalidé par ETag
+    headers = {
+        'ETag': f'"{hashlib.sha1(tile).hexdigest()}"',
+        'Cache-Control': 'private, no-cache'
+    }
+    if if_none_match and headers['ETag'] in [v.strip() for v in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=tile, media_type="application/vnd.mapbox-vector-tile", headers=headers)
+
 @router.get("/map/bounds", status_code=status.HTTP_200_OK)
 def get_map_bounds(
     current_user: User = Depends(get_current_user),
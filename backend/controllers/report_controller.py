@@ -3,21 +3,75 @@ Report Controller - API pour la génération de rapports PDF et Excel
 """
 
 import re
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, Optional
 from datetime import datetime
 import io
 
+from backend.config import EXPORT_BATCH_SIZE, REPORT_WAIT_TIMEOUT
+from backend.core.report_jobs import report_jobs, report_scheduler, REPORT_KINDS, DONE, FAILED
+from backend.core.streaming_export import export_response
 from backend.dependencies import get_current_user, get_db, require_admin
+from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
+from backend.services.geospatial_export_service import GeospatialExportService
 from backend.services.report_service import ReportService
 from backend.models.user import User
+from backend.utils.role_helpers import is_admin
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
 
+class ReportJobRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+
+def _check_report_access(kind: str, current_user: User) -> None:
+    report_kind = REPORT_KINDS.get(kind)
+    if report_kind is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Type de rapport inconnu. Types disponibles : {', '.join(REPORT_KINDS)}"
+        )
+    if report_kind.admin_only and not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator privileges required"
+        )
+
+
+async def _serve_report(kind: str, params: dict, db, current_user: User, filename: str,
+                        not_found_on_error: bool = False):
+    """
+    Rend un rapport via la file (ou le sert depuis le cache) et le renvoie
+
+    Si le rendu dépasse REPORT_WAIT_TIMEOUT, répond 202 avec le job à suivre
+    sur /api/reports/jobs/{job_id}.
+    """
+    try:
+        job = await run_in_threadpool(report_jobs.submit, kind, params, db, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    job = await report_jobs.wait(job, REPORT_WAIT_TIMEOUT)
+    if job.status == FAILED:
+        if not_found_on_error and job.error_type == 'ValueError':
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=job.error)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la génération du rapport : {job.error}"
+        )
+    if job.status != DONE:
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.to_dict())
+
+    return FileResponse(job.path, media_type=job.media_type, filename=filename)
+
+
 @router.get("/parcel/{parcel_id}/pdf", status_code=status.HTTP_200_OK)
-def generate_parcel_report_pdf(
+async def generate_parcel_report_pdf(
     parcel_id: str,
     include_history: bool = Query(True),
     include_documents: bool = Query(True),
@@ -32,41 +86,26 @@ def generate_parcel_report_pdf(
 
     **Requires**: Authentication
     **Includes**: Informations, historique, documents, carte (optionnel), parcelles à proximité (optionnel)
+    **Cache**: servi sans nouveau rendu tant que la parcelle n'a pas changé
     """
-    try:
-        report_service = ReportService(db)
-        
-        pdf_bytes = report_service.generate_parcel_report_pdf(
-            parcel_id=parcel_id,
-            include_history=include_history,
-            include_documents=include_documents,
-            include_map=include_map,
-            include_nearby=include_nearby,
-            nearby_radius=nearby_radius
-        )
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=parcelle_{parcel_id}_report_{datetime.now().strftime('%Y%m%d')}.pdf"
-            }
-        )
-        
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=str(e)
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la génération du rapport : {str(e)}"
-        )
+    return await _serve_report(
+        'parcel_pdf',
+        {
+            'parcel_id': parcel_id,
+            'include_history': include_history,
+            'include_documents': include_documents,
+            'include_map': include_map,
+            'include_nearby': include_nearby,
+            'nearby_radius': nearby_radius
+        },
+        db, current_user,
+        filename=f"parcelle_{parcel_id}_report_{datetime.now().strftime('%Y%m%d')}.pdf",
+        not_found_on_error=True
+    )
 
 
 @router.get("/activity/pdf", status_code=status.HTTP_200_OK)
-def generate_activity_report_pdf(
+async def generate_activity_report_pdf(
     days: int = Query(30, ge=1, le=365),
     user_id: Optional[int] = None,
     current_user: User = Depends(require_admin),
@@ -78,31 +117,14 @@ def generate_activity_report_pdf(
     **Requires**: Admin role
     **Period**: Derniers X jours
     """
-    try:
-        report_service = ReportService(db)
-        
-        pdf_bytes = report_service.generate_activity_report_pdf(
-            days=days,
-            user_id=user_id
-        )
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=activity_report_{datetime.now().strftime('%Y%m%d')}.pdf"
-            }
-        )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de la génération du rapport : {str(e)}"
-        )
+    return await _serve_report(
+        'activity_pdf', {'days': days, 'user_id': user_id}, db, current_user,
+        filename=f"activity_report_{datetime.now().strftime('%Y%m%d')}.pdf"
+    )
 
 
 @router.get("/export/parcels/excel", status_code=status.HTTP_200_OK)
-def export_parcels_excel(
+async def export_parcels_excel(
     zone: Optional[str] = None,
     status_filter: Optional[str] = Query(None, alias="status"),
     current_user: User = Depends(get_current_user),
@@ -115,30 +137,10 @@ def export_parcels_excel(
     **Filters**: zone, status
     **Format**: XLSX avec feuilles multiples, graphiques, formules
     """
-    try:
-        report_service = ReportService(db)
-        
-        filters = {}
-        if zone:
-            filters['zone'] = zone
-        if status_filter:
-            filters['status'] = status_filter
-        
-        excel_bytes = report_service.export_parcels_excel(filters=filters)
-        
-        return StreamingResponse(
-            io.BytesIO(excel_bytes),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={
-                "Content-Disposition": f"attachment; filename=parcelles_export_{datetime.now().strftime('%Y%m%d')}.xlsx"
-            }
-        )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de l'export Excel : {str(e)}"
-        )
+    return await _serve_report(
+        'parcels_excel', {'zone': zone or None, 'status': status_filter or None}, db, current_user,
+        filename=f"parcelles_export_{datetime.now().strftime('%Y%m%d')}.xlsx"
+    )
 
 
 @router.get("/export/documents/excel", status_code=status.HTTP_200_OK)
@@ -186,7 +188,7 @@ def export_documents_excel(
 
 
 @router.get("/audit/pdf", status_code=status.HTTP_200_OK)
-def generate_audit_report_pdf(
+async def generate_audit_report_pdf(
     days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(require_admin),
     db = Depends(get_db)
@@ -204,23 +206,72 @@ def generate_audit_report_pdf(
     - Historique des actions récentes
     - Recommandations de sécurité
     """
+    return await _serve_report(
+        'audit_pdf', {'days': days}, db, current_user,
+        filename=f"audit_report_{datetime.now().strftime('%Y%m%d')}.pdf"
+    )
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_report_job(
+    request: ReportJobRequest,
+    current_user: User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Soumet la génération d'un rapport et renvoie immédiatement son job_id
+
+    **Requires**: Authentication (Admin pour activity_pdf et audit_pdf)
+    **Kinds**: parcel_pdf, activity_pdf, audit_pdf, parcels_excel
+    """
+    _check_report_access(request.kind, current_user)
     try:
-        report_service = ReportService(db)
-        pdf_bytes = report_service.generate_audit_report_pdf(days=days)
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=audit_report_{datetime.now().strftime('%Y%m%d')}.pdf"
-            }
-        )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+        job = await run_in_threadpool(report_jobs.submit, request.kind, request.params, db, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return job.to_dict()
+
+
+def _get_job(job_id: str, current_user: User):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job de rapport introuvable")
+    _check_report_access(job.kind, current_user)
+    return job
+
+
+@router.get("/jobs/{job_id}", status_code=status.HTTP_200_OK)
+def get_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    État d'un job de rapport (queued, running, done, failed)
+
+    **Requires**: Authentication
+    """
+    return _get_job(job_id, current_user).to_dict()
+
+
+@router.get("/jobs/{job_id}/result", status_code=status.HTTP_200_OK)
+def download_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Télécharge le rapport d'un job terminé
+
+    **Requires**: Authentication
+    """
+    job = _get_job(job_id, current_user)
+    if job.status == FAILED:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=job.error)
+    if job.status != DONE or not job.path.exists():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Rapport en cours de génération")
+    return FileResponse(
+        job.path, media_type=job.media_type,
+        filename=f"{job.kind}_{datetime.now().strftime('%Y%m%d')}.{REPORT_KINDS[job.kind].extension}"
+    )
 
 
 @router.get("/history", status_code=status.HTTP_200_OK)
@@ -279,21 +330,26 @@ def schedule_report(
     Planifie la génération automatique d'un rapport.
     
     Body:
-        report_type: Type de rapport
+        report_type: Type de rapport (parcel_pdf, activity_pdf, audit_pdf, parcels_excel)
         parameters: Paramètres du rapport
         schedule_type: daily, weekly, monthly
         schedule_time: Heure au format HH:MM
+
+    Chaque échéance soumet le rapport à la file de génération ; le résultat est
+    disponible sur /api/reports/jobs/{last_job_id}/result.
     """
-    
-    report_service = ReportService(db)
-    
-    result = report_service.schedule_report(
-        report_type=report_type,
-        user_id=current_user.id,
-        parameters=parameters,
-        schedule_type=schedule_type,
-        schedule_time=schedule_time
-    )
+    _check_report_access(report_type, current_user)
+    try:
+        result = report_scheduler.schedule(
+            db,
+            report_type=report_type,
+            parameters=parameters,
+            schedule_type=schedule_type,
+            schedule_time=schedule_time,
+            created_by=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return {
         "success": True,
@@ -302,6 +358,36 @@ def schedule_report(
     }
 
 
+@router.get("/schedules", status_code=status.HTTP_200_OK)
+def list_report_schedules(
+    db = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Liste les planifications actives (toutes pour un administrateur)
+    """
+    schedules = report_scheduler.list_schedules(db, None if is_admin(current_user) else current_user.id)
+    return {
+        "success": True,
+        "count": len(schedules),
+        "schedules": schedules
+    }
+
+
+@router.delete("/schedules/{schedule_id}", status_code=status.HTTP_200_OK)
+def cancel_report_schedule(
+    schedule_id: int,
+    db = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Annule une planification (la sienne, ou toute planification pour un administrateur)
+    """
+    if not report_scheduler.cancel(db, schedule_id, None if is_admin(current_user) else current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Planification introuvable")
+    return {"success": True, "message": "Schedule cancelled"}
+
+
 @router.post("/export/excel", status_code=status.HTTP_200_OK)
 def export_data_excel(
     filters: dict = None,
@@ -335,8 +421,15 @@ def export_data_excel(
         )
 
 
+def _parcel_export_records(db, filters: Optional[dict]):
+    """Parcelles filtrées au format des exports géospatiaux, lues par lots"""
+    rows = SqlParcelRepository(db).iter_export_rows(filters or {}, batch_size=EXPORT_BATCH_SIZE)
+    return GeospatialExportService.parcel_records(rows)
+
+
 @router.post("/export/csv", status_code=status.HTTP_200_OK)
 def export_data_csv(
+    request: Request,
     filters: dict = None,
     db = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -344,22 +437,16 @@ def export_data_csv(
     """
     Exporte des données vers CSV selon les filtres spécifiés
 
+    Le fichier est envoyé en flux (compressé en gzip si le client l'accepte).
+
     **Requires**: Admin role
     """
     try:
-        
-        report_service = ReportService(db)
-
-        csv_bytes = report_service.export_filtered_data_csv(filters=filters or {})
-
-        
-
-        return StreamingResponse(
-            io.BytesIO(csv_bytes),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=data_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            }
+        return export_response(
+            GeospatialExportService().iter_csv_with_coordinates(_parcel_export_records(db, filters)),
+            f"data_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            "text/csv",
+            request
         )
     except Exception as e:
         raise HTTPException(
@@ -370,6 +457,7 @@ def export_data_csv(
 
 @router.post("/export/geojson", status_code=status.HTTP_200_OK)
 def export_geojson(
+    request: Request,
     filters: dict = None,
     db = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -377,27 +465,105 @@ def export_geojson(
     """
     Exporte les données géospatiales vers GeoJSON selon les filtres spécifiés
 
+    Le fichier est envoyé en flux (compressé en gzip si le client l'accepte).
+
     **Requires**: Admin role
     """
     try:
-        
-        report_service = ReportService(db)
+        return export_response(
+            GeospatialExportService().iter_geojson(_parcel_export_records(db, filters)),
+            f"geo_data_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.geojson",
+            "application/geo+json",
+            request
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de l'export GeoJSON : {str(e)}"
+        )
 
-        geojson_data = report_service.export_filtered_data_geojson(filters=filters or {})
 
-        
+@router.post("/export/kml", status_code=status.HTTP_200_OK)
+def export_kml(
+    request: Request,
+    filters: dict = None,
+    db = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Exporte les parcelles vers KML (Google Earth) selon les filtres spécifiés
 
-        return StreamingResponse(
-            io.BytesIO(geojson_data.encode()),
-            media_type="application/geo+json",
-            headers={
-                "Content-Disposition": f"attachment; filename=geo_data_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.geojson"
-            }
+    Le fichier est envoyé en flux (compressé en gzip si le client l'accepte).
+
+    **Requires**: Admin role
+    """
+    try:
+        return export_response(
+            GeospatialExportService().iter_kml(_parcel_export_records(db, filters)),
+            f"geo_data_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.kml",
+            "application/vnd.google-earth.kml+xml",
+            request
         )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erreur lors de l'export GeoJSON : {str(e)}"
+            detail=f"Erreur lors de l'export KML : {str(e)}"
+        )
+
+
+@router.post("/export/shapefile", status_code=status.HTTP_200_OK)
+def export_shapefile(
+    filters: dict = None,
+    db = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Exporte les parcelles au format Shapefile (ZIP : .shp, .shx, .dbf, .prj, .cpg)
+    selon les filtres spécifiés
+
+    Deux couches : parcelles (polygones) et parcelles_points (coordonnées déclarées).
+
+    **Requires**: Admin role
+    """
+    try:
+        return export_response(
+            GeospatialExportService().iter_shapefile(_parcel_export_records(db, filters)),
+            f"parcelles_shp_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+            "application/zip",
+            compress=False
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de l'export Shapefile : {str(e)}"
+        )
+
+
+@router.post("/export/geopackage", status_code=status.HTTP_200_OK)
+def export_geopackage(
+    request: Request,
+    filters: dict = None,
+    db = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Exporte les parcelles au format GeoPackage (avec index spatial) selon les filtres spécifiés
+
+    Mêmes couches que l'export Shapefile ; compressé en gzip si le client l'accepte.
+
+    **Requires**: Admin role
+    """
+    try:
+        return export_response(
+            GeospatialExportService().iter_geopackage(_parcel_export_records(db, filters)),
+            f"parcelles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.gpkg",
+            "application/geopackage+sqlite3",
+            request
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de l'export GeoPackage : {str(e)}"
         )
 
 
@@ -9,6 +9,7 @@ from backend.services.search_service import SearchService
 from backend.models.user import User
 from backend.dependencies import get_current_user
 from backend.container_config import get_search_service
+from backend.core.exceptions import SIUException
 
 
 class CoordinatesModel(BaseModel):
@@ -147,6 +148,9 @@ def search_within_geometry(
             },
             'count': len(results)
         }
+    except SIUException as e:
+        # Le paramètre `status` masque le module fastapi.status dans cette route
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -187,6 +191,9 @@ def search_intersecting_geometry(
             },
             'count': len(results)
         }
+    except SIUException as e:
+        # Le paramètre `status` masque le module fastapi.status dans cette route
+        raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -6,7 +6,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
 from typing import Optional
 import json
 
-from backend.services.websocket_service import manager
+from backend.services.websocket_service import manager, Subscription
 from backend.dependencies import get_current_user_ws
 from backend.models.user import User
 
@@ -16,12 +16,18 @@ router = APIRouter(prefix="/ws", tags=["WebSocket"])
 @router.websocket("/notifications")
 async def websocket_notifications(
     websocket: WebSocket,
-    token: Optional[str] = None
+    token: Optional[str] = None,
+    last_seq: Optional[int] = None
 ):
     """
     WebSocket endpoint pour les notifications en temps réel
     
-    **URL:** ws://localhost:8000/ws/notifications?token=<JWT_TOKEN>
+    **URL:** ws://localhost:8000/ws/notifications?token=<JWT_TOKEN>[&last_seq=<SEQ>]
+    
+    Chaque événement porte un numéro de séquence `seq`. En se reconnectant avec
+    `last_seq` (dernier `seq` reçu, ou celui du message de connexion), le client
+    reçoit les événements publiés pendant son absence ; `resync_required` signale
+    un historique incomplet.
     
     **Messages reçus:**
     - connection: Confirmation de connexion
@@ -30,6 +36,16 @@ async def websocket_notifications(
     - document_uploaded: Document uploadé
     - system_alert: Alerte système
     
+    **Abonnements:** par défaut tous les événements sont reçus. Le client peut
+    restreindre le flux :
+    ```json
+    {"type": "subscribe", "topics": ["parcels"], "zones": ["Z1"],
+     "parcel_ids": ["..."], "bbox": [min_lng, min_lat, max_lng, max_lat]}
+    ```
+    puis `{"type": "resume", "last_seq": N}` pour rejouer les événements
+    manqués selon ce filtre. Les mises à jour répétées d'une parcelle sont
+    fusionnées en un seul `parcel_updated` (champ `coalesced`).
+    
     **Format des messages:**
     ```json
     {
@@ -39,7 +55,8 @@ async def websocket_notifications(
             "reference": "REF-001",
             "created_by": 1
         },
-        "timestamp": "2026-01-25T10:30:00Z"
+        "timestamp": "2026-01-25T10:30:00Z",
+        "seq": 42
     }
     ```
     """
@@ -55,6 +72,8 @@ async def websocket_notifications(
     
     # Connecter l'utilisateur
     await manager.connect(websocket, user.id)
+    if last_seq is not None:
+        await manager.resume(websocket, user.id, last_seq)
     
     try:
         while True:
@@ -81,6 +100,30 @@ async def websocket_notifications(
                             "room": room
                         }, websocket)
                 
+                elif message_type == "subscribe":
+                    try:
+                        subscription = Subscription.from_message(message)
+                    except (TypeError, ValueError) as e:
+                        await manager.send_personal_message({
+                            "type": "error",
+                            "message": f"Invalid subscription: {e}"
+                        }, websocket)
+                    else:
+                        manager.set_subscription(websocket, subscription)
+                        await manager.send_personal_message({
+                            "type": "subscribed",
+                            "subscription": subscription.to_dict()
+                        }, websocket)
+                
+                elif message_type == "unsubscribe":
+                    manager.set_subscription(websocket, None)
+                    await manager.send_personal_message({"type": "unsubscribed"}, websocket)
+                
+                elif message_type == "resume":
+                    # Reprise après abonnement : seuls les événements filtrés sont rejoués
+                    if isinstance(message.get("last_seq"), int):
+                        await manager.resume(websocket, user.id, message["last_seq"])
+                
                 elif message_type == "leave_room":
                     room = message.get("room")
                     if room:
@@ -124,5 +167,6 @@ async def websocket_status(current_user: User = Depends(get_current_user_ws)):
     return {
         "active_users": manager.get_active_users_count(),
         "rooms": list(manager.rooms.keys()),
-        "is_online": manager.is_user_online(current_user.id)
+        "is_online": manager.is_user_online(current_user.id),
+        "fanout": manager.get_metrics()
     }
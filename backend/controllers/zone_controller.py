@@ -11,6 +11,8 @@ from pydantic import BaseModel
 from backend.dependencies import get_current_user, get_db, require_admin
 from backend.models.user import User
 from backend.services.zone_service import ZoneService
+from backend.core.exceptions import InvalidDataException
+from backend.core.pagination import TOTAL_MODE_PATTERN
 
 router = APIRouter(prefix="/api/zones", tags=["Zones"])
 
@@ -315,6 +317,8 @@ def get_zone_parcels(
     zone_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, max_length=512),
+    total_mode: str = Query('cached', alias="total", pattern=TOTAL_MODE_PATTERN),
     current_user: User = Depends(get_current_user),
     db = Depends(get_db)
 ):
@@ -322,6 +326,7 @@ def get_zone_parcels(
     Récupère les parcelles appartenant à une zone
 
     **Requires**: Authentication
+    **Pagination**: `cursor` (next_cursor de la réponse précédente) ou `page`
     """
     # Validation de l'ID de la zone
     import re
@@ -335,24 +340,16 @@ def get_zone_parcels(
     # Créer le service de zones
     zone_service = ZoneService(db)
 
-    # Récupérer les parcelles de la zone depuis le service
-    parcels = zone_service.get_zone_parcels(zone_id)
-
-    # Calculer la pagination
-    total = len(parcels)
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    paginated_parcels = parcels[start_idx:end_idx]
-    total_pages = (total + page_size - 1) // page_size
+    # Récupérer la page de parcelles de la zone depuis le service (pagination en base)
+    try:
+        result = zone_service.get_zone_parcels_page(
+            zone_id, page=page, page_size=page_size, cursor=cursor, total_mode=total_mode
+        )
+    except InvalidDataException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
 
-    return {
-        "items": paginated_parcels,
-        "total": total,
-        "zone_id": zone_id,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": total_pages
-    }
+    result["zone_id"] = zone_id
+    return result
 
 
 @router.get("/type/{zone_type}", status_code=status.HTTP_200_OK)
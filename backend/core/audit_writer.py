@@ -0,0 +1,331 @@
+"""
+Écriture asynchrone et groupée des logs d'audit
+
+Les requêtes déposent leurs enregistrements dans une file bornée en mémoire ; un
+thread dédié les insère par lots (AUDIT_BATCH_SIZE lignes, ou après
+AUDIT_FLUSH_INTERVAL secondes) dans une seule transaction. La latence d'une
+requête n'inclut donc plus de COMMIT d'audit.
+
+Quand la file est pleine, la politique AUDIT_OVERFLOW_POLICY s'applique :
+- spool : l'enregistrement est ajouté au fichier disque AUDIT_SPOOL_PATH ;
+- block : l'appelant attend une place (contre-pression), puis spool après AUDIT_BLOCK_TIMEOUT ;
+- drop_oldest / drop_newest : l'enregistrement le plus ancien / le nouveau est abandonné.
+
+Le spool reçoit aussi les lots dont l'insertion échoue et ce qui reste en file à
+l'arrêt ; il est rejoué au démarrage du worker et après chaque insertion réussie.
+Chaque processus a son propre fichier (AUDIT_SPOOL_PATH suffixé du pid) ; au
+démarrage, les spools des processus arrêtés sont repris par renommage atomique,
+si bien qu'un seul worker les rejoue.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+from sqlalchemy import exc as sql_exceptions
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import (
+    AUDIT_QUEUE_MAX_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL,
+    AUDIT_OVERFLOW_POLICY, AUDIT_BLOCK_TIMEOUT, AUDIT_SPOOL_PATH
+)
+from backend.models.audit_log import AuditLog
+
+OVERFLOW_POLICIES = ('spool', 'block', 'drop_oldest', 'drop_newest')
+
+# Colonnes renseignées par les producteurs (les autres gardent leur valeur par défaut)
+AUDIT_COLUMNS = frozenset(AuditLog.__table__.columns.keys()) - {'id'}
+
+
+class AuditLogWriter:
+    """File bornée d'enregistrements d'audit vidée par lots par un thread dédié"""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None,
+                 max_queue_size: int = AUDIT_QUEUE_MAX_SIZE,
+                 batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 overflow_policy: str = AUDIT_OVERFLOW_POLICY,
+                 block_timeout: float = AUDIT_BLOCK_TIMEOUT,
+                 spool_path: str = AUDIT_SPOOL_PATH):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {overflow_policy}")
+        self._session_factory = session_factory
+        self.max_queue_size = max(max_queue_size, 1)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.spool_path = spool_path
+
+        self._queue = deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._spool_lock = threading.Lock()
+        self._spool_pending = os.path.exists(self._process_spool_path())
+        self._thread = None
+        self._stopping = False
+        self._stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'spooled': 0, 'replayed': 0, 'failed_batches': 0,
+                       'worker_errors': 0}
+
+    @property
+    def session_factory(self) -> Callable[[], Session]:
+        if self._session_factory is None:
+            from backend.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """
+        Dépose un enregistrement d'audit (colonnes de AuditLog) sans attendre son insertion
+
+        Returns:
+            bool: False si l'enregistrement a été abandonné
+        """
+        record = {key: value for key, value in record.items() if key in AUDIT_COLUMNS}
+        record.setdefault('timestamp', datetime.now())
+        if self._thread is None:
+            self.start()
+
+        with self._condition:
+            self._stats['submitted'] += 1
+            if len(self._queue) >= self.max_queue_size:
+                if self.overflow_policy == 'drop_newest':
+                    self._stats['dropped'] += 1
+                    return False
+                if self.overflow_policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self._stats['dropped'] += 1
+                elif self.overflow_policy == 'block':
+                    self._condition.wait_for(
+                        lambda: len(self._queue) < self.max_queue_size or self._stopping,
+                        timeout=self.block_timeout
+                    )
+            if len(self._queue) < self.max_queue_size and not self._stopping:
+                self._queue.append(record)
+                self._condition.notify_all()
+                return True
+
+        # File toujours pleine (spool, ou block expiré) ou writer arrêté
+        self._spool([record])
+        return True
+
+    async def submit_async(self, record: Dict[str, Any]) -> bool:
+        """Variante pour la boucle d'événements : l'attente de la politique block se fait hors boucle"""
+        if self.overflow_policy == 'block':
+            return await run_in_threadpool(self.submit, record)
+        return self.submit(record)
+
+    def start(self) -> None:
+        """Démarre le worker (rejoue d'abord le spool laissé par une exécution précédente)"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attend que les enregistrements en file soient insérés
+
+        Returns:
+            bool: True si la file est vide à la sortie
+        """
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._queue and not self._in_flight, timeout=timeout)
+
+    def stop(self, timeout: float = 10) -> None:
+        """Arrêt gracieux : vide la file, puis spoole ce qui n'a pas pu être inséré à temps"""
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._condition:
+            remaining = list(self._queue)
+            self._queue.clear()
+            self._thread = None
+        if remaining:
+            self._spool(remaining)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queue_size'] = len(self._queue)
+        stats['max_queue_size'] = self.max_queue_size
+        stats['overflow_policy'] = self.overflow_policy
+        stats['spool_pending'] = self._spool_pending
+        return stats
+
+    def _run(self) -> None:
+        try:
+            self._replay_spool()
+        except Exception as e:
+            self._worker_error(e)
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._stopping)
+                # Laisser le lot se remplir, au plus flush_interval secondes
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                # Libère les producteurs bloqués
+                self._condition.notify_all()
+
+            written = None
+            try:
+                written = self._write(batch)
+                if not written:
+                    self._spool(batch)
+                elif self._spool_pending:
+                    self._replay_spool()
+            except Exception as e:
+                # Le thread doit survivre : sinon plus aucun log ne serait inséré
+                self._worker_error(e, dropped=0 if written is not None else len(batch))
+            finally:
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+
+    def _worker_error(self, error: Exception, dropped: int = 0) -> None:
+        with self._condition:
+            self._stats['worker_errors'] += 1
+            self._stats['dropped'] += dropped
+        print(f"Erreur inattendue dans le writer d'audit: {error}")
+
+    def _write(self, records: List[Dict[str, Any]]) -> bool:
+        from backend.infrastructure.repositories.audit_log_repository import SqlAuditLogRepository
+
+        db = self.session_factory()
+        try:
+            SqlAuditLogRepository(db).create_many([AuditLog(**record) for record in records])
+            db.commit()
+        except sql_exceptions.SQLAlchemyError as e:
+            db.rollback()
+            with self._condition:
+                self._stats['failed_batches'] += 1
+            print(f"Erreur lors de l'écriture d'un lot d'audit ({len(records)} logs): {e}")
+            return False
+        finally:
+            db.close()
+        with self._condition:
+            self._stats['written'] += len(records)
+        return True
+
+    def _spool(self, records: List[Dict[str, Any]]) -> None:
+        lines = ''.join(json.dumps(_encode(record), default=str) + '\n' for record in records)
+        try:
+            with self._spool_lock:
+                with open(self._process_spool_path(), 'a', encoding='utf-8') as spool:
+                    spool.write(lines)
+                    spool.flush()
+                    os.fsync(spool.fileno())
+                self._spool_pending = True
+        except OSError as e:
+            with self._condition:
+                self._stats['dropped'] += len(records)
+            print(f"Erreur lors de l'écriture du spool d'audit: {e}")
+            return
+        with self._condition:
+            self._stats['spooled'] += len(records)
+
+    def _process_spool_path(self) -> str:
+        # Le pid est relu à chaque appel : l'instance globale peut être créée avant le fork des workers
+        return f"{self.spool_path}.{os.getpid()}"
+
+    def _orphan_spools(self) -> List[str]:
+        """Spools (et rejeux interrompus) laissés par des processus qui ne tournent plus"""
+        orphans = [self.spool_path] if os.path.exists(self.spool_path) else []
+        for path in sorted(glob.glob(glob.escape(self.spool_path) + '.*')):
+            pid, _, suffix = path[len(self.spool_path) + 1:].partition('.')
+            if not pid.isdigit() or suffix not in ('', 'replay') or int(pid) == os.getpid():
+                continue
+            if not psutil.pid_exists(int(pid)):
+                orphans.append(path)
+        return orphans
+
+    def _replay_spool(self) -> None:
+        """
+        Réinsère les enregistrements du spool du processus (et des processus arrêtés)
+
+        Chaque fichier est d'abord renommé vers le fichier de rejeu du processus : le
+        renommage est atomique, un spool orphelin n'est donc rejoué que par un worker.
+        """
+        own_path = self._process_spool_path()
+        replay_path = own_path + '.replay'
+        # Un .replay existant provient d'un rejeu interrompu
+        if os.path.exists(replay_path) and not self._replay_file(replay_path):
+            return
+
+        sources = self._orphan_spools() + [own_path]
+        for source in sources:
+            with self._spool_lock:
+                if source == own_path:
+                    self._spool_pending = False
+                try:
+                    os.replace(source, replay_path)
+                except FileNotFoundError:
+                    # Rien à rejouer, ou spool déjà repris par un autre worker
+                    continue
+            if not self._replay_file(replay_path):
+                # Base indisponible : les autres spools attendent le prochain rejeu
+                break
+
+    def _replay_file(self, replay_path: str) -> bool:
+        records = []
+        replayed = True
+        with open(replay_path, encoding='utf-8') as replay:
+            for line in replay:
+                try:
+                    records.append(_decode(json.loads(line)))
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    print("Ligne illisible ignorée dans le spool d'audit")
+
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            if not self._write(batch):
+                # Base toujours indisponible : le reste retourne au spool
+                self._spool(records[start:])
+                replayed = False
+                break
+            with self._condition:
+                self._stats['replayed'] += len(batch)
+        try:
+            os.remove(replay_path)
+        except FileNotFoundError:
+            pass
+        return replayed
+
+
+def _encode(record: Dict[str, Any]) -> Dict[str, Any]:
+    timestamp = record.get('timestamp')
+    if isinstance(timestamp, datetime):
+        record = dict(record, timestamp=timestamp.isoformat())
+    return record
+
+
+def _decode(record: Dict[str, Any]) -> Dict[str, Any]:
+    record = {key: value for key, value in record.items() if key in AUDIT_COLUMNS}
+    if isinstance(record.get('timestamp'), str):
+        record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+    return record
+
+
+# Instance globale
+audit_writer = AuditLogWriter()
@@ -0,0 +1,253 @@
+"""
+Bus d'événements temps réel partagé entre les workers
+
+NotificationService publie sur le bus ; le ConnectionManager de chaque worker y
+est abonné et diffuse l'événement à ses propres sockets. Chaque événement reçoit
+un numéro de séquence croissant, ajouté au message (`seq`), qui permet à un
+client de reprendre après le dernier événement reçu.
+
+Backends (SIU_EVENT_BUS) :
+- database : table `realtime_events` partagée, interrogée toutes les
+  EVENT_BUS_POLL_INTERVAL secondes (SQLite comme PostgreSQL) ;
+- memory : bus local au processus (un seul worker, tests).
+
+Format d'un événement :
+    {"seq": 12, "target": "broadcast" | "user" | "room", "key": <user_id | room>,
+     "exclude_user": <user_id>, "message": {...}}
+
+La cible "principal" (core.principal_cache) porte les invalidations du cache des
+utilisateurs authentifiés ; elle n'est diffusée à aucune WebSocket.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, exc as sql_exceptions
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import (
+    EVENT_BUS_BACKEND, EVENT_BUS_POLL_INTERVAL, EVENT_BUS_POLL_OVERLAP, EVENT_BUS_RETENTION,
+    EVENT_BUS_REPLAY_LIMIT
+)
+from backend.models.realtime_event import RealtimeEvent
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+def make_event(target: str, message: Dict[str, Any], key: Any = None, exclude_user: Any = None) -> Dict[str, Any]:
+    """Construit un événement à publier (les identifiants sont normalisés en chaînes)"""
+    return {
+        "target": target,
+        "key": str(key) if key is not None else None,
+        "exclude_user": str(exclude_user) if exclude_user is not None else None,
+        "message": message
+    }
+
+
+class EventBus:
+    """Abonnement et diffusion locale, communs aux backends"""
+
+    def __init__(self):
+        self._handlers: List[EventHandler] = []
+        # Dernier numéro de séquence diffusé dans l'ordre (point de reprise annoncé aux clients)
+        self.last_seq = 0
+
+    def subscribe(self, handler: EventHandler) -> None:
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Erreur lors de la diffusion de l'événement {event['seq']}: {e}")
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class InMemoryEventBus(EventBus):
+    """Bus local au processus, avec un historique borné pour la reprise"""
+
+    def __init__(self, history_size: int = EVENT_BUS_REPLAY_LIMIT):
+        super().__init__()
+        self._history = deque(maxlen=history_size)
+
+    async def publish(self, event: Dict[str, Any]) -> int:
+        self.last_seq += 1
+        event = dict(event, seq=self.last_seq)
+        self._history.append(event)
+        self._dispatch(event)
+        return event["seq"]
+
+    async def events_since(self, seq: int, limit: int = EVENT_BUS_REPLAY_LIMIT) -> List[Dict[str, Any]]:
+        return [event for event in self._history if event["seq"] > seq][:limit]
+
+
+class DatabaseEventBus(EventBus):
+    """
+    Bus partagé via la table `realtime_events` (l'id sert de numéro de séquence)
+
+    Les numéros sont attribués à l'insertion mais visibles au COMMIT : un événement
+    d'un autre worker peut apparaître après un numéro supérieur déjà relevé ou publié
+    localement. Les événements sont donc dédoublonnés par numéro (et non par un
+    curseur croissant), et chaque relevé relit ceux créés pendant la fenêtre de
+    recouvrement (overlap).
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None,
+                 poll_interval: float = EVENT_BUS_POLL_INTERVAL,
+                 retention: int = EVENT_BUS_RETENTION,
+                 overlap: float = EVENT_BUS_POLL_OVERLAP):
+        super().__init__()
+        if session_factory is None:
+            from backend.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.overlap = overlap
+        # Événements déjà diffusés par ce worker (numéro -> instant), conservés
+        # tant qu'un relevé peut encore les relire
+        self._seen: 'OrderedDict[int, float]' = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = time.monotonic()
+
+    async def publish(self, event: Dict[str, Any]) -> int:
+        seq = await run_in_threadpool(self._insert, event)
+        self._seen[seq] = time.monotonic()
+        # Diffusion locale immédiate ; les autres workers la verront au prochain relevé
+        self._dispatch(dict(event, seq=seq))
+        return seq
+
+    async def events_since(self, seq: int, limit: int = EVENT_BUS_REPLAY_LIMIT) -> List[Dict[str, Any]]:
+        return await run_in_threadpool(self._fetch, seq, limit)
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        # Seuls les événements publiés après le démarrage sont diffusés
+        self.last_seq = await run_in_threadpool(self._max_seq)
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._seen.clear()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except sql_exceptions.SQLAlchemyError as e:
+                print(f"Erreur lors du relevé du bus d'événements: {e}")
+
+    async def poll(self) -> None:
+        """Diffuse les événements publiés par les autres workers depuis le dernier relevé"""
+        since = datetime.utcnow() - timedelta(seconds=self.overlap)
+        events = await run_in_threadpool(self._fetch_window, self.last_seq, since, EVENT_BUS_REPLAY_LIMIT)
+        for event in events:
+            self.last_seq = max(self.last_seq, event["seq"])
+            if event["seq"] in self._seen:
+                continue
+            self._seen[event["seq"]] = time.monotonic()
+            self._dispatch(event)
+
+        # Un événement n'est plus relu une fois sorti de la fenêtre de recouvrement
+        horizon = time.monotonic() - 2 * self.overlap - self.poll_interval
+        while self._seen and next(iter(self._seen.values())) < horizon:
+            self._seen.popitem(last=False)
+
+        if time.monotonic() - self._last_purge >= self.retention:
+            self._last_purge = time.monotonic()
+            await run_in_threadpool(self._purge)
+
+    def _insert(self, event: Dict[str, Any]) -> int:
+        db = self.session_factory()
+        try:
+            row = RealtimeEvent(
+                target=event["target"],
+                target_key=event.get("key"),
+                exclude_user=event.get("exclude_user"),
+                payload=json.dumps(event["message"], default=str)
+            )
+            db.add(row)
+            db.flush()
+            seq = row.id
+            db.commit()
+            return seq
+        except sql_exceptions.SQLAlchemyError:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _to_event(row: RealtimeEvent) -> Dict[str, Any]:
+        return {
+            "seq": row.id,
+            "target": row.target,
+            "key": row.target_key,
+            "exclude_user": row.exclude_user,
+            "message": json.loads(row.payload)
+        }
+
+    def _fetch(self, seq: int, limit: int) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            rows = db.query(RealtimeEvent).filter(RealtimeEvent.id > seq).order_by(RealtimeEvent.id).limit(limit).all()
+            return [self._to_event(row) for row in rows]
+        finally:
+            db.close()
+
+    def _fetch_window(self, seq: int, since: datetime, limit: int) -> List[Dict[str, Any]]:
+        """Événements de numéro supérieur à seq, précédés de ceux de numéro inférieur créés depuis since"""
+        db = self.session_factory()
+        try:
+            late = db.query(RealtimeEvent)\
+                .filter(RealtimeEvent.id <= seq, RealtimeEvent.created_at >= since)\
+                .order_by(RealtimeEvent.id).all()
+            rows = db.query(RealtimeEvent).filter(RealtimeEvent.id > seq).order_by(RealtimeEvent.id).limit(limit).all()
+            return [self._to_event(row) for row in late + rows]
+        finally:
+            db.close()
+
+    def _max_seq(self) -> int:
+        db = self.session_factory()
+        try:
+            return db.query(func.max(RealtimeEvent.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def _purge(self) -> None:
+        db = self.session_factory()
+        try:
+            db.query(RealtimeEvent).filter(
+                RealtimeEvent.created_at < datetime.utcnow() - timedelta(seconds=self.retention)
+            ).delete(synchronize_session=False)
+            db.commit()
+        except sql_exceptions.SQLAlchemyError as e:
+            db.rollback()
+            print(f"Erreur lors de la purge du bus d'événements: {e}")
+        finally:
+            db.close()
+
+
+def create_event_bus(backend: str = EVENT_BUS_BACKEND) -> EventBus:
+    if backend == 'memory':
+        return InMemoryEventBus()
+    return DatabaseEventBus()
+
+
+# Instance globale
+event_bus = create_event_bus()
@@ -0,0 +1,201 @@
+"""
+Boîte d'envoi des notifications temps réel émises par les services synchrones
+
+Les services (exécutés dans le threadpool, sans boucle d'événements) déposent
+leurs notifications avec `notification_outbox.enqueue(NotificationService.notify_xxx, ...)`.
+
+- Pendant une unité de travail, la notification est rattachée à la session et
+  n'est libérée qu'après le COMMIT ; une annulation la supprime.
+- Un dispatcher possédé par la boucle (démarré au startup) vide la file par lots,
+  dans l'ordre, et réessaie une notification en échec NOTIFICATION_MAX_RETRIES fois.
+
+Les compteurs (get_stats) rendent mesurables le débit et les pertes.
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.config import (
+    NOTIFICATION_OUTBOX_MAX_SIZE, NOTIFICATION_BATCH_SIZE, NOTIFICATION_MAX_RETRIES, NOTIFICATION_RETRY_DELAY
+)
+
+# Clé de session.info des notifications en attente du COMMIT
+_PENDING_KEY = 'siu_pending_notifications'
+
+
+class _Notification:
+    __slots__ = ('outbox', 'func', 'kwargs', 'attempts')
+
+    def __init__(self, outbox: 'NotificationOutbox', func: Callable[..., Awaitable[Any]], kwargs: Dict[str, Any]):
+        self.outbox = outbox
+        self.func = func
+        self.kwargs = kwargs
+        self.attempts = 0
+
+
+class NotificationOutbox:
+    """File thread-safe de notifications, vidée par une tâche de la boucle d'événements"""
+
+    def __init__(self, max_size: int = NOTIFICATION_OUTBOX_MAX_SIZE,
+                 batch_size: int = NOTIFICATION_BATCH_SIZE,
+                 max_retries: int = NOTIFICATION_MAX_RETRIES,
+                 retry_delay: float = NOTIFICATION_RETRY_DELAY):
+        self.max_size = max(max_size, 1)
+        self.batch_size = max(batch_size, 1)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0, 'released': 0, 'discarded': 0, 'dropped': 0,
+            'delivered': 0, 'retried': 0, 'failed': 0, 'batches': 0
+        }
+
+    def enqueue(self, func: Callable[..., Awaitable[Any]], **kwargs) -> None:
+        """
+        Dépose une notification (coroutine func(**kwargs)), depuis n'importe quel thread
+
+        Dans une unité de travail, elle n'est libérée qu'après le COMMIT de sa session.
+        """
+        from backend.database import get_current_unit_of_work
+
+        notification = _Notification(self, func, kwargs)
+        self._count('enqueued')
+        unit = get_current_unit_of_work()
+        if unit is not None and unit.started:
+            session = unit.session
+            if not session.in_transaction():
+                # Les repositories valident eux-mêmes : c'est la transaction suivante
+                # (au plus tard celle validée par UnitOfWorkMiddleware) qui décide
+                session.begin()
+            session.info.setdefault(_PENDING_KEY, []).append(notification)
+            return
+        self._push(notification)
+
+    def push(self, func: Callable[..., Awaitable[Any]], **kwargs) -> None:
+        """Dépose une notification sans l'attacher à une session (ex : depuis un after_commit)"""
+        self._count('enqueued')
+        self._push(_Notification(self, func, kwargs))
+
+    async def start(self) -> None:
+        """Démarre le dispatcher sur la boucle courante"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        # Notifications déposées avant le démarrage
+        if self._queue:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 5) -> None:
+        """Délivre ce qui reste en file (dans la limite de timeout) puis arrête le dispatcher"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Arrêt du dispatcher de notifications : {len(self._queue)} notification(s) non délivrée(s)")
+        self._task.cancel()
+        self._task = None
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_size'] = len(self._queue)
+        stats['running'] = self._task is not None
+        return stats
+
+    @staticmethod
+    def release(session: Session) -> None:
+        """Libère les notifications d'une session validée vers leur boîte d'envoi"""
+        for notification in session.info.pop(_PENDING_KEY, ()):
+            notification.outbox._count('released')
+            notification.outbox._push(notification)
+
+    @staticmethod
+    def discard(session: Session) -> None:
+        """Supprime les notifications d'une session annulée"""
+        for notification in session.info.pop(_PENDING_KEY, ()):
+            notification.outbox._count('discarded')
+
+    def _push(self, notification: _Notification) -> None:
+        if len(self._queue) >= self.max_size:
+            self._count('dropped')
+            print("File des notifications pleine, notification abandonnée")
+            return
+        self._queue.append(notification)
+        self._signal()
+
+    def _signal(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Boucle fermée (arrêt en cours)
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._drain()
+
+    async def _drain(self) -> None:
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._count('batches')
+            # Dans l'ordre : une création doit précéder les mises à jour de la même parcelle
+            for notification in batch:
+                await self._deliver(notification)
+
+    async def _deliver(self, notification: _Notification) -> None:
+        notification.attempts += 1
+        try:
+            await notification.func(**notification.kwargs)
+            self._count('delivered')
+        except Exception as e:
+            if notification.attempts > self.max_retries:
+                self._count('failed')
+                print(f"Notification {notification.func.__name__} abandonnée après {notification.attempts} essais: {e}")
+                return
+            self._count('retried')
+            delay = self.retry_delay * 2 ** (notification.attempts - 1)
+            self._loop.call_later(delay, self._push, notification)
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += value
+
+
+# Instance globale
+notification_outbox = NotificationOutbox()
+
+
+@event.listens_for(Session, 'after_commit')
+def _release_notifications(session):
+    NotificationOutbox.release(session)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_notifications(session, transaction):
+    # Après un COMMIT, la liste a déjà été libérée : il ne reste que les annulations
+    if transaction.parent is None and not session.in_transaction():
+        NotificationOutbox.discard(session)
@@ -0,0 +1,159 @@
+"""
+Pagination par curseur (keyset) des listes : parcelles, logs d'audit, mutations
+
+Une page suivante est lue par « WHERE (created_at, id) < (:created_at, :id)
+ORDER BY created_at DESC, id DESC LIMIT n », à partir des clés de tri du dernier
+élément déjà reçu : la base descend l'index depuis cette position au lieu de lire
+puis d'écarter OFFSET lignes. Une page coûte donc autant en fin de liste qu'au début.
+
+Le curseur est opaque pour le client (clés de tri en JSON, encodées en base64
+url-safe). La pagination par numéro de page (OFFSET) reste acceptée pour les
+clients existants ; chaque réponse fournit le curseur de la page suivante.
+
+Le total est optionnel :
+- 'exact' : COUNT(*) à chaque requête
+- 'cached' : COUNT(*) conservé dans le cache des réponses, invalidé par les
+  écritures sur la table (numéros de génération) ou après PAGINATION_COUNT_TTL
+- 'estimate' : estimation du planificateur (EXPLAIN, PostgreSQL), sinon 'cached'
+- 'none' : pas de total
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query
+
+from backend.config import PAGINATION_COUNT_TTL
+from backend.core.exceptions import InvalidDataException
+from backend.core.response_cache import response_cache
+
+# Modes de calcul du total
+TOTAL_MODES = ('exact', 'cached', 'estimate', 'none')
+# Validation du paramètre de requête correspondant
+TOTAL_MODE_PATTERN = '^(' + '|'.join(TOTAL_MODES) + ')$'
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode les clés de tri du dernier élément d'une page en curseur opaque"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    Décode un curseur en valeurs typées selon les colonnes de tri
+
+    Raises:
+        InvalidDataException: Curseur illisible ou ne correspondant pas aux colonnes
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_typed(value, column.type.python_type) for value, column in zip(values, columns)]
+    except (ValueError, TypeError):
+        raise InvalidDataException("Curseur de pagination invalide", field='cursor')
+
+
+def _typed(value: Any, python_type: type) -> Any:
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if not isinstance(value, python_type) or isinstance(value, bool):
+        raise TypeError(value)
+    return value
+
+
+def keyset_page(query: Query, columns: Sequence[Any], limit: int, cursor: Optional[str] = None,
+                offset: int = 0, descending: bool = True) -> Tuple[list, Optional[str]]:
+    """
+    Lit une page de résultats triée sur des colonnes formant une clé unique
+
+    Args:
+        query: Requête filtrée, sans tri ni limite
+        columns: Colonnes de tri, la dernière départageant les égalités (ex. created_at, id)
+        limit: Taille de la page
+        cursor: Curseur reçu avec la page précédente (prioritaire sur offset)
+        offset: Décalage, pour la pagination historique par numéro de page
+        descending: Ordre décroissant (les plus récents d'abord)
+
+    Returns:
+        (éléments de la page, curseur de la page suivante ou None en fin de liste)
+    """
+    if cursor:
+        keys = tuple_(*columns)
+        bound = tuple_(*[literal(value, column.type) for value, column in zip(decode_cursor(cursor, columns), columns)])
+        query = query.filter(keys < bound if descending else keys > bound)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if offset and not cursor:
+        query = query.offset(offset)
+    # Un élément de plus que demandé indique s'il existe une page suivante
+    items = query.limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+
+def count_total(query: Query, mode: str, table: str, filters: Dict[str, Any]) -> Optional[int]:
+    """
+    Total des résultats d'une requête filtrée, selon le mode demandé (TOTAL_MODES)
+
+    Args:
+        query: Requête filtrée, sans tri ni limite
+        table: Table interrogée (clé et invalidation du cache)
+        filters: Filtres appliqués (clé du cache)
+    """
+    if mode == 'none':
+        return None
+    if mode == 'exact':
+        return query.order_by(None).count()
+    if mode == 'estimate':
+        estimate = _planner_estimate(query)
+        if estimate is not None:
+            return estimate
+
+    key = response_cache.make_key('count:' + table, filters, '', (table,))
+    total = response_cache.get(key)
+    if not isinstance(total, int):
+        total = query.order_by(None).count()
+        response_cache.set(key, total, PAGINATION_COUNT_TTL)
+    return total
+
+
+def _planner_estimate(query: Query) -> Optional[int]:
+    """Nombre de lignes estimé par le planificateur PostgreSQL (None sur les autres bases)"""
+    session = query.session
+    bind = session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = session.connection().exec_driver_sql(
+        'EXPLAIN (FORMAT JSON) ' + compiled.string, compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def page_response(items: list, next_cursor: Optional[str], page_size: int, total: Optional[int],
+                  page: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Réponse paginée : éléments, curseur suivant et, si demandés, total et numéro de page
+
+    Les clés 'page' et 'total_pages' ne sont significatives qu'en pagination par numéro.
+    """
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'total_pages': max(1, (total + page_size - 1) // page_size) if total is not None else None
+    }
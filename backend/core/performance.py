@@ -1,7 +1,6 @@
 """
 Optimisations de performance pour l'application
 """
-from functools import lru_cache
 from typing import Dict, Any
 import time
 
@@ -42,10 +41,3 @@ def time_query(func):
         performance_monitor.record_query_time(func.__name__, duration)
         return result
     return wrapper
-
-@lru_cache(maxsize=128)
-def cached_zone_stats(zone: str) -> Dict[str, Any]:
-    """Cache les statistiques par zone"""
-    # Les résultats sont mis en cache automatiquement
-    return {}
-
@@ -0,0 +1,253 @@
+"""
+Cache des utilisateurs authentifiés (principal) pour get_current_user
+
+Un token déjà vérifié est résolu par une simple lecture de dictionnaire, sans
+décodage JWT ni requête utilisateur/rôle. Les entrées contiennent un instantané
+immuable de l'utilisateur, expirent après un TTL court (et au plus tard à
+l'expiration du token) et sont invalidées dès qu'un utilisateur ou un rôle est
+modifié en base.
+
+Chaque worker a son propre cache : une invalidation validée est aussi publiée
+sur le bus d'événements partagé (cible INVALIDATION_TARGET), et les autres
+workers retirent les entrées concernées au prochain relevé du bus.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.config import AUTH_CACHE_TTL, AUTH_CACHE_MAX_ENTRIES
+from backend.core.notification_outbox import notification_outbox
+
+# Cible des événements d'invalidation sur le bus (aucune WebSocket n'en est destinataire)
+INVALIDATION_TARGET = 'principal'
+
+
+@dataclass(frozen=True)
+class RoleSnapshot:
+    """Instantané immuable d'un rôle"""
+    id: Optional[int]
+    name: str
+    description: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Instantané immuable d'un utilisateur authentifié
+
+    Expose les mêmes attributs que le modèle User utilisés par les contrôleurs
+    (id, username, role.name, ...), sans session ni relation chargeable.
+    """
+    id: str
+    username: str
+    email: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    is_active: bool
+    role: Optional[RoleSnapshot]
+    role_id: Optional[int]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user) -> 'UserSnapshot':
+        role = user.role
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            is_active=user.is_active,
+            role=RoleSnapshot(id=role.id, name=role.name, description=role.description) if role else None,
+            role_id=user.role_id,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            last_login=user.last_login,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Même format que User.to_dict"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'role': self.role.name if self.role else None,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'last_login': self.last_login.isoformat() if self.last_login else None
+        }
+
+
+class PrincipalCache:
+    """Cache token -> utilisateur vérifié, avec TTL et invalidation par utilisateur"""
+
+    def __init__(self, ttl: int = AUTH_CACHE_TTL, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # token -> (échéance monotone, instantané)
+        self._entries: Dict[str, Tuple[float, UserSnapshot]] = {}
+        # id utilisateur -> tokens en cache
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation : une vérification commencée avant est ignorée
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        # Bus partagé entre les workers (attach), None : invalidations locales uniquement
+        self.event_bus = None
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        entry = self._entries.get(token)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        if entry is not None:
+            self.forget_token(token)
+        return None
+
+    def put(self, token: str, user: UserSnapshot, token_expires_at: Optional[float] = None,
+            generation: Optional[int] = None) -> None:
+        """
+        Met en cache un token vérifié
+
+        Args:
+            token: Token JWT
+            user: Instantané de l'utilisateur
+            token_expires_at: Expiration du token (timestamp Unix, claim `exp`)
+            generation: Valeur de `generation` lue avant la vérification
+        """
+        if self.ttl <= 0:
+            return
+        lifetime = self.ttl
+        if token_expires_at is not None:
+            lifetime = min(lifetime, token_expires_at - time.time())
+        if lifetime <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                # Utilisateur ou rôle modifié pendant la vérification : instantané peut-être périmé
+                return
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                    self._tokens_by_user.clear()
+            self._entries[token] = (time.monotonic() + lifetime, user)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+
+    def forget_token(self, token: str) -> None:
+        """Retire un token du cache (déconnexion)"""
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if entry is not None:
+                tokens = self._tokens_by_user.get(entry[1].id)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._tokens_by_user[entry[1].id]
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Retire tous les tokens en cache d'un utilisateur"""
+        with self._lock:
+            self.generation += 1
+            for token in self._tokens_by_user.pop(user_id, ()):
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def attach(self, event_bus) -> None:
+        """Abonne le cache aux invalidations publiées par les autres workers"""
+        self.event_bus = event_bus
+        event_bus.subscribe(self.dispatch_event)
+
+    def dispatch_event(self, event: Dict[str, Any]) -> None:
+        """Applique une invalidation reçue du bus (user_ids None : tous les utilisateurs)"""
+        if event["target"] != INVALIDATION_TARGET:
+            return
+        user_ids = event["message"].get("user_ids")
+        if user_ids is None:
+            self.clear()
+        else:
+            for user_id in user_ids:
+                self.invalidate_user(user_id)
+
+    async def publish_invalidation(self, user_ids: Optional[List[str]]) -> None:
+        """Publie une invalidation pour les autres workers"""
+        from backend.core.event_bus import make_event
+
+        if self.event_bus is not None:
+            await self.event_bus.publish(make_event(INVALIDATION_TARGET, {"user_ids": user_ids}))
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for token in [token for token, (expires, _) in self._entries.items() if expires <= now]:
+            user_id = self._entries.pop(token)[1].id
+            tokens = self._tokens_by_user.get(user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[user_id]
+
+
+# Instance globale
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_changed_users(session, flush_context):
+    """Mémorise les utilisateurs et rôles modifiés par la transaction en cours"""
+    from backend.models.user import User, Role
+
+    changed = session.info.setdefault('principal_changed_users', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, Role) and (obj in session.deleted or session.is_modified(obj, include_collections=False)):
+            # Renommage ou suppression d'un rôle : tous les utilisateurs sont concernés
+            changed.add(None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_user_changes(orm_execute_state):
+    """Les UPDATE/DELETE en masse sur users ou roles invalident tout le cache"""
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+        if orm_execute_state.bind_mapper.local_table.name in ('users', 'roles'):
+            orm_execute_state.session.info.setdefault('principal_changed_users', set()).add(None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    changed = session.info.pop('principal_changed_users', None)
+    if not changed:
+        return
+    if None in changed:
+        principal_cache.clear()
+        user_ids = None
+    else:
+        user_ids = sorted(changed)
+        for user_id in user_ids:
+            principal_cache.invalidate_user(user_id)
+    if principal_cache.event_bus is not None:
+        # Transaction déjà validée : l'événement part sans attendre un autre COMMIT
+        notification_outbox.push(principal_cache.publish_invalidation, user_ids=user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('principal_changed_users', None)
@@ -0,0 +1,570 @@
+"""
+File de génération des rapports PDF/Excel, rendus hors des threads de l'API
+
+Les endpoints soumettent un rapport (type + paramètres) et reçoivent un job_id ;
+des processus dédiés (REPORT_WORKERS, démarrés à la première soumission)
+appellent ReportService : ReportLab et matplotlib ne prennent plus le GIL des
+threads qui servent l'API.
+
+Le résultat est écrit dans REPORT_CACHE_DIR sous un nom dérivé d'un hachage
+des entrées : type, paramètres normalisés et version des données lues (date de
+mise à jour de la parcelle, dernier log d'audit...). Une demande identique sur
+des données inchangées est servie depuis ce cache sans nouveau rendu ; une
+demande identique en cours de rendu est rattachée au même job.
+
+ReportScheduler déclenche les rapports planifiés (table report_schedules) sur
+cette même file.
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, exc as sql_exceptions
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import (
+    REPORT_WORKERS, REPORT_MAX_TASKS_PER_CHILD, REPORT_CACHE_DIR, REPORT_CACHE_TTL, REPORT_SCHEDULER_INTERVAL
+)
+
+
+@dataclass(frozen=True)
+class ReportKind:
+    """Rapport disponible : méthode de ReportService et paramètres acceptés"""
+    method: str
+    media_type: str
+    extension: str
+    defaults: Dict[str, Any]
+    required: Tuple[str, ...] = ()
+    admin_only: bool = False
+    # Les paramètres sont passés à la méthode dans un dict `filters`
+    as_filters: bool = False
+
+    def arguments(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.as_filters:
+            return {'filters': {name: value for name, value in params.items() if value is not None}}
+        return params
+
+
+PDF = 'application/pdf'
+XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+REPORT_KINDS = {
+    'parcel_pdf': ReportKind(
+        'generate_parcel_report_pdf', PDF, 'pdf',
+        defaults={'include_history': True, 'include_documents': True, 'include_map': False,
+                  'include_nearby': True, 'nearby_radius': 2.0},
+        required=('parcel_id',)
+    ),
+    'activity_pdf': ReportKind(
+        'generate_activity_report_pdf', PDF, 'pdf',
+        defaults={'days': 30, 'user_id': None}, admin_only=True
+    ),
+    'audit_pdf': ReportKind(
+        'generate_audit_report_pdf', PDF, 'pdf',
+        defaults={'days': 30}, admin_only=True
+    ),
+    'parcels_excel': ReportKind(
+        'export_parcels_excel', XLSX, 'xlsx',
+        defaults={'zone': None, 'status': None}, as_filters=True
+    ),
+}
+
+_JOB_ID_PATTERN = re.compile(r'^(%s)-[0-9a-f]{64}$' % '|'.join(REPORT_KINDS))
+
+# Statuts d'un job
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+def _coerce(value: Any, expected: type) -> Any:
+    if expected is bool and isinstance(value, str):
+        if value.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f"Booléen invalide: {value}")
+        return value.lower() in ('true', '1')
+    return expected(value)
+
+
+def normalize_params(kind_name: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Valide les paramètres d'un rapport et complète les valeurs par défaut
+
+    La forme normalisée (types, défauts explicites) rend la clé de cache
+    indépendante de la façon dont la demande a été écrite.
+
+    Raises:
+        ValueError: type de rapport inconnu, paramètre inconnu, manquant ou invalide
+    """
+    kind = REPORT_KINDS.get(kind_name)
+    if kind is None:
+        raise ValueError(f"Type de rapport inconnu: {kind_name}")
+    params = dict(params or {})
+    unknown = set(params) - set(kind.defaults) - set(kind.required)
+    if unknown:
+        raise ValueError(f"Paramètre(s) inconnu(s) pour {kind_name}: {', '.join(sorted(unknown))}")
+
+    normalized = {}
+    for name in kind.required:
+        if params.get(name) in (None, ''):
+            raise ValueError(f"Paramètre requis pour {kind_name}: {name}")
+        normalized[name] = str(params[name])
+    for name, default in kind.defaults.items():
+        value = params.get(name, default)
+        if value is not None and default is not None:
+            value = _coerce(value, type(default))
+        normalized[name] = value
+    return normalized
+
+
+def data_version(db: Session, kind_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Version des données lues par un rapport, incluse dans sa clé de cache
+
+    Requêtes d'agrégat légères exécutées dans le processus de l'API. Les rapports
+    affichent la date du jour : le cache n'est jamais servi d'un jour sur l'autre.
+    """
+    from backend.models.parcel import Parcel
+    from backend.models.audit_log import AuditLog, ParcelHistory
+    from backend.models.document import Document
+
+    def parcels_version():
+        count, updated = db.query(func.count(Parcel.id), func.max(Parcel.updated_at)).one()
+        return [count, updated]
+
+    version = {'date': date.today().isoformat()}
+    if kind_name == 'parcel_pdf':
+        parcel_id = params['parcel_id']
+        version['parcel'] = db.query(Parcel.updated_at).filter(Parcel.id == parcel_id).scalar()
+        if params['include_history']:
+            version['history'] = db.query(func.max(ParcelHistory.id)).filter(ParcelHistory.parcel_id == parcel_id).scalar()
+        if params['include_documents']:
+            version['documents'] = db.query(func.count(Document.id), func.max(Document.uploaded_at)).filter(
+                Document.parcel_id == parcel_id).one()
+        if params['include_nearby']:
+            version['parcels'] = parcels_version()
+    elif kind_name == 'parcels_excel':
+        version['parcels'] = parcels_version()
+    else:
+        version['audit'] = db.query(func.max(AuditLog.id)).scalar()
+    return version
+
+
+def render_report(kind_name: str, params: Dict[str, Any], output_path: str) -> int:
+    """
+    Rend un rapport dans un processus de la file et l'écrit dans le cache
+
+    Le contenu est écrit sur disque par le processus de rendu : seule sa taille
+    repasse par le pipe vers le processus de l'API.
+    """
+    from backend.database import SessionLocal
+    from backend.services.report_service import ReportService
+
+    kind = REPORT_KINDS[kind_name]
+    db = SessionLocal()
+    try:
+        content = getattr(ReportService(db), kind.method)(**kind.arguments(params))
+    finally:
+        db.close()
+
+    temp_path = f"{output_path}.{os.getpid()}.part"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, output_path)
+    return len(content)
+
+
+def _init_render_process() -> None:
+    # Rendu sans affichage pour matplotlib
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+
+@dataclass
+class ReportJob:
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    path: Path
+    status: str = QUEUED
+    cached: bool = False
+    requested_by: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def media_type(self) -> str:
+        return REPORT_KINDS[self.kind].media_type
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'cached': self.cached,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'size': self.size,
+            'error': self.error
+        }
+
+
+class ReportJobQueue:
+    """Soumission, déduplication et cache disque des rapports rendus par un pool de processus"""
+
+    def __init__(self, cache_dir: str = REPORT_CACHE_DIR,
+                 workers: int = REPORT_WORKERS,
+                 cache_ttl: int = REPORT_CACHE_TTL,
+                 executor: Optional[Executor] = None,
+                 renderer: Callable[[str, Dict[str, Any], str], int] = render_report):
+        self.cache_dir = Path(cache_dir)
+        self.workers = max(workers, 1)
+        self.cache_ttl = cache_ttl
+        self.renderer = renderer
+        self._executor = executor
+        self._jobs: Dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'cache_hits': 0, 'deduplicated': 0, 'rendered': 0, 'failed': 0, 'purged': 0}
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                # spawn : pas de copie des connexions du pool SQLAlchemy ni des threads du worker
+                options = {}
+                if sys.version_info >= (3, 11):
+                    # Paramètre absent avant Python 3.11 : les processus durent alors jusqu'à l'arrêt
+                    options['max_tasks_per_child'] = REPORT_MAX_TASKS_PER_CHILD or None
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_render_process,
+                    **options
+                )
+            return self._executor
+
+    def stop(self, wait: bool = True) -> None:
+        """Arrête le pool de rendu (les rapports en cours sont terminés si wait)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def submit(self, kind_name: str, params: Optional[Dict[str, Any]], db: Session,
+               requested_by: Optional[str] = None) -> ReportJob:
+        """
+        Soumet un rapport, servi depuis le cache si ses données n'ont pas changé
+
+        Raises:
+            ValueError: paramètres invalides (voir normalize_params)
+        """
+        params = normalize_params(kind_name, params)
+        key = hashlib.sha256(json.dumps(
+            {'kind': kind_name, 'params': params, 'version': data_version(db, kind_name, params)},
+            sort_keys=True, default=str
+        ).encode()).hexdigest()
+        job_id = f"{kind_name}-{key}"
+        path = self._cache_path(job_id)
+
+        with self._lock:
+            self._stats['submitted'] += 1
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != FAILED and (not job.finished or path.exists()):
+                self._stats['cache_hits' if job.finished else 'deduplicated'] += 1
+                return job
+
+            if path.exists():
+                os.utime(path)  # Prolonge sa durée de vie dans le cache
+                job = ReportJob(job_id, kind_name, params, path, status=DONE, cached=True,
+                                requested_by=requested_by, finished_at=datetime.utcnow(), size=path.stat().st_size)
+                self._stats['cache_hits'] += 1
+                self._jobs[job_id] = job
+                return job
+
+            self._prune()
+            job = ReportJob(job_id, kind_name, params, path, requested_by=requested_by)
+            self._jobs[job_id] = job
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        future = self.executor.submit(self.renderer, kind_name, params, str(path))
+        job.future = future
+        future.add_done_callback(lambda done: self._finish(job, done))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """Job connu de ce worker, ou rapport présent dans le cache (rendu par un autre worker)"""
+        if not _JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            future = job.future
+            if job.status == QUEUED and future is not None and future.running():
+                job.status = RUNNING
+            return job
+        path = self._cache_path(job_id)
+        if not path.exists():
+            return None
+        return ReportJob(job_id, job_id.split('-', 1)[0], {}, path, status=DONE, cached=True,
+                         size=path.stat().st_size)
+
+    async def wait(self, job: ReportJob, timeout: float) -> ReportJob:
+        """Attend la fin d'un job, au plus timeout secondes (le job continue au-delà)"""
+        future = job.future  # Remis à None par _finish depuis le thread du pool
+        if not job.finished and future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                # Erreur de rendu : reportée dans job.error par _finish
+                pass
+            if future.done():
+                self._finish(job, future)
+        return job
+
+    def purge_cache(self) -> int:
+        """Supprime les rapports non demandés depuis plus de cache_ttl secondes"""
+        if not self.cache_dir.exists():
+            return 0
+        cutoff = time.time() - self.cache_ttl
+        purged = 0
+        for path in self.cache_dir.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    purged += 1
+            except OSError:
+                # Supprimé par un autre worker
+                pass
+        self._count('purged', purged)
+        return purged
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            stats['running'] = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            stats['pool_started'] = self._executor is not None
+        stats['workers'] = self.workers
+        return stats
+
+    def _cache_path(self, job_id: str) -> Path:
+        kind = REPORT_KINDS[job_id.split('-', 1)[0]]
+        return self.cache_dir / f"{job_id}.{kind.extension}"
+
+    def _finish(self, job: ReportJob, future: Future) -> None:
+        with self._lock:
+            if job.finished:
+                return
+            error = RuntimeError("Rendu annulé (arrêt du pool)") if future.cancelled() else future.exception()
+            job.finished_at = datetime.utcnow()
+            if error is None:
+                job.status = DONE
+                job.size = future.result()
+                self._stats['rendered'] += 1
+            else:
+                job.status = FAILED
+                job.error = str(error)
+                job.error_type = type(error).__name__
+                self._stats['failed'] += 1
+            job.future = None
+
+    def _prune(self) -> None:
+        # Appelé sous self._lock : oublie les jobs terminés depuis plus de cache_ttl
+        cutoff = datetime.utcnow() - timedelta(seconds=self.cache_ttl)
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += value
+
+
+SCHEDULE_TYPES = ('daily', 'weekly', 'monthly')
+
+
+def compute_next_run(schedule_type: str, schedule_time: str, after: datetime, anchor: datetime) -> datetime:
+    """
+    Prochaine exécution strictement après `after`
+
+    weekly : même jour de la semaine que anchor (création) ; monthly : même jour
+    du mois que anchor, ramené au 28 au plus.
+
+    Raises:
+        ValueError: type de planification ou heure (HH:MM) invalide
+    """
+    if schedule_type not in SCHEDULE_TYPES:
+        raise ValueError(f"Type de planification invalide: {schedule_type} ({', '.join(SCHEDULE_TYPES)})")
+    match = re.fullmatch(r'([01]\d|2[0-3]):([0-5]\d)', schedule_time or '')
+    if not match:
+        raise ValueError("Heure de planification invalide (format HH:MM)")
+    hour, minute = int(match.group(1)), int(match.group(2))
+
+    candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if schedule_type == 'daily':
+        if candidate <= after:
+            candidate += timedelta(days=1)
+    elif schedule_type == 'weekly':
+        candidate += timedelta(days=(anchor.weekday() - candidate.weekday()) % 7)
+        if candidate <= after:
+            candidate += timedelta(days=7)
+    else:
+        candidate = candidate.replace(day=min(anchor.day, 28))
+        if candidate <= after:
+            year, month = (candidate.year + 1, 1) if candidate.month == 12 else (candidate.year, candidate.month + 1)
+            candidate = candidate.replace(year=year, month=month)
+    return candidate
+
+
+class ReportScheduler:
+    """Déclenche les rapports planifiés sur la file, une seule fois quel que soit le nombre de workers"""
+
+    def __init__(self, queue: ReportJobQueue,
+                 session_factory: Optional[Callable[[], Session]] = None,
+                 interval: float = REPORT_SCHEDULER_INTERVAL):
+        self.queue = queue
+        self._session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def session_factory(self) -> Callable[[], Session]:
+        if self._session_factory is None:
+            from backend.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def schedule(self, db: Session, report_type: str, parameters: Optional[Dict[str, Any]],
+                 schedule_type: str, schedule_time: str, created_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Enregistre une planification
+
+        Raises:
+            ValueError: type de rapport, paramètres, type de planification ou heure invalides
+        """
+        from backend.models.report_schedule import ReportSchedule
+
+        params = normalize_params(report_type, parameters)
+        now = datetime.now()
+        schedule = ReportSchedule(
+            report_type=report_type,
+            parameters=json.dumps(params, sort_keys=True),
+            schedule_type=schedule_type,
+            schedule_time=schedule_time,
+            created_by=str(created_by) if created_by is not None else None,
+            created_at=now,
+            next_run_at=compute_next_run(schedule_type, schedule_time, now, now)
+        )
+        db.add(schedule)
+        db.commit()
+        return schedule.to_dict()
+
+    def list_schedules(self, db: Session, created_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        from backend.models.report_schedule import ReportSchedule
+
+        query = db.query(ReportSchedule).filter(ReportSchedule.active == True)
+        if created_by is not None:
+            query = query.filter(ReportSchedule.created_by == str(created_by))
+        return [schedule.to_dict() for schedule in query.order_by(ReportSchedule.next_run_at).all()]
+
+    def cancel(self, db: Session, schedule_id: int, created_by: Optional[str] = None) -> bool:
+        """Désactive une planification (de created_by si précisé)"""
+        from backend.models.report_schedule import ReportSchedule
+
+        query = db.query(ReportSchedule).filter(ReportSchedule.id == schedule_id, ReportSchedule.active == True)
+        if created_by is not None:
+            query = query.filter(ReportSchedule.created_by == str(created_by))
+        cancelled = query.update({ReportSchedule.active: False}, synchronize_session=False)
+        db.commit()
+        return bool(cancelled)
+
+    def run_due(self, now: Optional[datetime] = None) -> int:
+        """
+        Soumet les rapports dont l'échéance est passée
+
+        Returns:
+            int: Nombre de rapports soumis par ce worker
+        """
+        from backend.models.report_schedule import ReportSchedule
+
+        now = now or datetime.now()
+        launched = 0
+        db = self.session_factory()
+        try:
+            due = db.query(
+                ReportSchedule.id, ReportSchedule.report_type, ReportSchedule.parameters,
+                ReportSchedule.schedule_type, ReportSchedule.schedule_time,
+                ReportSchedule.created_at, ReportSchedule.created_by, ReportSchedule.next_run_at
+            ).filter(ReportSchedule.active == True, ReportSchedule.next_run_at <= now).all()
+
+            for row in due:
+                # Mise à jour conditionnelle : le premier worker qui avance l'échéance la déclenche
+                claimed = db.query(ReportSchedule).filter(
+                    ReportSchedule.id == row.id,
+                    ReportSchedule.next_run_at == row.next_run_at
+                ).update({
+                    ReportSchedule.next_run_at: compute_next_run(row.schedule_type, row.schedule_time, now, row.created_at),
+                    ReportSchedule.last_run_at: now
+                }, synchronize_session=False)
+                db.commit()
+                if not claimed:
+                    continue
+
+                try:
+                    job = self.queue.submit(row.report_type, json.loads(row.parameters), db, row.created_by)
+                except ValueError as e:
+                    print(f"Planification de rapport {row.id} invalide: {e}")
+                    continue
+                db.query(ReportSchedule).filter(ReportSchedule.id == row.id).update(
+                    {ReportSchedule.last_job_id: job.id}, synchronize_session=False
+                )
+                db.commit()
+                launched += 1
+        except sql_exceptions.SQLAlchemyError as e:
+            db.rollback()
+            print(f"Erreur lors du déclenchement des rapports planifiés: {e}")
+        finally:
+            db.close()
+        return launched
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.run_due)
+                await run_in_threadpool(self.queue.purge_cache)
+            except Exception as e:
+                print(f"Erreur du planificateur de rapports: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Instance globale
+report_jobs = ReportJobQueue()
+report_scheduler = ReportScheduler(report_jobs)
@@ -3,7 +3,7 @@ Interfaces pour le pattern Repository
 """
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import TypeVar, Generic, List, Optional, Dict, Any
+from typing import TypeVar, Generic, Iterator, List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 
 T = TypeVar('T')
@@ -57,10 +57,30 @@ class IRepository(Generic[T], ABC):
         pass
 
 
+# Dimensions des statistiques de parcelles et libellé des valeurs vides
+PARCEL_STATISTICS_DIMENSIONS = {
+    'category': 'Indefini',
+    'status': 'available',
+    'zone': 'Non définie',
+}
+
+
 class IParcelRepository(IRepository):
     """
     Interface spécifique pour le repository des parcelles
     """
+
+    @abstractmethod
+    def get_statistics_aggregates(self, filters: Optional[Dict[str, Any]] = None) -> List[tuple]:
+        """
+        Agrégats des parcelles filtrées, globalement et par dimension (PARCEL_STATISTICS_DIMENSIONS)
+
+        Returns:
+            Lignes (dimension, clé, nombre, surface totale, surface min, surface max) ;
+            la ligne globale a pour dimension 'total' et une clé None. Les surfaces
+            nulles ou à zéro sont ignorées pour le min/max.
+        """
+        pass
     
     @abstractmethod
     def get_by_reference(self, reference: str) -> Optional[T]:
@@ -83,6 +103,63 @@ class IParcelRepository(IRepository):
         """
         pass
 
+    @abstractmethod
+    def get_by_ids(self, ids: List[str]) -> List[T]:
+        """
+        Récupère les parcelles correspondant à une liste d'IDs
+        """
+        pass
+
+    @abstractmethod
+    def get_unique_owners_count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Compte les propriétaires distincts des parcelles filtrées
+        """
+        pass
+
+    @abstractmethod
+    def get_for_map(self, bbox: Optional[tuple] = None, category: Optional[str] = None,
+                    owner_id: Optional[str] = None) -> List[T]:
+        """
+        Récupère les parcelles d'une emprise (min_lat, min_lng, max_lat, max_lng), filtrées en base
+        """
+        pass
+
+    @abstractmethod
+    def get_spatial_index_rows(self) -> List[tuple]:
+        """
+        Récupère les tuples (id, lat, lng, géométrie) servant à construire l'index spatial
+        """
+        pass
+
+    @abstractmethod
+    def iter_export_rows(self, filters: Optional[Dict[str, Any]] = None, batch_size: int = 1000) -> Iterator[Any]:
+        """
+        Parcourt les parcelles filtrées pour un export, lues par lots de batch_size (curseur serveur)
+
+        Chaque ligne expose les colonnes utiles aux exports (attributs, coordonnées,
+        géométrie, dates) et owner_name ; la mémoire consommée ne dépend pas du
+        nombre de parcelles.
+        """
+        pass
+
+    @abstractmethod
+    def search_page(self, criteria: Dict[str, Any], cursor: Optional[str] = None,
+                    total_mode: str = 'cached') -> Dict[str, Any]:
+        """
+        Recherche paginée des parcelles, des plus récentes aux plus anciennes (created_at, id)
+
+        Args:
+            criteria: Critères de recherche, avec page et page_size
+            cursor: Curseur de la page suivante (next_cursor de la page précédente) ;
+                prioritaire sur le numéro de page
+            total_mode: Calcul du total ('exact', 'cached', 'estimate' ou 'none')
+
+        Returns:
+            dict: items, next_cursor, has_more, total, page, page_size, total_pages
+        """
+        pass
+
 
 class IParcelHistoryRepository(IRepository):
     """
@@ -214,6 +291,21 @@ class IAuditLogRepository(IRepository):
         """
         pass
 
+    @abstractmethod
+    def get_audit_logs_page(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        total_mode: str = 'none'
+    ) -> Dict[str, Any]:
+        """
+        Page d'audit logs filtrés (mêmes filtres que get_audit_logs), du plus récent
+        au plus ancien (timestamp, id), avec le curseur de la page suivante
+        """
+        pass
+
     @abstractmethod
     def get_entity_history(
         self,
@@ -300,6 +392,13 @@ class IAuditLogRepository(IRepository):
         """
         pass
 
+    @abstractmethod
+    def create_many(self, entities: List[T]) -> int:
+        """
+        Insère un lot de logs en une seule transaction
+        """
+        pass
+
 
 class IMutationRepository(IRepository):
     """
@@ -348,6 +447,15 @@ class IMutationRepository(IRepository):
         """
         pass
 
+    @abstractmethod
+    def search_page(self, criteria: Dict[str, Any], limit: int = 20, offset: int = 0,
+                    cursor: Optional[str] = None, total_mode: str = 'cached') -> Dict[str, Any]:
+        """
+        Page de mutations filtrées (mêmes critères que search), des plus récentes aux
+        plus anciennes (created_at, id), avec le curseur de la page suivante
+        """
+        pass
+
 
 class IDocumentRepository(IRepository):
     """
@@ -402,3 +510,26 @@ class IDocumentRepository(IRepository):
         Récupère les documents par tags
         """
         pass
+
+
+class IParcelStatsRepository(ABC):
+    """
+    Interface du repository des statistiques matérialisées (table parcel_stats)
+    """
+
+    @abstractmethod
+    def get_snapshot(self) -> Dict[str, Dict[str, tuple]]:
+        """
+        Récupère tous les compteurs : {dimension: {clé: (nombre, surface totale)}}
+        """
+        pass
+
+    @abstractmethod
+    def reconcile(self) -> int:
+        """
+        Recalcule les compteurs depuis les tables sources et corrige les écarts
+
+        Returns:
+            int: Nombre de compteurs corrigés
+        """
+        pass
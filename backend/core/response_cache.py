@@ -0,0 +1,277 @@
+"""
+Cache des réponses des endpoints de lecture (tableau de bord, analytics)
+
+Les entrées sont indexées par route, paramètres de requête et rôle de l'utilisateur,
+expirent après un TTL et sont invalidées par les écritures sur les tables dont elles
+dépendent (parcelles, documents, mutations).
+
+L'invalidation repose sur des numéros de génération par table, inclus dans la clé :
+incrémenter la génération d'une table rend obsolètes toutes les entrées qui en
+dépendent, sans avoir à les énumérer. Le mécanisme fonctionne donc aussi bien avec
+le backend en mémoire qu'avec un backend partagé entre workers (Redis).
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.config import CACHE_TIMEOUT, CACHE_MAX_ENTRIES, CACHE_URL
+
+# Tables dont les écritures invalident les réponses en cache
+DEFAULT_DEPENDENCIES = ('parcels', 'documents', 'parcel_mutations')
+
+# Sentinelle distinguant une absence d'entrée d'une valeur None en cache
+_MISSING = object()
+
+
+class InMemoryCacheBackend:
+    """Cache LRU en mémoire avec expiration (propre à chaque worker)"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counters(self, names: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._counters.get(name, 0) for name in names)
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Cache partagé entre workers (Redis), valeurs sérialisées en JSON"""
+
+    PREFIX = 'siu:cache:'
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(self.PREFIX + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        from fastapi.encoders import jsonable_encoder
+        self.client.set(self.PREFIX + key, json.dumps(jsonable_encoder(value)), ex=ttl)
+
+    def get_counters(self, names: Iterable[str]) -> Tuple[int, ...]:
+        names = list(names)
+        if not names:
+            return ()
+        values = self.client.mget([self.PREFIX + 'gen:' + name for name in names])
+        return tuple(int(value or 0) for value in values)
+
+    def incr(self, name: str) -> None:
+        self.client.incr(self.PREFIX + 'gen:' + name)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(self.PREFIX + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(self.PREFIX + '*'))
+
+
+class ResponseCache:
+    """Cache des réponses avec TTL, invalidation par table et compteurs de hits/miss"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or InMemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def make_key(self, route: str, params: Dict[str, Any], role: str, dependencies: Iterable[str]) -> str:
+        dependencies = tuple(dependencies)
+        generations = self.backend.get_counters(dependencies)
+        payload = json.dumps(
+            [route, role, sorted((name, repr(value)) for name, value in params.items()),
+             list(zip(dependencies, generations))]
+        )
+        return route + ':' + hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Any:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # Un cache indisponible ne doit pas faire échouer la requête
+            self.errors += 1
+            print(f"Erreur de lecture du cache: {e}")
+            value = _MISSING
+        if value is _MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            self.errors += 1
+            print(f"Erreur d'écriture du cache: {e}")
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """Rend obsolètes les entrées dépendant des tables modifiées"""
+        for table in tables:
+            try:
+                self.backend.incr(table)
+            except Exception as e:
+                self.errors += 1
+                print(f"Erreur d'invalidation du cache: {e}")
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = self.misses = self.errors = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            entries = self.backend.size()
+        except Exception:
+            entries = None
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+        }
+
+
+def _create_backend():
+    if CACHE_URL:
+        try:
+            return RedisCacheBackend(CACHE_URL)
+        except Exception as e:
+            print(f"Cache partagé indisponible ({e}), utilisation du cache en mémoire")
+    return InMemoryCacheBackend()
+
+
+# Instance globale
+response_cache = ResponseCache(_create_backend())
+
+
+def _role_of(user) -> str:
+    from backend.utils.role_helpers import get_role_value
+    return get_role_value(getattr(user, 'role', None)) if user is not None else 'anonymous'
+
+
+def cached_response(ttl: int = CACHE_TIMEOUT, depends_on: Tuple[str, ...] = DEFAULT_DEPENDENCIES):
+    """
+    Décorateur d'endpoint FastAPI mettant sa réponse en cache
+
+    La clé combine la route, les paramètres simples de la requête et le rôle de
+    l'utilisateur (paramètre `current_user`). Les dépendances injectées (session,
+    utilisateur) sont exclues de la clé.
+
+    Args:
+        ttl: Durée de vie des entrées en secondes
+        depends_on: Tables dont les écritures invalident la réponse
+    """
+    def decorator(func: Callable):
+        route = f"{func.__module__}.{func.__qualname__}"
+
+        def lookup(kwargs: Dict[str, Any]) -> Tuple[str, Any]:
+            params = {
+                name: value for name, value in kwargs.items()
+                if value is None or isinstance(value, (str, int, float, bool))
+            }
+            key = response_cache.make_key(route, params, _role_of(kwargs.get('current_user')), depends_on)
+            return key, response_cache.get(key)
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key, value = lookup(kwargs)
+                if value is not _MISSING:
+                    return value
+                value = await func(*args, **kwargs)
+                response_cache.set(key, value, ttl)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key, value = lookup(kwargs)
+            if value is not _MISSING:
+                return value
+            value = func(*args, **kwargs)
+            response_cache.set(key, value, ttl)
+            return value
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_written_tables(session, flush_context):
+    """Mémorise les tables modifiées par la transaction en cours"""
+    tables = session.info.setdefault('cache_written_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            tables.add(table)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_written_tables(orm_execute_state):
+    """Mémorise les tables modifiées par les UPDATE/DELETE en masse (query.update/delete)"""
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+        orm_execute_state.session.info.setdefault('cache_written_tables', set()).add(
+            orm_execute_state.bind_mapper.local_table.name
+        )
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_written_tables(session):
+    """Invalide le cache une fois les écritures validées"""
+    tables = session.info.pop('cache_written_tables', None)
+    if tables:
+        response_cache.invalidate(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_written_tables(session):
+    session.info.pop('cache_written_tables', None)
@@ -0,0 +1,394 @@
+"""
+Index spatial en mémoire (R-tree) pour les parcelles
+"""
+import json
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import shapely
+import shapely.geometry
+from shapely import STRtree
+from shapely.errors import GEOSException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Rayon moyen de la Terre en km
+EARTH_RADIUS_KM = 6371
+# Longueur approximative d'un degré de latitude en km
+KM_PER_DEGREE = 111.32
+
+# (id, latitude, longitude, géométrie)
+IndexRow = Tuple[str, float, float, Any]
+
+# Prédicats exacts : la géométrie de requête est le premier argument
+PREDICATES = {
+    'intersects': shapely.intersects,
+    'within': shapely.contains,  # parcelle within requête <=> requête contains parcelle
+}
+
+# Nombre de géométries évaluées par appel vectorisé
+PREDICATE_BATCH_SIZE = 10000
+
+# Clé de session.info des modifications de l'index en attente du COMMIT
+_PENDING_KEY = 'siu_pending_spatial_index'
+
+
+def _coordinates_to_geojson(coordinates: list) -> Optional[Dict[str, Any]]:
+    """
+    Convertit les anciens formats de listes de coordonnées en dict GeoJSON
+
+    - [lng, lat, lng, lat, ...]          -> Polygon
+    - [[lng, lat], ...]                  -> Polygon (un anneau)
+    - [[[lng, lat], ...], ...]           -> Polygon (plusieurs anneaux)
+    - [[[[lng, lat], ...], ...], ...]    -> MultiPolygon
+    """
+    if not coordinates:
+        return None
+
+    if isinstance(coordinates[0], (int, float)):
+        ring = [coordinates[i:i + 2] for i in range(0, len(coordinates) - 1, 2)]
+        return {'type': 'Polygon', 'coordinates': [ring]}
+
+    depth = 1
+    item = coordinates[0]
+    while isinstance(item, list) and item and isinstance(item[0], list):
+        depth += 1
+        item = item[0]
+
+    if depth == 1:
+        return {'type': 'Polygon', 'coordinates': [coordinates]}
+    if depth == 2:
+        return {'type': 'Polygon', 'coordinates': coordinates}
+    return {'type': 'MultiPolygon', 'coordinates': coordinates}
+
+
+def parse_geometry(geometry: Any):
+    """
+    Convertit une géométrie stockée en géométrie shapely 2D valide
+
+    Accepte un dict GeoJSON, une chaîne JSON, les anciens formats de listes
+    de coordonnées ou le WKB normalisé (Parcel.geometry_wkb). Les coordonnées Z
+    sont supprimées et les géométries invalides sont réparées. Retourne None si
+    la géométrie est inexploitable.
+    """
+    if geometry is None:
+        return None
+
+    if isinstance(geometry, (bytes, bytearray, memoryview)):
+        # Le WKB stocké est déjà normalisé (2D, valide) à l'écriture
+        try:
+            return shapely.from_wkb(bytes(geometry))
+        except GEOSException:
+            return None
+
+    if isinstance(geometry, str):
+        try:
+            geometry = json.loads(geometry)
+        except ValueError:
+            return None
+
+    if isinstance(geometry, list):
+        geometry = _coordinates_to_geojson(geometry)
+
+    if not isinstance(geometry, dict) or 'type' not in geometry:
+        return None
+
+    try:
+        shape = shapely.force_2d(shapely.geometry.shape(geometry))
+    except (GEOSException, ValueError, TypeError, KeyError, IndexError, AttributeError):
+        return None
+
+    if shape.is_empty:
+        return None
+    if not shape.is_valid:
+        shape = shapely.make_valid(shape)
+    return shape
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Distance de Haversine (km) entre un point et un ensemble de points, vectorisée"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ParcelSpatialIndex:
+    """
+    Index R-tree (STRtree) partagé par le processus sur les parcelles.
+
+    Pour chaque parcelle, l'index conserve son centroïde, son emprise et sa
+    géométrie shapely (analysée une seule fois). L'arbre est construit
+    paresseusement à partir d'un chargeur de lignes (id, lat, lng, géométrie).
+    Un STRtree étant immuable, les modifications ultérieures sont conservées
+    dans une zone tampon (« dirty ») parcourue linéairement, puis l'arbre est
+    reconstruit quand cette zone dépasse un seuil.
+
+    Les modifications reçues avant la fin de la construction (construction en
+    arrière-plan au démarrage) sont mises de côté, puis appliquées par-dessus
+    les lignes chargées : celles-ci peuvent avoir été lues avant la modification.
+
+    Pendant une unité de travail, une modification est rattachée à la session et
+    n'est appliquée qu'après le COMMIT ; une annulation la supprime.
+    """
+
+    def __init__(self, rebuild_threshold: int = 1000):
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.RLock()
+        # Sérialise les constructions sans bloquer les mises à jour incrémentales
+        self._build_lock = threading.Lock()
+        # id -> (lat, lng, min_lng, min_lat, max_lng, max_lat)
+        self._entries: Dict[str, Tuple[float, float, float, float, float, float]] = {}
+        # id -> géométrie shapely (Point au centroïde si la parcelle n'a pas de géométrie)
+        self._shapes: Dict[str, Any] = {}
+        self._tree: Optional[STRtree] = None
+        self._tree_ids = np.empty(0, dtype=object)
+        self._tree_shapes = np.empty(0, dtype=object)
+        # Parcelles ajoutées, modifiées ou supprimées depuis la dernière construction
+        self._dirty: set = set()
+        # Modifications reçues avant la fin de la construction : id -> entrée (None = suppression)
+        self._early_changes: Dict[str, Any] = {}
+        self._built = False
+        self._build_duration = 0.0
+
+    @property
+    def is_built(self) -> bool:
+        return self._built
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --- Construction ---
+
+    def build(self, rows: Iterable[IndexRow]) -> None:
+        """Construit l'index à partir de toutes les lignes fournies"""
+        start = time.time()
+        entries = {}
+        shapes = {}
+        for parcel_id, lat, lng, geometry in rows:
+            made = self._make_entry(lat, lng, geometry)
+            if made:
+                entries[parcel_id], shapes[parcel_id] = made
+
+        with self._lock:
+            for parcel_id, made in self._early_changes.items():
+                if made:
+                    entries[parcel_id], shapes[parcel_id] = made
+                else:
+                    entries.pop(parcel_id, None)
+                    shapes.pop(parcel_id, None)
+            self._early_changes = {}
+            self._entries = entries
+            self._shapes = shapes
+            self._rebuild_tree()
+            self._built = True
+            self._build_duration = time.time() - start
+
+    def ensure_built(self, loader: Callable[[], Iterable[IndexRow]]) -> 'ParcelSpatialIndex':
+        """Construit l'index au premier appel, puis le retourne tel quel"""
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self.build(loader())
+        return self
+
+    def reset(self) -> None:
+        """Vide l'index (il sera reconstruit au prochain ensure_built)"""
+        with self._lock:
+            self._entries = {}
+            self._shapes = {}
+            self._dirty = set()
+            self._early_changes = {}
+            self._tree = None
+            self._tree_ids = np.empty(0, dtype=object)
+            self._tree_shapes = np.empty(0, dtype=object)
+            self._built = False
+
+    def _rebuild_tree(self) -> None:
+        ids = list(self._entries.keys())
+        self._tree_ids = np.array(ids, dtype=object)
+        self._tree_shapes = np.array([self._shapes[i] for i in ids], dtype=object)
+        if ids:
+            bounds = np.array([self._entries[i][2:] for i in ids], dtype=float)
+            boxes = shapely.box(bounds[:, 0], bounds[:, 1], bounds[:, 2], bounds[:, 3])
+            self._tree = STRtree(boxes)
+        else:
+            self._tree = None
+        self._dirty = set()
+
+    @staticmethod
+    def _make_entry(lat: Optional[float], lng: Optional[float], geometry: Any):
+        if lat is None or lng is None:
+            return None
+        shape = parse_geometry(geometry)
+        if shape is None:
+            return (lat, lng, lng, lat, lng, lat), shapely.Point(lng, lat)
+
+        # L'emprise couvre aussi le centroïde déclaré, même s'il sort de la géométrie
+        min_lng, min_lat, max_lng, max_lat = shape.bounds
+        entry = (
+            lat, lng,
+            min(min_lng, lng), min(min_lat, lat),
+            max(max_lng, lng), max(max_lat, lat)
+        )
+        return entry, shape
+
+    # --- Mises à jour incrémentales ---
+
+    def upsert(self, parcel_id: str, lat: float, lng: float, geometry: Any = None) -> None:
+        """Ajoute ou met à jour une parcelle dans l'index"""
+        self._schedule(parcel_id, self._make_entry(lat, lng, geometry))
+
+    def upsert_parcel(self, parcel) -> None:
+        """Ajoute ou met à jour une parcelle ORM dans l'index"""
+        self.upsert(parcel.id, parcel.coordinates_lat, parcel.coordinates_lng, parcel.geometry)
+
+    def remove(self, parcel_id: str) -> None:
+        """Retire une parcelle de l'index"""
+        self._schedule(parcel_id, None)
+
+    def _schedule(self, parcel_id: str, made) -> None:
+        """Applique une modification, après le COMMIT de la session dans une unité de travail"""
+        from backend.database import get_current_unit_of_work
+
+        unit = get_current_unit_of_work()
+        if unit is not None and unit.started:
+            session = unit.session
+            if not session.in_transaction():
+                # Les repositories valident eux-mêmes : c'est la transaction suivante
+                # (au plus tard celle validée par UnitOfWorkMiddleware) qui décide
+                session.begin()
+            # L'entrée est calculée dès maintenant : les objets ORM expirent au COMMIT
+            session.info.setdefault(_PENDING_KEY, []).append((self, parcel_id, made))
+            return
+        self._apply(parcel_id, made)
+
+    def _apply(self, parcel_id: str, made) -> None:
+        """Applique une entrée (None = suppression), mise de côté tant que l'index n'est pas construit"""
+        with self._lock:
+            if not self._built:
+                self._early_changes[parcel_id] = made
+                return
+            if made:
+                self._entries[parcel_id], self._shapes[parcel_id] = made
+            else:
+                self._entries.pop(parcel_id, None)
+                self._shapes.pop(parcel_id, None)
+            self._dirty.add(parcel_id)
+
+    # --- Requêtes ---
+
+    def _tree_hits(self, envelope) -> np.ndarray:
+        """Positions dans l'arbre des parcelles dont l'emprise intersecte l'enveloppe"""
+        if len(self._dirty) > self.rebuild_threshold:
+            self._rebuild_tree()
+        if self._tree is None:
+            return np.empty(0, dtype=np.intp)
+        return self._tree.query(envelope)
+
+    def query_bbox(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> List[str]:
+        """Retourne les IDs des parcelles dont l'emprise intersecte la bounding box"""
+        with self._lock:
+            hits = self._tree_hits(shapely.box(min_lng, min_lat, max_lng, max_lat))
+            ids = [i for i in self._tree_ids[hits] if i not in self._dirty]
+
+            for parcel_id in self._dirty:
+                entry = self._entries.get(parcel_id)
+                if entry and entry[2] <= max_lng and entry[4] >= min_lng and entry[3] <= max_lat and entry[5] >= min_lat:
+                    ids.append(parcel_id)
+            return ids
+
+    def query_points_in_bbox(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> List[str]:
+        """Retourne les IDs des parcelles dont le centroïde est dans la bounding box"""
+        with self._lock:
+            return [
+                parcel_id for parcel_id in self.query_bbox(min_lng, min_lat, max_lng, max_lat)
+                if min_lat <= self._entries[parcel_id][0] <= max_lat
+                and min_lng <= self._entries[parcel_id][1] <= max_lng
+            ]
+
+    def query_geometry(self, geometry, predicate: str = 'intersects') -> List[str]:
+        """
+        Retourne les IDs des parcelles satisfaisant un prédicat topologique exact
+
+        Les candidats sont présélectionnés par emprise dans l'arbre, puis le
+        prédicat est évalué par lots vectorisés contre la géométrie de requête préparée.
+
+        Args:
+            geometry: Géométrie shapely de la requête
+            predicate: 'intersects' ou 'within' (parcelle entièrement contenue dans la requête)
+        """
+        predicate_fn = PREDICATES[predicate]
+        shapely.prepare(geometry)
+
+        with self._lock:
+            hits = self._tree_hits(shapely.box(*geometry.bounds))
+            ids = []
+            for start in range(0, len(hits), PREDICATE_BATCH_SIZE):
+                batch = hits[start:start + PREDICATE_BATCH_SIZE]
+                mask = predicate_fn(geometry, self._tree_shapes[batch])
+                ids.extend(i for i in self._tree_ids[batch[mask]] if i not in self._dirty)
+
+            for parcel_id in self._dirty:
+                shape = self._shapes.get(parcel_id)
+                if shape is not None and predicate_fn(geometry, shape):
+                    ids.append(parcel_id)
+            return ids
+
+    def nearby(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Recherche les parcelles dont le centroïde est à moins de radius_km du point
+
+        Returns:
+            Liste de tuples (parcel_id, distance_km) triée par distance croissante
+        """
+        lat_delta = radius_km / KM_PER_DEGREE
+        lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+
+        with self._lock:
+            candidates = self.query_bbox(lng - lng_delta, lat - lat_delta, lng + lng_delta, lat + lat_delta)
+            if not candidates:
+                return []
+            lats = np.fromiter((self._entries[i][0] for i in candidates), dtype=float, count=len(candidates))
+            lngs = np.fromiter((self._entries[i][1] for i in candidates), dtype=float, count=len(candidates))
+
+        distances = haversine_km(lat, lng, lats, lngs)
+        order = np.argsort(distances, kind='stable')
+        results = []
+        for position in order:
+            distance = float(distances[position])
+            if distance > radius_km:
+                break
+            results.append((candidates[position], distance))
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne des informations sur l'état de l'index"""
+        return {
+            'built': self._built,
+            'size': len(self._entries),
+            'pending_updates': len(self._dirty),
+            'build_duration_ms': round(self._build_duration * 1000, 2)
+        }
+
+
+# Instance globale
+parcel_spatial_index = ParcelSpatialIndex()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_index_changes(session):
+    for index, parcel_id, made in session.info.pop(_PENDING_KEY, ()):
+        index._apply(parcel_id, made)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_index_changes(session, transaction):
+    # Après un COMMIT, la liste a déjà été appliquée : il ne reste que les annulations
+    if transaction.parent is None and not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,114 @@
+"""
+Exports en flux : génération incrémentale, regroupement en blocs et compression gzip
+
+Les exporteurs (CSV, GeoJSON, KML) sont des générateurs d'octets alimentés par un
+curseur serveur : le contenu est produit au fil de la lecture des lignes et envoyé
+par blocs d'environ EXPORT_CHUNK_SIZE octets. La mémoire consommée ne dépend donc
+pas du volume exporté, et le premier bloc (en-tête du fichier) part avant même
+l'exécution de la requête.
+"""
+import csv
+import io
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from backend.config import EXPORT_CHUNK_SIZE, EXPORT_GZIP_LEVEL
+
+
+def iter_csv(fieldnames: Sequence[str], rows: Iterable[Dict[str, Any]], bom: bool = False,
+             chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Écrit des lignes CSV (en-tête compris) en UTF-8, par blocs d'environ chunk_size octets
+
+    Args:
+        fieldnames: Colonnes, dans l'ordre ; les clés supplémentaires sont ignorées
+        rows: Lignes (dictionnaires), consommées au fur et à mesure
+        bom: Préfixe UTF-8 BOM (ouverture directe dans Excel)
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    header = buffer.getvalue().encode('utf-8')
+    yield (b'\xef\xbb\xbf' + header) if bom else header
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def buffer_chunks(chunks: Iterable[bytes], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Regroupe les petits morceaux en blocs d'environ chunk_size octets (le premier part sans attendre)"""
+    pending = []
+    pending_size = 0
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if first or pending_size >= chunk_size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+            first = False
+    if pending:
+        yield b''.join(pending)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = EXPORT_GZIP_LEVEL) -> Iterator[bytes]:
+    """
+    Compresse un flux au format gzip, bloc par bloc
+
+    Un seul compresseur pour tout le flux (le dictionnaire est conservé d'un bloc à
+    l'autre) ; Z_SYNC_FLUSH émet la sortie de chaque bloc sans attendre la suite.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Le client accepte-t-il une réponse compressée en gzip (Accept-Encoding) ?"""
+    for part in request.headers.get('accept-encoding', '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def export_response(chunks: Iterable[bytes], filename: str, media_type: str,
+                    request: Optional[Request] = None, compress: bool = True) -> StreamingResponse:
+    """
+    Réponse de téléchargement en flux d'un export
+
+    Le contenu est compressé à la volée (Content-Encoding: gzip) si le client l'accepte.
+
+    Args:
+        chunks: Générateur d'octets de l'export
+        filename: Nom du fichier proposé au téléchargement
+        media_type: Type MIME du contenu (avant compression)
+        request: Requête HTTP, pour la négociation de la compression
+        compress: False pour un contenu déjà compressé (archive ZIP)
+    """
+    body = buffer_chunks(chunks)
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Vary': 'Accept-Encoding'
+    }
+    if compress and request is not None and accepts_gzip(request):
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    return StreamingResponse(body, media_type=media_type, headers=headers)
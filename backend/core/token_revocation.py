@@ -0,0 +1,234 @@
+"""
+Révocation des tokens JWT partagée entre les workers
+
+Les tokens révoqués (déconnexion) sont enregistrés dans la table `revoked_tokens`.
+Chaque worker garde devant la base un filtre de Bloom des empreintes révoquées :
+un token non révoqué (cas courant) est accepté sans requête ; seuls les positifs
+du filtre (vrais révoqués et rares faux positifs) sont confirmés en base.
+
+Les révocations faites par les autres workers sont récupérées au plus tard après
+TOKEN_REVOCATION_SYNC_INTERVAL secondes : lignes d'id supérieur au dernier chargé,
+plus celles révoquées pendant la fenêtre TOKEN_REVOCATION_SYNC_OVERLAP (un id de
+séquence PostgreSQL peut être validé après un id supérieur). Les tokens expirés
+sont purgés de la table et le filtre est alors reconstruit.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import or_, exc as sql_exceptions
+from sqlalchemy.orm import Session
+
+from backend.config import (
+    TOKEN_REVOCATION_SYNC_INTERVAL, TOKEN_REVOCATION_SYNC_OVERLAP, TOKEN_REVOCATION_PURGE_INTERVAL,
+    TOKEN_REVOCATION_BLOOM_CAPACITY
+)
+from backend.models.revoked_token import RevokedToken
+
+# Taux de faux positifs visé par le filtre (requête en base inutile)
+BLOOM_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """Filtre de Bloom sur des empreintes SHA-256 (pas de hachage supplémentaire)"""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        # Double hachage : les deux moitiés de l'empreinte servent de fonctions indépendantes
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: bytes) -> None:
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+def token_digest(token: str) -> bytes:
+    """Empreinte SHA-256 d'un token"""
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+class TokenRevocationStore:
+    """Registre des tokens révoqués : table partagée + filtre de Bloom local"""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None,
+                 sync_interval: float = TOKEN_REVOCATION_SYNC_INTERVAL,
+                 purge_interval: int = TOKEN_REVOCATION_PURGE_INTERVAL,
+                 capacity: int = TOKEN_REVOCATION_BLOOM_CAPACITY,
+                 overlap: float = TOKEN_REVOCATION_SYNC_OVERLAP):
+        if session_factory is None:
+            from backend.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self.capacity = capacity
+        self.overlap = overlap
+        self.bloom = BloomFilter(capacity)
+        self._last_id = 0
+        self._last_sync = float('-inf')
+        self._last_purge = time.monotonic()
+        self._lock = threading.Lock()
+
+    def revoke(self, token: str, user_id: Optional[str] = None, expires_at: Optional[datetime] = None) -> None:
+        """
+        Révoque un token jusqu'à son expiration
+
+        Args:
+            token: Token JWT
+            user_id: Propriétaire du token (claim `sub`)
+            expires_at: Expiration UTC du token (claim `exp`), lue dans le token si absente
+        """
+        if user_id is None or expires_at is None:
+            claims = self._claims(token)
+            user_id = user_id or claims.get('sub')
+            if expires_at is None and claims.get('exp'):
+                expires_at = datetime.utcfromtimestamp(claims['exp'])
+        if expires_at is None:
+            from backend.services.auth_service import ACCESS_TOKEN_EXPIRE_MINUTES
+            expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+        digest = token_digest(token)
+        db = self.session_factory()
+        try:
+            if not db.query(RevokedToken.id).filter(RevokedToken.token_hash == digest.hex()).first():
+                db.add(RevokedToken(token_hash=digest.hex(), user_id=user_id, expires_at=expires_at))
+                db.commit()
+        except sql_exceptions.IntegrityError:
+            # Révoqué au même moment par un autre worker
+            db.rollback()
+        finally:
+            db.close()
+
+        with self._lock:
+            self.bloom.add(digest)
+
+    def is_revoked(self, token: str) -> bool:
+        """Vérifie si un token a été révoqué (requête en base seulement si le filtre répond oui)"""
+        self._maybe_sync()
+        digest = token_digest(token)
+        if digest not in self.bloom:
+            return False
+
+        db = self.session_factory()
+        try:
+            return db.query(RevokedToken.id).filter(RevokedToken.token_hash == digest.hex()).first() is not None
+        except sql_exceptions.SQLAlchemyError as e:
+            # En cas de doute sur un token signalé par le filtre, on le refuse
+            print(f"Erreur lors de la vérification de révocation: {e}")
+            return True
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        """
+        Supprime les révocations de tokens expirés et reconstruit le filtre
+
+        Returns:
+            int: Nombre de révocations supprimées
+        """
+        db = self.session_factory()
+        try:
+            deleted = db.query(RevokedToken).filter(
+                RevokedToken.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+        except sql_exceptions.SQLAlchemyError as e:
+            db.rollback()
+            print(f"Erreur lors de la purge des tokens révoqués: {e}")
+            return 0
+        finally:
+            db.close()
+
+        with self._lock:
+            self._last_purge = time.monotonic()
+            if deleted:
+                try:
+                    self._rebuild()
+                except sql_exceptions.SQLAlchemyError as e:
+                    # L'ancien filtre reste en place (tokens purgés compris : simple faux positif)
+                    print(f"Erreur lors de la reconstruction du filtre des tokens révoqués: {e}")
+        return deleted
+
+    def _maybe_sync(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        # Un seul thread synchronise ; les autres continuent avec le filtre courant
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = now
+            self._load(or_(
+                RevokedToken.id > self._last_id,
+                RevokedToken.revoked_at >= datetime.utcnow() - timedelta(seconds=self.overlap)
+            ))
+            purge_due = now - self._last_purge >= self.purge_interval
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la synchronisation des tokens révoqués: {e}")
+            return
+        finally:
+            self._lock.release()
+        if purge_due:
+            self.purge_expired()
+
+    def _rebuild(self) -> None:
+        """
+        Reconstruit le filtre depuis les révocations non expirées (verrou détenu)
+
+        is_revoked lit self.bloom sans verrou : le nouveau filtre n'est publié
+        qu'une fois rempli, l'ancien répond jusque-là.
+        """
+        rows = self._read(RevokedToken.expires_at >= datetime.utcnow())
+        # Filtre saturé : taux de faux positifs dégradé, on l'agrandit
+        if len(rows) > self.capacity:
+            self.capacity = len(rows) * 2
+        bloom = BloomFilter(self.capacity)
+        for _, digest in rows:
+            bloom.add(digest)
+        self.bloom = bloom
+        self._last_id = max((row_id for row_id, _ in rows), default=0)
+
+    def _load(self, condition) -> None:
+        for row_id, digest in self._read(condition):
+            # Les lignes de la fenêtre de recouvrement sont relues à chaque synchronisation
+            if digest not in self.bloom:
+                self.bloom.add(digest)
+            self._last_id = max(self._last_id, row_id)
+        if self.bloom.count > self.bloom.capacity:
+            self._rebuild()
+
+    def _read(self, condition) -> List[Tuple[int, bytes]]:
+        db = self.session_factory()
+        try:
+            rows = db.query(RevokedToken.id, RevokedToken.token_hash).filter(condition).all()
+        finally:
+            db.close()
+        return [(row_id, bytes.fromhex(token_hash)) for row_id, token_hash in rows]
+
+    @staticmethod
+    def _claims(token: str) -> dict:
+        from jose import jwt, JWTError
+        try:
+            return jwt.get_unverified_claims(token)
+        except JWTError:
+            return {}
+
+
+# Instance globale
+token_revocation_store = TokenRevocationStore()
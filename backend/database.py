@@ -1,7 +1,15 @@
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from backend.config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+
 def get_database_url():
     """
     Retourne l'URL de la base de données.
@@ -16,11 +24,26 @@ def get_database_url():
 
 SQLALCHEMY_DATABASE_URL = get_database_url()
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    # connect_args est spécifique à SQLite. Il n'est pas nécessaire pour d'autres BDD.
-    connect_args={"check_same_thread": False}
-)
+
+def _engine_options(url: str) -> dict:
+    """Options du moteur : pool de connexions configurable (backend.config, variables SIU_DB_POOL_*)"""
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    if url.startswith('sqlite'):
+        # connect_args est spécifique à SQLite. Il n'est pas nécessaire pour d'autres BDD.
+        options['connect_args'] = {"check_same_thread": False}
+        if ':memory:' in url or url in ('sqlite://', 'sqlite:///'):
+            # Base en mémoire : une seule connexion, pas de pool dimensionnable
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 
 # Crée une classe SessionLocal. Chaque instance de SessionLocal sera une session de base de données.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -29,13 +52,176 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Nos modèles ORM hériteront de cette classe.
 Base = declarative_base()
 
+
+class PoolMetrics:
+    """Compteurs cumulés des événements du pool de connexions"""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+
+    def attach(self, target_engine) -> None:
+        event.listen(target_engine, 'connect', self._on_connect)
+        event.listen(target_engine, 'checkout', self._on_checkout)
+        event.listen(target_engine, 'checkin', self._on_checkin)
+        event.listen(target_engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+
+pool_metrics = PoolMetrics()
+pool_metrics.attach(engine)
+
+
+def get_pool_stats() -> dict:
+    """
+    État courant du pool de connexions et compteurs cumulés
+
+    Returns:
+        dict: Taille, connexions empruntées/disponibles, débordement et compteurs d'événements
+    """
+    pool = engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'connects_total': pool_metrics.connects,
+        'checkouts_total': pool_metrics.checkouts,
+        'checkins_total': pool_metrics.checkins,
+        'invalidations_total': pool_metrics.invalidations,
+        'active_units_of_work': UnitOfWork.active,
+    }
+    # Seul QueuePool expose son dimensionnement
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if 'size' in stats:
+        stats['max_overflow'] = getattr(pool, '_max_overflow', None)
+    return stats
+
+
+class UnitOfWork:
+    """
+    Session unique d'une requête HTTP (ou d'un traitement hors requête)
+
+    La session est ouverte à la première utilisation, partagée par tous les
+    repositories et services résolus pendant la requête, puis validée (ou annulée)
+    et fermée par UnitOfWorkMiddleware.
+    """
+    active = 0
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory or SessionLocal
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self._session_factory()
+            UnitOfWork.active += 1
+        return self._session
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def commit(self) -> None:
+        if self._session is not None:
+            self._session.commit()
+
+    def rollback(self) -> None:
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+            UnitOfWork.active -= 1
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar('siu_unit_of_work', default=None)
+
+
+def get_current_unit_of_work() -> Optional[UnitOfWork]:
+    """Unité de travail de la requête en cours, None hors requête"""
+    return _current_unit_of_work.get()
+
+
+def begin_unit_of_work(session_factory=None):
+    """
+    Démarre une unité de travail dans le contexte courant
+
+    Returns:
+        tuple: (unité de travail, jeton à passer à end_unit_of_work)
+    """
+    unit = UnitOfWork(session_factory)
+    return unit, _current_unit_of_work.set(unit)
+
+
+def end_unit_of_work(token) -> None:
+    """Retire l'unité de travail du contexte courant (sans la fermer)"""
+    _current_unit_of_work.reset(token)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Unité de travail hors requête HTTP (WebSocket, tâches de fond, scripts)
+
+    Valide la session en fin de bloc, l'annule en cas d'exception, puis la ferme.
+    """
+    unit, token = begin_unit_of_work()
+    try:
+        yield unit
+        unit.commit()
+    except Exception:
+        unit.rollback()
+        raise
+    finally:
+        unit.close()
+        end_unit_of_work(token)
+
+
+def get_request_session():
+    """
+    Session de l'unité de travail courante (fabrique du conteneur d'injection)
+
+    Raises:
+        RuntimeError: Si aucune unité de travail n'est active
+    """
+    unit = _current_unit_of_work.get()
+    if unit is None:
+        raise RuntimeError(
+            "Aucune unité de travail active : résoudre les services dans une requête HTTP "
+            "ou dans un bloc `with unit_of_work():`"
+        )
+    return unit.session
+
+
 def get_db():
     """
     Dépendance FastAPI pour obtenir une session de base de données.
-    - Ouvre une session au début de la requête.
-    - Fournit la session à la fonction de la route.
-    - Ferme la session à la fin de la requête.
+    - Pendant une requête, fournit la session de l'unité de travail (validée et
+      fermée par UnitOfWorkMiddleware).
+    - Sinon, ouvre une session dédiée, fermée à la fin de la requête de la route.
     """
+    unit = _current_unit_of_work.get()
+    if unit is not None:
+        yield unit.session
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -49,7 +235,7 @@ def init_db():
     Les modèles doivent être importés quelque part pour que Base les connaisse.
     """
     # Importer tous les modèles ici pour qu'ils soient enregistrés avec Base
-    from backend.models import user, parcel, document, alert, audit_log, mutation, zone, permit
+    from backend.models import user, parcel, document, alert, audit_log, mutation, zone, permit, parcel_stats, revoked_token, realtime_event, document_blob, report_schedule
     print("Initialisation de la base de données et création des tables si elles n'existent pas...")
     Base.metadata.create_all(bind=engine)
     print("Tables initialisées.")
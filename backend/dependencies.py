@@ -1,12 +1,16 @@
 """
 FastAPI dependencies for authentication and authorization
 """
+import re
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+from jose import jwt
 from backend.services.auth_service import AuthService
+from backend.core.principal_cache import principal_cache, UserSnapshot
+from backend.core.token_revocation import token_revocation_store
 from backend.models.user import User, UserRole
-from backend.database import SessionLocal
+from backend.database import SessionLocal, get_current_unit_of_work, unit_of_work
 from backend.utils.role_helpers import is_admin
 
 # Security scheme pour JWT
@@ -17,9 +21,17 @@ def get_db():
     """
     Dependency pour obtenir une session de base de données
 
+    Pendant une requête HTTP, c'est la session de l'unité de travail, partagée avec
+    les services du conteneur et validée par UnitOfWorkMiddleware.
+
     Yields:
         Session SQLAlchemy
     """
+    unit = get_current_unit_of_work()
+    if unit is not None:
+        yield unit.session
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -30,15 +42,43 @@ def get_db():
     finally:
         db.close()
 
+# Format attendu d'un JWT (header.payload.signature)
+TOKEN_PATTERN = re.compile(r'^[a-zA-Z0-9\-_=]+\.[a-zA-Z0-9\-_=]+\.?[a-zA-Z0-9\-_.+/=]*$')
+
+
+def _verify_and_cache(token: str) -> Optional[UserSnapshot]:
+    """
+    Vérifie un token (signature, expiration, utilisateur) et met le résultat en cache
+
+    Returns:
+        UserSnapshot: Instantané de l'utilisateur, None si le token est invalide
+    """
+    generation = principal_cache.generation
+
+    from backend.container_config import get_admin_service
+    admin_service = get_admin_service()
+    auth_service = AuthService(admin_service=admin_service)
+    user = auth_service.verify_token(token)
+    if user is None:
+        return None
+
+    snapshot = UserSnapshot.from_user(user)
+    principal_cache.put(token, snapshot, jwt.get_unverified_claims(token).get('exp'), generation)
+    return snapshot
+
+
 def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """
     Dependency pour récupérer l'utilisateur authentifié depuis le token JWT
 
+    Les tokens déjà vérifiés sont résolus depuis le cache des principaux
+    (core.principal_cache), sans décodage ni requête en base.
+
     Args:
         token: Token JWT extrait du header Authorization
 
     Returns:
-        User: L'utilisateur authentifié
+        User: Instantané immuable (UserSnapshot) de l'utilisateur authentifié
 
     Raises:
         HTTPException: Si le token est invalide ou expiré
@@ -51,21 +91,26 @@ def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)) ->
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Vérifier que le token ne contient pas de caractères suspects
-    import re
-    if not re.match(r'^[a-zA-Z0-9\-_=]+\.[a-zA-Z0-9\-_=]+\.?[a-zA-Z0-9\-_.+/=]*$', token.credentials):
+    # Tokens révoqués (déconnexion), y compris par un autre worker
+    if token_revocation_store.is_revoked(token.credentials):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Format de token invalide",
+            detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    from backend.container_config import get_admin_service
-    admin_service = get_admin_service()
-    auth_service = AuthService(admin_service=admin_service)
-    user = auth_service.verify_token(token.credentials)
-
+    user = principal_cache.get(token.credentials)
     if user is None:
+        # Vérifier que le token ne contient pas de caractères suspects
+        if not TOKEN_PATTERN.match(token.credentials):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Format de token invalide",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user = _verify_and_cache(token.credentials)
+
+    if user is None or user.is_active is False:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -84,25 +129,24 @@ async def get_current_user_ws(token: Optional[str]) -> Optional[User]:
     Returns:
         User object if authenticated, None otherwise
     """
-    if not token:
+    if not token or token_revocation_store.is_revoked(token):
         return None
 
+    user = principal_cache.get(token)
+    if user is not None:
+        return user if user.is_active is not False else None
+
     # Validation du token pour prévenir les attaques par injection
-    import re
-    if not re.match(r'^[a-zA-Z0-9\-_=]+\.[a-zA-Z0-9\-_=]+\.?[a-zA-Z0-9\-_.+/=]*$', token):
+    if not TOKEN_PATTERN.match(token):
         print("Format de token WebSocket invalide")
         return None
 
     try:
-        from backend.container_config import get_admin_service
-        admin_service = get_admin_service()
-        auth_service = AuthService(admin_service=admin_service)
-        user = auth_service.verify_token(token)
-
-        if not user:
+        # Hors requête HTTP : session dédiée au temps de la vérification
+        with unit_of_work():
+            user = _verify_and_cache(token)
+        if not user or user.is_active is False:
             return None
-
-        # verify_token retourne déjà un User object
         return user
     except Exception as e:
         print(f"WebSocket auth error: {e}")
@@ -7,6 +7,7 @@ from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, or_, exc as sql_exceptions
 
+from backend.core.pagination import count_total, keyset_page, page_response
 from backend.core.repository_interfaces import IAuditLogRepository
 from backend.models.audit_log import AuditLog
 
@@ -43,6 +44,17 @@ class SqlAuditLogRepository(IAuditLogRepository):
             print(f"Erreur lors de la création du log d'audit: {e}")
             raise e
 
+    def create_many(self, entities: List[AuditLog]) -> int:
+        try:
+            # Les INSERT du flush sont regroupés (insertmanyvalues) en quelques requêtes
+            self.db_session.add_all(entities)
+            self.db_session.flush()
+            return len(entities)
+        except sql_exceptions.SQLAlchemyError as e:
+            self.db_session.rollback()
+            print(f"Erreur lors de la création d'un lot de logs d'audit: {e}")
+            raise e
+
     def update(self, id: str, entity: AuditLog) -> Optional[AuditLog]:
         return None  # Les logs sont immuables
 
@@ -56,6 +68,51 @@ class SqlAuditLogRepository(IAuditLogRepository):
             print(f"Erreur lors de la recherche des logs d'audit: {e}")
             return []
 
+    # Filtres d'égalité des listes d'audit logs
+    AUDIT_FILTER_FIELDS = ('action', 'entity_type', 'entity_id', 'user_id', 'status', 'is_sensitive')
+
+    def _audit_logs_query(self, filters: Dict[str, Any]):
+        """Requête des audit logs filtrés (sans tri ni pagination)"""
+        query = self.db_session.query(AuditLog)
+        for field in self.AUDIT_FILTER_FIELDS:
+            value = filters.get(field)
+            if value is None or value == '':
+                continue
+            if field == 'entity_id':
+                value = str(value)
+            query = query.filter(getattr(AuditLog, field) == value)
+        if filters.get('date_from'):
+            query = query.filter(AuditLog.timestamp >= filters['date_from'])
+        if filters.get('date_to'):
+            query = query.filter(AuditLog.timestamp <= filters['date_to'])
+        return query
+
+    @staticmethod
+    def _log_to_dict(row: AuditLog) -> Dict[str, Any]:
+        return {
+            'id': row.id,
+            'action': row.action,
+            'entity_type': row.entity_type,
+            'entity_id': row.entity_id,
+            'user_id': row.user_id,
+            'username': row.username,
+            'user_role': row.user_role,
+            'old_data': json.loads(row.old_data) if row.old_data else None,
+            'new_data': json.loads(row.new_data) if row.new_data else None,
+            'changes': json.loads(row.changes) if row.changes else None,
+            'user_ip': row.user_ip,
+            'user_agent': row.user_agent,
+            'request_method': row.request_method,
+            'request_path': row.request_path,
+            'duration_ms': row.duration_ms,
+            'status': row.status,
+            'error_message': row.error_message,
+            'response_status': row.response_status,
+            'is_sensitive': bool(row.is_sensitive),
+            'timestamp': row.timestamp.isoformat() if hasattr(row.timestamp, 'isoformat') else str(row.timestamp),
+            'metadata_ext': json.loads(row.metadata_ext) if row.metadata_ext else None
+        }
+
     def get_audit_logs(
         self,
         action: str = None,
@@ -69,60 +126,30 @@ class SqlAuditLogRepository(IAuditLogRepository):
         limit: int = 100,
         offset: int = 0
     ) -> List[Dict[str, Any]]:
-        try:
-            query = self.db_session.query(AuditLog)
+        filters = {
+            'action': action, 'entity_type': entity_type, 'entity_id': entity_id, 'user_id': user_id,
+            'status': status, 'date_from': date_from, 'date_to': date_to, 'is_sensitive': is_sensitive
+        }
+        return self.get_audit_logs_page(filters, limit=limit, offset=offset)['items']
 
-            if action:
-                query = query.filter(AuditLog.action == action)
-            if entity_type:
-                query = query.filter(AuditLog.entity_type == entity_type)
-            if entity_id:
-                query = query.filter(AuditLog.entity_id == str(entity_id))
-            if user_id:
-                query = query.filter(AuditLog.user_id == user_id)
-            if status:
-                query = query.filter(AuditLog.status == status)
-            if date_from:
-                query = query.filter(AuditLog.timestamp >= date_from)
-            if date_to:
-                query = query.filter(AuditLog.timestamp <= date_to)
-            if is_sensitive is not None:
-                query = query.filter(AuditLog.is_sensitive == is_sensitive)
-
-            query = query.order_by(AuditLog.timestamp.desc())
-            query = query.offset(offset).limit(limit)
-
-            rows = query.all()
-            logs = []
-            for row in rows:
-                log_dict = {
-                    'id': row.id,
-                    'action': row.action,
-                    'entity_type': row.entity_type,
-                    'entity_id': row.entity_id,
-                    'user_id': row.user_id,
-                    'username': row.username,
-                    'user_role': row.user_role,
-                    'old_data': json.loads(row.old_data) if row.old_data else None,
-                    'new_data': json.loads(row.new_data) if row.new_data else None,
-                    'changes': json.loads(row.changes) if row.changes else None,
-                    'user_ip': row.user_ip,
-                    'user_agent': row.user_agent,
-                    'request_method': row.request_method,
-                    'request_path': row.request_path,
-                    'duration_ms': row.duration_ms,
-                    'status': row.status,
-                    'error_message': row.error_message,
-                    'response_status': row.response_status,
-                    'is_sensitive': bool(row.is_sensitive),
-                    'timestamp': row.timestamp.isoformat() if hasattr(row.timestamp, 'isoformat') else str(row.timestamp),
-                    'metadata_ext': json.loads(row.metadata_ext) if row.metadata_ext else None
-                }
-                logs.append(log_dict)
-            return logs
+    def get_audit_logs_page(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        total_mode: str = 'none'
+    ) -> Dict[str, Any]:
+        query = self._audit_logs_query(filters)
+        try:
+            rows, next_cursor = keyset_page(
+                query, (AuditLog.timestamp, AuditLog.id), limit, cursor=cursor, offset=offset
+            )
+            total = count_total(query, total_mode, AuditLog.__tablename__, filters)
         except sql_exceptions.SQLAlchemyError as e:
             print(f"Erreur lors de la récupération des logs d'audit: {e}")
-            return []
+            rows, next_cursor, total = [], None, None
+        return page_response([self._log_to_dict(row) for row in rows], next_cursor, limit, total)
 
     def get_entity_history(
         self,
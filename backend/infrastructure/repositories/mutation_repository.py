@@ -4,7 +4,8 @@ Implémentation du repository pour les mutations foncières
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, and_, or_
+from sqlalchemy import desc, asc, and_, or_, exc as sql_exceptions
+from backend.core.pagination import count_total, keyset_page, page_response
 from backend.core.repository_interfaces import IMutationRepository
 from backend.models.mutation import ParcelMutation
 
@@ -79,35 +80,52 @@ class SqlMutationRepository(IMutationRepository):
             print(f"Erreur lors de la suppression de la mutation: {e}")
             return False
 
+    def _search_query(self, criteria: Dict[str, Any]):
+        """Requête des mutations filtrées par les critères (sans tri ni pagination)"""
+        query = self.db_session.query(ParcelMutation)
+
+        # Appliquer les filtres
+        if 'parcel_id' in criteria:
+            query = query.filter(ParcelMutation.parcel_id == criteria['parcel_id'])
+        if 'mutation_type' in criteria:
+            query = query.filter(ParcelMutation.mutation_type == criteria['mutation_type'])
+        if 'from_owner_id' in criteria:
+            query = query.filter(ParcelMutation.from_owner_id == criteria['from_owner_id'])
+        if 'to_owner_id' in criteria:
+            query = query.filter(ParcelMutation.to_owner_id == criteria['to_owner_id'])
+        if 'status' in criteria:
+            query = query.filter(ParcelMutation.status == criteria['status'])
+        if 'initiated_by_user_id' in criteria:
+            query = query.filter(ParcelMutation.initiated_by_user_id == criteria['initiated_by_user_id'])
+        if 'approved_by_user_id' in criteria:
+            query = query.filter(ParcelMutation.approved_by_user_id == criteria['approved_by_user_id'])
+        if 'from_date' in criteria:
+            query = query.filter(ParcelMutation.created_at >= criteria['from_date'])
+        if 'to_date' in criteria:
+            query = query.filter(ParcelMutation.created_at <= criteria['to_date'])
+
+        return query
+
     def search(self, criteria: Dict[str, Any]) -> List[ParcelMutation]:
         try:
-            query = self.db_session.query(ParcelMutation)
-
-            # Appliquer les filtres
-            if 'parcel_id' in criteria:
-                query = query.filter(ParcelMutation.parcel_id == criteria['parcel_id'])
-            if 'mutation_type' in criteria:
-                query = query.filter(ParcelMutation.mutation_type == criteria['mutation_type'])
-            if 'from_owner_id' in criteria:
-                query = query.filter(ParcelMutation.from_owner_id == criteria['from_owner_id'])
-            if 'to_owner_id' in criteria:
-                query = query.filter(ParcelMutation.to_owner_id == criteria['to_owner_id'])
-            if 'status' in criteria:
-                query = query.filter(ParcelMutation.status == criteria['status'])
-            if 'initiated_by_user_id' in criteria:
-                query = query.filter(ParcelMutation.initiated_by_user_id == criteria['initiated_by_user_id'])
-            if 'approved_by_user_id' in criteria:
-                query = query.filter(ParcelMutation.approved_by_user_id == criteria['approved_by_user_id'])
-            if 'from_date' in criteria:
-                query = query.filter(ParcelMutation.created_at >= criteria['from_date'])
-            if 'to_date' in criteria:
-                query = query.filter(ParcelMutation.created_at <= criteria['to_date'])
-
-            return query.all()
+            return self._search_query(criteria).all()
         except Exception as e:
             print(f"Erreur lors de la recherche des mutations: {e}")
             return []
 
+    def search_page(self, criteria: Dict[str, Any], limit: int = 20, offset: int = 0,
+                    cursor: Optional[str] = None, total_mode: str = 'cached') -> Dict[str, Any]:
+        query = self._search_query(criteria)
+        try:
+            items, next_cursor = keyset_page(
+                query, (ParcelMutation.created_at, ParcelMutation.id), limit, cursor=cursor, offset=offset
+            )
+            total = count_total(query, total_mode, ParcelMutation.__tablename__, criteria)
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la recherche paginée des mutations: {e}")
+            items, next_cursor, total = [], None, 0
+        return page_response(items, next_cursor, limit, total)
+
     def get_by_parcel_id(self, parcel_id: str) -> List[ParcelMutation]:
         try:
             return self.db_session.query(ParcelMutation).filter(ParcelMutation.parcel_id == parcel_id).all()
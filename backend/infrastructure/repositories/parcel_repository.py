@@ -1,11 +1,13 @@
 """
 Implémentation des repositories SQLAlchemy
 """
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, exc as sql_exceptions
-from backend.core.repository_interfaces import IParcelRepository
+from sqlalchemy import and_, or_, case, func, literal, null, select, union_all, text, exc as sql_exceptions
+from backend.core.pagination import count_total, keyset_page, page_response
+from backend.core.repository_interfaces import IParcelRepository, PARCEL_STATISTICS_DIMENSIONS
 from backend.models.parcel import Parcel
+from backend.models.user import User
 from backend.utils.db_helpers import safe_ilike
 
 
@@ -41,6 +43,182 @@ class SqlParcelRepository(IParcelRepository):
             print(f"Erreur lors de la récupération de toutes les parcelles: {e}")
             return []
 
+    # Dialectes supportant GROUP BY GROUPING SETS
+    GROUPING_SETS_DIALECTS = ('postgresql', 'mssql', 'oracle')
+
+    # Filtres d'égalité acceptés par les statistiques
+    STATISTICS_FILTER_FIELDS = ('category', 'zone', 'status', 'region', 'province', 'localite', 'commune', 'owner_id')
+
+    def _statistics_conditions(self, filters: Optional[Dict[str, Any]]) -> list:
+        """Conditions SQL des filtres de statistiques (champs exacts et période de création)"""
+        filters = filters or {}
+        conditions = [
+            getattr(Parcel, field) == filters[field]
+            for field in self.STATISTICS_FILTER_FIELDS if filters.get(field)
+        ]
+        date_from = filters.get('startDate') or filters.get('date_from')
+        date_to = filters.get('endDate') or filters.get('date_to')
+        if date_from:
+            conditions.append(Parcel.created_at >= date_from)
+        if date_to:
+            conditions.append(Parcel.created_at <= date_to)
+        return conditions
+
+    def get_statistics_aggregates(self, filters: Optional[Dict[str, Any]] = None
+                                  ) -> List[Tuple[str, Optional[str], int, float, float, float]]:
+        """
+        Calcule en base les agrégats des parcelles (total et par catégorie, statut, zone)
+
+        Une seule requête GROUPING SETS si le dialecte le permet, sinon une UNION ALL
+        des regroupements (SQLite).
+
+        Args:
+            filters: Filtres optionnels (champs de STATISTICS_FILTER_FIELDS, startDate, endDate)
+        """
+        dimensions = {
+            name: func.coalesce(func.nullif(getattr(Parcel, name), ''), default).label(name)
+            for name, default in PARCEL_STATISTICS_DIMENSIONS.items()
+        }
+        # Surfaces nulles exclues du min/max, comme pour la somme
+        area = case((Parcel.area != 0, Parcel.area), else_=null()).label('area')
+        rows = select(*dimensions.values(), area).where(*self._statistics_conditions(filters)).subquery()
+
+        def aggregates():
+            return (func.count(), func.coalesce(func.sum(rows.c.area), 0),
+                    func.min(rows.c.area), func.max(rows.c.area))
+
+        try:
+            if self.db_session.get_bind().dialect.name in self.GROUPING_SETS_DIALECTS:
+                grouped = [func.grouping(rows.c[name]) == 0 for name in dimensions]
+                dimension = case(
+                    *[(is_grouped, literal(name)) for is_grouped, name in zip(grouped, dimensions)],
+                    else_=literal('total')
+                )
+                key = func.coalesce(*[rows.c[name] for name in dimensions])
+                query = select(dimension, key, *aggregates()).group_by(
+                    func.grouping_sets(*[rows.c[name] for name in dimensions], text('()'))
+                )
+            else:
+                query = union_all(
+                    select(literal('total'), null(), *aggregates()),
+                    *[
+                        select(literal(name), rows.c[name], *aggregates()).group_by(rows.c[name])
+                        for name in dimensions
+                    ]
+                )
+            return [tuple(row) for row in self.db_session.execute(query)]
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors du calcul des statistiques des parcelles: {e}")
+            return []
+
+    def get_unique_owners_count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Compte les propriétaires distincts des parcelles filtrées"""
+        try:
+            return self.db_session.query(func.count(func.distinct(Parcel.owner_id))).filter(
+                *self._statistics_conditions(filters)
+            ).scalar() or 0
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors du comptage des propriétaires: {e}")
+            return 0
+
+    def get_by_ids(self, ids: List[str]) -> List[Parcel]:
+        """Récupère les parcelles correspondant à une liste d'IDs (par lots pour limiter la taille du IN)"""
+        try:
+            parcels = []
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                parcels.extend(self.db_session.query(Parcel).filter(Parcel.id.in_(chunk)).all())
+            return parcels
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la récupération des parcelles par IDs: {e}")
+            return []
+
+    def get_spatial_index_rows(self) -> List[Tuple[str, float, float, Any]]:
+        """Récupère uniquement les colonnes nécessaires à l'index spatial (id, lat, lng, géométrie WKB)"""
+        try:
+            return self.db_session.query(
+                Parcel.id, Parcel.coordinates_lat, Parcel.coordinates_lng, Parcel.geometry_wkb
+            ).all()
+        except sql_exceptions.SQLAlchemyError as e:
+            # Ne pas retourner une liste vide : l'index serait considéré comme construit
+            print(f"Erreur lors du chargement de l'index spatial: {e}")
+            raise e
+
+    # Colonnes lues par les exports (sans les emprises ni les colonnes dérivées de la géométrie)
+    EXPORT_COLUMNS = (
+        Parcel.id, Parcel.reference_cadastrale, Parcel.coordinates_lat, Parcel.coordinates_lng,
+        Parcel.area, Parcel.address, Parcel.category, Parcel.status, Parcel.zone, Parcel.region,
+        Parcel.province, Parcel.localite, Parcel.commune, Parcel.owner_id, Parcel.geometry,
+        Parcel.geometry_geojson, Parcel.geometry_wkb, Parcel.created_at, Parcel.updated_at
+    )
+
+    def iter_export_rows(self, filters: Optional[Dict[str, Any]] = None, batch_size: int = 1000) -> Iterator[Any]:
+        """
+        Parcourt les parcelles filtrées par lots, pour les exports en flux
+
+        yield_per active un curseur côté serveur (stream_results) : seules
+        batch_size lignes sont en mémoire à la fois. Le nom du propriétaire est
+        obtenu par jointure plutôt que par chargement paresseux ligne à ligne.
+
+        Args:
+            filters: Filtres des statistiques (champs exacts, startDate, endDate)
+            batch_size: Nombre de lignes lues par lot
+        """
+        owner_name = func.coalesce(
+            func.nullif(func.trim(func.coalesce(User.first_name, '') + ' ' + func.coalesce(User.last_name, '')), ''),
+            User.username
+        ).label('owner_name')
+        query = self.db_session.query(*self.EXPORT_COLUMNS, owner_name)\
+            .outerjoin(User, User.id == Parcel.owner_id)\
+            .filter(*self._statistics_conditions(filters))\
+            .order_by(Parcel.id)\
+            .execution_options(yield_per=batch_size)
+        try:
+            yield from query
+        except sql_exceptions.SQLAlchemyError as e:
+            # Les en-têtes sont déjà envoyés : l'export est interrompu
+            print(f"Erreur lors de l'export des parcelles: {e}")
+            raise e
+
+    def get_for_map(self, bbox: Optional[Tuple[float, float, float, float]] = None,
+                    category: Optional[str] = None, owner_id: Optional[str] = None) -> List[Parcel]:
+        """
+        Récupère les parcelles à afficher sur la carte, filtrées en SQL
+
+        Args:
+            bbox: Tuple (min_lat, min_lng, max_lat, max_lng) ; retient les parcelles dont l'emprise l'intersecte
+            category: Catégorie exacte
+            owner_id: ID du propriétaire
+        """
+        try:
+            query = self.db_session.query(Parcel)
+
+            if bbox:
+                min_lat, min_lng, max_lat, max_lng = bbox
+                query = query.filter(or_(
+                    and_(
+                        Parcel.min_lat <= max_lat, Parcel.max_lat >= min_lat,
+                        Parcel.min_lng <= max_lng, Parcel.max_lng >= min_lng
+                    ),
+                    # Parcelles dont l'emprise n'a pas encore été calculée : centroïde
+                    and_(
+                        Parcel.min_lat.is_(None),
+                        Parcel.coordinates_lat.between(min_lat, max_lat),
+                        Parcel.coordinates_lng.between(min_lng, max_lng)
+                    )
+                ))
+
+            if category:
+                query = query.filter(Parcel.category == category)
+
+            if owner_id:
+                query = query.filter(Parcel.owner_id == owner_id)
+
+            return query.all()
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la récupération des parcelles pour la carte: {e}")
+            return []
+
     def get_by_owner(self, owner_id: str) -> List[Parcel]:
         try:
             return self.db_session.query(Parcel).filter(Parcel.owner_id == owner_id).all()
@@ -98,40 +276,46 @@ class SqlParcelRepository(IParcelRepository):
             print(f"Erreur lors de la suppression de la parcelle: {e}")
             return False
 
-    def search(self, criteria: Dict[str, Any]) -> List[Parcel]:
-        try:
-            query = self.db_session.query(Parcel)
+    def _search_query(self, criteria: Dict[str, Any]):
+        """Requête des parcelles filtrées par les critères de recherche (sans tri ni pagination)"""
+        query = self.db_session.query(Parcel)
 
-            # Appliquer les filtres de recherche
-            search_term = criteria.get('search_term')
-            reference = criteria.get('reference_cadastrale')
-            address = criteria.get('address')
-            owner_id = criteria.get('owner_id')
-            category = criteria.get('category')
-            page = criteria.get('page', 1)
-            page_size = criteria.get('page_size', 100)
+        # Appliquer les filtres de recherche
+        search_term = criteria.get('search_term')
+        reference = criteria.get('reference_cadastrale')
+        address = criteria.get('address')
 
-            if reference:
-                query = query.filter(safe_ilike(Parcel.reference_cadastrale, reference))
+        if reference:
+            query = query.filter(safe_ilike(Parcel.reference_cadastrale, reference))
 
-            if search_term:
-                query = query.filter(or_(
-                    safe_ilike(Parcel.reference_cadastrale, search_term),
-                    safe_ilike(Parcel.address, search_term),
-                    safe_ilike(Parcel.description, search_term)
-                ))
+        if search_term:
+            query = query.filter(or_(
+                safe_ilike(Parcel.reference_cadastrale, search_term),
+                safe_ilike(Parcel.address, search_term),
+                safe_ilike(Parcel.description, search_term)
+            ))
 
-            if address:
-                query = query.filter(safe_ilike(Parcel.address, address))
+        if address:
+            query = query.filter(safe_ilike(Parcel.address, address))
 
-            if owner_id:
-                query = query.filter(Parcel.owner_id == owner_id)
+        for field in ('owner_id', 'category', 'status', 'zone'):
+            if criteria.get(field):
+                query = query.filter(getattr(Parcel, field) == criteria[field])
 
-            if category:
-                query = query.filter(Parcel.category == category)
+        if criteria.get('min_area') is not None:
+            query = query.filter(Parcel.area >= criteria['min_area'])
+        if criteria.get('max_area') is not None:
+            query = query.filter(Parcel.area <= criteria['max_area'])
 
-            # Trier par date de création décroissante
-            query = query.order_by(Parcel.created_at.desc())
+        return query
+
+    def search(self, criteria: Dict[str, Any]) -> List[Parcel]:
+        try:
+            page = criteria.get('page', 1)
+            page_size = criteria.get('page_size', 100)
+
+            # Trier par date de création décroissante (l'ID départage les égalités)
+            query = self._search_query(criteria).order_by(Parcel.created_at.desc(), Parcel.id.desc())
 
             # Pagination
             offset = (page - 1) * page_size
@@ -143,39 +327,32 @@ class SqlParcelRepository(IParcelRepository):
     def count_search(self, criteria: Dict[str, Any]) -> int:
         """Compte le nombre total de résultats pour une recherche"""
         try:
-            query = self.db_session.query(Parcel)
-
-            # Appliquer les mêmes filtres que search()
-            search_term = criteria.get('search_term')
-            reference = criteria.get('reference_cadastrale')
-            address = criteria.get('address')
-            owner_id = criteria.get('owner_id')
-            category = criteria.get('category')
-
-            if reference:
-                query = query.filter(safe_ilike(Parcel.reference_cadastrale, reference))
-
-            if search_term:
-                query = query.filter(or_(
-                    safe_ilike(Parcel.reference_cadastrale, search_term),
-                    safe_ilike(Parcel.address, search_term),
-                    safe_ilike(Parcel.description, search_term)
-                ))
-
-            if address:
-                query = query.filter(safe_ilike(Parcel.address, address))
-
-            if owner_id:
-                query = query.filter(Parcel.owner_id == owner_id)
-
-            if category:
-                query = query.filter(Parcel.category == category)
-
-            return query.count()
+            return self._search_query(criteria).count()
         except sql_exceptions.SQLAlchemyError as e:
             print(f"Erreur lors du comptage des parcelles: {e}")
             return 0
 
+    # Champs de recherche entrant dans la clé des totaux en cache
+    SEARCH_FIELDS = ('search_term', 'reference_cadastrale', 'address', 'owner_id', 'category',
+                     'status', 'zone', 'min_area', 'max_area')
+
+    def search_page(self, criteria: Dict[str, Any], cursor: Optional[str] = None,
+                    total_mode: str = 'cached') -> Dict[str, Any]:
+        page = criteria.get('page', 1)
+        page_size = criteria.get('page_size', 100)
+        query = self._search_query(criteria)
+        try:
+            items, next_cursor = keyset_page(
+                query, (Parcel.created_at, Parcel.id), page_size,
+                cursor=cursor, offset=(page - 1) * page_size
+            )
+            filters = {field: criteria.get(field) for field in self.SEARCH_FIELDS}
+            total = count_total(query, total_mode, Parcel.__tablename__, filters)
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la recherche paginée des parcelles: {e}")
+            items, next_cursor, total = [], None, 0
+        return page_response(items, next_cursor, page_size, total, page=None if cursor else page)
+
     def get_with_filters(self, filters: Dict[str, Any]) -> List[Parcel]:
         try:
             query = self.db_session.query(Parcel)
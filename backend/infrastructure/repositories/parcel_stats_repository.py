@@ -0,0 +1,129 @@
+"""
+Implémentation du repository des statistiques matérialisées.
+"""
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, exc as sql_exceptions
+
+from backend.core.repository_interfaces import IParcelStatsRepository, PARCEL_STATISTICS_DIMENSIONS
+from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
+from backend.models.parcel import Parcel
+from backend.models.document import Document
+from backend.models.audit_log import AuditLog
+from backend.models.alert import Alert
+from backend.models.parcel_stats import (
+    ParcelStat, PARCELS, OWNER, PARCEL_MONTH, DOCUMENTS, DOCUMENT_MONTH, AUDIT_LOGS, AUDIT_DAY, OPEN_ALERTS
+)
+
+# Écart de surface toléré avant correction (cumul d'arrondis flottants)
+AREA_TOLERANCE = 1e-6
+
+
+class SqlParcelStatsRepository(IParcelStatsRepository):
+    """
+    Implémentation SQLAlchemy du repository des statistiques matérialisées.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def get_snapshot(self) -> Dict[str, Dict[str, Tuple[int, float]]]:
+        try:
+            rows = self.db_session.query(
+                ParcelStat.dimension, ParcelStat.key, ParcelStat.item_count, ParcelStat.total_area
+            ).filter(ParcelStat.item_count != 0).all()
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la lecture des statistiques matérialisées: {e}")
+            return {}
+
+        snapshot = {}
+        for dimension, key, count, area in rows:
+            snapshot.setdefault(dimension, {})[key] = (count, area)
+        return snapshot
+
+    def reconcile(self) -> int:
+        """
+        Recalcule les compteurs depuis les tables sources et corrige les écarts.
+
+        Les écritures concurrentes à la réconciliation peuvent laisser un écart,
+        rattrapé au passage suivant.
+        """
+        try:
+            expected = self._compute_expected()
+            current = {
+                (row.dimension, row.key): row
+                for row in self.db_session.query(ParcelStat).all()
+            }
+
+            corrected = 0
+            for key, row in current.items():
+                if key not in expected:
+                    self.db_session.delete(row)
+                    corrected += 1
+
+            for (dimension, key), (count, area) in expected.items():
+                row = current.get((dimension, key))
+                if row is None:
+                    self.db_session.add(ParcelStat(dimension=dimension, key=key, item_count=count, total_area=area))
+                    corrected += 1
+                elif row.item_count != count or abs(row.total_area - area) > AREA_TOLERANCE:
+                    row.item_count = count
+                    row.total_area = area
+                    corrected += 1
+
+            self.db_session.flush()
+            return corrected
+        except sql_exceptions.SQLAlchemyError as e:
+            print(f"Erreur lors de la réconciliation des statistiques: {e}")
+            raise e
+
+    def _compute_expected(self) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        expected = {}
+
+        aggregates = SqlParcelRepository(self.db_session).get_statistics_aggregates()
+        # La ligne globale existe même sans parcelle : son absence signale un échec
+        if not any(row[0] == 'total' for row in aggregates):
+            raise sql_exceptions.InvalidRequestError("Agrégats des parcelles indisponibles")
+
+        for dimension, key, count, area_sum, _, _ in aggregates:
+            if dimension == 'total':
+                expected[(PARCELS, '')] = (count, area_sum or 0.0)
+            elif dimension in PARCEL_STATISTICS_DIMENSIONS:
+                expected[(dimension, key)] = (count, area_sum or 0.0)
+
+        for dimension, column, query in self._count_queries():
+            for key, count in query.group_by(column).all():
+                if key:
+                    expected[(dimension, key)] = (count, 0.0)
+
+        documents = self.db_session.query(func.count(Document.id)).filter(
+            or_(Document.deleted == False, Document.deleted.is_(None))
+        )
+        audit_logs = self.db_session.query(func.count(AuditLog.id))
+        open_alerts = self.db_session.query(func.count(Alert.id)).filter(
+            or_(Alert.acknowledged == False, Alert.acknowledged.is_(None))
+        )
+        for dimension, query in ((DOCUMENTS, documents), (AUDIT_LOGS, audit_logs), (OPEN_ALERTS, open_alerts)):
+            count = query.scalar() or 0
+            if count:
+                expected[(dimension, '')] = (count, 0.0)
+
+        return {key: value for key, value in expected.items() if value[0]}
+
+    def _count_queries(self) -> List[tuple]:
+        parcel_month = self._format_date(Parcel.created_at, '%Y-%m', 'YYYY-MM')
+        document_month = self._format_date(Document.uploaded_at, '%Y-%m', 'YYYY-MM')
+        audit_day = self._format_date(AuditLog.timestamp, '%Y-%m-%d', 'YYYY-MM-DD')
+        return [
+            (OWNER, Parcel.owner_id, self.db_session.query(Parcel.owner_id, func.count(Parcel.id))),
+            (PARCEL_MONTH, parcel_month, self.db_session.query(parcel_month, func.count(Parcel.id))),
+            (DOCUMENT_MONTH, document_month, self.db_session.query(document_month, func.count(Document.id)).filter(
+                or_(Document.deleted == False, Document.deleted.is_(None))
+            )),
+            (AUDIT_DAY, audit_day, self.db_session.query(audit_day, func.count(AuditLog.id))),
+        ]
+
+    def _format_date(self, column, sqlite_format: str, sql_format: str):
+        if self.db_session.get_bind().dialect.name == 'sqlite':
+            return func.strftime(sqlite_format, column)
+        return func.to_char(column, sql_format)
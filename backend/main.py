@@ -1,4 +1,6 @@
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Ajouter le répertoire parent au PYTHONPATH
@@ -11,9 +13,18 @@ from fastapi.responses import FileResponse
 from backend.controllers import user_controller, auth_controller, parcel_controller, document_controller, dashboard_controller, audit_controller, report_controller, websocket_controller, monitoring_controller, mutation_controller, analytics_controller, permit_controller, zone_controller, advanced_features_controller, search_controller
 from backend.controllers.activity_controller import activity_controller
 from backend.controllers.analytics_charts_controller import router as analytics_charts_router
-from backend.config import CORS_ORIGINS
+from backend.config import CORS_ORIGINS, STATS_RECONCILE_INTERVAL
 from backend.middleware.rate_limit_middleware import setup_rate_limiting
+from backend.middleware.audit_middleware import setup_audit_middleware
+from backend.middleware.unit_of_work_middleware import UnitOfWorkMiddleware
 from backend.container_config import configure_container
+from backend.core.spatial_index import parcel_spatial_index
+from backend.core.audit_writer import audit_writer
+from backend.core.event_bus import event_bus
+from backend.core.notification_outbox import notification_outbox
+from backend.core.principal_cache import principal_cache
+from backend.core.report_jobs import report_jobs, report_scheduler
+from backend.services.websocket_service import manager as websocket_manager
 
 # Créer l'instance de l'application FastAPI
 app = FastAPI(
@@ -26,6 +37,107 @@ app = FastAPI(
 configure_container()
 
 
+def _build_parcel_spatial_index():
+    """Construit l'index spatial des parcelles avec une session dédiée"""
+    from backend.database import SessionLocal
+    from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
+
+    db = SessionLocal()
+    try:
+        parcel_spatial_index.ensure_built(SqlParcelRepository(db).get_spatial_index_rows)
+    except Exception as e:
+        # L'index sera construit paresseusement à la première recherche
+        print(f"Erreur lors de la construction de l'index spatial: {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def warm_up_spatial_index():
+    """Lance la construction de l'index spatial en arrière-plan pour ne pas retarder le démarrage"""
+    threading.Thread(target=_build_parcel_spatial_index, daemon=True).start()
+
+
+def _reconcile_parcel_stats_periodically():
+    """Corrige périodiquement la dérive des statistiques matérialisées (écritures hors ORM)"""
+    from backend.database import SessionLocal
+    from backend.infrastructure.repositories.parcel_stats_repository import SqlParcelStatsRepository
+
+    while True:
+        db = SessionLocal()
+        try:
+            corrected = SqlParcelStatsRepository(db).reconcile()
+            db.commit()
+            if corrected:
+                print(f"Statistiques matérialisées: {corrected} compteur(s) corrigé(s)")
+        except Exception as e:
+            db.rollback()
+            print(f"Erreur lors de la réconciliation des statistiques: {e}")
+        finally:
+            db.close()
+        time.sleep(STATS_RECONCILE_INTERVAL)
+
+
+@app.on_event("startup")
+def start_parcel_stats_reconciliation():
+    """Lance la réconciliation des statistiques en arrière-plan (une première fois au démarrage)"""
+    if STATS_RECONCILE_INTERVAL > 0:
+        threading.Thread(target=_reconcile_parcel_stats_periodically, daemon=True).start()
+
+
+@app.on_event("startup")
+def start_audit_writer():
+    """Démarre l'écriture groupée des logs d'audit (rejoue le spool d'une exécution précédente)"""
+    audit_writer.start()
+
+
+@app.on_event("shutdown")
+def stop_audit_writer():
+    """Insère les logs d'audit encore en file avant l'arrêt"""
+    audit_writer.stop()
+
+
+@app.on_event("startup")
+async def start_event_bus():
+    """Abonne les WebSockets et le cache des utilisateurs de ce worker au bus d'événements partagé"""
+    websocket_manager.attach(event_bus)
+    principal_cache.attach(event_bus)
+    try:
+        await event_bus.start()
+    except Exception as e:
+        # Les notifications restent diffusées aux sockets de ce worker
+        print(f"Erreur lors du démarrage du bus d'événements: {e}")
+
+
+@app.on_event("startup")
+async def start_notification_outbox():
+    """Démarre la délivrance des notifications déposées par les services après COMMIT"""
+    await notification_outbox.start()
+
+
+@app.on_event("shutdown")
+async def stop_event_bus():
+    """Délivre les notifications en attente puis arrête le relevé du bus d'événements"""
+    await notification_outbox.stop()
+    await event_bus.stop()
+
+
+@app.on_event("startup")
+async def start_report_scheduler():
+    """Déclenche les rapports planifiés (le pool de rendu démarre à la première soumission)"""
+    await report_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_report_jobs():
+    """Arrête le planificateur puis le pool de rendu des rapports"""
+    await report_scheduler.stop()
+    report_jobs.stop(wait=False)
+
+
+# Une session de base de données par requête, partagée par les services du conteneur
+app.add_middleware(UnitOfWorkMiddleware)
+
 # Configuration CORS - DOIT être ajouté AVANT les routers
 app.add_middleware(
     CORSMiddleware,
@@ -38,6 +150,9 @@ app.add_middleware(
 # Setup rate limiting for authentication endpoints
 setup_rate_limiting(app)
 
+# Audit des requêtes (mutations et erreurs), écrit par lots en arrière-plan
+setup_audit_middleware(app)
+
 # Inclure les routeurs des contrôleurs
 app.include_router(user_controller.router)
 app.include_router(auth_controller.router)
@@ -4,20 +4,20 @@ Capture toutes les requêtes avec contexte complet
 """
 
 import time
-import json
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from typing import Callable
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
-class AuditMiddleware(BaseHTTPMiddleware):
+class AuditMiddleware:
     """
-    Middleware pour capturer et auditer toutes les requêtes HTTP
+    Middleware ASGI pour capturer et auditer toutes les requêtes HTTP
+
+    Observe directement les messages http.response.start / http.response.body :
+    la réponse n'est ni bufferisée ni recopiée.
     """
     
-    def __init__(self, app, excluded_paths: list = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, excluded_paths: list = None):
+        self.app = app
         # Chemins à exclure de l'audit (health checks, static files, etc.)
         self.excluded_paths = excluded_paths or [
             '/health',
@@ -27,85 +27,52 @@ class AuditMiddleware(BaseHTTPMiddleware):
             '/favicon.ico'
         ]
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Intercepte toutes les requêtes et enregistre dans l'audit log
         """
         # Vérifier si le chemin doit être exclu
-        if self._should_exclude(request.url.path):
-            return await call_next(request)
+        if scope['type'] != 'http' or self._should_exclude(scope['path']):
+            await self.app(scope, receive, send)
+            return
         
         # Capturer le temps de début
         start_time = time.time()
+        method = scope['method']
+        path = scope['path']
         
-        # Extraire le contexte
-        user_id = None
-        username = None
-        user_role = None
-        
-        # Extraire l'utilisateur du contexte (si authentifié)
-        if hasattr(request.state, 'user'):
-            user = request.state.user
-            user_id = getattr(user, 'id', None)
-            username = getattr(user, 'username', None) or getattr(user, 'email', None)
-            user_role = getattr(user, 'role', None)
-        
-        # Extraire les informations réseau
-        user_ip = self._get_client_ip(request)
-        user_agent = request.headers.get('user-agent', '')
-        
-        # Déterminer l'action et l'entité depuis le path
-        action, entity_type, entity_id = self._parse_request_path(
-            request.method,
-            request.url.path
-        )
-        
-        # Exécuter la requête
-        response = None
+        # Exécuter la requête en observant la réponse
+        response_status = None
+        response_size = 0
         error_message = None
-        status = "success"
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_status, response_size
+            if message['type'] == 'http.response.start':
+                response_status = message['status']
+            elif message['type'] == 'http.response.body':
+                response_size += len(message.get('body', b''))
+            await send(message)
         
         try:
-            response = await call_next(request)
-            
-            # Vérifier si c'est une erreur
-            if response.status_code >= 400:
-                status = "failure"
-                
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            status = "failure"
             error_message = str(e)
+            if response_status is None:
+                response_status = 500
             raise
         finally:
             # Calculer la durée
             duration_ms = int((time.time() - start_time) * 1000)
             
-            # Enregistrer dans l'audit log (async via background task)
-            if response and self._should_audit(request.method, response.status_code):
-                # Créer le log en arrière-plan pour ne pas bloquer la réponse
+            # Déposer le log dans la file d'audit : l'insertion se fait par lots hors requête
+            if response_status is not None and self._should_audit(method, response_status):
                 try:
-                    self._log_to_audit(
-                        action=action,
-                        entity_type=entity_type,
-                        entity_id=entity_id,
-                        user_id=user_id,
-                        username=username,
-                        user_role=user_role,
-                        user_ip=user_ip,
-                        user_agent=user_agent,
-                        request_method=request.method,
-                        request_path=request.url.path,
-                        duration_ms=duration_ms,
-                        status=status,
-                        error_message=error_message,
-                        response_status=response.status_code if response else None,
-                        response_size=len(response.body) if response and hasattr(response, 'body') else None
-                    )
+                    await self._log_to_audit(scope, method, path, response_status, response_size,
+                                             duration_ms, error_message)
                 except Exception as e:
                     # Ne pas faire échouer la requête si l'audit échoue
                     print(f"Erreur lors de l'audit : {e}")
-        
-        return response
     
     def _should_exclude(self, path: str) -> bool:
         """Vérifie si le chemin doit être exclu de l'audit"""
@@ -125,20 +92,20 @@ class AuditMiddleware(BaseHTTPMiddleware):
         # Optionnel : activer si besoin de tout tracer
         return False
     
-    def _get_client_ip(self, request: Request) -> str:
+    def _get_client_ip(self, scope: Scope, headers: Headers) -> str:
         """Récupère l'IP du client (gère les proxies)"""
         # Vérifier les headers de proxy
-        forwarded = request.headers.get('x-forwarded-for')
+        forwarded = headers.get('x-forwarded-for')
         if forwarded:
             return forwarded.split(',')[0].strip()
         
-        real_ip = request.headers.get('x-real-ip')
+        real_ip = headers.get('x-real-ip')
         if real_ip:
             return real_ip
         
         # IP directe
-        if request.client:
-            return request.client.host
+        if scope.get('client'):
+            return scope['client'][0]
         
         return 'unknown'
     
@@ -194,26 +161,42 @@ class AuditMiddleware(BaseHTTPMiddleware):
         
         return action, entity_type, entity_id
     
-    def _log_to_audit(self, **kwargs):
+    async def _log_to_audit(self, scope: Scope, method: str, path: str, response_status: int,
+                            response_size: int, duration_ms: int, error_message: str = None):
         """
-        Enregistre dans l'audit log
-        Note: Doit être appelé de manière asynchrone ou en background
+        Dépose l'enregistrement dans la file du writer d'audit (sans COMMIT dans la requête)
         """
-        try:
-            from backend.database import SessionLocal
-            from backend.services.audit_service import AuditService
+        from backend.core.audit_writer import audit_writer
 
-            # Créer une session SQLAlchemy
-            db = SessionLocal()
+        headers = Headers(scope=scope)
 
-            try:
-                audit_service = AuditService(db)
-                audit_service.log_action(**kwargs)
-            finally:
-                db.close()
+        # Utilisateur placé dans request.state par l'authentification (si authentifié)
+        user = scope.get('state', {}).get('user')
+        user_id = getattr(user, 'id', None)
+        username = getattr(user, 'username', None) or getattr(user, 'email', None)
+        user_role = getattr(user, 'role', None)
 
-        except Exception as e:
-            print(f"Erreur _log_to_audit : {e}")
+        # Déterminer l'action et l'entité depuis le path
+        action, entity_type, entity_id = self._parse_request_path(method, path)
+
+        await audit_writer.submit_async({
+            'action': action,
+            # entity_type est obligatoire en base (chemins hors /api)
+            'entity_type': entity_type or 'system',
+            'entity_id': entity_id,
+            'user_id': user_id,
+            'username': username,
+            'user_role': user_role,
+            'user_ip': self._get_client_ip(scope, headers),
+            'user_agent': headers.get('user-agent', ''),
+            'request_method': method,
+            'request_path': path,
+            'duration_ms': duration_ms,
+            'status': 'failure' if response_status >= 400 else 'success',
+            'error_message': error_message,
+            'response_status': response_status,
+            'response_size': response_size
+        })
 
 
 def setup_audit_middleware(app, excluded_paths: list = None):
@@ -1,26 +1,27 @@
 """
 Rate limiting middleware for authentication endpoints
 """
+import re
 import time
 from collections import defaultdict, deque
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.exceptions import HTTPException
-from typing import Callable
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+IP_PATTERN = re.compile(r'^[\d\.]+$|^[0-9a-fA-F:]+$')
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+
+class RateLimitMiddleware:
     """
-    Simple in-memory rate limiting middleware
+    Simple in-memory rate limiting middleware (raw ASGI)
     Tracks requests by IP address with configurable limits
     """
     
-    def __init__(self, app, 
+    def __init__(self, app: ASGIApp,
                  max_attempts: int = 5, 
                  window_seconds: int = 300,  # 5 minutes
                  auth_endpoints: list = None):
-        super().__init__(app)
+        self.app = app
         self.max_attempts = max_attempts
         self.window_seconds = window_seconds
         self.auth_endpoints = auth_endpoints or ["/api/auth/login"]
@@ -28,66 +29,72 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Dictionary to store attempts: {ip: deque of timestamps}
         self.attempts = defaultdict(lambda: deque(maxlen=max_attempts))
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Check if this is an authentication endpoint that needs rate limiting
-        if request.url.path in self.auth_endpoints:
-            client_ip = self._get_client_ip(request)
-            
-            # Clean old attempts outside the window
-            current_time = time.time()
-            while (self.attempts[client_ip] and 
-                   current_time - self.attempts[client_ip][0] > self.window_seconds):
-                self.attempts[client_ip].popleft()
-            
-            # Check if limit exceeded
-            if len(self.attempts[client_ip]) >= self.max_attempts:
-                # Too many attempts
-                raise HTTPException(
-                    status_code=429,
-                    detail={
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # For non-auth endpoints, just pass through
+        if scope['type'] != 'http' or scope['path'] not in self.auth_endpoints:
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = self._get_client_ip(scope)
+        
+        # Clean old attempts outside the window
+        current_time = time.time()
+        attempts = self.attempts[client_ip]
+        while attempts and current_time - attempts[0] > self.window_seconds:
+            attempts.popleft()
+        
+        # Check if limit exceeded
+        if len(attempts) >= self.max_attempts:
+            # Too many attempts
+            response = JSONResponse(
+                status_code=429,
+                content={
+                    "detail": {
                         "error": "Too many login attempts",
                         "message": f"Maximum {self.max_attempts} attempts per {self.window_seconds} seconds exceeded"
                     }
-                )
-            
-            # Process the request
-            response = await call_next(request)
-            
-            # Record attempt if it was a failed login
-            if (response.status_code == 401 or 
-                (response.status_code == 200 and 
-                 hasattr(response, 'body') and 
-                 b'"authenticated":false' in getattr(response, 'body', b''))):
-                
-                # Only count failed attempts
-                self.attempts[client_ip].append(current_time)
-            
-            return response
+                }
+            )
+            await response(scope, receive, send)
+            return
         
-        # For non-auth endpoints, just pass through
-        return await call_next(request)
+        # Process the request, observing the status and the (small) login response body
+        response_status = None
+        body = bytearray()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_status
+            if message['type'] == 'http.response.start':
+                response_status = message['status']
+            elif message['type'] == 'http.response.body' and response_status == 200:
+                body.extend(message.get('body', b''))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        
+        # Record attempt if it was a failed login
+        if response_status == 401 or (response_status == 200 and b'"authenticated":false' in body):
+            # Only count failed attempts
+            attempts.append(current_time)
 
-    def _get_client_ip(self, request: Request) -> str:
+    def _get_client_ip(self, scope: Scope) -> str:
         """Get client IP address from request"""
-        forwarded = request.headers.get('x-forwarded-for')
+        headers = Headers(scope=scope)
+        forwarded = headers.get('x-forwarded-for')
         if forwarded:
             # Prendre uniquement le premier IP pour éviter les falsifications
-            ip_list = [ip.strip() for ip in forwarded.split(',')]
             # Valider que le premier élément est une adresse IP valide
-            import re
-            first_ip = ip_list[0]
-            if re.match(r'^[\d\.]+$', first_ip) or re.match(r'^[0-9a-fA-F:]+$', first_ip):
+            first_ip = forwarded.split(',')[0].strip()
+            if IP_PATTERN.match(first_ip):
                 return first_ip
 
-        real_ip = request.headers.get('x-real-ip')
-        if real_ip:
-            # Valider que l'IP est une adresse IP valide
-            import re
-            if re.match(r'^[\d\.]+$', real_ip) or re.match(r'^[0-9a-fA-F:]+$', real_ip):
-                return real_ip
+        real_ip = headers.get('x-real-ip')
+        # Valider que l'IP est une adresse IP valide
+        if real_ip and IP_PATTERN.match(real_ip):
+            return real_ip
 
-        if request.client:
-            return request.client.host
+        if scope.get('client'):
+            return scope['client'][0]
 
         return 'unknown'
 
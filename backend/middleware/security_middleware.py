@@ -1,29 +1,46 @@
 """
 Middleware de sécurité avancé
 """
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from backend.core.security import rate_limiter, security_validator
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Middleware de sécurité pour toutes les requêtes"""
-    
-    async def dispatch(self, request: Request, call_next):
-        # Vérifier les headers de sécurité
-        client_ip = request.client.host
-        
+# Security headers ajoutés à toutes les réponses
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'",
+}
+
+
+class SecurityMiddleware:
+    """Middleware ASGI de sécurité pour toutes les requêtes"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = scope['client'][0] if scope.get('client') else 'unknown'
+
         # Rate limiting global (100 req/min par IP)
         if rate_limiter.is_rate_limited(f"ip_{client_ip}", max_requests=100, window_seconds=60):
-            raise HTTPException(status_code=429, detail="Too many requests")
-        
-        # Ajouter les headers de sécurité à la réponse
-        response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        
-        return response
+            response = JSONResponse(status_code=429, content={"detail": "Too many requests"})
+            await response(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            # Ajouter les headers de sécurité à la réponse
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,50 @@
+"""
+Middleware d'unité de travail : une session de base de données par requête HTTP
+"""
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.database import begin_unit_of_work, end_unit_of_work
+
+
+class UnitOfWorkMiddleware:
+    """
+    Ouvre une unité de travail pour chaque requête HTTP
+
+    La session (créée à la première utilisation) est validée juste avant l'envoi
+    des en-têtes de réponse si le statut est < 400, annulée sinon, puis fermée à la
+    fin de la requête. Les écritures des tâches de fond exécutées après la réponse
+    sont validées en fin de requête.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        unit, token = begin_unit_of_work()
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start' and unit.started:
+                if message['status'] < 400:
+                    # Une erreur de validation remonte avant l'envoi d'une réponse de succès
+                    await run_in_threadpool(unit.commit)
+                else:
+                    await run_in_threadpool(unit.rollback)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+            if unit.started:
+                await run_in_threadpool(unit.commit)
+        except Exception:
+            if unit.started:
+                await run_in_threadpool(unit.rollback)
+            raise
+        finally:
+            if unit.started:
+                await run_in_threadpool(unit.close)
+            end_unit_of_work(token)
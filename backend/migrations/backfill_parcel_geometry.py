@@ -0,0 +1,81 @@
+"""
+Backfill de la géométrie normalisée des parcelles
+
+Recalcule pour les parcelles existantes les colonnes dérivées de la géométrie
+(GeoJSON canonique, WKB, emprise, centroïde, nombre de sommets).
+
+Usage:
+    python -m backend.migrations.backfill_parcel_geometry [--all] [--batch-size 500]
+"""
+import argparse
+
+import sqlalchemy as sa
+
+from backend.models.parcel import normalize_geometry
+
+SELECT_BATCH = (
+    "SELECT id, coordinates_lat, coordinates_lng, geometry FROM parcels "
+    "WHERE id > :last_id {missing} ORDER BY id LIMIT :limit"
+)
+
+UPDATE_PARCEL = sa.text(
+    "UPDATE parcels SET geometry_geojson = :geometry_geojson, geometry_wkb = :geometry_wkb, "
+    "centroid_lat = :centroid_lat, centroid_lng = :centroid_lng, vertex_count = :vertex_count, "
+    "min_lat = :min_lat, min_lng = :min_lng, max_lat = :max_lat, max_lng = :max_lng "
+    "WHERE id = :id"
+)
+
+
+def backfill_parcel_geometry(connection, batch_size: int = 500, only_missing: bool = True) -> int:
+    """
+    Normalise la géométrie des parcelles par lots
+
+    Args:
+        connection: Connexion SQLAlchemy (transaction gérée par l'appelant)
+        batch_size: Nombre de parcelles traitées par lot
+        only_missing: Ne traiter que les parcelles jamais normalisées
+
+    Returns:
+        int: Nombre de parcelles mises à jour
+    """
+    missing = "AND vertex_count IS NULL" if only_missing else ""
+    query = sa.text(SELECT_BATCH.format(missing=missing)).columns(
+        sa.column('id'), sa.column('coordinates_lat'), sa.column('coordinates_lng'),
+        sa.column('geometry', sa.JSON)
+    )
+    update = UPDATE_PARCEL.bindparams(
+        sa.bindparam('geometry_geojson', type_=sa.JSON),
+        sa.bindparam('geometry_wkb', type_=sa.LargeBinary)
+    )
+
+    last_id = ''
+    updated = 0
+    while True:
+        rows = connection.execute(query, {'last_id': last_id, 'limit': batch_size}).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for parcel_id, lat, lng, geometry in rows:
+            values = normalize_geometry(lat, lng, geometry)
+            values['id'] = parcel_id
+            updates.append(values)
+
+        connection.execute(update, updates)
+        updated += len(updates)
+        last_id = rows[-1][0]
+
+    return updated
+
+
+if __name__ == '__main__':
+    from backend.database import engine
+
+    parser = argparse.ArgumentParser(description="Backfill de la géométrie normalisée des parcelles")
+    parser.add_argument('--all', action='store_true', help="Renormaliser toutes les parcelles")
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        count = backfill_parcel_geometry(connection, args.batch_size, only_missing=not args.all)
+    print(f"✅ {count} parcelles normalisées")
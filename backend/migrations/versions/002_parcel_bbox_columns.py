@@ -0,0 +1,57 @@
+"""Add bounding box columns to parcels
+
+Revision ID: 002_parcel_bbox_columns
+Revises: 001_initial_tables
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.models.parcel import compute_bounds
+
+# revision identifiers, used by Alembic.
+revision = '002_parcel_bbox_columns'
+down_revision = '001_initial_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('parcels', sa.Column('min_lat', sa.Float(), nullable=True))
+    op.add_column('parcels', sa.Column('min_lng', sa.Float(), nullable=True))
+    op.add_column('parcels', sa.Column('max_lat', sa.Float(), nullable=True))
+    op.add_column('parcels', sa.Column('max_lng', sa.Float(), nullable=True))
+    op.create_index('ix_parcels_bbox_lat', 'parcels', ['min_lat', 'max_lat'])
+    op.create_index('ix_parcels_bbox_lng', 'parcels', ['min_lng', 'max_lng'])
+
+    # Calcul de l'emprise des parcelles existantes
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, coordinates_lat, coordinates_lng, geometry FROM parcels"
+    )).fetchall()
+
+    updates = []
+    for parcel_id, lat, lng, geometry in rows:
+        min_lat, min_lng, max_lat, max_lng = compute_bounds(lat, lng, geometry)
+        updates.append({
+            'id': parcel_id,
+            'min_lat': min_lat, 'min_lng': min_lng,
+            'max_lat': max_lat, 'max_lng': max_lng
+        })
+
+    if updates:
+        bind.execute(sa.text(
+            "UPDATE parcels SET min_lat = :min_lat, min_lng = :min_lng, "
+            "max_lat = :max_lat, max_lng = :max_lng WHERE id = :id"
+        ), updates)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('parcels') as batch_op:
+        batch_op.drop_index('ix_parcels_bbox_lng')
+        batch_op.drop_index('ix_parcels_bbox_lat')
+        batch_op.drop_column('max_lng')
+        batch_op.drop_column('max_lat')
+        batch_op.drop_column('min_lng')
+        batch_op.drop_column('min_lat')
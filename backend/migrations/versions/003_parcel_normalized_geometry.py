@@ -0,0 +1,36 @@
+"""Add normalized geometry columns to parcels
+
+Revision ID: 003_parcel_normalized_geometry
+Revises: 002_parcel_bbox_columns
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.backfill_parcel_geometry import backfill_parcel_geometry
+
+# revision identifiers, used by Alembic.
+revision = '003_parcel_normalized_geometry'
+down_revision = '002_parcel_bbox_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('parcels', sa.Column('geometry_geojson', sa.JSON(), nullable=True))
+    op.add_column('parcels', sa.Column('geometry_wkb', sa.LargeBinary(), nullable=True))
+    op.add_column('parcels', sa.Column('centroid_lat', sa.Float(), nullable=True))
+    op.add_column('parcels', sa.Column('centroid_lng', sa.Float(), nullable=True))
+    op.add_column('parcels', sa.Column('vertex_count', sa.Integer(), nullable=True))
+
+    backfill_parcel_geometry(op.get_bind())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('parcels') as batch_op:
+        batch_op.drop_column('vertex_count')
+        batch_op.drop_column('centroid_lng')
+        batch_op.drop_column('centroid_lat')
+        batch_op.drop_column('geometry_wkb')
+        batch_op.drop_column('geometry_geojson')
@@ -0,0 +1,38 @@
+"""Add materialized parcel_stats table
+
+Revision ID: 004_parcel_stats
+Revises: 003_parcel_normalized_geometry
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from backend.infrastructure.repositories.parcel_stats_repository import SqlParcelStatsRepository
+
+# revision identifiers, used by Alembic.
+revision = '004_parcel_stats'
+down_revision = '003_parcel_normalized_geometry'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'parcel_stats',
+        sa.Column('dimension', sa.String(), primary_key=True),
+        sa.Column('key', sa.String(), primary_key=True),
+        sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_area', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+    # Calcul initial des compteurs depuis les tables existantes
+    session = Session(bind=op.get_bind())
+    SqlParcelStatsRepository(session).reconcile()
+    session.flush()
+
+
+def downgrade() -> None:
+    op.drop_table('parcel_stats')
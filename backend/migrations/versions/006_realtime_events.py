@@ -0,0 +1,34 @@
+"""Add realtime_events table for the cross-worker event bus
+
+Revision ID: 006_realtime_events
+Revises: 005_revoked_tokens
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_realtime_events'
+down_revision = '005_revoked_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'realtime_events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('target', sa.String(length=16), nullable=False),
+        sa.Column('target_key', sa.String(), nullable=True),
+        sa.Column('exclude_user', sa.String(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_realtime_events_created_at', 'realtime_events', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_realtime_events_created_at', table_name='realtime_events')
+    op.drop_table('realtime_events')
@@ -0,0 +1,39 @@
+"""Add content-addressed document_blobs table and documents.checksum
+
+Revision ID: 007_document_blobs
+Revises: 006_realtime_events
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_document_blobs'
+down_revision = '006_realtime_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_blobs',
+        sa.Column('checksum', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('released_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('checksum')
+    )
+    op.create_index('ix_document_blobs_released_at', 'document_blobs', ['released_at'])
+
+    op.add_column('documents', sa.Column('checksum', sa.String(length=64), nullable=True))
+    op.create_index('ix_documents_checksum', 'documents', ['checksum'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_checksum', table_name='documents')
+    op.drop_column('documents', 'checksum')
+
+    op.drop_index('ix_document_blobs_released_at', table_name='document_blobs')
+    op.drop_table('document_blobs')
@@ -0,0 +1,39 @@
+"""Add report_schedules table for the report scheduler
+
+Revision ID: 008_report_schedules
+Revises: 007_document_blobs
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_report_schedules'
+down_revision = '007_document_blobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'report_schedules',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('report_type', sa.String(length=32), nullable=False),
+        sa.Column('parameters', sa.Text(), nullable=False),
+        sa.Column('schedule_type', sa.String(length=16), nullable=False),
+        sa.Column('schedule_time', sa.String(length=5), nullable=False),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('next_run_at', sa.DateTime(), nullable=False),
+        sa.Column('last_run_at', sa.DateTime(), nullable=True),
+        sa.Column('last_job_id', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_report_schedules_next_run_at', 'report_schedules', ['next_run_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_schedules_next_run_at', table_name='report_schedules')
+    op.drop_table('report_schedules')
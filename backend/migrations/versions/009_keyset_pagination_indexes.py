@@ -0,0 +1,26 @@
+"""Add (created_at, id) indexes for keyset pagination
+
+Revision ID: 009_keyset_pagination_indexes
+Revises: 008_report_schedules
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009_keyset_pagination_indexes'
+down_revision = '008_report_schedules'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_parcels_created_at_id', 'parcels', ['created_at', 'id'])
+    op.create_index('ix_audit_logs_timestamp_id', 'audit_logs', ['timestamp', 'id'])
+    op.create_index('ix_parcel_mutations_created_at_id', 'parcel_mutations', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_parcel_mutations_created_at_id', table_name='parcel_mutations')
+    op.drop_index('ix_audit_logs_timestamp_id', table_name='audit_logs')
+    op.drop_index('ix_parcels_created_at_id', table_name='parcels')
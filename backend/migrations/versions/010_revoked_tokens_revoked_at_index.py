@@ -0,0 +1,22 @@
+"""Index revoked_tokens.revoked_at for the revocation sync overlap window
+
+Revision ID: 010_revoked_tokens_revoked_at_index
+Revises: 009_keyset_pagination_indexes
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '010_revoked_tokens_revoked_at_index'
+down_revision = '009_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
@@ -11,6 +11,11 @@ from .alert import Alert, AlertType, AlertSeverity
 from .availability import ParcelReservation, VerificationLog
 from .zone import Zone
 from .permit import Permit
+from .parcel_stats import ParcelStat
+from .revoked_token import RevokedToken
+from .realtime_event import RealtimeEvent
+from .document_blob import DocumentBlob
+from .report_schedule import ReportSchedule
 
 __all__ = [
     'User', 'Role', 'UserRole',
@@ -21,5 +26,10 @@ __all__ = [
     'Alert', 'AlertType', 'AlertSeverity',
     'ParcelReservation', 'VerificationLog',
     'Zone',
-    'Permit'
+    'Permit',
+    'ParcelStat',
+    'RevokedToken',
+    'RealtimeEvent',
+    'DocumentBlob',
+    'ReportSchedule'
 ]
\ No newline at end of file
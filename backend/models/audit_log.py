@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, BigInteger, Boolean, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, BigInteger, Boolean, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -79,6 +79,11 @@ class AuditLog(Base):
     
     metadata_ext = Column(JSON, nullable=True)
 
+    __table_args__ = (
+        # Pagination par curseur des listes (plus récents d'abord)
+        Index('ix_audit_logs_timestamp_id', 'timestamp', 'id'),
+    )
+
     # Relations SQLAlchemy
     user = relationship("User", foreign_keys=[user_id], backref="audit_logs_created")
     reviewer = relationship("User", foreign_keys=[reviewed_by], backref="audit_logs_reviewed")
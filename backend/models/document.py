@@ -32,6 +32,8 @@ class Document(Base):
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String, nullable=False)
+    # SHA-256 du contenu : clé du blob partagé (document_blobs) sous blobs/ab/cd/<sha256>
+    checksum = Column(String(64), nullable=True, index=True)
     
     parcel_id = Column(String, ForeignKey('parcels.id'), nullable=False, index=True)
     document_type = Column(SQLEnum(DocumentType, name='document_type'), nullable=False)
@@ -58,6 +60,7 @@ class Document(Base):
             'file_size': self.file_size,
             'file_size_formatted': file_size_formatted,
             'mime_type': self.mime_type,
+            'checksum': self.checksum,
             'parcel_id': self.parcel_id,
             'document_type': self.document_type.value if hasattr(self.document_type, 'value') else self.document_type,
             'version': self.version,
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime
+from ..database import Base
+
+
+class DocumentBlob(Base):
+    """
+    Contenu de document stocké une seule fois, adressé par son SHA-256
+
+    Le fichier est rangé sous `blobs/ab/cd/<sha256>` ; chaque document qui le
+    référence incrémente ref_count. Un blob retombé à 0 n'est supprimé (fichier
+    et ligne) que par le balayage, après un délai de grâce.
+    """
+    __tablename__ = 'document_blobs'
+
+    checksum = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Moment où ref_count est retombé à 0 (None tant qu'il est référencé)
+    released_at = Column(DateTime, nullable=True, index=True)
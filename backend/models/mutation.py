@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum as PyEnum
 import uuid
 from sqlalchemy import (
-    Column, String, Float, Text, DateTime, ForeignKey, Enum as SQLEnum
+    Column, String, Float, Text, DateTime, ForeignKey, Index, Enum as SQLEnum
 )
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -56,6 +56,11 @@ class ParcelMutation(Base):
     completed_at = Column(DateTime, nullable=True)
     rejection_reason = Column(Text, nullable=True)
 
+    __table_args__ = (
+        # Pagination par curseur des listes (plus récentes d'abord)
+        Index('ix_parcel_mutations_created_at_id', 'created_at', 'id'),
+    )
+
     # --- Relations SQLAlchemy ---
     parcel = relationship("Parcel", backref="mutations")
     initiator = relationship("User", foreign_keys=[initiated_by_user_id], backref="initiated_mutations")
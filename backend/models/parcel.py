@@ -1,11 +1,15 @@
 from datetime import datetime
 from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+import json
 import uuid
+import shapely
 from sqlalchemy import (
-    Column, String, Float, Text, ForeignKey, DateTime, JSON
+    Column, String, Float, Integer, Text, ForeignKey, DateTime, JSON, LargeBinary, Index, event, inspect
 )
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..core.spatial_index import parse_geometry
 from .user import User  # Importer pour la relation
 
 # Les Enums et classes de catégories peuvent être conservées car elles
@@ -38,6 +42,20 @@ class Parcel(Base):
     
     # Utiliser le type JSON natif si la BDD le supporte (SQLite le supporte)
     geometry = Column(JSON) 
+
+    # Emprise de la géométrie, calculée à l'écriture pour le filtrage spatial en SQL
+    min_lat = Column(Float)
+    min_lng = Column(Float)
+    max_lat = Column(Float)
+    max_lng = Column(Float)
+
+    # Géométrie normalisée à l'écriture (voir normalize_geometry) : GeoJSON canonique 2D,
+    # WKB compact, centroïde et nombre de sommets
+    geometry_geojson = Column(JSON)
+    geometry_wkb = Column(LargeBinary)
+    centroid_lat = Column(Float)
+    centroid_lng = Column(Float)
+    vertex_count = Column(Integer)
     
     owner_id = Column(String, ForeignKey('users.id'), index=True)
     created_by = Column(String, ForeignKey('users.id'))
@@ -63,6 +81,13 @@ class Parcel(Base):
     created_at = Column(DateTime, default=datetime.now, nullable=False)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
 
+    __table_args__ = (
+        Index('ix_parcels_bbox_lat', 'min_lat', 'max_lat'),
+        Index('ix_parcels_bbox_lng', 'min_lng', 'max_lng'),
+        # Pagination par curseur des listes (plus récentes d'abord)
+        Index('ix_parcels_created_at_id', 'created_at', 'id'),
+    )
+
     # --- Relations SQLAlchemy ---
     owner = relationship("User", foreign_keys=[owner_id])
     creator = relationship("User", foreign_keys=[created_by])
@@ -116,3 +141,77 @@ class Parcel(Base):
                 setattr(self, key, value)
         
         self.updated_at = datetime.now()
+
+    def normalize_geometry(self):
+        """Recalcule la géométrie normalisée et les colonnes dérivées (emprise, centroïde...)."""
+        for key, value in normalize_geometry(self.coordinates_lat, self.coordinates_lng, self.geometry).items():
+            setattr(self, key, value)
+
+
+# Colonnes dont dépendent les valeurs normalisées
+NORMALIZATION_SOURCES = ('geometry', 'coordinates_lat', 'coordinates_lng')
+
+
+def _bounds(lat: Optional[float], lng: Optional[float], shape) -> Tuple[Optional[float], ...]:
+    if lat is None or lng is None:
+        return None, None, None, None
+    if shape is None:
+        return lat, lng, lat, lng
+
+    min_lng, min_lat, max_lng, max_lat = shape.bounds
+    return min(min_lat, lat), min(min_lng, lng), max(max_lat, lat), max(max_lng, lng)
+
+
+def compute_bounds(lat: Optional[float], lng: Optional[float], geometry: Any) -> Tuple[Optional[float], ...]:
+    """
+    Calcule l'emprise (min_lat, min_lng, max_lat, max_lng) d'une parcelle.
+
+    L'emprise couvre la géométrie et le centroïde déclaré ; sans géométrie
+    exploitable, elle se réduit au centroïde.
+    """
+    return _bounds(lat, lng, parse_geometry(geometry))
+
+
+def normalize_geometry(lat: Optional[float], lng: Optional[float], geometry: Any) -> Dict[str, Any]:
+    """
+    Calcule les colonnes dérivées de la géométrie d'une parcelle.
+
+    La géométrie, quel que soit son format d'origine (dict, chaîne JSON, listes
+    de coordonnées), est convertie en GeoJSON canonique 2D et valide, et en WKB.
+    Sans géométrie exploitable, le centroïde est le point déclaré.
+    """
+    shape = parse_geometry(geometry)
+    min_lat, min_lng, max_lat, max_lng = _bounds(lat, lng, shape)
+
+    values = {
+        'min_lat': min_lat, 'min_lng': min_lng, 'max_lat': max_lat, 'max_lng': max_lng,
+        'geometry_geojson': None, 'geometry_wkb': None,
+        'centroid_lat': lat, 'centroid_lng': lng, 'vertex_count': 0
+    }
+    if shape is None:
+        return values
+
+    centroid = shape.centroid
+    values.update({
+        'geometry_geojson': json.loads(shapely.to_geojson(shape)),
+        'geometry_wkb': shapely.to_wkb(shape),
+        'centroid_lat': centroid.y,
+        'centroid_lng': centroid.x,
+        'vertex_count': int(shapely.get_num_coordinates(shape))
+    })
+    return values
+
+
+@event.listens_for(Parcel, 'before_insert')
+def _normalize_new_parcel(mapper, connection, target):
+    """Normalise la géométrie de toute nouvelle parcelle, quel que soit le chemin d'écriture."""
+    target.normalize_geometry()
+
+
+@event.listens_for(Parcel, 'before_update')
+def _normalize_updated_parcel(mapper, connection, target):
+    """Renormalise uniquement si la géométrie ou le point déclaré a changé."""
+    state = inspect(target)
+    changed = any(state.attrs[name].history.has_changes() for name in NORMALIZATION_SOURCES)
+    if changed or (target.geometry is not None and target.geometry_wkb is None):
+        target.normalize_geometry()
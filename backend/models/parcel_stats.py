@@ -0,0 +1,204 @@
+"""
+Statistiques matérialisées des parcelles, documents, alertes et journaux d'audit
+
+La table `parcel_stats` contient des compteurs par (dimension, clé), maintenus
+dans la même transaction que les écritures ORM (événement `after_flush`).
+Les écritures qui contournent l'ORM (UPDATE/DELETE en masse, SQL brut) sont
+corrigées par la réconciliation périodique (SqlParcelStatsRepository.reconcile).
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import Column, String, Integer, Float, DateTime, event, inspect
+from sqlalchemy.orm import Session
+
+from ..database import Base
+from ..core.repository_interfaces import PARCEL_STATISTICS_DIMENSIONS
+from .parcel import Parcel
+from .document import Document
+from .audit_log import AuditLog
+from .alert import Alert
+
+# Dimensions maintenues en plus des PARCEL_STATISTICS_DIMENSIONS
+PARCELS = 'parcels'
+OWNER = 'owner'
+PARCEL_MONTH = 'parcel_month'
+DOCUMENTS = 'documents'
+DOCUMENT_MONTH = 'document_month'
+AUDIT_LOGS = 'audit_logs'
+AUDIT_DAY = 'audit_day'
+OPEN_ALERTS = 'open_alerts'
+
+PARCEL_FIELDS = ('area', 'owner_id', 'created_at') + tuple(PARCEL_STATISTICS_DIMENSIONS)
+
+# (dimension, clé) -> [delta nombre, delta surface]
+Deltas = Dict[Tuple[str, str], List[float]]
+
+
+class ParcelStat(Base):
+    """Compteur matérialisé pour une dimension et une clé (clé '' pour les totaux)"""
+    __tablename__ = 'parcel_stats'
+
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True, default='')
+    item_count = Column(Integer, nullable=False, default=0)
+    total_area = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+def parcel_stat_keys(values: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+    """Clés de statistiques auxquelles contribue une parcelle"""
+    yield PARCELS, ''
+    for name, default in PARCEL_STATISTICS_DIMENSIONS.items():
+        yield name, values.get(name) or default
+    if values.get('owner_id'):
+        yield OWNER, values['owner_id']
+    if values.get('created_at'):
+        yield PARCEL_MONTH, values['created_at'].strftime('%Y-%m')
+
+
+def _add_parcel(deltas: Deltas, values: Dict[str, Any], sign: int) -> None:
+    area = values.get('area') or 0
+    for key in parcel_stat_keys(values):
+        deltas[key][0] += sign
+        # Les surfaces ne sont suivies que pour les dimensions de répartition
+        if key[0] == PARCELS or key[0] in PARCEL_STATISTICS_DIMENSIONS:
+            deltas[key][1] += sign * area
+
+
+def _add_document(deltas: Deltas, values: Dict[str, Any], sign: int) -> None:
+    if values.get('deleted'):
+        return
+    deltas[(DOCUMENTS, '')][0] += sign
+    if values.get('uploaded_at'):
+        deltas[(DOCUMENT_MONTH, values['uploaded_at'].strftime('%Y-%m'))][0] += sign
+
+
+def _add_audit_log(deltas: Deltas, values: Dict[str, Any], sign: int) -> None:
+    deltas[(AUDIT_LOGS, '')][0] += sign
+    timestamp = values.get('timestamp') or datetime.now()
+    deltas[(AUDIT_DAY, timestamp.strftime('%Y-%m-%d'))][0] += sign
+
+
+def _add_alert(deltas: Deltas, values: Dict[str, Any], sign: int) -> None:
+    if not values.get('acknowledged'):
+        deltas[(OPEN_ALERTS, '')][0] += sign
+
+
+TRACKED = {
+    Parcel: (PARCEL_FIELDS, _add_parcel),
+    Document: (('deleted', 'uploaded_at'), _add_document),
+    AuditLog: (('timestamp',), _add_audit_log),
+    Alert: (('acknowledged',), _add_alert),
+}
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Charge la valeur précédente des champs suivis avant modification (objets expirés après commit)
+for _model, (_fields, _) in TRACKED.items():
+    for _name in _fields:
+        event.listen(getattr(_model, _name), 'set', _load_previous_value, active_history=True)
+
+
+def _snapshot(obj, fields: Tuple[str, ...], previous: bool) -> Dict[str, Any]:
+    """Valeurs courantes, ou avant modification, des champs suivis d'un objet"""
+    state = inspect(obj)
+    values = {}
+    for name in fields:
+        history = state.attrs[name].history
+        if previous and (history.deleted or history.added):
+            values[name] = history.deleted[0] if history.deleted else None
+        else:
+            values[name] = getattr(obj, name)
+    return values
+
+
+def collect_deltas(session: Session) -> Deltas:
+    """Calcule les variations de compteurs induites par le flush en cours"""
+    deltas: Deltas = defaultdict(lambda: [0, 0.0])
+
+    for obj in session.new:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            tracked[1](deltas, _snapshot(obj, tracked[0], previous=False), 1)
+
+    for obj in session.deleted:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            tracked[1](deltas, _snapshot(obj, tracked[0], previous=True), -1)
+
+    for obj in session.dirty:
+        tracked = TRACKED.get(type(obj))
+        if not tracked or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in tracked[0]):
+            continue
+        tracked[1](deltas, _snapshot(obj, tracked[0], previous=True), -1)
+        tracked[1](deltas, _snapshot(obj, tracked[0], previous=False), 1)
+
+    return {key: value for key, value in deltas.items() if value[0] or value[1]}
+
+
+def apply_deltas(connection, deltas: Deltas) -> None:
+    """Applique des variations à la table parcel_stats (upsert en lot)"""
+    if not deltas:
+        return
+
+    table = ParcelStat.__table__
+    now = datetime.now()
+    rows = [
+        {'dimension': dimension, 'key': key, 'item_count': count, 'total_area': area, 'updated_at': now}
+        for (dimension, key), (count, area) in deltas.items()
+    ]
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.dimension, table.c.key],
+            set_={
+                'item_count': table.c.item_count + stmt.excluded.item_count,
+                'total_area': table.c.total_area + stmt.excluded.total_area,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.dimension == row['dimension'], table.c.key == row['key'])
+            .values(item_count=table.c.item_count + row['item_count'],
+                    total_area=table.c.total_area + row['total_area'],
+                    updated_at=now)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(**row))
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_deleted_values(session, flush_context, instances):
+    """Charge les champs suivis des objets supprimés tant que leur ligne existe encore"""
+    for obj in session.deleted:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            for name in tracked[0]:
+                getattr(obj, name)
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_parcel_stats(session, flush_context):
+    """Met à jour les statistiques dans la transaction de l'écriture"""
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
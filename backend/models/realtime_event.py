@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Text
+from ..database import Base
+
+
+class RealtimeEvent(Base):
+    """
+    Événement temps réel publié sur le bus partagé entre les workers
+
+    L'id sert de numéro de séquence : chaque worker diffuse les événements
+    d'id supérieur au dernier vu, et un client qui se reconnecte reprend
+    après le dernier numéro reçu. Les lignes sont purgées après la rétention.
+    """
+    __tablename__ = 'realtime_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # broadcast, user ou room
+    target = Column(String(16), nullable=False)
+    target_key = Column(String, nullable=True)
+    exclude_user = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)  # Message JSON
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
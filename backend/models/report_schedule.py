@@ -0,0 +1,42 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean
+from ..database import Base
+
+
+class ReportSchedule(Base):
+    """
+    Génération planifiée d'un rapport (quotidienne, hebdomadaire ou mensuelle)
+
+    Le planificateur de chaque worker soumet à la file des rapports les
+    planifications dont next_run_at est dépassé ; la mise à jour conditionnelle
+    de next_run_at garantit qu'un seul worker déclenche chaque exécution.
+    """
+    __tablename__ = 'report_schedules'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    report_type = Column(String(32), nullable=False)
+    parameters = Column(Text, nullable=False)  # Paramètres JSON normalisés
+    # daily, weekly ou monthly, à l'heure schedule_time (HH:MM)
+    schedule_type = Column(String(16), nullable=False)
+    schedule_time = Column(String(5), nullable=False)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    active = Column(Boolean, default=True, nullable=False)
+    next_run_at = Column(DateTime, nullable=False, index=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_job_id = Column(String, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'parameters': self.parameters,
+            'schedule_type': self.schedule_type,
+            'schedule_time': self.schedule_time,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'active': self.active,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_job_id': self.last_job_id
+        }
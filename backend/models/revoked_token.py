@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime
+from ..database import Base
+
+
+class RevokedToken(Base):
+    """
+    Token JWT révoqué (déconnexion), partagé entre les workers
+
+    Le token est identifié par son empreinte SHA-256 ; la ligne peut être purgée
+    une fois le token expiré, puisqu'il serait de toute façon refusé.
+    """
+    __tablename__ = 'revoked_tokens'
+
+    # Ordre de révocation, utilisé par les workers pour se synchroniser
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
+    user_id = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)  # UTC, claim `exp` du token
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # UTC
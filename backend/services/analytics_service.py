@@ -1,14 +1,28 @@
 """
 Service d'analyse et de reporting pour le système SIU
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from backend.core.repository_interfaces import IParcelRepository, IUserRepository, IDocumentRepository, IAuditLogRepository
+from backend.core.repository_interfaces import (
+    IParcelRepository, IUserRepository, IDocumentRepository, IAuditLogRepository, IParcelStatsRepository
+)
 from backend.models.parcel import Parcel
 from backend.models.user import User
 from backend.models.document import Document
 from backend.models.audit_log import AuditLog
+from backend.models.parcel_stats import PARCELS, OWNER, DOCUMENTS, AUDIT_DAY, OPEN_ALERTS
+from backend.core.streaming_export import iter_csv
+from backend.config import EXPORT_BATCH_SIZE
+
+# Nombre de jours pris en compte pour l'activité récente du tableau de bord
+RECENT_ACTIVITY_DAYS = 7
+
+# Colonnes des exports CSV de parcelles (clés de _parcel_to_dict)
+PARCEL_EXPORT_FIELDS = [
+    'id', 'reference_cadastrale', 'coordinates_lat', 'coordinates_lng', 'area', 'address',
+    'category', 'status', 'zone', 'owner_id', 'created_at', 'updated_at'
+]
 
 
 class AnalyticsService:
@@ -21,69 +35,81 @@ class AnalyticsService:
         parcel_repository: IParcelRepository,
         user_repository: IUserRepository,
         document_repository: IDocumentRepository,
-        audit_log_repository: IAuditLogRepository
+        audit_log_repository: IAuditLogRepository,
+        stats_repository: IParcelStatsRepository
     ):
         self.parcel_repository = parcel_repository
         self.user_repository = user_repository
         self.document_repository = document_repository
         self.audit_log_repository = audit_log_repository
+        self.stats_repository = stats_repository
 
     def get_dashboard_stats(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Récupère les statistiques du tableau de bord
+
+        Sans filtre, tout est lu dans les statistiques matérialisées (parcel_stats).
+        Avec des filtres, les compteurs de parcelles sont agrégés en base.
         """
-        filters = filters or {}
-        
-        # Calculer les statistiques de base
-        total_parcels = self.parcel_repository.count(filters)
-        available_parcels = self.parcel_repository.count({**filters, 'status': 'available'})
-        occupied_parcels = self.parcel_repository.count({**filters, 'status': 'occupied'})
-        disputed_parcels = self.parcel_repository.count({**filters, 'status': 'disputed'})
-        reserved_parcels = self.parcel_repository.count({**filters, 'status': 'reserved'})
-        
-        # Calculer la superficie totale
-        total_area = self.parcel_repository.get_total_area(filters)
-        
-        # Calculer la superficie moyenne
+        snapshot = self.stats_repository.get_snapshot()
+
+        if filters:
+            breakdowns = self._aggregate_breakdowns(filters)
+            total_parcels, total_area = breakdowns.pop(PARCELS).get('', (0, 0.0))
+            total_owners = self.parcel_repository.get_unique_owners_count(filters)
+        else:
+            breakdowns = snapshot
+            total_parcels, total_area = snapshot.get(PARCELS, {}).get('', (0, 0.0))
+            total_owners = len(snapshot.get(OWNER, {}))
+
+        by_status = breakdowns.get('status', {})
         avg_area = total_area / total_parcels if total_parcels > 0 else 0
-        
-        # Calculer le nombre total de propriétaires
-        total_owners = self.parcel_repository.get_unique_owners_count(filters)
-        
-        # Calculer le nombre total de documents
-        total_documents = self.document_repository.count(filters)
-        
-        # Calculer les activités récentes
-        recent_activities = self.audit_log_repository.count({
-            **filters,
-            'date_from': (datetime.now() - timedelta(days=7)).isoformat()
-        })
-        
-        # Calculer les alertes
-        alerts_count = self.audit_log_repository.count({'is_alert': True, **filters})
-        
+
+        since = (datetime.now() - timedelta(days=RECENT_ACTIVITY_DAYS)).strftime('%Y-%m-%d')
+        recent_activities = sum(
+            count for day, (count, _) in snapshot.get(AUDIT_DAY, {}).items() if day >= since
+        )
+
         return {
             'total_parcels': total_parcels,
-            'available_parcels': available_parcels,
-            'occupied_parcels': occupied_parcels,
-            'disputed_parcels': disputed_parcels,
-            'reserved_parcels': reserved_parcels,
+            'available_parcels': by_status.get('available', (0, 0))[0],
+            'occupied_parcels': by_status.get('occupied', (0, 0))[0],
+            'disputed_parcels': by_status.get('disputed', (0, 0))[0],
+            'reserved_parcels': by_status.get('reserved', (0, 0))[0],
             'total_area': total_area,
             'average_area': avg_area,
             'total_owners': total_owners,
-            'total_documents': total_documents,
+            'total_documents': snapshot.get(DOCUMENTS, {}).get('', (0, 0))[0],
             'recent_activities': recent_activities,
-            'alerts_count': alerts_count
+            'alerts_count': snapshot.get(OPEN_ALERTS, {}).get('', (0, 0))[0]
         }
 
+    def get_breakdown(self, dimension: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Répartition du nombre de parcelles par catégorie, statut ou zone, par effectif décroissant
+        """
+        if filters:
+            counts = self._aggregate_breakdowns(filters).get(dimension, {})
+        else:
+            counts = self.stats_repository.get_snapshot().get(dimension, {})
+        ordered = sorted(counts.items(), key=lambda item: (-item[1][0], item[0]))
+        return {key: count for key, (count, _) in ordered}
+
+    def _aggregate_breakdowns(self, filters: Dict[str, Any]) -> Dict[str, Dict[str, tuple]]:
+        """Agrégats filtrés, au même format que les statistiques matérialisées"""
+        breakdowns = {PARCELS: {}}
+        for dimension, key, count, area_sum, _, _ in self.parcel_repository.get_statistics_aggregates(filters):
+            if dimension == 'total':
+                breakdowns[PARCELS][''] = (count, area_sum or 0.0)
+            else:
+                breakdowns.setdefault(dimension, {})[key] = (count, area_sum or 0.0)
+        return breakdowns
+
     def get_parcels_by_category(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Récupère les données pour le graphique des parcelles par catégorie
         """
-        filters = filters or {}
-        
-        # Obtenir les statistiques par catégorie
-        category_stats = self.parcel_repository.get_stats_by_category(filters)
+        category_stats = self.get_breakdown('category', filters)
         
         labels = list(category_stats.keys())
         data = list(category_stats.values())
@@ -104,10 +130,7 @@ class AnalyticsService:
         """
         Récupère les données pour le graphique des parcelles par statut
         """
-        filters = filters or {}
-        
-        # Obtenir les statistiques par statut
-        status_stats = self.parcel_repository.get_stats_by_status(filters)
+        status_stats = self.get_breakdown('status', filters)
         
         labels = list(status_stats.keys())
         data = list(status_stats.values())
@@ -125,10 +148,7 @@ class AnalyticsService:
         """
         Récupère les données pour le graphique des parcelles par zone
         """
-        filters = filters or {}
-        
-        # Obtenir les statistiques par zone
-        zone_stats = self.parcel_repository.get_stats_by_zone(filters)
+        zone_stats = self.get_breakdown('zone', filters)
         
         labels = list(zone_stats.keys())
         data = list(zone_stats.values())
@@ -266,32 +286,22 @@ class AnalyticsService:
         buffer.seek(0)
         return buffer.getvalue()
 
-    def generate_csv_report(self, report_type: str, filters: Optional[Dict[str, Any]] = None) -> str:
+    def iter_csv_report(self, report_type: str, filters: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
         """
-        Génère un rapport CSV
+        Génère un rapport CSV en flux (liste des parcelles lue par lots, sans la charger entière)
         """
-        import io
-        import csv
-        
-        # Récupérer les données selon le type de rapport
         if report_type == 'parcels_summary':
             stats = self.get_dashboard_stats(filters)
-            data = [stats]
-        elif report_type == 'parcels_list':
-            parcels = self.parcel_repository.get_all(filters)
-            data = [self._parcel_to_dict(p) for p in parcels]
-        else:
-            data = []
-        
-        # Créer un buffer en mémoire
-        buffer = io.StringIO()
-        if data:
-            fieldnames = data[0].keys()
-            writer = csv.DictWriter(buffer, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
-        
-        return buffer.getvalue()
+            return iter_csv(list(stats.keys()), [stats])
+        if report_type == 'parcels_list':
+            return self._iter_parcels_csv(filters)
+        return iter([])
+
+    def generate_csv_report(self, report_type: str, filters: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Génère un rapport CSV
+        """
+        return b''.join(self.iter_csv_report(report_type, filters)).decode('utf-8')
 
     def get_report_history(self, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
         """
@@ -381,28 +391,17 @@ class AnalyticsService:
         
         return predictions
 
+    def iter_raw_data(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """
+        Exporte les données brutes en flux (CSV des parcelles filtrées)
+        """
+        return self._iter_parcels_csv(filters)
+
     def export_raw_data(self, filters: Optional[Dict[str, Any]] = None) -> bytes:
         """
         Exporte les données brutes
         """
-        import io
-        import csv
-        
-        # Récupérer toutes les données selon les filtres
-        parcels = self.parcel_repository.get_all(filters)
-        
-        # Convertir en CSV
-        buffer = io.StringIO()
-        if parcels:
-            fieldnames = self._parcel_to_dict(parcels[0]).keys()
-            writer = csv.DictWriter(buffer, fieldnames=fieldnames)
-            writer.writeheader()
-            for parcel in parcels:
-                writer.writerow(self._parcel_to_dict(parcel))
-        
-        # Convertir en bytes
-        csv_content = buffer.getvalue()
-        return csv_content.encode('utf-8')
+        return b''.join(self.iter_raw_data(filters))
 
     def get_stats_by_period(self, period: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -516,6 +515,10 @@ class AnalyticsService:
             print(f"Erreur lors de la récupération des top zones: {str(e)}")
             return []
 
+    def _iter_parcels_csv(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        rows = self.parcel_repository.iter_export_rows(filters, batch_size=EXPORT_BATCH_SIZE)
+        return iter_csv(PARCEL_EXPORT_FIELDS, (self._parcel_to_dict(row) for row in rows))
+
     def _parcel_to_dict(self, parcel: Parcel) -> Dict[str, Any]:
         """
         Convertit une parcelle en dictionnaire
@@ -6,6 +6,7 @@ Enregistre et recherche dans l'audit trail
 import json
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
+from backend.core.pagination import page_response
 from backend.core.repository_interfaces import IAuditLogRepository
 from backend.models.audit_log import AuditLog
 
@@ -105,22 +106,7 @@ class AuditService:
             list: Liste des audit logs
         """
         try:
-            # Validation des paramètres pour prévenir les injections
-            import re
-
-            if action and (len(action) > 50 or not re.match(r'^[a-zA-Z0-9_\-\s]+$', action)):
-                return []
-
-            if entity_type and (len(entity_type) > 50 or not re.match(r'^[a-zA-Z0-9_]+$', entity_type)):
-                return []
-
-            if entity_id and (len(entity_id) > 100 or not re.match(r'^[a-zA-Z0-9_-]+$', entity_id)):
-                return []
-
-            if user_id and (len(user_id) > 100 or not re.match(r'^[a-zA-Z0-9_-]+$', user_id)):
-                return []
-
-            if status and (len(status) > 20 or not re.match(r'^[a-zA-Z]+$', status)):
+            if not self._valid_log_filters(action, entity_type, entity_id, user_id, status):
                 return []
 
             # Limiter les valeurs possibles pour éviter les attaques par déni de service
@@ -148,6 +134,58 @@ class AuditService:
         except Exception as e:
             print(f"Erreur get_audit_logs : {e}")
             return []
+
+    def get_audit_logs_page(
+        self,
+        filters: Dict[str, Any],
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        total_mode: str = 'none'
+    ) -> Dict[str, Any]:
+        """
+        Récupère une page d'audit logs (pagination par curseur ou par décalage)
+
+        Args:
+            filters: action, entity_type, entity_id, user_id, status, date_from, date_to, is_sensitive
+            cursor: next_cursor de la page précédente (prioritaire sur offset)
+            total_mode: Calcul du total ('exact', 'cached', 'estimate' ou 'none')
+
+        Returns:
+            dict: items, next_cursor, has_more, total, page_size
+        """
+        filters = dict(filters)
+        if filters.get('user_id') is not None:
+            filters['user_id'] = str(filters['user_id'])
+        if not self._valid_log_filters(*(filters.get(field) for field in
+                                         ('action', 'entity_type', 'entity_id', 'user_id', 'status'))):
+            return page_response([], None, limit, 0)
+
+        return self.audit_log_repository.get_audit_logs_page(
+            filters, limit=min(limit, 1000), offset=max(offset, 0), cursor=cursor, total_mode=total_mode
+        )
+
+    @staticmethod
+    def _valid_log_filters(action: str, entity_type: str, entity_id: str, user_id: str, status: str) -> bool:
+        """Validation des filtres des audit logs pour prévenir les injections"""
+        import re
+
+        if action and (len(action) > 50 or not re.match(r'^[a-zA-Z0-9_\-\s]+$', action)):
+            return False
+
+        if entity_type and (len(entity_type) > 50 or not re.match(r'^[a-zA-Z0-9_]+$', entity_type)):
+            return False
+
+        if entity_id and (len(entity_id) > 100 or not re.match(r'^[a-zA-Z0-9_-]+$', entity_id)):
+            return False
+
+        if user_id and (len(user_id) > 100 or not re.match(r'^[a-zA-Z0-9_-]+$', user_id)):
+            return False
+
+        if status and (len(status) > 20 or not re.match(r'^[a-zA-Z]+$', status)):
+            return False
+
+        return True
     
     def get_entity_history(
         self,
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 from backend.models.user import User
 from backend.services.admin_service import AdminService
+from backend.core.principal_cache import principal_cache
+from backend.core.token_revocation import token_revocation_store
 from typing import Dict, Any, Optional
 import secrets
 from jose import JWTError, jwt
@@ -36,9 +38,8 @@ class AuthService:
 
     def __init__(self, admin_service: AdminService):
         self.admin_service = admin_service
-        # Pour une implémentation complète, utiliser Redis ou une table de données
-        self.tokens = {}  # Dictionnaire pour stocker les tokens en mémoire
-        self.blacklisted_tokens = set()  # Ensemble pour les tokens blacklistés
+        # Révocations partagées entre instances et workers (table revoked_tokens)
+        self.revocation_store = token_revocation_store
         
     def authenticate(self, credentials: Dict[str, str]) -> Dict[str, Any]:
         """
@@ -175,16 +176,7 @@ class AuthService:
         }
 
         # Générer le token JWT
-        token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-        # Stocker aussi en mémoire pour compatibilité (pourra être supprimé plus tard)
-        self.tokens[token] = {
-            'user_id': user.id,
-            'expires_at': expires_at,
-            'created_at': datetime.utcnow()
-        }
-
-        return token
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     
     def _get_redirect_url_by_role(self, role) -> str:
         """
@@ -264,30 +256,17 @@ class AuthService:
         Returns:
             bool: True si la déconnexion a réussi, False sinon
         """
-        # Ajouter le token à la liste noire pour invalider immédiatement
-        self.blacklisted_tokens.add(token)
-
-        # Supprimer le token du dictionnaire des tokens actifs
-        if token in self.tokens:
-            del self.tokens[token]
+        # Révoquer le token pour tous les workers jusqu'à son expiration
+        self.revocation_store.revoke(token)
+        principal_cache.forget_token(token)
 
         return True
 
     def cleanup_expired_tokens(self):
         """
-        Nettoie les tokens expirés du dictionnaire des tokens
+        Supprime les révocations de tokens expirés
         """
-        current_time = datetime.utcnow()
-        expired_tokens = []
-
-        for token, token_info in self.tokens.items():
-            if token_info.get('expires_at', current_time) < current_time:
-                expired_tokens.append(token)
-
-        for token in expired_tokens:
-            del self.tokens[token]
-
-        return len(expired_tokens)
+        return self.revocation_store.purge_expired()
 
     def is_token_blacklisted(self, token: str) -> bool:
         """
@@ -299,7 +278,7 @@ class AuthService:
         Returns:
             bool: True si le token est blacklisté, False sinon
         """
-        return token in self.blacklisted_tokens
+        return self.revocation_store.is_revoked(token)
     
     def reset_password(self, reset_data: Dict[str, str]) -> Dict[str, Any]:
         """
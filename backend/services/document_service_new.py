@@ -5,15 +5,19 @@ Version améliorée avec validation, sécurité, thumbnails, et métadonnées co
 
 import os
 import json
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, BinaryIO
 from pathlib import Path
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, case, exc as sql_exceptions
 
 # Import des services
-from .storage_service import StorageService
+from .storage_service import StorageService, StagedUpload, UploadRejected
 from .document_validator import DocumentValidator
+from backend.config import UPLOAD_WORKERS, BLOB_SWEEP_GRACE
 
 # Import des modèles (à adapter selon votre structure)
 # from backend.models.document import Document, DocumentType, DocumentStatus
@@ -24,6 +28,28 @@ UPLOAD_BASE_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
 MAX_FILE_SIZE_MB = int(os.environ.get('MAX_FILE_SIZE_MB', '50'))
 
 
+@dataclass
+class PreparedUpload:
+    """Upload reçu et validé, prêt à être enregistré en base"""
+    filename: str
+    safe_filename: str
+    mime_type: str
+    staged: StagedUpload
+    thumbnail_data: Optional[bytes] = None
+
+
+def _document_type(value):
+    """Type de document depuis sa valeur ('survey_plan') ou son nom ('SURVEY_PLAN')"""
+    from backend.models.document import DocumentType
+    
+    if isinstance(value, DocumentType):
+        return value
+    try:
+        return DocumentType(str(value).lower())
+    except ValueError:
+        raise ValueError(f"Type de document invalide: {value}")
+
+
 class DocumentService:
     """Service complet pour la gestion des documents"""
     
@@ -67,63 +93,23 @@ class DocumentService:
         Returns:
             dict: Résultat avec document créé ou erreur
         """
+        prepared = None
+        stored_paths = []
         try:
-            # 1. Lire les données du fichier
-            file.seek(0)
-            file_data = file.read()
-            
-            # 2. Valider le fichier
-            is_valid, error_msg, mime_type = self.validator.validate_file(file_data, filename)
-            if not is_valid:
-                return {
-                    'success': False,
-                    'error': error_msg
-                }
-            
-            # 3. Sanitize filename
-            safe_filename = self.validator.sanitize_filename(filename)
+            prepared = self.prepare_upload(file, filename)
             
-            # 4. Créer le document en DB pour obtenir un ID
-            from backend.models.document import Document, DocumentStatus
-            
-            document = Document(
+            document = self._store_prepared(
+                prepared, stored_paths,
                 parcel_id=parcel_id,
                 title=title,
                 description=description,
                 document_type=document_type,
-                filename=safe_filename,
-                mime_type=mime_type,
-                file_size=len(file_data),
                 uploaded_by=uploaded_by,
                 tags=json.dumps(tags) if tags else None,
-                expiry_date=expiry_date,
-                status=DocumentStatus.EN_ATTENTE
-            )
-            
-            self.db.add(document)
-            self.db.flush()  # Pour obtenir l'ID
-            
-            # 5. Sauvegarder le fichier sur disque
-            file.seek(0)
-            file_path, checksum, file_size = self.storage.save_document(
-                file, parcel_id, document.id, safe_filename
+                expiry_date=expiry_date
             )
             
-            # 6. Mettre à jour le document avec les infos de stockage
-            document.file_path = file_path
-            document.checksum = checksum
-            document.file_size = file_size
-            
-            # 7. Générer thumbnail si c'est une image
-            if mime_type.startswith('image/'):
-                thumbnail_data = self.validator.generate_thumbnail(file_data)
-                if thumbnail_data:
-                    thumbnail_path = self.storage.save_thumbnail(
-                        thumbnail_data, parcel_id, document.id
-                    )
-                    document.thumbnail_path = thumbnail_path
-            
-            # 8. Commit
+            # Commit
             self.db.commit()
             
             return {
@@ -132,51 +118,345 @@ class DocumentService:
                 'message': 'Document uploadé avec succès'
             }
             
+        except UploadRejected as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
         except Exception as e:
             self.db.rollback()
+            self._undo_placed(stored_paths)
             return {
                 'success': False,
                 'error': f'Erreur lors de l\'upload : {str(e)}'
             }
+        finally:
+            if prepared is not None:
+                self.storage.discard_upload(prepared.staged)
+    
+    def prepare_upload(self, file: BinaryIO, filename: str) -> PreparedUpload:
+        """
+        Traitement fichier d'un upload, sans accès à la base (utilisable depuis un thread)
+        
+        Le fichier est reçu en un seul passage : type réel vérifié sur le premier
+        bloc, taille limitée au fil de la lecture, SHA-256 et écriture dans un
+        fichier temporaire en même temps. Le contenu complet (images) est ensuite
+        vérifié et la miniature générée depuis le disque.
+        
+        Returns:
+            PreparedUpload: à enregistrer avec _store_prepared
+            
+        Raises:
+            UploadRejected: fichier refusé (le fichier temporaire est supprimé)
+        """
+        try:
+            safe_filename = self.validator.sanitize_filename(filename)
+        except ValueError as e:
+            raise UploadRejected(str(e))
+        
+        detected = {}
+        
+        def inspect(head: bytes) -> None:
+            is_valid, error_msg, mime_type = self.validator.validate_header(head, filename)
+            if not is_valid:
+                raise UploadRejected(error_msg)
+            detected['mime_type'] = mime_type
+        
+        staged = self.storage.receive_upload(file, self.validator.max_file_size, inspect)
+        try:
+            if staged.size == 0:
+                raise UploadRejected("Fichier vide")
+            mime_type = detected['mime_type']
+            
+            is_valid, error_msg = self.validator.validate_content(staged.temp_path, mime_type)
+            if not is_valid:
+                raise UploadRejected(error_msg)
+            
+            thumbnail_data = None
+            if mime_type.startswith('image/'):
+                thumbnail_data = self.validator.generate_thumbnail(staged.temp_path)
+        except BaseException:
+            self.storage.discard_upload(staged)
+            raise
+        
+        return PreparedUpload(filename, safe_filename, mime_type, staged, thumbnail_data)
+    
+    def _store_prepared(self, prepared: PreparedUpload, stored_paths: List[str], parcel_id, **fields):
+        """
+        Crée le document en DB (flush, sans commit) et place ses fichiers
+        
+        Le contenu est rangé dans le stockage adressé par SHA-256 : un contenu
+        déjà présent n'est pas réécrit, seul son compteur de références augmente.
+        Les chemins placés sont ajoutés à stored_paths, pour _undo_placed si la
+        transaction est annulée.
+        
+        Les champs absents de la table documents (titre, tags, expiration) sont ignorés.
+        """
+        from backend.models.document import Document
+        
+        columns = Document.__table__.columns.keys()
+        document_type = _document_type(fields.pop('document_type'))
+        
+        # Blob placé avant l'insertion : file_path est obligatoire
+        created = self._acquire_blob(prepared.staged.checksum, prepared.staged.size)
+        file_path = self.storage.commit_blob(prepared.staged, replace=created)
+        if created:
+            stored_paths.append(file_path)
+        
+        document = Document(
+            parcel_id=parcel_id,
+            filename=prepared.safe_filename,
+            original_filename=prepared.filename,
+            file_path=file_path,
+            mime_type=prepared.mime_type,
+            file_size=prepared.staged.size,
+            checksum=prepared.staged.checksum,
+            document_type=document_type,
+            **{key: value for key, value in fields.items() if key in columns and value is not None}
+        )
+        
+        self.db.add(document)
+        self.db.flush()  # Pour obtenir l'ID
+        
+        if prepared.thumbnail_data:
+            document.thumbnail_path = self.storage.save_thumbnail(
+                prepared.thumbnail_data, parcel_id, document.id
+            )
+            stored_paths.append(document.thumbnail_path)
+        
+        return document
+    
+    def _acquire_blob(self, checksum: str, size: int) -> bool:
+        """
+        Ajoute une référence au blob (créé au besoin), dans la transaction courante
+        
+        Returns:
+            bool: True si le blob vient d'être créé
+        """
+        from backend.models.document_blob import DocumentBlob
+        
+        def increment() -> int:
+            return self.db.query(DocumentBlob).filter(DocumentBlob.checksum == checksum).update(
+                {DocumentBlob.ref_count: DocumentBlob.ref_count + 1, DocumentBlob.released_at: None},
+                synchronize_session=False
+            )
+        
+        if increment():
+            return False
+        try:
+            with self.db.begin_nested():
+                self.db.add(DocumentBlob(checksum=checksum, size=size, ref_count=1))
+            return True
+        except sql_exceptions.IntegrityError:
+            # Créé entre-temps par un upload concurrent du même contenu
+            increment()
+            return False
+    
+    def _release_blob(self, checksum: str) -> None:
+        """Retire une référence au blob ; à 0, il devient candidat au balayage"""
+        from backend.models.document_blob import DocumentBlob
+        
+        self.db.query(DocumentBlob).filter(DocumentBlob.checksum == checksum).update(
+            {
+                DocumentBlob.ref_count: DocumentBlob.ref_count - 1,
+                DocumentBlob.released_at: case(
+                    (DocumentBlob.ref_count <= 1, datetime.utcnow()), else_=DocumentBlob.released_at
+                )
+            },
+            synchronize_session=False
+        )
+    
+    def _undo_placed(self, stored_paths: List[str]) -> None:
+        """
+        Après annulation de la transaction : supprime les miniatures placées
+        
+        Un blob créé par la transaction annulée peut déjà être partagé par un
+        upload concurrent du même contenu : il n'est pas supprimé ici mais
+        enregistré sans référence, pour le balayage.
+        """
+        from backend.models.document_blob import DocumentBlob
+        
+        for stored_path in stored_paths:
+            if not stored_path.startswith('blobs/'):
+                self.storage.delete_document(stored_path)
+                continue
+            checksum = Path(stored_path).name
+            try:
+                if self.db.get(DocumentBlob, checksum) is None:
+                    self.db.add(DocumentBlob(
+                        checksum=checksum,
+                        size=self.storage.blob_path(checksum).stat().st_size,
+                        ref_count=0,
+                        released_at=datetime.utcnow()
+                    ))
+                self.db.commit()
+            except (sql_exceptions.SQLAlchemyError, OSError) as e:
+                self.db.rollback()
+                print(f"Erreur lors de l'enregistrement du blob orphelin {checksum}: {e}")
+    
+    def sweep_blobs(self, grace_seconds: int = BLOB_SWEEP_GRACE) -> int:
+        """
+        Supprime les blobs sans référence depuis plus de grace_seconds
+        
+        Seuls les blobs à ref_count nul sont examinés (index sur released_at) :
+        ni la table des documents ni le disque ne sont parcourus.
+        
+        Le fichier est supprimé avant le COMMIT de la suppression de la ligne, tant
+        que celle-ci est verrouillée : un upload concurrent du même contenu attend
+        la fin du balayage, puis recrée la ligne et replace le fichier.
+        
+        Returns:
+            int: Nombre de blobs supprimés
+        """
+        from backend.models.document_blob import DocumentBlob
+        
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        candidates = self.db.query(DocumentBlob.checksum).filter(
+            DocumentBlob.released_at <= cutoff,
+            DocumentBlob.ref_count <= 0
+        ).all()
+        
+        deleted_count = 0
+        for (checksum,) in candidates:
+            # Supprimé seulement s'il n'a pas été référencé à nouveau entre-temps
+            removed = self.db.query(DocumentBlob).filter(
+                DocumentBlob.checksum == checksum,
+                DocumentBlob.ref_count <= 0
+            ).delete(synchronize_session=False)
+            if removed and not self.storage.delete_blob(checksum) and self.storage.has_blob(checksum):
+                # Fichier toujours présent : la ligne est conservée pour un prochain balayage
+                self.db.rollback()
+                continue
+            self.db.commit()
+            if removed:
+                deleted_count += 1
+        
+        return deleted_count
+    
+    def prepare_uploads(
+        self,
+        files: list[tuple[BinaryIO, str]],
+        max_workers: int = UPLOAD_WORKERS
+    ) -> list:
+        """
+        Traitement fichier de plusieurs uploads dans un pool de threads borné
+        
+        Hachage, écritures disque et décodage des images libèrent le GIL : les
+        fichiers sont traités en parallèle.
+        
+        Returns:
+            list: Dans l'ordre de files, un PreparedUpload ou l'exception UploadRejected
+        """
+        def prepare(item):
+            file, filename = item
+            try:
+                return self.prepare_upload(file, filename)
+            except UploadRejected as e:
+                return e
+            except Exception as e:
+                # Erreur inattendue limitée à ce fichier (son fichier temporaire est déjà
+                # supprimé) : les uploads déjà reçus restent à enregistrer ou à supprimer
+                print(f"Erreur lors du traitement de l'upload {filename}: {e}")
+                return UploadRejected(f"Erreur lors du traitement du fichier : {e}")
+        
+        if max_workers <= 1 or len(files) <= 1:
+            return [prepare(item) for item in files]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files)), thread_name_prefix='siu-upload') as executor:
+            return list(executor.map(prepare, files))
     
     def upload_multiple_documents(
         self,
         files: list[tuple[BinaryIO, str]],  # (file, filename)
         parcel_id: int,
         document_type: str,
-        uploaded_by: int
+        uploaded_by: int,
+        max_workers: int = UPLOAD_WORKERS
     ) -> Dict[str, Any]:
         """
         Upload multiple documents à la fois
         
+        Validation, hachage, écriture et miniatures sont exécutés en parallèle
+        (prepare_uploads) ; les métadonnées des fichiers acceptés sont ensuite
+        enregistrées dans une seule transaction. Un fichier refusé n'empêche pas
+        l'enregistrement des autres ; un échec de la transaction les annule tous.
+        
         Returns:
-            dict: Résultat avec liste des documents créés et erreurs
+            dict: Résultat avec liste des documents créés, erreurs et résultat par fichier
         """
         results = {
             'success': True,
             'documents': [],
-            'errors': []
+            'errors': [],
+            'results': []
         }
         
-        for file, filename in files:
-            result = self.upload_document(
-                file=file,
-                parcel_id=parcel_id,
-                title=filename,
-                filename=filename,
-                document_type=document_type,
-                uploaded_by=uploaded_by
-            )
-            
-            if result['success']:
-                results['documents'].append(result['document'])
+        started = time.perf_counter()
+        prepared_uploads = self.prepare_uploads(files, max_workers)
+        prepared_in = time.perf_counter() - started
+        
+        stored_paths = []
+        documents = []
+        try:
+            for prepared in prepared_uploads:
+                if isinstance(prepared, PreparedUpload):
+                    documents.append(self._store_prepared(
+                        prepared, stored_paths,
+                        parcel_id=parcel_id,
+                        title=prepared.filename,
+                        document_type=document_type,
+                        uploaded_by=uploaded_by
+                    ))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            self._undo_placed(stored_paths)
+            error = f'Erreur lors de l\'upload : {str(e)}'
+            prepared_uploads = [
+                UploadRejected(error) if isinstance(prepared, PreparedUpload) else prepared
+                for prepared in prepared_uploads
+            ]
+            documents = []
+        finally:
+            for prepared in prepared_uploads:
+                if isinstance(prepared, PreparedUpload):
+                    self.storage.discard_upload(prepared.staged)
+        
+        documents = iter(documents)
+        total_bytes = 0
+        for (_, filename), prepared in zip(files, prepared_uploads):
+            if isinstance(prepared, PreparedUpload):
+                document = next(documents).to_dict()
+                total_bytes += prepared.staged.size
+                results['documents'].append(document)
+                results['results'].append({
+                    'filename': filename,
+                    'success': True,
+                    'document': document
+                })
             else:
                 results['errors'].append({
                     'filename': filename,
-                    'error': result['error']
+                    'error': str(prepared)
+                })
+                results['results'].append({
+                    'filename': filename,
+                    'success': False,
+                    'error': str(prepared)
                 })
                 results['success'] = False
         
+        elapsed = time.perf_counter() - started
+        results['stats'] = {
+            'files': len(files),
+            'stored': len(results['documents']),
+            'bytes': total_bytes,
+            'workers': min(max_workers, len(files)) or 1,
+            'prepare_seconds': round(prepared_in, 3),
+            'total_seconds': round(elapsed, 3),
+            'mb_per_second': round(total_bytes / (1024 * 1024) / elapsed, 2) if elapsed else None
+        }
+        
         return results
     
     def get_document(self, document_id: int) -> Optional[Dict[str, Any]]:
@@ -423,8 +703,11 @@ class DocumentService:
                 return {'success': False, 'error': 'Document non trouvé'}
             
             if permanent:
-                # Suppression physique du fichier
-                self.storage.delete_document(document.file_path)
+                # Suppression physique du fichier (blob partagé : retrait d'une référence)
+                if document.file_path.startswith('blobs/'):
+                    self._release_blob(document.checksum)
+                else:
+                    self.storage.delete_document(document.file_path)
                 if document.thumbnail_path:
                     self.storage.delete_thumbnail(document.thumbnail_path)
                 
@@ -452,17 +735,9 @@ class DocumentService:
         return self.storage.get_storage_stats()
     
     def cleanup_orphan_files(self) -> Dict[str, Any]:
-        """Nettoie les fichiers orphelins"""
+        """Nettoie les fichiers orphelins (blobs sans référence)"""
         try:
-            from backend.models.document import Document
-            
-            # Récupérer tous les chemins valides
-            documents = self.db.query(Document).all()
-            valid_paths = [doc.file_path for doc in documents]
-            if documents and documents[0].thumbnail_path:
-                valid_paths.extend([doc.thumbnail_path for doc in documents if doc.thumbnail_path])
-            
-            deleted_count = self.storage.cleanup_orphan_files(valid_paths)
+            deleted_count = self.sweep_blobs()
             
             return {
                 'success': True,
@@ -471,4 +746,5 @@ class DocumentService:
             }
             
         except Exception as e:
+            self.db.rollback()
             return {'success': False, 'error': str(e)}
@@ -3,7 +3,7 @@ Service de validation et sécurité des documents
 """
 import mimetypes
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 from PIL import Image
 import io
 
@@ -66,14 +66,39 @@ class DocumentValidator:
         if file_size == 0:
             return False, "Fichier vide", None
         
-        # 2. Vérifier l'extension
+        # 2. Vérifier l'extension et le type réel
+        is_valid, error, mime_type = self.validate_header(file_data, filename)
+        if not is_valid:
+            return False, error, None
+
+        # 3. Vérifications sur le contenu complet
+        is_valid, error = self.validate_content(file_data, mime_type)
+        if not is_valid:
+            return False, error, None
+
+        return True, None, mime_type
+
+    def validate_header(self, head: bytes, filename: str) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Valide l'extension et le type réel (magic numbers) d'après les premiers octets
+
+        Utilisé sur le premier bloc d'un upload lu en flux, avant la lecture du reste.
+
+        Args:
+            head: Premiers octets du fichier
+            filename: Nom du fichier
+
+        Returns:
+            tuple: (is_valid, error_message, mime_type)
+        """
+        # 1. Vérifier l'extension
         extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
         if not self._is_extension_allowed(extension):
             return False, f"Extension '{extension}' non autorisée", None
         
-        # 3. Détecter le MIME type réel (magic numbers)
+        # 2. Détecter le MIME type réel (magic numbers)
         try:
-            mime_type = magic.from_buffer(file_data, mime=True)
+            mime_type = magic.from_buffer(head, mime=True)
         except Exception:
             # Fallback sur mimetypes si python-magic n'est pas disponible
             mime_type, _ = mimetypes.guess_type(filename)
@@ -81,22 +106,31 @@ class DocumentValidator:
         if not mime_type:
             return False, "Impossible de déterminer le type de fichier", None
         
-        # 4. Vérifier que le MIME type est autorisé
+        # 3. Vérifier que le MIME type est autorisé
         if mime_type not in self.ALLOWED_MIME_TYPES:
             return False, f"Type de fichier '{mime_type}' non autorisé", None
         
-        # 5. Vérification supplémentaire pour les images
-        if mime_type.startswith('image/'):
-            is_valid_image, error = self._validate_image(file_data)
-            if not is_valid_image:
-                return False, error, None
-        
-        # 6. Vérifier que l'extension correspond au MIME type
+        # 4. Vérifier que l'extension correspond au MIME type
         expected_extensions = mimetypes.guess_all_extensions(mime_type)
         if expected_extensions and f'.{extension}' not in expected_extensions:
             return False, f"Extension '{extension}' ne correspond pas au type de fichier '{mime_type}'", None
         
         return True, None, mime_type
+
+    def validate_content(self, source: Union[bytes, Path], mime_type: str) -> Tuple[bool, Optional[str]]:
+        """
+        Vérifications nécessitant le fichier complet (images non corrompues)
+
+        Args:
+            source: Données du fichier ou chemin du fichier reçu
+            mime_type: Type détecté par validate_header
+
+        Returns:
+            tuple: (is_valid, error_message)
+        """
+        if mime_type.startswith('image/'):
+            return self._validate_image(source)
+        return True, None
     
     def _is_extension_allowed(self, extension: str) -> bool:
         """Vérifie si une extension est autorisée"""
@@ -105,18 +139,23 @@ class DocumentValidator:
             all_extensions.update(exts)
         return extension.lower() in all_extensions
     
-    def _validate_image(self, file_data: bytes) -> Tuple[bool, Optional[str]]:
+    @staticmethod
+    def _open_image(source: Union[bytes, Path]) -> Image.Image:
+        """Ouvre une image depuis ses données ou depuis le disque (lecture à la demande)"""
+        return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+    def _validate_image(self, source: Union[bytes, Path]) -> Tuple[bool, Optional[str]]:
         """
         Valide qu'une image est correcte et non corrompue
         
         Args:
-            file_data: Données de l'image
+            source: Données de l'image ou chemin du fichier
             
         Returns:
             tuple: (is_valid, error_message)
         """
         try:
-            img = Image.open(io.BytesIO(file_data))
+            img = self._open_image(source)
             img.verify()  # Vérifie que l'image n'est pas corrompue
             
             # Vérifier les dimensions (éviter les bombes de décompression)
@@ -127,19 +166,19 @@ class DocumentValidator:
         except Exception as e:
             return False, f"Image invalide ou corrompue : {str(e)}"
     
-    def generate_thumbnail(self, file_data: bytes, size: Tuple[int, int] = (200, 200)) -> Optional[bytes]:
+    def generate_thumbnail(self, source: Union[bytes, Path], size: Tuple[int, int] = (200, 200)) -> Optional[bytes]:
         """
         Génère une miniature pour une image
         
         Args:
-            file_data: Données de l'image
+            source: Données de l'image ou chemin du fichier
             size: Taille de la miniature (largeur, hauteur)
             
         Returns:
             bytes: Données de la miniature ou None en cas d'erreur
         """
         try:
-            img = Image.open(io.BytesIO(file_data))
+            img = self._open_image(source)
             img.thumbnail(size, Image.Resampling.LANCZOS)
             
             # Convertir en RGB si nécessaire (pour sauvegarder en JPEG)
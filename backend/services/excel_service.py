@@ -1,25 +1,58 @@
 """
 Service d'export Excel avec openpyxl
 Crée des fichiers Excel professionnels avec formatage, graphiques, formules
+Mode write_only pour les gros exports, écrits en flux
 """
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
 from openpyxl.chart import BarChart, PieChart, LineChart, Reference
 from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any
 import io
+import warnings
+
+
+# En-têtes des feuilles d'export
+PARCEL_HEADERS = [
+    'ID', 'Référence', 'Adresse', 'Superficie (m²)',
+    'Zone', 'Statut', 'Propriétaire', 'Date création'
+]
+DOCUMENT_HEADERS = [
+    'ID', 'Titre', 'Type', 'Taille', 'Statut',
+    'Uploadé par', 'Date upload', 'Validé'
+]
+
+
+def _as_datetime(value: Any) -> Any:
+    """Convertit une date ISO en datetime (laissée telle quelle si illisible)"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+    return value
 
 
 class ExcelService:
-    """Service d'export Excel professionnel"""
+    """
+    Service d'export Excel professionnel
+
+    En mode write_only, les lignes sont écrites au fil de l'eau dans le fichier
+    (mémoire constante, données fournies par un générateur) : seuls l'en-tête,
+    les dates, les statuts et la ligne de total portent un style nommé, le
+    quadrillage des données étant assuré par un style de tableau Excel.
+    """
     
-    def __init__(self, title: str = "Export SIU"):
+    def __init__(self, title: str = "Export SIU", write_only: bool = False):
         self.title = title
-        self.wb = Workbook()
-        self.wb.remove(self.wb.active)  # Retirer la feuille par défaut
+        self.write_only = write_only
+        self.wb = Workbook(write_only=write_only)
+        if not write_only:
+            self.wb.remove(self.wb.active)  # Retirer la feuille par défaut
         
         # Styles prédéfinis
         self.header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
@@ -30,143 +63,195 @@ class ExcelService:
             top=Side(style='thin'),
             bottom=Side(style='thin')
         )
+        self._register_styles()
+
+    def _register_styles(self):
+        """Styles nommés partagés par toutes les cellules du classeur (un seul enregistrement chacun)"""
+        styles = [
+            NamedStyle('siu_header', font=self.header_font, fill=self.header_fill, border=self.border,
+                       alignment=Alignment(horizontal='center', vertical='center')),
+            NamedStyle('siu_cell', border=self.border),
+            NamedStyle('siu_date', border=self.border, number_format='DD/MM/YYYY'),
+            NamedStyle('siu_datetime', border=self.border, number_format='DD/MM/YYYY HH:MM'),
+            NamedStyle('siu_valid', border=self.border,
+                       fill=PatternFill(start_color='C8E6C9', end_color='C8E6C9', fill_type='solid')),
+            NamedStyle('siu_pending', border=self.border,
+                       fill=PatternFill(start_color='FFECB3', end_color='FFECB3', fill_type='solid')),
+            NamedStyle('siu_total', font=Font(bold=True)),
+        ]
+        for style in styles:
+            self.wb.add_named_style(style)
     
     def create_sheet(self, title: str, activate: bool = True):
         """Crée une nouvelle feuille"""
         sheet = self.wb.create_sheet(title=title)
-        if activate:
+        if activate and not self.write_only:
             self.wb.active = sheet
         return sheet
+
+    def _styled(self, sheet, value: Any, style: str):
+        """Cellule isolée portant un style nommé (mode write_only)"""
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.style = style
+        return cell
+
+    def _start_table_sheet(self, sheet_name: str, headers: List[str], width: int = 15):
+        """Crée une feuille de données : largeurs de colonnes, volet figé et ligne d'en-tête"""
+        sheet = self.create_sheet(sheet_name)
+        # Avant toute ligne : en mode write_only, ces réglages précèdent les données dans le fichier
+        for col in range(1, len(headers) + 1):
+            sheet.column_dimensions[get_column_letter(col)].width = width
+        sheet.freeze_panes = 'A2'
+
+        if self.write_only:
+            sheet.append([self._styled(sheet, header, 'siu_header') for header in headers])
+        else:
+            for col_num, header in enumerate(headers, 1):
+                cell = sheet.cell(row=1, column=col_num)
+                cell.value = header
+                cell.style = 'siu_header'
+        return sheet
+
+    def _append_row(self, sheet, row_num: int, values: List[Any], styles: Dict[int, str]):
+        """
+        Ajoute une ligne de données
+
+        Args:
+            styles: Style nommé par index de colonne (0-based) ; les autres colonnes
+                prennent 'siu_cell' en mode normal et aucun style en mode write_only
+        """
+        if self.write_only:
+            sheet.append([
+                self._styled(sheet, value, styles[col]) if col in styles and value is not None else value
+                for col, value in enumerate(values)
+            ])
+            return
+        for col, value in enumerate(values):
+            cell = sheet.cell(row=row_num, column=col + 1)
+            cell.value = value
+            cell.style = styles.get(col, 'siu_cell') if value is not None else 'siu_cell'
+
+    def _finish_table_sheet(self, sheet, name: str, headers: List[str], rows: int):
+        """Filtres (tableau Excel en mode write_only) sur les lignes écrites"""
+        ref = f"A1:{get_column_letter(len(headers))}{rows + 1}"
+        if not self.write_only:
+            sheet.auto_filter.ref = ref
+        elif rows:
+            table = Table(displayName=name, ref=ref)
+            # En write_only, openpyxl n'initialise pas les colonnes à partir des en-têtes
+            table.tableColumns = [TableColumn(id=i, name=header) for i, header in enumerate(headers, 1)]
+            table.tableStyleInfo = TableStyleInfo(name='TableStyleLight1', showRowStripes=True)
+            # Avertissement systématique d'openpyxl en write_only, colonnes déjà renseignées ci-dessus
+            with warnings.catch_warnings():
+                warnings.filterwarnings('ignore', message='In write-only mode you must add table columns manually')
+                sheet.add_table(table)
     
     def export_parcels(
         self,
-        parcels: List[Dict[str, Any]],
+        parcels: Iterable[Dict[str, Any]],
         sheet_name: str = "Parcelles"
-    ):
+    ) -> Dict[str, Any]:
         """
-        Exporte une liste de parcelles avec formatage
+        Exporte des parcelles avec formatage
         
         Args:
-            parcels: Liste des parcelles
+            parcels: Parcelles (liste ou générateur, consommé au fur et à mesure)
             sheet_name: Nom de la feuille
+
+        Returns:
+            Dict: Nombre de parcelles ('count') et superficie totale ('total_area')
         """
-        sheet = self.create_sheet(sheet_name)
-        
-        # En-têtes
-        headers = [
-            'ID', 'Référence', 'Adresse', 'Superficie (m²)', 
-            'Zone', 'Statut', 'Propriétaire', 'Date création'
-        ]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = sheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = self.header_font
-            cell.fill = self.header_fill
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = self.border
+        sheet = self._start_table_sheet(sheet_name, PARCEL_HEADERS)
         
         # Données
-        for row_num, parcel in enumerate(parcels, 2):
-            sheet.cell(row=row_num, column=1).value = parcel.get('id')
-            sheet.cell(row=row_num, column=2).value = parcel.get('reference_cadastrale')
-            sheet.cell(row=row_num, column=3).value = parcel.get('address')
-            sheet.cell(row=row_num, column=4).value = parcel.get('area')
-            sheet.cell(row=row_num, column=5).value = parcel.get('zone')
-            sheet.cell(row=row_num, column=6).value = parcel.get('status')
-            sheet.cell(row=row_num, column=7).value = parcel.get('owner_name', 'N/A')
-            
-            # Date formatée
-            created_at = parcel.get('created_at')
-            if created_at:
-                if isinstance(created_at, str):
-                    created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                sheet.cell(row=row_num, column=8).value = created_at
-                sheet.cell(row=row_num, column=8).number_format = 'DD/MM/YYYY'
-            
-            # Bordures
-            for col in range(1, 9):
-                sheet.cell(row=row_num, column=col).border = self.border
+        count = 0
+        total_area = 0.0
+        for count, parcel in enumerate(parcels, 1):
+            area = parcel.get('area')
+            total_area += area or 0
+            self._append_row(sheet, count + 1, [
+                parcel.get('id'),
+                parcel.get('reference_cadastrale'),
+                parcel.get('address'),
+                area,
+                parcel.get('zone'),
+                parcel.get('status'),
+                parcel.get('owner_name') or 'N/A',
+                _as_datetime(parcel.get('created_at')) or None
+            ], {7: 'siu_date'})
         
-        # Auto-ajuster les colonnes
-        for col in range(1, 9):
-            sheet.column_dimensions[get_column_letter(col)].width = 15
-        
-        # Ajouter des filtres
-        sheet.auto_filter.ref = f"A1:H{len(parcels) + 1}"
+        self._finish_table_sheet(sheet, 'Parcelles', PARCEL_HEADERS, count)
         
         # Ligne de total pour superficie
-        total_row = len(parcels) + 2
-        sheet.cell(row=total_row, column=3).value = "TOTAL:"
-        sheet.cell(row=total_row, column=3).font = Font(bold=True)
-        
-        sheet.cell(row=total_row, column=4).value = f"=SUM(D2:D{len(parcels) + 1})"
-        sheet.cell(row=total_row, column=4).font = Font(bold=True)
+        total_row = count + 2
+        total = ["TOTAL:", f"=SUM(D2:D{count + 1})"]
+        if self.write_only:
+            sheet.append([None, None] + [self._styled(sheet, value, 'siu_total') for value in total])
+        else:
+            for col, value in enumerate(total, 3):
+                sheet.cell(row=total_row, column=col).value = value
+                sheet.cell(row=total_row, column=col).style = 'siu_total'
+
+        return {'count': count, 'total_area': total_area}
     
     def export_documents(
         self,
-        documents: List[Dict[str, Any]],
+        documents: Iterable[Dict[str, Any]],
         sheet_name: str = "Documents"
-    ):
-        """Exporte une liste de documents"""
-        sheet = self.create_sheet(sheet_name)
-        
-        headers = [
-            'ID', 'Titre', 'Type', 'Taille', 'Statut', 
-            'Uploadé par', 'Date upload', 'Validé'
-        ]
-        
-        # En-têtes avec style
-        for col_num, header in enumerate(headers, 1):
-            cell = sheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = self.header_font
-            cell.fill = self.header_fill
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = self.border
+    ) -> Dict[str, Any]:
+        """
+        Exporte des documents (liste ou générateur, consommé au fur et à mesure)
+
+        Returns:
+            Dict: Nombre de documents ('count'), taille totale en octets ('total_size')
+                et nombre de documents validés ('validated')
+        """
+        sheet = self._start_table_sheet(sheet_name, DOCUMENT_HEADERS)
         
         # Données
-        for row_num, doc in enumerate(documents, 2):
-            sheet.cell(row=row_num, column=1).value = doc.get('id')
-            sheet.cell(row=row_num, column=2).value = doc.get('title')
-            sheet.cell(row=row_num, column=3).value = doc.get('document_type')
-            
+        count = 0
+        total_size = 0
+        validated_count = 0
+        for count, doc in enumerate(documents, 1):
             # Taille formatée
             size = doc.get('file_size', 0)
+            total_size += size or 0
             size_mb = size / (1024 * 1024) if size else 0
-            sheet.cell(row=row_num, column=4).value = f"{size_mb:.2f} MB"
-            
-            sheet.cell(row=row_num, column=5).value = doc.get('status')
-            sheet.cell(row=row_num, column=6).value = doc.get('username', 'N/A')
-            
-            # Date
-            uploaded_at = doc.get('uploaded_at')
-            if uploaded_at:
-                if isinstance(uploaded_at, str):
-                    uploaded_at = datetime.fromisoformat(uploaded_at.replace('Z', '+00:00'))
-                sheet.cell(row=row_num, column=7).value = uploaded_at
-                sheet.cell(row=row_num, column=7).number_format = 'DD/MM/YYYY HH:MM'
-            
-            sheet.cell(row=row_num, column=8).value = 'Oui' if doc.get('validated') else 'Non'
-            
-            # Couleur selon statut
-            status_cell = sheet.cell(row=row_num, column=5)
-            if doc.get('validated'):
-                status_cell.fill = PatternFill(start_color='C8E6C9', end_color='C8E6C9', fill_type='solid')
-            else:
-                status_cell.fill = PatternFill(start_color='FFECB3', end_color='FFECB3', fill_type='solid')
-            
-            # Bordures
-            for col in range(1, 9):
-                sheet.cell(row=row_num, column=col).border = self.border
+            validated = bool(doc.get('validated'))
+            validated_count += validated
+
+            self._append_row(sheet, count + 1, [
+                doc.get('id'),
+                doc.get('title'),
+                doc.get('document_type'),
+                f"{size_mb:.2f} MB",
+                doc.get('status'),
+                doc.get('username') or 'N/A',
+                _as_datetime(doc.get('uploaded_at')) or None,
+                'Oui' if validated else 'Non'
+            ], {4: 'siu_valid' if validated else 'siu_pending', 6: 'siu_datetime'})
         
-        # Auto-ajuster
-        for col in range(1, 9):
-            sheet.column_dimensions[get_column_letter(col)].width = 15
+        self._finish_table_sheet(sheet, 'Documents', DOCUMENT_HEADERS, count)
+        return {'count': count, 'total_size': total_size, 'validated': validated_count}
     
     def add_summary_sheet(self, stats: Dict[str, Any]):
         """Ajoute une feuille de résumé avec statistiques"""
         sheet = self.create_sheet("Résumé", activate=False)
+        sheet.column_dimensions['A'].width = 30
+        sheet.column_dimensions['B'].width = 20
+
+        if self.write_only:
+            # Pas de fusion de cellules en mode write_only
+            title = WriteOnlyCell(sheet, value=self.title)
+            title.font = Font(size=18, bold=True, color='673AB7')
+            generated = WriteOnlyCell(sheet, value=f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
+            generated.font = Font(size=10, italic=True)
+            sheet.append([title])
+            sheet.append([generated])
+            sheet.append([])
+            for key, value in stats.items():
+                sheet.append([self._styled(sheet, key, 'siu_total'), value])
+            return
         
         # Titre
         sheet['A1'] = self.title
@@ -184,10 +269,6 @@ class ExcelService:
             sheet.cell(row=row, column=1).font = Font(bold=True)
             sheet.cell(row=row, column=2).value = value
             row += 1
-        
-        # Auto-ajuster
-        sheet.column_dimensions['A'].width = 30
-        sheet.column_dimensions['B'].width = 20
     
     def add_chart(
         self,
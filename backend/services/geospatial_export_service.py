@@ -1,32 +1,147 @@
 """
 Service pour l'export de données géospatiales.
-Supporte GeoJSON, Shapefile, KML, CSV avec coordonnées.
+Supporte GeoJSON, Shapefile, GeoPackage, KML, CSV avec coordonnées.
+
+Les exports GeoJSON, KML et CSV sont produits en flux (méthodes iter_*) : les
+parcelles sont consommées une à une, sans construire la liste complète ni le
+fichier entier en mémoire. Les formats Shapefile et GeoPackage, dont les en-têtes
+dépendent du contenu complet, sont écrits entité par entité dans des fichiers
+temporaires (voir gis_writers) puis envoyés par morceaux.
 """
-from typing import List, Dict, Any, Optional
-from io import BytesIO
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape
 import json
+import os
+import tempfile
 import zipfile
-import csv
 from datetime import datetime
 
+import shapely
+
+from backend.config import EXPORT_BATCH_SIZE, EXPORT_CHUNK_SIZE
+from backend.core.spatial_index import parse_geometry
+from backend.core.streaming_export import iter_csv
+from backend.services.gis_writers import (
+    GeoPackageWriter, ShapefileWriter, SHP_POINT, SHP_POLYGON, to_multipolygon
+)
+
+
+# Colonnes de l'export CSV avec coordonnées
+CSV_FIELDNAMES = [
+    'id', 'reference', 'address', 'area', 'zone', 'category',
+    'status', 'owner_name', 'latitude', 'longitude',
+    'created_at', 'updated_at'
+]
+
+# Champs attributaires des exports Shapefile et GeoPackage (noms dBASE de 10 caractères max)
+GIS_FIELDS = [
+    ('id', 'C', 36, 0), ('reference', 'C', 50, 0), ('address', 'C', 254, 0), ('area', 'N', 18, 2),
+    ('zone', 'C', 80, 0), ('category', 'C', 50, 0), ('status', 'C', 20, 0), ('owner_name', 'C', 100, 0),
+    ('latitude', 'N', 18, 8), ('longitude', 'N', 18, 8), ('created_at', 'C', 19, 0), ('updated_at', 'C', 19, 0)
+]
+# Couches SIG : parcelles délimitées par un polygone, et points déclarés de toutes les parcelles
+POLYGON_LAYER = 'parcelles'
+POINT_LAYER = 'parcelles_points'
+
+KML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+<name>Parcelles SIU</name>
+<description>Export des parcelles du Système d'Information Urbain</description>
+<Style id="parcel-available">
+<IconStyle><color>ff00ff00</color></IconStyle>
+</Style>
+<Style id="parcel-reserved">
+<IconStyle><color>ff0000ff</color></IconStyle>
+</Style>
+<Style id="parcel-sold">
+<IconStyle><color>ffff0000</color></IconStyle>
+</Style>
+"""
+
+
+def _or_na(value: Any) -> Any:
+    return 'N/A' if value is None or value == '' else value
+
+
+def _gis_features(parcels: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Any, Any]]:
+    # (parcelle, polygone ou None, point déclaré ou None) ; le WKB normalisé, s'il est
+    # fourni, se décode bien plus vite que le GeoJSON
+    for parcel in parcels:
+        shape = parse_geometry(parcel.get("geometry_wkb") or parcel.get("geometry"))
+        polygon = shape if shape is not None and shape.geom_type in ('Polygon', 'MultiPolygon') else None
+        point = None
+        if parcel.get("latitude") is not None and parcel.get("longitude") is not None:
+            point = shapely.Point(parcel["longitude"], parcel["latitude"])
+        yield parcel, polygon, point
+
+
+class _ZipSink:
+    """Flux d'écriture non positionnable : recueille les octets produits par zipfile"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> List[bytes]:
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
 
 class GeospatialExportService:
     """Service dédié à l'export de données géospatiales dans différents formats."""
 
-    def export_geojson(self, parcels: List[Dict[str, Any]]) -> bytes:
+    @staticmethod
+    def parcel_records(rows: Iterable[Any]) -> Iterator[Dict[str, Any]]:
         """
-        Exporte les parcelles au format GeoJSON.
-        
+        Convertit au fil de l'eau les lignes de IParcelRepository.iter_export_rows
+        en parcelles au format attendu par les exports
+
         Args:
-            parcels: Liste de parcelles avec leurs coordonnées
-            
-        Returns:
-            bytes: Contenu du fichier GeoJSON
+            rows: Lignes exposant les colonnes de la parcelle et owner_name
         """
-        features = []
-        
+        for row in rows:
+            yield {
+                "id": row.id,
+                "reference": row.reference_cadastrale,
+                "address": row.address,
+                "area": row.area,
+                "zone": row.zone,
+                "category": row.category,
+                "status": row.status,
+                "owner_name": row.owner_name or None,
+                "latitude": row.coordinates_lat,
+                "longitude": row.coordinates_lng,
+                "geometry": row.geometry_geojson or row.geometry,
+                "geometry_wkb": row.geometry_wkb,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            }
+
+    def iter_geojson(self, parcels: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """
+        Exporte les parcelles au format GeoJSON, feature par feature.
+
+        Le nombre de features, connu seulement à la fin, est écrit dans les
+        métadonnées placées après la liste des features.
+
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+
+        Yields:
+            bytes: Morceaux successifs du fichier GeoJSON
+        """
+        crs = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
+        yield f'{{"type": "FeatureCollection", "crs": {json.dumps(crs)}, "features": ['.encode('utf-8')
+
+        total = 0
         for parcel in parcels:
-            # Créer une feature GeoJSON pour chaque parcelle
             feature = {
                 "type": "Feature",
                 "properties": {
@@ -42,7 +157,7 @@ class GeospatialExportService:
                 },
                 "geometry": None
             }
-            
+
             # Gérer les différents types de géométrie
             if parcel.get("latitude") and parcel.get("longitude"):
                 feature["geometry"] = {
@@ -52,122 +167,212 @@ class GeospatialExportService:
             elif parcel.get("geometry"):
                 # Si la géométrie est déjà en format GeoJSON
                 feature["geometry"] = parcel["geometry"]
-            
-            features.append(feature)
-        
-        geojson = {
-            "type": "FeatureCollection",
-            "crs": {
-                "type": "name",
-                "properties": {
-                    "name": "urn:ogc:def:crs:OGC:1.3:CRS84"
-                }
-            },
-            "features": features,
-            "metadata": {
-                "export_date": datetime.now().isoformat(),
-                "total_features": len(features),
-                "source": "SIU - Système d'Information Urbain"
-            }
+
+            separator = ',\n' if total else '\n'
+            yield (separator + json.dumps(feature, ensure_ascii=False, default=str)).encode('utf-8')
+            total += 1
+
+        metadata = {
+            "export_date": datetime.now().isoformat(),
+            "total_features": total,
+            "source": "SIU - Système d'Information Urbain"
         }
-        
-        return json.dumps(geojson, ensure_ascii=False, indent=2).encode('utf-8')
+        yield f'\n], "metadata": {json.dumps(metadata, ensure_ascii=False)}}}\n'.encode('utf-8')
 
-    def export_shapefile(self, parcels: List[Dict[str, Any]]) -> bytes:
+    def export_geojson(self, parcels: List[Dict[str, Any]]) -> bytes:
         """
-        Exporte les parcelles au format Shapefile (ZIP contenant .shp, .shx, .dbf, .prj).
+        Exporte les parcelles au format GeoJSON.
         
         Args:
             parcels: Liste de parcelles avec leurs coordonnées
             
         Returns:
-            bytes: Contenu du fichier ZIP contenant les fichiers Shapefile
+            bytes: Contenu du fichier GeoJSON
         """
-        # Pour une implémentation complète, on utiliserait pyshp ou fiona
-        # Pour l'instant, on crée un GeoJSON et on le met dans un ZIP
-        
-        geojson_content = self.export_geojson(parcels)
-        
-        # Créer un fichier ZIP
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Ajouter le GeoJSON (peut être converti en Shapefile avec des outils externes)
-            zip_file.writestr('parcels.geojson', geojson_content)
-            
-            # Ajouter un fichier README
-            readme = f"""SIU - Export Shapefile
-Export date: {datetime.now().isoformat()}
-Total parcels: {len(parcels)}
+        return b''.join(self.iter_geojson(parcels))
+
+    def write_shapefiles(self, parcels: Iterable[Dict[str, Any]], directory: str) -> List[str]:
+        """
+        Écrit les couches Shapefile des parcelles dans un dossier, entité par entité.
+
+        Deux couches : POLYGON_LAYER (parcelles délimitées par un polygone) et
+        POINT_LAYER (coordonnées déclarées de toutes les parcelles).
 
-Note: Ce fichier contient les données au format GeoJSON.
-Pour convertir en Shapefile (.shp), utilisez QGIS ou ogr2ogr:
-  ogr2ogr -f "ESRI Shapefile" parcels.shp parcels.geojson
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+            directory: Dossier de destination
+
+        Returns:
+            List[str]: Chemins des fichiers écrits (.shp, .shx, .dbf, .prj, .cpg et README)
+        """
+        with ShapefileWriter(os.path.join(directory, POLYGON_LAYER), SHP_POLYGON, GIS_FIELDS) as polygons, \
+                ShapefileWriter(os.path.join(directory, POINT_LAYER), SHP_POINT, GIS_FIELDS) as points:
+            for parcel, polygon, point in _gis_features(parcels):
+                if polygon is not None:
+                    polygons.write(polygon, parcel)
+                points.write(point, parcel)
+
+        readme = os.path.join(directory, 'README.txt')
+        with open(readme, 'w', encoding='utf-8') as f:
+            f.write(f"""SIU - Export Shapefile
+Export date: {datetime.now().isoformat()}
+{POLYGON_LAYER}.shp : {polygons.count} parcelles délimitées (polygones)
+{POINT_LAYER}.shp : {points.count} parcelles (coordonnées déclarées)
 
 Système de coordonnées: WGS84 (EPSG:4326)
-"""
-            zip_file.writestr('README.txt', readme)
-        
-        zip_buffer.seek(0)
-        return zip_buffer.read()
+Encodage des attributs: UTF-8 (fichiers .cpg)
+""")
+        return polygons.files + points.files + [readme]
 
-    def export_kml(self, parcels: List[Dict[str, Any]]) -> bytes:
+    def iter_shapefile(self, parcels: Iterable[Dict[str, Any]],
+                       chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
         """
-        Exporte les parcelles au format KML (Google Earth).
+        Exporte les parcelles au format Shapefile, dans une archive ZIP envoyée par morceaux.
+
+        Les couches sont écrites dans un dossier temporaire (les en-têtes Shapefile
+        dépendent du contenu complet), puis compressées à la volée.
+
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+
+        Yields:
+            bytes: Morceaux successifs de l'archive ZIP
+        """
+        with tempfile.TemporaryDirectory(prefix='siu_shp_') as directory:
+            files = self.write_shapefiles(parcels, directory)
+            sink = _ZipSink()
+            with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for path in files:
+                    info = zipfile.ZipInfo(os.path.basename(path), date_time=datetime.now().timetuple()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    force_zip64 = os.path.getsize(path) > zipfile.ZIP64_LIMIT
+                    with open(path, 'rb') as source, archive.open(info, 'w', force_zip64=force_zip64) as target:
+                        for chunk in iter(lambda: source.read(chunk_size), b''):
+                            target.write(chunk)
+                            yield from sink.drain()
+                    yield from sink.drain()
+            yield from sink.drain()
+
+    def export_shapefile(self, parcels: List[Dict[str, Any]]) -> bytes:
+        """
+        Exporte les parcelles au format Shapefile (ZIP contenant .shp, .shx, .dbf, .prj, .cpg).
         
         Args:
             parcels: Liste de parcelles avec leurs coordonnées
             
         Returns:
-            bytes: Contenu du fichier KML
+            bytes: Contenu du fichier ZIP contenant les fichiers Shapefile
         """
-        kml_parts = [
-            '<?xml version="1.0" encoding="UTF-8"?>',
-            '<kml xmlns="http://www.opengis.net/kml/2.2">',
-            '<Document>',
-            '<name>Parcelles SIU</name>',
-            '<description>Export des parcelles du Système d\'Information Urbain</description>',
-            
-            # Styles
-            '<Style id="parcel-available">',
-            '<IconStyle><color>ff00ff00</color></IconStyle>',
-            '</Style>',
-            '<Style id="parcel-reserved">',
-            '<IconStyle><color>ff0000ff</color></IconStyle>',
-            '</Style>',
-            '<Style id="parcel-sold">',
-            '<IconStyle><color>ffff0000</color></IconStyle>',
-            '</Style>',
-        ]
-        
-        # Ajouter les placemarks pour chaque parcelle
+        return b''.join(self.iter_shapefile(parcels))
+
+    def write_geopackage(self, parcels: Iterable[Dict[str, Any]], path: str,
+                         batch_size: int = EXPORT_BATCH_SIZE) -> None:
+        """
+        Écrit les parcelles dans un GeoPackage, par lots, avec index spatial R-tree.
+
+        Mêmes couches que l'export Shapefile : POLYGON_LAYER (MULTIPOLYGON) et POINT_LAYER.
+
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+            path: Chemin du fichier .gpkg (remplacé s'il existe)
+            batch_size: Nombre d'entités insérées par lot
+        """
+        with GeoPackageWriter(path, batch_size=batch_size) as writer:
+            writer.add_layer(POLYGON_LAYER, 'MULTIPOLYGON', GIS_FIELDS, 'Parcelles délimitées (SIU)')
+            writer.add_layer(POINT_LAYER, 'POINT', GIS_FIELDS, 'Coordonnées déclarées des parcelles (SIU)')
+            for parcel, polygon, point in _gis_features(parcels):
+                if polygon is not None:
+                    writer.write(POLYGON_LAYER, to_multipolygon(polygon), parcel)
+                writer.write(POINT_LAYER, point, parcel)
+
+    def iter_geopackage(self, parcels: Iterable[Dict[str, Any]],
+                        chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Exporte les parcelles au format GeoPackage, envoyé par morceaux.
+
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+
+        Yields:
+            bytes: Morceaux successifs du fichier .gpkg
+        """
+        with tempfile.TemporaryDirectory(prefix='siu_gpkg_') as directory:
+            path = os.path.join(directory, f'{POLYGON_LAYER}.gpkg')
+            self.write_geopackage(parcels, path)
+            with open(path, 'rb') as source:
+                yield from iter(lambda: source.read(chunk_size), b'')
+
+    def export_geopackage(self, parcels: List[Dict[str, Any]]) -> bytes:
+        """
+        Exporte les parcelles au format GeoPackage.
+
+        Args:
+            parcels: Liste de parcelles avec leurs coordonnées
+
+        Returns:
+            bytes: Contenu du fichier GeoPackage
+        """
+        return b''.join(self.iter_geopackage(parcels))
+
+    def iter_kml(self, parcels: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """
+        Exporte les parcelles au format KML (Google Earth), placemark par placemark.
+
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+
+        Yields:
+            bytes: Morceaux successifs du fichier KML
+        """
+        yield KML_HEADER.encode('utf-8')
+
         for parcel in parcels:
             if parcel.get("latitude") and parcel.get("longitude"):
-                style_id = f"parcel-{parcel.get('status', 'available')}"
-                
-                kml_parts.extend([
+                style_id = f"parcel-{parcel.get('status') or 'available'}"
+                yield '\n'.join([
                     '<Placemark>',
-                    f'<name>{parcel.get("reference", "N/A")}</name>',
+                    f'<name>{escape(str(parcel.get("reference") or "N/A"))}</name>',
                     '<description><![CDATA[',
-                    f'<b>Adresse:</b> {parcel.get("address", "N/A")}<br/>',
-                    f'<b>Surface:</b> {parcel.get("area", "N/A")} m²<br/>',
-                    f'<b>Zone:</b> {parcel.get("zone", "N/A")}<br/>',
-                    f'<b>Catégorie:</b> {parcel.get("category", "N/A")}<br/>',
-                    f'<b>Statut:</b> {parcel.get("status", "N/A")}<br/>',
-                    f'<b>Propriétaire:</b> {parcel.get("owner_name", "N/A")}',
+                    f'<b>Adresse:</b> {_or_na(parcel.get("address"))}<br/>',
+                    f'<b>Surface:</b> {_or_na(parcel.get("area"))} m²<br/>',
+                    f'<b>Zone:</b> {_or_na(parcel.get("zone"))}<br/>',
+                    f'<b>Catégorie:</b> {_or_na(parcel.get("category"))}<br/>',
+                    f'<b>Statut:</b> {_or_na(parcel.get("status"))}<br/>',
+                    f'<b>Propriétaire:</b> {_or_na(parcel.get("owner_name"))}',
                     ']]></description>',
-                    f'<styleUrl>#{style_id}</styleUrl>',
+                    f'<styleUrl>#{escape(style_id)}</styleUrl>',
                     '<Point>',
                     f'<coordinates>{parcel["longitude"]},{parcel["latitude"]},0</coordinates>',
                     '</Point>',
-                    '</Placemark>',
-                ])
-        
-        kml_parts.extend([
-            '</Document>',
-            '</kml>'
-        ])
+                    '</Placemark>\n',
+                ]).encode('utf-8')
+
+        yield b'</Document>\n</kml>\n'
+
+    def export_kml(self, parcels: List[Dict[str, Any]]) -> bytes:
+        """
+        Exporte les parcelles au format KML (Google Earth).
         
-        return '\n'.join(kml_parts).encode('utf-8')
+        Args:
+            parcels: Liste de parcelles avec leurs coordonnées
+            
+        Returns:
+            bytes: Contenu du fichier KML
+        """
+        return b''.join(self.iter_kml(parcels))
+
+    def iter_csv_with_coordinates(self, parcels: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+        """
+        Exporte les parcelles au format CSV avec les coordonnées, ligne par ligne.
+
+        Args:
+            parcels: Parcelles avec leurs coordonnées (consommées au fur et à mesure)
+
+        Yields:
+            bytes: Morceaux successifs du fichier CSV (UTF-8 avec BOM pour Excel)
+        """
+        rows = ({key: parcel.get(key, '') for key in CSV_FIELDNAMES} for parcel in parcels)
+        return iter_csv(CSV_FIELDNAMES, rows, bom=True)
 
     def export_csv_with_coordinates(self, parcels: List[Dict[str, Any]]) -> bytes:
         """
@@ -179,31 +384,4 @@ Système de coordonnées: WGS84 (EPSG:4326)
         Returns:
             bytes: Contenu du fichier CSV
         """
-        csv_buffer = BytesIO()
-        
-        # Définir les colonnes
-        fieldnames = [
-            'id', 'reference', 'address', 'area', 'zone', 'category', 
-            'status', 'owner_name', 'latitude', 'longitude', 
-            'created_at', 'updated_at'
-        ]
-        
-        # Écrire en mode texte
-        import io
-        text_buffer = io.StringIO()
-        writer = csv.DictWriter(text_buffer, fieldnames=fieldnames, extrasaction='ignore')
-        
-        # Écrire l'en-tête
-        writer.writeheader()
-        
-        # Écrire les données
-        for parcel in parcels:
-            # Préparer les données
-            row = {key: parcel.get(key, '') for key in fieldnames}
-            writer.writerow(row)
-        
-        # Convertir en bytes
-        csv_content = text_buffer.getvalue().encode('utf-8-sig')  # UTF-8 avec BOM pour Excel
-        text_buffer.close()
-        
-        return csv_content
+        return b''.join(self.iter_csv_with_coordinates(parcels))
@@ -0,0 +1,386 @@
+"""
+Écriture native des formats SIG : Shapefile (.shp, .shx, .dbf, .prj, .cpg) et GeoPackage
+
+Les deux writers écrivent les entités au fil de l'eau dans des fichiers sur disque :
+la mémoire consommée ne dépend pas du nombre d'entités. Les en-têtes qui dépendent
+du contenu (taille des fichiers, nombre d'enregistrements, emprise) sont complétés
+à la fermeture.
+
+Coordonnées en WGS84 (EPSG:4326), x = longitude, y = latitude.
+"""
+import os
+import sqlite3
+import struct
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import shapely
+from shapely.geometry.polygon import orient
+
+# Types de formes Shapefile
+SHP_NULL = 0
+SHP_POINT = 1
+SHP_POLYGON = 5
+
+# Système de coordonnées des exports (WGS84)
+WGS84_PRJ = (
+    'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_84",6378137.0,298.257223563]],'
+    'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]'
+)
+WGS84_GPKG_DEFINITION = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],'
+    'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],'
+    'UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]'
+)
+
+# Champ attributaire : (nom, type dBASE C ou N, largeur, décimales)
+Field = Tuple[str, str, int, int]
+
+
+def _polygon_parts(shape) -> List[List[Tuple[float, float]]]:
+    """Anneaux d'un polygone ou multipolygone, extérieurs horaires et trous anti-horaires"""
+    polygons = shape.geoms if shape.geom_type == 'MultiPolygon' else [shape]
+    parts = []
+    for polygon in polygons:
+        polygon = orient(polygon, sign=-1.0)
+        parts.append(list(polygon.exterior.coords))
+        parts.extend(list(ring.coords) for ring in polygon.interiors)
+    return parts
+
+
+class ShapefileWriter:
+    """
+    Écrit une couche Shapefile enregistrement par enregistrement
+
+    Une couche ne contient qu'un type de forme (SHP_POINT ou SHP_POLYGON) ; les
+    entités sans géométrie sont écrites comme formes nulles. Les chaînes sont
+    encodées en UTF-8 (déclaré dans le .cpg) et tronquées à la largeur du champ.
+    """
+
+    def __init__(self, base_path: str, shape_type: int, fields: Sequence[Field]):
+        if shape_type not in (SHP_POINT, SHP_POLYGON):
+            raise ValueError(f"Type de forme non supporté: {shape_type}")
+        for name, field_type, _, _ in fields:
+            if len(name) > 10 or field_type not in ('C', 'N'):
+                raise ValueError(f"Champ dBASE invalide: {name} ({field_type})")
+        self.base_path = base_path
+        self.shape_type = shape_type
+        self.fields = list(fields)
+        self.count = 0
+        self._bbox = None
+        self._record_length = 1 + sum(width for _, _, width, _ in self.fields)
+
+        self._shp = open(f"{base_path}.shp", 'wb')
+        self._shx = open(f"{base_path}.shx", 'wb')
+        self._dbf = open(f"{base_path}.dbf", 'wb')
+        # En-têtes provisoires, réécrits par close()
+        self._shp.write(b'\0' * 100)
+        self._shx.write(b'\0' * 100)
+        self._dbf.write(self._dbf_header())
+
+        with open(f"{base_path}.prj", 'w', encoding='ascii') as prj:
+            prj.write(WGS84_PRJ)
+        with open(f"{base_path}.cpg", 'w', encoding='ascii') as cpg:
+            cpg.write('UTF-8')
+
+    @property
+    def files(self) -> List[str]:
+        return [f"{self.base_path}.{extension}" for extension in ('shp', 'shx', 'dbf', 'prj', 'cpg')]
+
+    def write(self, shape, attributes: Dict[str, Any]) -> None:
+        """
+        Ajoute un enregistrement
+
+        Args:
+            shape: Géométrie shapely du type de la couche, ou None (forme nulle)
+            attributes: Valeurs des champs, par nom
+        """
+        content = self._shape_content(shape)
+        offset = self._shp.tell()
+        self.count += 1
+        self._shp.write(struct.pack('>2i', self.count, len(content) // 2))
+        self._shp.write(content)
+        self._shx.write(struct.pack('>2i', offset // 2, len(content) // 2))
+        self._dbf.write(self._dbf_record(attributes))
+
+    def close(self) -> None:
+        """Complète les en-têtes (tailles, emprise, nombre d'enregistrements) et ferme les fichiers"""
+        if self._shp.closed:
+            return
+        self._dbf.write(b'\x1a')
+        for handle in (self._shp, self._shx):
+            length = handle.tell()
+            handle.seek(0)
+            handle.write(self._shp_header(length))
+            handle.close()
+        self._dbf.seek(0)
+        self._dbf.write(self._dbf_header())
+        self._dbf.close()
+
+    def __enter__(self) -> 'ShapefileWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _extend_bbox(self, bounds: Tuple[float, float, float, float]) -> None:
+        if self._bbox is None:
+            self._bbox = list(bounds)
+        else:
+            self._bbox = [min(self._bbox[0], bounds[0]), min(self._bbox[1], bounds[1]),
+                          max(self._bbox[2], bounds[2]), max(self._bbox[3], bounds[3])]
+
+    def _shape_content(self, shape) -> bytes:
+        if shape is None or shape.is_empty:
+            return struct.pack('<i', SHP_NULL)
+
+        if self.shape_type == SHP_POINT:
+            if shape.geom_type != 'Point':
+                raise ValueError(f"Géométrie {shape.geom_type} dans une couche de points")
+            self._extend_bbox(shape.bounds)
+            return struct.pack('<i2d', SHP_POINT, shape.x, shape.y)
+
+        if shape.geom_type not in ('Polygon', 'MultiPolygon'):
+            raise ValueError(f"Géométrie {shape.geom_type} dans une couche de polygones")
+        parts = _polygon_parts(shape)
+        self._extend_bbox(shape.bounds)
+        indexes, start = [], 0
+        for ring in parts:
+            indexes.append(start)
+            start += len(ring)
+        points = [coordinate for ring in parts for point in ring for coordinate in point[:2]]
+        return b''.join([
+            struct.pack('<i4d2i', SHP_POLYGON, *shape.bounds, len(parts), start),
+            struct.pack(f'<{len(indexes)}i', *indexes),
+            struct.pack(f'<{len(points)}d', *points),
+        ])
+
+    def _shp_header(self, length: int) -> bytes:
+        bbox = self._bbox or [0.0, 0.0, 0.0, 0.0]
+        return (struct.pack('>7i', 9994, 0, 0, 0, 0, 0, length // 2)
+                + struct.pack('<2i4d4d', 1000, self.shape_type, *bbox, 0.0, 0.0, 0.0, 0.0))
+
+    def _dbf_header(self) -> bytes:
+        today = date.today()
+        header_length = 32 + 32 * len(self.fields) + 1
+        header = struct.pack('<B3BIHH20x', 0x03, today.year - 1900, today.month, today.day,
+                             self.count, header_length, self._record_length)
+        descriptors = b''.join(
+            struct.pack('<11sc4xBB14x', name.encode('ascii'), field_type.encode('ascii'), width, decimals)
+            for name, field_type, width, decimals in self.fields
+        )
+        return header + descriptors + b'\r'
+
+    def _dbf_record(self, attributes: Dict[str, Any]) -> bytes:
+        values = [b' ']  # Enregistrement non supprimé
+        for name, field_type, width, decimals in self.fields:
+            value = attributes.get(name)
+            if value is None or value == '':
+                values.append(b' ' * width)
+            elif field_type == 'N':
+                text = f"{float(value):.{decimals}f}" if decimals else str(int(value))
+                values.append(text.encode('ascii')[:width].rjust(width))
+            else:
+                encoded = str(value).encode('utf-8')[:width]
+                # Ne pas couper un caractère multi-octets
+                encoded = encoded.decode('utf-8', errors='ignore').encode('utf-8')
+                values.append(encoded.ljust(width))
+        return b''.join(values)
+
+
+# Types SQL GeoPackage des champs dBASE
+_GPKG_TYPES = {'C': 'TEXT', 'N': 'REAL'}
+
+_RTREE_TRIGGERS = """
+CREATE TRIGGER "rtree_{t}_{c}_insert" AFTER INSERT ON "{t}"
+  WHEN (new."{c}" NOT NULL AND NOT ST_IsEmpty(NEW."{c}"))
+BEGIN
+  INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (
+    NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"), ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}"));
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update1" AFTER UPDATE OF "{c}" ON "{t}"
+  WHEN OLD."{i}" = NEW."{i}" AND (NEW."{c}" NOTNULL AND NOT ST_IsEmpty(NEW."{c}"))
+BEGIN
+  INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (
+    NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"), ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}"));
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update2" AFTER UPDATE OF "{c}" ON "{t}"
+  WHEN OLD."{i}" = NEW."{i}" AND (NEW."{c}" ISNULL OR ST_IsEmpty(NEW."{c}"))
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}";
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update3" AFTER UPDATE ON "{t}"
+  WHEN OLD."{i}" != NEW."{i}" AND (NEW."{c}" NOTNULL AND NOT ST_IsEmpty(NEW."{c}"))
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}";
+  INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (
+    NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"), ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}"));
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update4" AFTER UPDATE ON "{t}"
+  WHEN OLD."{i}" != NEW."{i}" AND (NEW."{c}" ISNULL OR ST_IsEmpty(NEW."{c}"))
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id IN (OLD."{i}", NEW."{i}");
+END;
+CREATE TRIGGER "rtree_{t}_{c}_delete" AFTER DELETE ON "{t}"
+  WHEN old."{c}" NOT NULL
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}";
+END;
+"""
+
+
+class GeoPackageWriter:
+    """
+    Écrit des couches vectorielles dans un GeoPackage (OGC 1.3) avec index spatial R-tree
+
+    Les entités sont insérées par lots de batch_size ; l'index spatial
+    (extension gpkg_rtree_index) est alimenté en même temps, à partir des
+    emprises calculées à l'écriture : le fichier s'ouvre sans reconstruction
+    d'index dans QGIS/GDAL.
+    """
+
+    GEOMETRY_COLUMN = 'geom'
+
+    def __init__(self, path: str, batch_size: int = 1000, srs_id: int = 4326):
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.batch_size = max(batch_size, 1)
+        self.srs_id = srs_id
+        self._layers: Dict[str, Dict[str, Any]] = {}
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(f"""
+            PRAGMA application_id = 1196444487;
+            PRAGMA user_version = 10300;
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+            CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+                description TEXT DEFAULT '',
+                last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER,
+                CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id));
+            CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name),
+                CONSTRAINT fk_gc_tn FOREIGN KEY (table_name) REFERENCES gpkg_contents(table_name),
+                CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id));
+            CREATE TABLE gpkg_extensions (
+                table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL,
+                definition TEXT NOT NULL, scope TEXT NOT NULL,
+                CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name));
+        """)
+        self._connection.executemany("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+            ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', 'undefined cartesian coordinate reference system'),
+            ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', 'undefined geographic coordinate reference system'),
+            ('WGS 84 geodetic', 4326, 'EPSG', 4326, WGS84_GPKG_DEFINITION, 'longitude/latitude coordinates in WGS84'),
+        ])
+
+    def add_layer(self, table: str, geometry_type: str, fields: Sequence[Field], description: str = '') -> None:
+        """
+        Déclare une couche (table d'entités)
+
+        Args:
+            table: Nom de la table
+            geometry_type: POINT, POLYGON, MULTIPOLYGON...
+            fields: Champs attributaires (types dBASE : C texte, N réel)
+        """
+        columns = ', '.join(f'"{name}" {_GPKG_TYPES[field_type]}' for name, field_type, _, _ in fields)
+        self._connection.executescript(f"""
+            CREATE TABLE "{table}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, "{self.GEOMETRY_COLUMN}" {geometry_type}, {columns});
+            CREATE VIRTUAL TABLE "rtree_{table}_{self.GEOMETRY_COLUMN}" USING rtree(id, minx, maxx, miny, maxy);
+        """)
+        self._connection.execute(
+            "INSERT INTO gpkg_contents (table_name, data_type, identifier, description, srs_id) VALUES (?, 'features', ?, ?, ?)",
+            (table, table, description, self.srs_id)
+        )
+        self._connection.execute("INSERT INTO gpkg_geometry_columns VALUES (?, ?, ?, ?, 0, 0)",
+                                 (table, self.GEOMETRY_COLUMN, geometry_type, self.srs_id))
+        self._connection.execute(
+            "INSERT INTO gpkg_extensions VALUES (?, ?, 'gpkg_rtree_index', "
+            "'http://www.geopackage.org/spec120/#extension_rtree', 'write-only')",
+            (table, self.GEOMETRY_COLUMN)
+        )
+        names = [name for name, _, _, _ in fields]
+        quoted = ', '.join(f'"{name}"' for name in names)
+        placeholders = ', '.join('?' * (len(names) + 2))
+        self._layers[table] = {
+            'fields': names,
+            'insert': f'INSERT INTO "{table}" (fid, "{self.GEOMETRY_COLUMN}", {quoted}) VALUES ({placeholders})',
+            'rows': [], 'index': [], 'count': 0, 'bbox': None
+        }
+
+    def write(self, table: str, shape, attributes: Dict[str, Any]) -> None:
+        """
+        Ajoute une entité à une couche
+
+        Args:
+            shape: Géométrie shapely (convertie en multipolygone pour une couche MULTIPOLYGON), ou None
+            attributes: Valeurs des champs, par nom
+        """
+        layer = self._layers[table]
+        layer['count'] += 1
+        fid = layer['count']
+        blob = None
+        if shape is not None and not shape.is_empty:
+            min_x, min_y, max_x, max_y = shape.bounds
+            blob = self._geometry_blob(shape, (min_x, max_x, min_y, max_y))
+            layer['index'].append((fid, min_x, max_x, min_y, max_y))
+            bbox = layer['bbox']
+            layer['bbox'] = (min_x, min_y, max_x, max_y) if bbox is None else (
+                min(bbox[0], min_x), min(bbox[1], min_y), max(bbox[2], max_x), max(bbox[3], max_y))
+        layer['rows'].append((fid, blob, *(attributes.get(name) for name in layer['fields'])))
+        if len(layer['rows']) >= self.batch_size:
+            self._flush(table)
+
+    def close(self) -> None:
+        """Écrit les lots restants, l'emprise des couches et les triggers de l'index spatial"""
+        if self._connection is None:
+            return
+        for table, layer in self._layers.items():
+            self._flush(table)
+            if layer['bbox'] is not None:
+                self._connection.execute(
+                    "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ? WHERE table_name = ?",
+                    (*layer['bbox'], table)
+                )
+            # Triggers de maintenance de l'index (fonctions ST_* fournies par le lecteur GeoPackage)
+            self._connection.executescript(_RTREE_TRIGGERS.format(t=table, c=self.GEOMETRY_COLUMN, i='fid'))
+        self._connection.commit()
+        self._connection.close()
+        self._connection = None
+
+    def __enter__(self) -> 'GeoPackageWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _flush(self, table: str) -> None:
+        layer = self._layers[table]
+        if layer['rows']:
+            self._connection.executemany(layer['insert'], layer['rows'])
+            layer['rows'] = []
+        if layer['index']:
+            self._connection.executemany(
+                f'INSERT INTO "rtree_{table}_{self.GEOMETRY_COLUMN}" VALUES (?, ?, ?, ?, ?)', layer['index']
+            )
+            layer['index'] = []
+
+    def _geometry_blob(self, shape, envelope: Tuple[float, float, float, float]) -> bytes:
+        # En-tête GeoPackageBinary : magic, version 0, flags (enveloppe XY, little-endian), srs_id, enveloppe
+        header = struct.pack('<2sBBi4d', b'GP', 0, 0b00000011, self.srs_id, *envelope)
+        return header + shapely.to_wkb(shape, output_dimension=2, byte_order=1)
+
+
+def to_multipolygon(shape) -> Optional[Any]:
+    """Convertit un polygone en multipolygone (type homogène d'une couche MULTIPOLYGON)"""
+    if shape is None or shape.geom_type == 'MultiPolygon':
+        return shape
+    if shape.geom_type == 'Polygon':
+        return shapely.MultiPolygon([shape])
+    return None
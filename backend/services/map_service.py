@@ -5,6 +5,7 @@ Ce service gère:
 - Génération de GeoJSON (RFC 7946) pour l'affichage cartographique
 - Calcul des limites (bounds) de la carte
 - Filtrage spatial des parcelles
+- Encodage des tuiles vectorielles (Mapbox Vector Tile)
 - Validation de la géométrie
 """
 
@@ -12,6 +13,15 @@ from typing import List, Dict, Optional, Tuple
 from backend.models.parcel import Parcel
 import json
 
+# Paramètres des tuiles vectorielles (MVT)
+MVT_LAYER_NAME = 'parcels'
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+# Tolérance Douglas-Peucker en unités de tuile : ~1 pixel quel que soit le zoom
+MVT_SIMPLIFY_TOLERANCE = 1.0
+# En dessous de cette surface (unités de tuile²), une parcelle est rendue comme un point
+MVT_MIN_POLYGON_AREA = 4.0
+
 
 class MapService:
     """Service pour les opérations cartographiques"""
@@ -104,64 +114,23 @@ class MapService:
     def _create_geometry(self, parcel: Parcel) -> dict:
         """
         Crée l'objet geometry pour une parcelle
-        
-        Supporte: Polygon, MultiPolygon, et génération automatique
-        
+
+        Utilise la géométrie normalisée à l'écriture (Parcel.geometry_geojson) ;
+        à défaut, génère un carré autour du point central.
+
         Args:
             parcel: Parcelle
-            
+
         Returns:
             dict: Geometry object (GeoJSON)
         """
-        if parcel.geometry:
-            # Cas 1: Géométrie est déjà un dict GeoJSON
-            if isinstance(parcel.geometry, dict):
-                if 'type' in parcel.geometry and 'coordinates' in parcel.geometry:
-                    return parcel.geometry
-            
-            # Cas 2: Géométrie est une string JSON
-            elif isinstance(parcel.geometry, str):
-                import json
-                try:
-                    geom = json.loads(parcel.geometry)
-                    if isinstance(geom, dict) and 'type' in geom and 'coordinates' in geom:
-                        return geom
-                except:
-                    pass
-            
-            # Cas 3: Géométrie est une liste de coordonnées
-            elif isinstance(parcel.geometry, list) and len(parcel.geometry) >= 4:
-                # Détecter le format et le type
-                if isinstance(parcel.geometry[0], list):
-                    # Tableau imbriqué
-                    if isinstance(parcel.geometry[0][0], list):
-                        # MultiPolygon: [[[lon,lat],...],[[...],...]]
-                        return {
-                            'type': 'MultiPolygon',
-                            'coordinates': [parcel.geometry]
-                        }
-                    else:
-                        # Polygon: [[lon,lat],...]
-                        return {
-                            'type': 'Polygon',
-                            'coordinates': [parcel.geometry]
-                        }
-                else:
-                    # Liste simple [lon,lat,lon,lat,...] → Polygon
-                    coords = []
-                    for i in range(0, len(parcel.geometry), 2):
-                        if i + 1 < len(parcel.geometry):
-                            coords.append([parcel.geometry[i], parcel.geometry[i+1]])
-                    if coords:
-                        return {
-                            'type': 'Polygon',
-                            'coordinates': [coords]
-                        }
-        
+        if parcel.geometry_geojson:
+            return parcel.geometry_geojson
+
         # Fallback: Générer un polygone carré à partir du point central
-        if parcel.coordinates:
-            lat = parcel.coordinates['lat']
-            lng = parcel.coordinates['lng']
+        if parcel.coordinates_lat is not None and parcel.coordinates_lng is not None:
+            lat = parcel.coordinates_lat
+            lng = parcel.coordinates_lng
             
             # Calculer l'offset basé sur la superficie
             import math
@@ -216,31 +185,13 @@ class MapService:
         """
         if not parcels:
             return None
-        
-        # Initialiser avec les coordonnées de la première parcelle
-        first_parcel = parcels[0]
-        min_lat = max_lat = first_parcel.coordinates['lat']
-        min_lng = max_lng = first_parcel.coordinates['lng']
-        
-        # Parcourir toutes les parcelles pour trouver les extrema
-        for parcel in parcels:
-            # Si la parcelle a une géométrie, utiliser tous ses points
-            if parcel.geometry:
-                for point in parcel.geometry:
-                    lng, lat = point
-                    min_lat = min(min_lat, lat)
-                    max_lat = max(max_lat, lat)
-                    min_lng = min(min_lng, lng)
-                    max_lng = max(max_lng, lng)
-            else:
-                # Sinon utiliser le point central
-                lat = parcel.coordinates['lat']
-                lng = parcel.coordinates['lng']
-                min_lat = min(min_lat, lat)
-                max_lat = max(max_lat, lat)
-                min_lng = min(min_lng, lng)
-                max_lng = max(max_lng, lng)
-        
+
+        # Emprises calculées à l'écriture ; à défaut, point central
+        min_lat = min(p.min_lat if p.min_lat is not None else p.coordinates_lat for p in parcels)
+        min_lng = min(p.min_lng if p.min_lng is not None else p.coordinates_lng for p in parcels)
+        max_lat = max(p.max_lat if p.max_lat is not None else p.coordinates_lat for p in parcels)
+        max_lng = max(p.max_lng if p.max_lng is not None else p.coordinates_lng for p in parcels)
+
         # Calculer le centre
         center_lat = (min_lat + max_lat) / 2
         center_lng = (min_lng + max_lng) / 2
@@ -274,105 +225,16 @@ class MapService:
         filtered = []
 
         for parcel in parcels:
-            # Vérifier si la parcelle intersecte la bbox
-            if parcel.geometry:
-                # Extraire les points de la géométrie selon son format
-                points = self._extract_points_from_geometry(parcel.geometry)
-
-                # Vérifier si au moins un point du polygone est dans la bbox
-                for lng, lat in points:
-                    if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
-                        filtered.append(parcel)
-                        break
-            else:
-                # Vérifier le point central
-                lat = parcel.coordinates['lat']
-                lng = parcel.coordinates['lng']
-                if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+            if parcel.min_lat is not None:
+                # Intersection de l'emprise stockée avec la bbox
+                if (parcel.min_lat <= max_lat and parcel.max_lat >= min_lat and
+                        parcel.min_lng <= max_lng and parcel.max_lng >= min_lng):
                     filtered.append(parcel)
+            elif min_lat <= parcel.coordinates_lat <= max_lat and min_lng <= parcel.coordinates_lng <= max_lng:
+                filtered.append(parcel)
 
         return filtered
 
-    def _extract_points_from_geometry(self, geometry):
-        """
-        Extrait les points (lng, lat) d'une géométrie dans différents formats
-
-        Args:
-            geometry: Géométrie dans divers formats (dict, list, string)
-
-        Returns:
-            List[Tuple[float, float]]: Liste de points (lng, lat)
-        """
-        points = []
-
-        if geometry is None:
-            return points
-
-        # Si c'est une chaîne JSON, la parser
-        if isinstance(geometry, str):
-            import json
-            try:
-                geometry = json.loads(geometry)
-            except:
-                return points
-
-        # Si c'est un dictionnaire (GeoJSON), extraire les coordonnées
-        if isinstance(geometry, dict):
-            if 'coordinates' in geometry:
-                coords = geometry['coordinates']
-                # Gérer les différents types de géométries GeoJSON
-                points.extend(self._extract_points_from_coordinates(coords))
-        elif isinstance(geometry, list):
-            # Si c'est une liste de coordonnées directes
-            points.extend(self._extract_points_from_coordinates(geometry))
-
-        return points
-
-    def _extract_points_from_coordinates(self, coords):
-        """
-        Extrait les points (lng, lat) des coordonnées selon leur structure
-
-        Args:
-            coords: Coordonnées dans divers formats imbriqués
-
-        Returns:
-            List[Tuple[float, float]]: Liste de points (lng, lat)
-        """
-        points = []
-
-        if coords is None:
-            return points
-
-        # Limiter la profondeur de récursion pour éviter les attaques par déni de service
-        if isinstance(coords, list) and len(coords) > 10000:
-            return points  # Retourner une liste vide si la structure est trop grande
-
-        # Si c'est une liste de points [lng, lat]
-        if isinstance(coords, list) and len(coords) > 0:
-            # Vérifier si c'est une liste de points [lng, lat]
-            if isinstance(coords[0], (int, float)) and len(coords) >= 2:
-                # C'est une liste de coordonnées linéaires [lng, lat, lng, lat, ...]
-                for i in range(0, len(coords), 2):
-                    if i + 1 < len(coords):
-                        points.append((coords[i], coords[i+1]))
-            # Sinon, c'est une liste imbriquée de structures complexes
-            else:
-                for item in coords:
-                    if isinstance(item, list):
-                        # Gérer les structures imbriquées comme Polygon ou MultiPolygon
-                        if len(item) > 0 and isinstance(item[0], (int, float)):
-                            # C'est un point [lng, lat]
-                            if len(item) >= 2:
-                                points.append((item[0], item[1]))
-                        else:
-                            # Limiter la profondeur de récursion pour éviter les attaques par déni de service
-                            if len(points) > 10000:  # Limiter le nombre total de points
-                                break
-                            # C'est une structure imbriquée, explorer récursivement
-                            points.extend(self._extract_points_from_coordinates(item))
-
-        return points
-    
     @staticmethod
     def validate_geometry(geometry: List[List[float]]) -> Tuple[bool, Optional[str]]:
         """
@@ -448,3 +310,124 @@ class MapService:
         ]
         
         return square
+
+    @staticmethod
+    def tile_to_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+        """
+        Convertit une tuile XYZ (Web Mercator) en bounding box
+
+        Args:
+            z: Niveau de zoom
+            x: Colonne de la tuile
+            y: Ligne de la tuile (origine en haut à gauche)
+
+        Returns:
+            Tuple (min_lat, min_lng, max_lat, max_lng)
+        """
+        import math
+
+        n = 2 ** z
+        if z < 0 or not (0 <= x < n) or not (0 <= y < n):
+            raise ValueError(f"Tuile invalide: {z}/{x}/{y}")
+
+        def tile_lat(row: int) -> float:
+            return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+        min_lng = x / n * 360.0 - 180.0
+        max_lng = (x + 1) / n * 360.0 - 180.0
+        return tile_lat(y + 1), min_lng, tile_lat(y), max_lng
+
+    @staticmethod
+    def tile_query_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+        """
+        Bounding box d'une tuile élargie de la marge de découpage MVT
+
+        Returns:
+            Tuple (min_lat, min_lng, max_lat, max_lng)
+        """
+        min_lat, min_lng, max_lat, max_lng = MapService.tile_to_bbox(z, x, y)
+        margin = MVT_BUFFER / MVT_EXTENT
+        lat_margin = (max_lat - min_lat) * margin
+        lng_margin = (max_lng - min_lng) * margin
+        return min_lat - lat_margin, min_lng - lng_margin, max_lat + lat_margin, max_lng + lng_margin
+
+    def generate_vector_tile(self, parcels: List[Parcel], z: int, x: int, y: int) -> bytes:
+        """
+        Encode les parcelles d'une tuile XYZ au format Mapbox Vector Tile
+
+        Les géométries sont projetées en coordonnées de tuile, découpées avec une
+        marge de MVT_BUFFER, simplifiées (Douglas-Peucker, ~1 pixel) puis quantifiées
+        sur la grille MVT_EXTENT par l'encodeur. Les parcelles sans géométrie, ou
+        plus petites qu'un pixel à ce zoom, sont rendues comme des points.
+
+        Args:
+            parcels: Parcelles intersectant la tuile
+            z, x, y: Coordonnées de la tuile
+
+        Returns:
+            bytes: Tuile encodée en protobuf
+        """
+        import numpy as np
+        import shapely
+        import mapbox_vector_tile
+
+        n = 2 ** z
+
+        def to_tile_coords(coords):
+            lng = coords[:, 0]
+            lat = np.radians(np.clip(coords[:, 1], -85.05112878, 85.05112878))
+            px = ((lng + 180.0) / 360.0 * n - x) * MVT_EXTENT
+            py = ((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n - y) * MVT_EXTENT
+            return np.column_stack([px, py])
+
+        kept = [p for p in parcels
+                if p.geometry_wkb is not None or (p.coordinates_lat is not None and p.coordinates_lng is not None)]
+        geoms = shapely.from_wkb(np.array([p.geometry_wkb for p in kept], dtype=object))
+        missing = shapely.is_missing(geoms)
+        if missing.any():
+            geoms[missing] = shapely.points([(p.coordinates_lng, p.coordinates_lat)
+                                             for p, m in zip(kept, missing) if m])
+
+        # Opérations vectorisées sur l'ensemble des géométries de la tuile
+        geoms = shapely.transform(geoms, to_tile_coords)
+        geoms = shapely.clip_by_rect(geoms, -MVT_BUFFER, -MVT_BUFFER,
+                                     MVT_EXTENT + MVT_BUFFER, MVT_EXTENT + MVT_BUFFER)
+        polygonal = np.isin(shapely.get_type_id(geoms), (3, 6))
+        too_small = polygonal & (shapely.area(geoms) < MVT_MIN_POLYGON_AREA)
+        geoms = np.where(too_small, shapely.point_on_surface(geoms), geoms)
+        simplify = polygonal & ~too_small
+        geoms[simplify] = shapely.simplify(geoms[simplify], MVT_SIMPLIFY_TOLERANCE, preserve_topology=True)
+
+        features = [
+            {'geometry': geom, 'properties': self._vector_tile_properties(parcel)}
+            for parcel, geom, empty in zip(kept, geoms, shapely.is_empty(geoms))
+            if not empty
+        ]
+
+        return mapbox_vector_tile.encode(
+            [{'name': MVT_LAYER_NAME, 'features': features}],
+            default_options={
+                'extents': MVT_EXTENT,
+                'y_coord_down': True,
+                'on_invalid_geometry': mapbox_vector_tile.encoder.on_invalid_geometry_make_valid
+            }
+        )
+
+    @staticmethod
+    def _vector_tile_properties(parcel: Parcel) -> dict:
+        """
+        Propriétés minimales nécessaires au style de la carte
+        """
+        category = parcel.category.value if hasattr(parcel.category, 'value') else parcel.category
+        if parcel.status:
+            parcel_status = parcel.status
+        else:
+            parcel_status = 'occupied' if parcel.owner_id else 'available'
+
+        properties = {
+            'id': parcel.id,
+            'reference': parcel.reference_cadastrale,
+            'category': str(category) if category else 'Indefini',
+            'status': parcel_status
+        }
+        return {k: v for k, v in properties.items() if v is not None}
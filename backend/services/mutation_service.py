@@ -4,7 +4,8 @@ Service de gestion des mutations foncières
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from backend.core.repository_interfaces import IMutationRepository, IUserRepository, IParcelRepository, IDocumentRepository
-from backend.models.mutation import ParcelMutation
+from backend.core.exceptions import InvalidDataException
+from backend.models.mutation import ParcelMutation, MutationStatus
 from backend.models.user import User
 from backend.models.parcel import Parcel
 from backend.models.document import Document
@@ -827,6 +828,29 @@ class MutationService:
             'total_pages': mutations['total_pages']
         }
 
+    def get_all_mutations(self, status: Optional[str] = None, limit: int = 20, offset: int = 0,
+                          cursor: Optional[str] = None, total_mode: str = 'cached') -> Dict[str, Any]:
+        """
+        Récupère une page de mutations, des plus récentes aux plus anciennes
+
+        Args:
+            status: Statut des mutations (valeur de MutationStatus)
+            cursor: next_cursor de la page précédente (prioritaire sur offset)
+            total_mode: Calcul du total ('exact', 'cached', 'estimate' ou 'none')
+
+        Returns:
+            dict: items (mutations), next_cursor, has_more, total, page_size, total_pages
+        """
+        criteria = {}
+        if status:
+            try:
+                criteria['status'] = MutationStatus(status)
+            except ValueError:
+                raise InvalidDataException(f"Statut de mutation invalide: {status}", field='status')
+        return self.mutation_repository.search_page(
+            criteria, limit=limit, offset=offset, cursor=cursor, total_mode=total_mode
+        )
+
     def _mutation_to_dict(self, mutation: ParcelMutation) -> Dict[str, Any]:
         """
         Convertit une mutation en dictionnaire
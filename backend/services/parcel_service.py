@@ -1,12 +1,13 @@
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import uuid
-import asyncio
-from backend.core.repository_interfaces import IParcelRepository, IParcelHistoryRepository
+from backend.core.repository_interfaces import IParcelRepository, IParcelHistoryRepository, PARCEL_STATISTICS_DIMENSIONS
 from backend.services.admin_service import AdminService
 from backend.services.websocket_service import NotificationService
+from backend.core.notification_outbox import notification_outbox
 from backend.services.map_service import MapService
 from backend.services.availability_service import AvailabilityService
+from backend.core.spatial_index import parcel_spatial_index
 from backend.core.exceptions import (
     EntityNotFoundException,
     InvalidDataException,
@@ -77,6 +78,7 @@ class ParcelService:
         )
 
         saved_parcel = self.parcel_repository.create(parcel)
+        parcel_spatial_index.upsert_parcel(saved_parcel)
 
         history = ParcelHistory(
             parcel_id=saved_parcel.id,
@@ -86,15 +88,15 @@ class ParcelService:
         )
         self.parcel_history_repository.create(history)
 
-        try:
-            loop = asyncio.get_event_loop()
-            loop.create_task(NotificationService.notify_parcel_created(
-                parcel_id=saved_parcel.id,
-                parcel_ref=saved_parcel.reference_cadastrale,
-                created_by=created_by_user_id
-            ))
-        except Exception as e:
-            print(f"Erreur notification WebSocket: {e}")
+        notification_outbox.enqueue(
+            NotificationService.notify_parcel_created,
+            parcel_id=saved_parcel.id,
+            parcel_ref=saved_parcel.reference_cadastrale,
+            created_by=created_by_user_id,
+            zone=saved_parcel.zone,
+            lat=saved_parcel.coordinates_lat,
+            lng=saved_parcel.coordinates_lng
+        )
 
         return {
             'success': True,
@@ -148,15 +150,15 @@ class ParcelService:
         )
         self.parcel_history_repository.create(history)
 
-        try:
-            loop = asyncio.get_event_loop()
-            loop.create_task(NotificationService.notify_parcel_updated(
-                parcel_id=parcel_id,
-                parcel_ref=updated_parcel.reference_cadastrale,
-                updated_by=assigned_by_user_id
-            ))
-        except Exception as e:
-            print(f"Erreur notification WebSocket: {e}")
+        notification_outbox.enqueue(
+            NotificationService.notify_parcel_updated,
+            parcel_id=parcel_id,
+            parcel_ref=updated_parcel.reference_cadastrale,
+            updated_by=assigned_by_user_id,
+            zone=updated_parcel.zone,
+            lat=updated_parcel.coordinates_lat,
+            lng=updated_parcel.coordinates_lng
+        )
 
         return {
             'success': True,
@@ -187,16 +189,17 @@ class ParcelService:
 
         parcel.update_info(**update_data, updated_by=updated_by_user_id)
         updated_parcel = self.parcel_repository.update(parcel_id, parcel)
+        parcel_spatial_index.upsert_parcel(updated_parcel)
 
-        try:
-            loop = asyncio.get_event_loop()
-            loop.create_task(NotificationService.notify_parcel_updated(
-                parcel_id=parcel_id,
-                parcel_ref=updated_parcel.reference_cadastrale,
-                updated_by=updated_by_user_id
-            ))
-        except Exception as e:
-            print(f"Erreur notification WebSocket: {e}")
+        notification_outbox.enqueue(
+            NotificationService.notify_parcel_updated,
+            parcel_id=parcel_id,
+            parcel_ref=updated_parcel.reference_cadastrale,
+            updated_by=updated_by_user_id,
+            zone=updated_parcel.zone,
+            lat=updated_parcel.coordinates_lat,
+            lng=updated_parcel.coordinates_lng
+        )
 
         return {
             'success': True,
@@ -214,39 +217,35 @@ class ParcelService:
             return False
 
         parcel_ref = parcel.reference_cadastrale
+        parcel_zone, parcel_lat, parcel_lng = parcel.zone, parcel.coordinates_lat, parcel.coordinates_lng
         
         self.parcel_history_repository.delete_by_parcel_id(parcel_id)
         self.parcel_repository.delete(parcel_id)
+        parcel_spatial_index.remove(parcel_id)
 
-        try:
-            loop = asyncio.get_event_loop()
-            loop.create_task(NotificationService.notify_parcel_deleted(
-                parcel_id=parcel_id,
-                parcel_ref=parcel_ref,
-                deleted_by=deleted_by_user_id
-            ))
-        except Exception as e:
-            print(f"Erreur notification WebSocket: {e}")
+        notification_outbox.enqueue(
+            NotificationService.notify_parcel_deleted,
+            parcel_id=parcel_id,
+            parcel_ref=parcel_ref,
+            deleted_by=deleted_by_user_id,
+            zone=parcel_zone,
+            lat=parcel_lat,
+            lng=parcel_lng
+        )
 
         return True
     
-    def search_parcels(self, search_criteria: Dict[str, Any]) -> Dict[str, Any]:
+    def search_parcels(self, search_criteria: Dict[str, Any], cursor: Optional[str] = None,
+                       total_mode: str = 'cached') -> Dict[str, Any]:
         """
         Recherche des parcelles selon les critères spécifiés avec pagination.
+
+        La page suivante s'obtient en repassant next_cursor (pagination par curseur,
+        coût constant quelle que soit la profondeur) ; le numéro de page reste accepté.
         """
-        page = search_criteria.get('page', 1)
-        page_size = search_criteria.get('page_size', 100)
-        
-        results = self.parcel_repository.search(search_criteria)
-        total = self.parcel_repository.count_search(search_criteria)
-        
-        return {
-            'items': [p.to_dict() for p in results],
-            'total': total,
-            'page': page,
-            'page_size': page_size,
-            'total_pages': (total + page_size - 1) // page_size if total > 0 else 1
-        }
+        result = self.parcel_repository.search_page(search_criteria, cursor=cursor, total_mode=total_mode)
+        result['items'] = [p.to_dict() for p in result['items']]
+        return result
     
     def get_all_parcels(self) -> List[Dict[str, Any]]:
         """Récupère toutes les parcelles depuis la base de données"""
@@ -299,7 +298,33 @@ class ParcelService:
                 return self.parcel_repository.get_by_owner(current_user.id)
 
         return self.parcel_repository.get_all()
-    
+
+    def get_parcels_for_map(self, current_user=None, bbox: Optional[Tuple[float, float, float, float]] = None,
+                            category: Optional[str] = None, owner_id: Optional[str] = None) -> List[Parcel]:
+        """
+        Récupère les parcelles d'une emprise pour la carte, les filtres étant appliqués en base
+
+        Args:
+            current_user: Utilisateur courant (restreint à ses parcelles s'il n'est ni admin ni manager)
+            bbox: Tuple (min_lat, min_lng, max_lat, max_lng)
+            category: Filtre par catégorie
+            owner_id: Filtre par propriétaire
+        """
+        if current_user and not is_admin_or_manager(current_user):
+            if owner_id and owner_id != current_user.id:
+                return []
+            owner_id = current_user.id
+
+        return self.parcel_repository.get_for_map(bbox=bbox, category=category, owner_id=owner_id)
+
+    def get_vector_tile(self, current_user, z: int, x: int, y: int, category: Optional[str] = None) -> bytes:
+        """
+        Génère la tuile vectorielle (MVT) z/x/y des parcelles visibles par l'utilisateur
+        """
+        bbox = MapService.tile_query_bbox(z, x, y)
+        parcels = self.get_parcels_for_map(current_user, bbox=bbox, category=category)
+        return MapService().generate_vector_tile(parcels, z, x, y)
+
     def update_parcel_geometry(self, parcel_id: str, geometry: List[List[float]], updated_by_user_id: str) -> Dict[str, Any]:
         """
         Met à jour uniquement la géométrie d'une parcelle
@@ -319,6 +344,7 @@ class ParcelService:
         parcel.geometry = geometry
         parcel.updated_at = datetime.now()
         self.parcel_repository.update(parcel_id, parcel)
+        parcel_spatial_index.upsert_parcel(parcel)
 
         history = ParcelHistory(
             parcel_id=parcel_id,
@@ -329,15 +355,15 @@ class ParcelService:
         )
         self.parcel_history_repository.create(history)
 
-        try:
-            loop = asyncio.get_event_loop()
-            loop.create_task(NotificationService.notify_parcel_updated(
-                parcel_id=parcel_id,
-                parcel_ref=parcel.reference_cadastrale,
-                updated_by=updated_by_user_id
-            ))
-        except Exception as e:
-            print(f"Erreur notification WebSocket: {e}")
+        notification_outbox.enqueue(
+            NotificationService.notify_parcel_updated,
+            parcel_id=parcel_id,
+            parcel_ref=parcel.reference_cadastrale,
+            updated_by=updated_by_user_id,
+            zone=parcel.zone,
+            lat=parcel.coordinates_lat,
+            lng=parcel.coordinates_lng
+        )
 
         return {
             'success': True,
@@ -417,36 +443,22 @@ class ParcelService:
             - total_area: Surface totale en m²
             - average_area: Surface moyenne en m²
         """
-        all_parcels = self.parcel_repository.get_all()
-
-        total = len(all_parcels)
-
-        # Statistiques par catégorie
-        by_category = {}
-        for parcel in all_parcels:
-            category = parcel.category or 'Indefini'
-            by_category[category] = by_category.get(category, 0) + 1
-
-        # Statistiques par statut
-        by_status = {}
-        for parcel in all_parcels:
-            status = parcel.status or 'available'
-            by_status[status] = by_status.get(status, 0) + 1
-
-        # Statistiques par zone
-        by_zone = {}
-        for parcel in all_parcels:
-            zone = parcel.zone or 'Non définie'
-            by_zone[zone] = by_zone.get(zone, 0) + 1
-
-        # Calcul des surfaces
-        total_area = sum(parcel.area for parcel in all_parcels if parcel.area)
+        rows = self.parcel_repository.get_statistics_aggregates()
+
+        total, total_area, min_area, max_area = 0, 0, None, None
+        by_dimension = {name: {} for name in PARCEL_STATISTICS_DIMENSIONS}
+        for dimension, key, count, area_sum, area_min, area_max in rows:
+            if dimension == 'total':
+                total, total_area, min_area, max_area = count, area_sum or 0, area_min, area_max
+            else:
+                by_dimension[dimension][key] = count
+
+        by_category = by_dimension['category']
+        by_status = by_dimension['status']
+        by_zone = by_dimension['zone']
         average_area = total_area / total if total > 0 else 0
-
-        # Trouver min et max
-        areas = [parcel.area for parcel in all_parcels if parcel.area]
-        min_area = min(areas) if areas else 0
-        max_area = max(areas) if areas else 0
+        min_area = min_area or 0
+        max_area = max_area or 0
 
         return {
             'total': total,
@@ -472,40 +484,33 @@ class ParcelService:
         Returns:
             List[Dict]: Liste des parcelles à proximité avec leurs distances
         """
-        import math
-
         # Récupérer la parcelle de référence
         reference_parcel = self.get_parcel_by_id(parcel_id)
         if not reference_parcel:
             raise EntityNotFoundException("Parcelle", parcel_id)
 
-        # Récupérer toutes les parcelles
-        all_parcels = self.parcel_repository.get_all()
+        # Interroger l'index spatial puis charger uniquement les parcelles trouvées
+        matches = self._get_spatial_index().nearby(
+            reference_parcel.coordinates_lat, reference_parcel.coordinates_lng, radius_km
+        )
+        distances = {match_id: distance for match_id, distance in matches if match_id != parcel_id}
+        parcels = self.parcel_repository.get_by_ids(list(distances.keys()))
 
-        # Calculer la distance entre la parcelle de référence et toutes les autres
         nearby_parcels = []
-        for parcel in all_parcels:
-            # Ne pas inclure la parcelle elle-même
-            if parcel.id == parcel_id:
-                continue
-
-            # Calculer la distance en kilomètres
-            distance = self._calculate_distance(
-                reference_parcel.coordinates_lat, reference_parcel.coordinates_lng,
-                parcel.coordinates_lat, parcel.coordinates_lng
-            )
-
-            # Ajouter à la liste si dans le rayon
-            if distance <= radius_km:
-                parcel_dict = parcel.to_dict()
-                parcel_dict['distance_km'] = round(distance, 3)
-                nearby_parcels.append(parcel_dict)
+        for parcel in parcels:
+            parcel_dict = parcel.to_dict()
+            parcel_dict['distance_km'] = round(distances[parcel.id], 3)
+            nearby_parcels.append(parcel_dict)
 
         # Trier par distance croissante
         nearby_parcels.sort(key=lambda x: x['distance_km'])
 
         return nearby_parcels
 
+    def _get_spatial_index(self):
+        """Retourne l'index spatial des parcelles, construit au premier appel"""
+        return parcel_spatial_index.ensure_built(self.parcel_repository.get_spatial_index_rows)
+
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
         Calcule la distance entre deux points géographiques en kilomètres
@@ -11,6 +11,9 @@ from sqlalchemy import text
 from .pdf_generator import PDFGenerator
 from .excel_service import ExcelService
 
+from backend.config import EXPORT_BATCH_SIZE
+from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
+
 # Import des modèles nécessaires
 from backend.models.document_model import Document
 from backend.models.parcel import Parcel
@@ -171,45 +174,9 @@ class ReportService:
                 if parcel.coordinates_lat and parcel.coordinates_lng:
                     # pdf.add_section("6. Localisation Géographique")
 
-                    # Calculer les coordonnées à partir de la géométrie si disponible
-                    center_lat = float(parcel.coordinates_lat)
-                    center_lon = float(parcel.coordinates_lng)
-                    
-                    # Si la géométrie est disponible, recalculer le centroïde
-                    if parcel.geometry:
-                        try:
-                            import json
-                            geom_data = json.loads(json.dumps(parcel.geometry)) if isinstance(parcel.geometry, str) else parcel.geometry
-                            
-                            if geom_data and 'coordinates' in geom_data:
-                                coords = geom_data['coordinates']
-                                
-                                if geom_data['type'] == 'Polygon':
-                                    # Calculer le centroïde du polygone principal
-                                    all_coords = []
-                                    for poly_coords in coords:
-                                        if poly_coords:
-                                            all_coords.extend([(float(coord[0]), float(coord[1])) for coord in poly_coords if len(coord) >= 2])
-                                    
-                                    if all_coords:
-                                        center_lon = sum(coord[0] for coord in all_coords) / len(all_coords)
-                                        center_lat = sum(coord[1] for coord in all_coords) / len(all_coords)
-                                        
-                                elif geom_data['type'] == 'MultiPolygon':
-                                    # Calculer le centroïde de tous les polygones
-                                    all_coords = []
-                                    for polygon in coords:
-                                        for poly_coords in polygon:
-                                            if poly_coords:
-                                                all_coords.extend([(float(coord[0]), float(coord[1])) for coord in poly_coords if len(coord) >= 2])
-                                    
-                                    if all_coords:
-                                        center_lon = sum(coord[0] for coord in all_coords) / len(all_coords)
-                                        center_lat = sum(coord[1] for coord in all_coords) / len(all_coords)
-                        except Exception as e:
-                            print(f"Erreur lors du calcul du centroïde à partir de la géométrie: {str(e)}")
-                            # Garder les coordonnées par défaut si la géométrie est invalide
-                            pass
+                    # Centroïde de la géométrie, calculé à l'écriture (point déclaré à défaut)
+                    center_lat = float(parcel.centroid_lat if parcel.centroid_lat is not None else parcel.coordinates_lat)
+                    center_lon = float(parcel.centroid_lng if parcel.centroid_lng is not None else parcel.coordinates_lng)
 
                     # Ajouter les coordonnées GPS (calculées à partir de la géométrie si disponible)
                     # coords_info = {
@@ -362,9 +329,9 @@ class ReportService:
                         # Continuer sans les parcelles à proximité si une erreur survient
 
                     # Si la géométrie est disponible, la dessiner
-                    if parcel.geometry:
+                    if parcel.geometry_geojson:
                         try:
-                            geom_data = json.loads(json.dumps(parcel.geometry)) if isinstance(parcel.geometry, str) else parcel.geometry
+                            geom_data = parcel.geometry_geojson
 
                             if geom_data and 'coordinates' in geom_data:
                                 coords = geom_data['coordinates']
@@ -1062,6 +1029,9 @@ class ReportService:
     ) -> bytes:
         """
         Exporte les parcelles vers Excel
+
+        Les parcelles et le nom de leur propriétaire sont lus par une seule requête
+        (jointure), par lots, et écrits en flux dans un classeur write_only.
         
         Args:
             filters: Filtres à appliquer
@@ -1069,8 +1039,8 @@ class ReportService:
         Returns:
             bytes: Contenu du fichier Excel
         """
-        from backend.models.parcel import Parcel
-        
+        import re
+
         # Valider les filtres d'entrée
         if filters:
             if not isinstance(filters, dict):
@@ -1082,48 +1052,22 @@ class ReportService:
             if invalid_keys:
                 raise ValueError(f"Filtres non autorisés: {invalid_keys}")
 
-        query = self.db.query(Parcel)
+            # Valider que la zone et le statut ne contiennent pas de caractères spéciaux
+            if filters.get('zone') and not re.match(r'^[a-zA-Z0-9 _-]+$', str(filters['zone'])):
+                raise ValueError("La zone contient des caractères non valides")
+            if filters.get('status') and not re.match(r'^[a-zA-Z0-9 _-]+$', str(filters['status'])):
+                raise ValueError("Le statut contient des caractères non valides")
 
-        # Appliquer les filtres
-        if filters:
-            if filters.get('zone'):
-                # Valider que la zone ne contient pas de caractères spéciaux
-                import re
-                if not re.match(r'^[a-zA-Z0-9 _-]+$', str(filters['zone'])):
-                    raise ValueError("La zone contient des caractères non valides")
-                query = query.filter(Parcel.zone == filters['zone'])
-            if filters.get('status'):
-                # Valider que le statut ne contient pas de caractères spéciaux
-                if not re.match(r'^[a-zA-Z0-9 _-]+$', str(filters['status'])):
-                    raise ValueError("Le statut contient des caractères non valides")
-                query = query.filter(Parcel.status == filters['status'])
-        
-        parcels = query.all()
+        rows = SqlParcelRepository(self.db).iter_export_rows(filters or {}, batch_size=EXPORT_BATCH_SIZE)
         
         # Créer l'Excel
-        excel = ExcelService(title="Export Parcelles SIU")
-        
-        # Convertir en dictionnaires
-        parcels_data = []
-        for parcel in parcels:
-            parcels_data.append({
-                'id': parcel.id,
-                'reference_cadastrale': parcel.reference_cadastrale,
-                'address': parcel.address,
-                'area': parcel.area,
-                'zone': parcel.zone,
-                'status': parcel.status,
-                'owner_name': parcel.owner.full_name if parcel.owner else 'N/A',
-                'created_at': parcel.created_at
-            })
-        
-        # Export
-        excel.export_parcels(parcels_data)
+        excel = ExcelService(title="Export Parcelles SIU", write_only=True)
+        totals = excel.export_parcels(row._mapping for row in rows)
         
         # Stats
         stats = {
-            "Total parcelles": len(parcels),
-            "Superficie totale": f"{sum(p.area or 0 for p in parcels)} m²",
+            "Total parcelles": totals['count'],
+            "Superficie totale": f"{totals['total_area']} m²",
             "Date d'export": datetime.now().strftime("%d/%m/%Y %H:%M")
         }
         excel.add_summary_sheet(stats)
@@ -1319,9 +1263,17 @@ class ReportService:
         self,
         parcel_id: Optional[str] = None
     ) -> bytes:
-        """Exporte les documents vers Excel"""
+        """
+        Exporte les documents vers Excel
+
+        Documents et nom de l'auteur de l'upload sont lus par une seule requête
+        (jointure), par lots, et écrits en flux dans un classeur write_only.
+        """
 
-        query = self.db.query(Document).filter(Document.deleted == False)
+        query = self.db.query(
+            Document.id, Document.original_filename, Document.document_type, Document.file_size,
+            Document.is_public, Document.uploaded_at, User.username
+        ).outerjoin(User, User.id == Document.uploaded_by).filter(Document.deleted == False)
 
         if parcel_id:
             # Valider que l'ID est un UUID valide pour éviter les injections
@@ -1331,31 +1283,26 @@ class ReportService:
                 raise ValueError("ID de parcelle invalide")
             query = query.filter(Document.parcel_id == parcel_id)
 
-        documents = query.all()
+        rows = query.order_by(Document.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
 
         # Créer l'Excel
-        excel = ExcelService(title="Export Documents SIU")
-
-        # Convertir
-        docs_data = []
-        for doc in documents:
-            docs_data.append({
-                'id': doc.id,
-                'title': doc.title,
-                'document_type': doc.document_type,
-                'file_size': doc.file_size,
-                'status': doc.status,
-                'username': 'N/A',  # À compléter avec join
-                'uploaded_at': doc.uploaded_at,
-                'validated': doc.validated
-            })
-
-        excel.export_documents(docs_data)
+        excel = ExcelService(title="Export Documents SIU", write_only=True)
+
+        # Convertir (le modèle n'a ni titre ni statut de validation : nom d'origine et visibilité)
+        totals = excel.export_documents({
+            'id': row.id,
+            'title': row.original_filename,
+            'document_type': row.document_type,
+            'file_size': row.file_size,
+            'status': 'Public' if row.is_public else 'Privé',
+            'username': row.username,
+            'uploaded_at': row.uploaded_at
+        } for row in rows)
 
         stats = {
-            "Total documents": len(documents),
-            "Taille totale": f"{sum(d.file_size or 0 for d in documents) / (1024*1024):.2f} MB",
-            "Documents validés": sum(1 for d in documents if d.validated)
+            "Total documents": totals['count'],
+            "Taille totale": f"{totals['total_size'] / (1024*1024):.2f} MB",
+            "Documents validés": totals['validated']
         }
         excel.add_summary_sheet(stats)
 
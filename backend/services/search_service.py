@@ -1,13 +1,15 @@
 """
 Service de recherche avancée pour les parcelles et autres entités
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 from sqlalchemy.orm import Session
 from backend.core.repository_interfaces import IParcelRepository, IUserRepository, IDocumentRepository
 from backend.models.parcel import Parcel
 from backend.models.user import User
 from backend.models.document import Document
+from backend.core.spatial_index import parcel_spatial_index, parse_geometry
+from backend.core.exceptions import InvalidDataException
 
 
 class SearchService:
@@ -46,24 +48,26 @@ class SearchService:
             'status': status,
             'zone': zone,
             'min_area': min_area,
-            'max_area': max_area
+            'max_area': max_area,
+            'page': page,
+            'page_size': page_size
         }
         
-        # Effectuer la recherche
-        parcels = self.parcel_repository.search(search_criteria)
-        
-        # Calculer les métadonnées de pagination
-        total = len(parcels)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated_results = parcels[start_idx:end_idx]
+        # Effectuer la recherche, paginée en base (curseur ou numéro de page)
+        result = self.parcel_repository.search_page(
+            search_criteria,
+            cursor=filters.get('cursor'),
+            total_mode=filters.get('total_mode', 'cached')
+        )
         
         return {
-            'results': [self._parcel_to_dict(p) for p in paginated_results],
-            'total': total,
-            'page': page,
+            'results': [self._parcel_to_dict(p) for p in result['items']],
+            'total': result['total'],
+            'page': result['page'],
             'page_size': page_size,
-            'total_pages': (total + page_size - 1) // page_size
+            'total_pages': result['total_pages'],
+            'next_cursor': result['next_cursor'],
+            'has_more': result['has_more']
         }
 
     def geocode_address(self, address: str) -> List[Dict[str, Any]]:
@@ -99,71 +103,52 @@ class SearchService:
         """
         Recherche les parcelles à proximité d'un point
         """
-        # Pour l'instant, on récupère toutes les parcelles et on filtre manuellement
-        # En production, on utiliserait une requête spatiale avec PostGIS ou équivalent
-        all_parcels = self.parcel_repository.get_all()
-        
-        nearby_parcels = []
-        for parcel in all_parcels:
-            # Calculer la distance approximative (en km) entre deux points
-            # Utilisation de la formule de Haversine simplifiée
-            if hasattr(parcel, 'coordinates_lat') and hasattr(parcel, 'coordinates_lng'):
-                distance = self._calculate_distance(
-                    lat, lng,
-                    parcel.coordinates_lat,
-                    parcel.coordinates_lng
-                )
-                if distance <= radius_km:
-                    nearby_parcels.append(parcel)
-                    
-        # Trier par distance et limiter
-        nearby_parcels.sort(key=lambda p: self._calculate_distance(
-            lat, lng,
-            p.coordinates_lat,
-            p.coordinates_lng
-        ))
-        
-        return [self._parcel_to_dict(p) for p in nearby_parcels[:limit]]
+        # L'index spatial retourne les IDs triés par distance ; seules ces parcelles sont chargées
+        matches = self._get_spatial_index().nearby(lat, lng, radius_km, limit=limit)
+        parcels_by_id = {p.id: p for p in self.parcel_repository.get_by_ids([m[0] for m in matches])}
+
+        return [self._parcel_to_dict(parcels_by_id[parcel_id]) for parcel_id, _ in matches if parcel_id in parcels_by_id]
 
-    def search_within_geometry(self, geometry: List[List[float]], category: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    def search_within_geometry(self, geometry: Union[List[List[float]], Dict[str, Any]], category: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Recherche les parcelles à l'intérieur d'une géométrie
+        Recherche les parcelles entièrement contenues dans une géométrie
         """
-        # Pour l'instant, on récupère toutes les parcelles et on vérifie manuellement
-        # En production, on utiliserait une requête spatiale avec PostGIS
-        all_parcels = self.parcel_repository.get_all()
-        
-        within_parcels = []
-        for parcel in all_parcels:
-            if self._is_parcel_within_geometry(parcel, geometry):
-                # Vérifier les filtres additionnels
-                if category and parcel.category != category:
-                    continue
-                if status and parcel.status != status:
-                    continue
-                within_parcels.append(parcel)
-        
-        return [self._parcel_to_dict(p) for p in within_parcels]
+        return self._search_by_predicate(geometry, 'within', category, status)
 
-    def search_intersecting(self, geometry: List[List[float]], category: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    def search_intersecting(self, geometry: Union[List[List[float]], Dict[str, Any]], category: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Recherche les parcelles qui intersectent une géométrie
         """
-        # Pour l'instant, on récupère toutes les parcelles et on vérifie manuellement
-        # En production, on utiliserait une requête spatiale avec PostGIS
-        all_parcels = self.parcel_repository.get_all()
-        
-        intersecting_parcels = []
-        for parcel in all_parcels:
-            if self._does_parcel_intersect_geometry(parcel, geometry):
-                # Vérifier les filtres additionnels
-                if category and parcel.category != category:
-                    continue
-                if status and parcel.status != status:
-                    continue
-                intersecting_parcels.append(parcel)
-        
-        return [self._parcel_to_dict(p) for p in intersecting_parcels]
+        return self._search_by_predicate(geometry, 'intersects', category, status)
+
+    def _search_by_predicate(self, geometry: Union[List[List[float]], Dict[str, Any]], predicate: str, category: Optional[str], status: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Évalue un prédicat topologique exact via l'index spatial, puis charge uniquement les parcelles retenues
+
+        Args:
+            geometry: Anneau [[lng, lat], ...] ou géométrie GeoJSON (Polygon, MultiPolygon)
+            predicate: 'within' ou 'intersects'
+        """
+        query_shape = parse_geometry(geometry)
+        if query_shape is None:
+            raise InvalidDataException("Géométrie de recherche invalide", field='geometry')
+
+        matching_ids = self._get_spatial_index().query_geometry(query_shape, predicate)
+
+        results = []
+        for parcel in self.parcel_repository.get_by_ids(matching_ids):
+            # Vérifier les filtres additionnels
+            if category and parcel.category != category:
+                continue
+            if status and parcel.status != status:
+                continue
+            results.append(parcel)
+
+        return [self._parcel_to_dict(p) for p in results]
+
+    def _get_spatial_index(self):
+        """Retourne l'index spatial des parcelles, construit au premier appel"""
+        return parcel_spatial_index.ensure_built(self.parcel_repository.get_spatial_index_rows)
 
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """
@@ -184,34 +169,6 @@ class SearchService:
         
         return c * r
 
-    def _is_parcel_within_geometry(self, parcel: Parcel, geometry: List[List[float]]) -> bool:
-        """
-        Vérifie si une parcelle est à l'intérieur d'une géométrie
-        """
-        # Pour l'instant, on vérifie simplement si les coordonnées de la parcelle
-        # sont à l'intérieur du rectangle englobant de la géométrie
-        if not hasattr(parcel, 'coordinates_lat') or not hasattr(parcel, 'coordinates_lng'):
-            return False
-            
-        lat = parcel.coordinates_lat
-        lng = parcel.coordinates_lng
-        
-        # Trouver les bornes de la géométrie
-        min_lat = min(coord[1] for coord in geometry)
-        max_lat = max(coord[1] for coord in geometry)
-        min_lng = min(coord[0] for coord in geometry)
-        max_lng = max(coord[0] for coord in geometry)
-        
-        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
-
-    def _does_parcel_intersect_geometry(self, parcel: Parcel, geometry: List[List[float]]) -> bool:
-        """
-        Vérifie si une parcelle intersecte une géométrie
-        """
-        # Pour l'instant, on utilise la même logique que _is_parcel_within_geometry
-        # mais en pratique, on devrait implémenter une vraie intersection géométrique
-        return self._is_parcel_within_geometry(parcel, geometry)
-
     def _parcel_to_dict(self, parcel: Parcel) -> Dict[str, Any]:
         """
         Convertit une parcelle en dictionnaire
@@ -2,13 +2,31 @@
 Service de gestion du stockage des fichiers
 """
 import os
+import re
 import hashlib
 import shutil
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, BinaryIO
+from typing import Callable, Optional, BinaryIO
 from werkzeug.utils import secure_filename
 
+from backend.config import UPLOAD_CHUNK_SIZE, UPLOAD_SNIFF_SIZE
+
+
+class UploadRejected(ValueError):
+    """Upload refusé pendant la lecture du flux (taille, type de fichier)"""
+
+
+@dataclass
+class StagedUpload:
+    """Upload reçu dans un fichier temporaire, en attente de son emplacement définitif"""
+    temp_path: Path
+    checksum: str
+    size: int
+
+
 class StorageService:
     """Service de stockage sécurisé des fichiers"""
     
@@ -35,8 +53,135 @@ class StorageService:
         Returns:
             tuple: (file_path, checksum, file_size)
         """
+        file_path = self.document_path(parcel_id, document_id, filename)
+        staged = self.receive_upload(file)
+        return self.commit_upload(staged, file_path), staged.checksum, staged.size
+
+    def receive_upload(
+        self,
+        file: BinaryIO,
+        max_size: Optional[int] = None,
+        inspect: Optional[Callable[[bytes], None]] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        sniff_size: int = UPLOAD_SNIFF_SIZE
+    ) -> StagedUpload:
+        """
+        Reçoit un upload en un seul passage, en mémoire bornée
+
+        Chaque bloc est compté, haché (SHA-256) et écrit dans un fichier temporaire
+        du dossier d'upload. Les premiers octets sont passés à `inspect` (détection
+        du type réel) dès qu'ils sont lus : un fichier refusé n'est pas lu en entier.
+
+        Args:
+            file: Flux à lire
+            max_size: Taille maximale en octets (None = illimitée)
+            inspect: Appelé une fois avec les premiers octets, lève UploadRejected pour refuser
+            chunk_size: Taille des blocs lus
+            sniff_size: Nombre d'octets passés à inspect
+
+        Returns:
+            StagedUpload: à placer avec commit_upload ou supprimer avec discard_upload
+
+        Raises:
+            UploadRejected: fichier trop volumineux ou refusé par inspect
+        """
+        tmp_folder = self.base_upload_folder / "tmp"
+        tmp_folder.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=tmp_folder, suffix='.part')
+        temp_path = Path(temp_name)
+
+        checksum = hashlib.sha256()
+        file_size = 0
+        head = b''
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while chunk := file.read(chunk_size):
+                    file_size += len(chunk)
+                    if max_size is not None and file_size > max_size:
+                        raise UploadRejected(f"Fichier trop volumineux. Maximum {max_size // (1024*1024)} MB")
+                    if inspect is not None:
+                        head += chunk[:sniff_size - len(head)]
+                        if len(head) >= sniff_size:
+                            inspect(head)
+                            inspect = None
+                    checksum.update(chunk)
+                    f.write(chunk)
+
+            if inspect is not None and file_size:
+                # Fichier plus court que sniff_size
+                inspect(head)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        return StagedUpload(temp_path, checksum.hexdigest(), file_size)
+
+    def commit_upload(self, staged: StagedUpload, file_path: Path) -> str:
+        """
+        Place un upload reçu à son emplacement définitif (renommage atomique)
+
+        Returns:
+            str: Chemin relatif à base_upload_folder
+        """
+        # Le dossier temporaire est sous base_upload_folder : même système de fichiers
+        os.replace(staged.temp_path, file_path)
+        return str(file_path.relative_to(self.base_upload_folder))
+
+    def discard_upload(self, staged: StagedUpload) -> None:
+        """Supprime un upload reçu qui ne sera pas conservé"""
+        staged.temp_path.unlink(missing_ok=True)
+
+    def blob_path(self, checksum: str) -> Path:
+        """
+        Chemin d'un contenu adressé par son SHA-256 : blobs/ab/cd/<sha256>
+
+        Raises:
+            ValueError: checksum qui n'est pas un SHA-256 hexadécimal
+        """
+        if not re.fullmatch(r'[0-9a-f]{64}', checksum or ''):
+            raise ValueError("Invalid checksum: must be a lowercase hexadecimal SHA-256")
+        return self.base_upload_folder / "blobs" / checksum[:2] / checksum[2:4] / checksum
+
+    def has_blob(self, checksum: str) -> bool:
+        """Indique si le contenu est déjà présent dans le stockage"""
+        return self.blob_path(checksum).exists()
+
+    def commit_blob(self, staged: StagedUpload, replace: bool = False) -> str:
+        """
+        Range un upload reçu dans le stockage adressé par contenu
+
+        Si le contenu est déjà présent, le fichier reçu est simplement supprimé.
+
+        Args:
+            staged: Upload reçu
+            replace: Toujours placer le fichier reçu, même si le blob existe (ligne
+                document_blobs qui vient d'être créée : le fichier présent n'est
+                référencé par aucun document et peut être en cours de balayage)
+
+        Returns:
+            str: Chemin relatif du blob
+        """
+        blob_path = self.blob_path(staged.checksum)
+        if blob_path.exists() and not replace:
+            self.discard_upload(staged)
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            # Deux uploads simultanés du même contenu écrivent les mêmes octets
+            os.replace(staged.temp_path, blob_path)
+        return blob_path.relative_to(self.base_upload_folder).as_posix()
+
+    def delete_blob(self, checksum: str) -> bool:
+        """Supprime un blob du stockage"""
+        return self.delete_document(str(self.blob_path(checksum).relative_to(self.base_upload_folder)))
+
+    def document_path(self, parcel_id: str, document_id: str, filename: str) -> Path:
+        """
+        Chemin de stockage d'un document, après validation des identifiants
+
+        Raises:
+            ValueError: identifiant ou nom de fichier invalide (traversée de chemin)
+        """
         # Valider les IDs pour éviter la traversée de chemin
-        import re
         safe_parcel_id = str(parcel_id)
         if not safe_parcel_id:
             safe_parcel_id = "unassigned"
@@ -67,23 +212,8 @@ class StorageService:
         # Ajouter extension basée sur l'ID du document pour unicité
         file_extension = safe_filename.rsplit('.', 1)[1] if '.' in safe_filename else ''
         stored_filename = f"{document_id}.{file_extension}" if file_extension else str(document_id)
-        file_path = parcel_folder / stored_filename
+        return parcel_folder / stored_filename
 
-        # Calculer checksum pendant l'écriture
-        checksum = hashlib.sha256()
-        file_size = 0
-
-        with open(file_path, 'wb') as f:
-            while chunk := file.read(8192):  # Lire par blocs de 8KB
-                checksum.update(chunk)
-                f.write(chunk)
-                file_size += len(chunk)
-
-        # Retourner le chemin relatif à base_upload_folder
-        relative_path = str(file_path.relative_to(self.base_upload_folder))
-
-        return relative_path, checksum.hexdigest(), file_size
-    
     def save_thumbnail(
         self, 
         thumbnail_data: bytes, 
@@ -176,7 +306,13 @@ class StorageService:
         valid_paths_set = set(valid_paths)
         deleted_count = 0
         
+        tmp_folder = self.base_upload_folder / "tmp"
+        blobs_folder = self.base_upload_folder / "blobs"
         for root, dirs, files in os.walk(self.base_upload_folder):
+            if Path(root) in (tmp_folder, blobs_folder):
+                # Uploads en cours de réception ; blobs gérés par compteur de références
+                dirs.clear()
+                continue
             for file in files:
                 file_path = Path(root) / file
                 relative_path = str(file_path.relative_to(self.base_upload_folder))
@@ -3,21 +3,258 @@ WebSocket Service pour notifications en temps réel
 Gère les connexions WebSocket et broadcast des événements
 """
 
-from typing import Dict, Set, Any
+from typing import Dict, Set, Any, Optional, Tuple, FrozenSet
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
 import json
 import asyncio
 from fastapi import WebSocket, WebSocketDisconnect
 
+from backend.config import (
+    WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_POLICY, WS_SEND_TIMEOUT, WS_COALESCE_WINDOW, EVENT_BUS_REPLAY_LIMIT
+)
+from backend.core.event_bus import EventBus, make_event
+
+SLOW_CONSUMER_POLICIES = ('coalesce', 'drop_oldest', 'disconnect')
+
+# Code de fermeture pour un client trop lent (1013 : Try Again Later)
+WS_1013_TRY_AGAIN_LATER = 1013
+
+# Numéros d'événements mémorisés par client pour le dédoublonnage
+SEEN_SEQS_LIMIT = 2 * EVENT_BUS_REPLAY_LIMIT
+
+# Thème de chaque type d'événement pour les abonnements (par défaut, le type lui-même)
+EVENT_TOPICS = {
+    "parcel_created": "parcels",
+    "parcel_updated": "parcels",
+    "parcel_deleted": "parcels",
+    "document_uploaded": "documents",
+    "document_deleted": "documents",
+    "system_alert": "alerts",
+}
+
+# Événements fusionnés par entité pendant WS_COALESCE_WINDOW avant publication
+COALESCED_EVENT_TYPES = frozenset({"parcel_updated"})
+
+
+def serialize_message(message: Dict[str, Any]) -> str:
+    """Sérialise un message une seule fois pour tous ses destinataires (même format que send_json)"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+    """
+    Clé de regroupement d'un message : seul le plus récent d'une même clé
+    (même type d'événement sur la même entité) est utile à un client en retard
+
+    Les événements de document portent aussi la parcelle : ils sont regroupés par
+    document, sinon deux documents d'une même parcelle s'écraseraient.
+    """
+    data = message.get("data")
+    if not isinstance(data, dict):
+        return None
+    entity_id = data.get("document_id")
+    if entity_id is None:
+        entity_id = data.get("parcel_id")
+    if entity_id is None:
+        return None
+    return message.get("type"), entity_id
+
+
+def event_topic(message: Dict[str, Any]) -> str:
+    message_type = message.get("type")
+    return EVENT_TOPICS.get(message_type, message_type)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """
+    Filtre des événements envoyés à une connexion
+
+    Un événement passe si son thème est demandé (ou aucun thème précisé) et,
+    lorsqu'il concerne une parcelle et que des filtres d'entité sont donnés,
+    s'il correspond à l'un d'eux : identifiant, zone ou position dans la bbox.
+    """
+    topics: FrozenSet[str] = frozenset()
+    zones: FrozenSet[str] = frozenset()
+    parcel_ids: FrozenSet[str] = frozenset()
+    # (min_lng, min_lat, max_lng, max_lat)
+    bbox: Optional[Tuple[float, float, float, float]] = None
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> 'Subscription':
+        """Construit un abonnement depuis un message `subscribe` du client (ValueError si invalide)"""
+        bbox = message.get("bbox")
+        if bbox is not None:
+            bbox = tuple(float(value) for value in bbox)
+            if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+                raise ValueError("bbox attendue : [min_lng, min_lat, max_lng, max_lat]")
+        return cls(
+            topics=frozenset(str(topic) for topic in message.get("topics") or ()),
+            zones=frozenset(str(zone) for zone in message.get("zones") or ()),
+            parcel_ids=frozenset(str(parcel_id) for parcel_id in message.get("parcel_ids") or ()),
+            bbox=bbox
+        )
+
+    def matches(self, message: Dict[str, Any]) -> bool:
+        if self.topics and event_topic(message) not in self.topics:
+            return False
+        data = message.get("data")
+        if not isinstance(data, dict) or data.get("parcel_id") is None:
+            return True
+        if not (self.zones or self.parcel_ids or self.bbox):
+            return True
+        if str(data["parcel_id"]) in self.parcel_ids:
+            return True
+        if data.get("zone") is not None and data["zone"] in self.zones:
+            return True
+        if self.bbox and data.get("lat") is not None and data.get("lng") is not None:
+            min_lng, min_lat, max_lng, max_lat = self.bbox
+            return min_lng <= data["lng"] <= max_lng and min_lat <= data["lat"] <= max_lat
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "topics": sorted(self.topics),
+            "zones": sorted(self.zones),
+            "parcel_ids": sorted(self.parcel_ids),
+            "bbox": list(self.bbox) if self.bbox else None
+        }
+
+
+class ClientConnection:
+    """Connexion WebSocket avec sa file d'envoi bornée et sa tâche d'écriture"""
+
+    def __init__(self, manager: 'ConnectionManager', websocket: WebSocket, user_id: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.user_id = user_id
+        # Entrées [clé de regroupement, payload JSON]
+        self.queue = deque()
+        self.dropped = 0
+        # Filtre des événements diffusés (None : tous)
+        self.subscription: Optional[Subscription] = None
+        # Événements du bus remis à ce client (dédoublonnage par numéro : un événement
+        # d'un autre worker peut arriver après un événement local de numéro supérieur),
+        # plus grand numéro remis, et événements retenus pendant une reprise
+        self.seen_seqs = set()
+        self._seen_order = deque()
+        self.last_seq = 0
+        self.resuming = False
+        self.pending = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, payload: str, key: Optional[Tuple[str, Any]] = None) -> bool:
+        """
+        Ajoute un message à la file sans attendre son envoi
+
+        Returns:
+            bool: False si le client a été déconnecté pour lenteur
+        """
+        policy = self.manager.slow_consumer_policy
+        if policy == 'coalesce' and key is not None and self.queue:
+            for index, entry in enumerate(self.queue):
+                if entry[0] == key:
+                    # Le message en attente est obsolète : seule la version la plus récente est envoyée
+                    del self.queue[index]
+                    self.manager._stats['coalesced'] += 1
+                    break
+        if len(self.queue) >= self.manager.queue_size:
+            if policy == 'disconnect':
+                self.manager._stats['slow_disconnects'] += 1
+                self.manager._evict(self)
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+            self.manager._stats['dropped'] += 1
+        self.queue.append([key, payload])
+        self._wakeup.set()
+        return True
+
+    def deliver(self, payload: str, key: Optional[Tuple[str, Any]], seq: int) -> bool:
+        """Remet un événement numéroté du bus (ignoré s'il a déjà été remis)"""
+        if self.resuming:
+            self.pending.append((seq, payload, key))
+            return True
+        if seq in self.seen_seqs:
+            return True
+        self.seen_seqs.add(seq)
+        self._seen_order.append(seq)
+        if len(self._seen_order) > SEEN_SEQS_LIMIT:
+            self.seen_seqs.discard(self._seen_order.popleft())
+        self.last_seq = max(self.last_seq, seq)
+        return self.enqueue(payload, key)
+
+    def close(self) -> None:
+        """Arrête la tâche d'écriture (sauf si c'est elle qui ferme la connexion)"""
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self.queue.clear()
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                while not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                _, payload = self.queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(payload), self.manager.send_timeout)
+                self.manager._stats['sent'] += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            print(f"WebSocket send timeout for user {self.user_id}, closing connection")
+            self.manager._stats['slow_disconnects'] += 1
+            self.manager._evict(self)
+        except WebSocketDisconnect:
+            self.manager.disconnect(self.websocket, self.user_id)
+        except Exception as e:
+            print(f"Error sending to user {self.user_id}: {e}")
+            self.manager.disconnect(self.websocket, self.user_id)
+
 
 class ConnectionManager:
-    """Gestionnaire de connexions WebSocket"""
+    """
+    Gestionnaire de connexions WebSocket
+
+    Chaque message diffusé est sérialisé une fois puis déposé dans la file bornée
+    de chaque destinataire ; une tâche d'écriture par connexion l'envoie. Un client
+    lent ne retarde donc plus les autres : quand sa file est pleine, la politique
+    WS_SLOW_CONSUMER_POLICY regroupe (coalesce), abandonne (drop_oldest) ou le déconnecte.
+
+    Les notifications passent par le bus d'événements (attach) pour atteindre les
+    sockets de tous les workers ; broadcast/send_to_user restent locaux au worker.
+    Les mises à jour répétées d'une même entité sont fusionnées avant publication
+    (WS_COALESCE_WINDOW), et chaque connexion ne reçoit que les événements de son
+    abonnement (subscribe).
+    """
     
-    def __init__(self):
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE,
+                 slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY,
+                 send_timeout: float = WS_SEND_TIMEOUT,
+                 coalesce_window: float = WS_COALESCE_WINDOW):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Politique des clients lents inconnue: {slow_consumer_policy}")
         # Connexions actives par user_id
         self.active_connections: Dict[int, Set[WebSocket]] = {}
         # Connexions par room (pour groupes)
         self.rooms: Dict[str, Set[WebSocket]] = {}
+        # File d'envoi et tâche d'écriture de chaque connexion
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.queue_size = max(queue_size, 1)
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.event_bus: Optional[EventBus] = None
+        self.coalesce_window = coalesce_window
+        # Événements en attente de publication, par entité : [événement, nombre fusionné]
+        self._coalescing: Dict[Tuple[str, Any], list] = {}
+        self._coalesce_flush: Optional[asyncio.TimerHandle] = None
+        self._stats = {'sent': 0, 'dropped': 0, 'coalesced': 0, 'merged': 0, 'filtered': 0, 'slow_disconnects': 0}
     
     async def connect(self, websocket: WebSocket, user_id: int):
         """Accepter une nouvelle connexion"""
@@ -27,16 +264,25 @@ class ConnectionManager:
             self.active_connections[user_id] = set()
         
         self.active_connections[user_id].add(websocket)
+        client = ClientConnection(self, websocket, user_id)
+        self.clients[websocket] = client
+        client.start()
         
         # Envoyer message de bienvenue
         await self.send_personal_message({
             "type": "connection",
             "message": "Connected to SIU WebSocket",
+            # Point de reprise à renvoyer (last_seq) en cas de reconnexion
+            "seq": self.event_bus.last_seq if self.event_bus else None,
             "timestamp": datetime.utcnow().isoformat()
         }, websocket)
     
     def disconnect(self, websocket: WebSocket, user_id: int):
         """Déconnecter un client"""
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            client.close()
+
         if user_id in self.active_connections:
             self.active_connections[user_id].discard(websocket)
             
@@ -50,6 +296,10 @@ class ConnectionManager:
     
     async def send_personal_message(self, message: Dict[str, Any], websocket: WebSocket):
         """Envoyer un message à une connexion spécifique"""
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.enqueue(serialize_message(message))
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
@@ -57,51 +307,17 @@ class ConnectionManager:
     
     async def send_to_user(self, message: Dict[str, Any], user_id: int):
         """Envoyer un message à toutes les connexions d'un utilisateur"""
-        if user_id in self.active_connections:
-            disconnected = set()
-            
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except WebSocketDisconnect:
-                    disconnected.add(connection)
-                except Exception as e:
-                    print(f"Error sending to user {user_id}: {e}")
-                    disconnected.add(connection)
-            
-            # Nettoyer les connexions mortes
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
+        self._fan_out(message, self.active_connections.get(user_id, ()))
     
     async def broadcast(self, message: Dict[str, Any], exclude_user: int = None):
         """Envoyer un message à tous les utilisateurs connectés"""
-        disconnected_users = []
-        
-        for user_id, connections in self.active_connections.items():
-            if exclude_user and user_id == exclude_user:
-                continue
-            
-            disconnected = set()
-            for connection in connections:
-                try:
-                    await connection.send_json(message)
-                except WebSocketDisconnect:
-                    disconnected.add(connection)
-                except Exception as e:
-                    print(f"Error broadcasting to user {user_id}: {e}")
-                    disconnected.add(connection)
-            
-            # Nettoyer les connexions mortes
-            for conn in disconnected:
-                self.disconnect(conn, user_id)
-            
-            if not self.active_connections[user_id]:
-                disconnected_users.append(user_id)
-        
-        # Nettoyer les utilisateurs sans connexions
-        for user_id in disconnected_users:
-            if user_id in self.active_connections:
-                del self.active_connections[user_id]
+        recipients = [
+            connection
+            for user_id, connections in self.active_connections.items()
+            if not (exclude_user and user_id == exclude_user)
+            for connection in connections
+        ]
+        self._fan_out(message, recipients)
     
     async def join_room(self, websocket: WebSocket, room: str):
         """Rejoindre une room (ex: 'parcels', 'documents')"""
@@ -117,20 +333,7 @@ class ConnectionManager:
     
     async def broadcast_to_room(self, message: Dict[str, Any], room: str):
         """Envoyer un message à tous les membres d'une room"""
-        if room not in self.rooms:
-            return
-        
-        disconnected = set()
-        for connection in self.rooms[room]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to room {room}: {e}")
-                disconnected.add(connection)
-        
-        # Nettoyer les connexions mortes
-        for conn in disconnected:
-            self.rooms[room].discard(conn)
+        self._fan_out(message, self.rooms.get(room, ()))
     
     def get_active_users_count(self) -> int:
         """Obtenir le nombre d'utilisateurs connectés"""
@@ -140,57 +343,240 @@ class ConnectionManager:
         """Vérifier si un utilisateur est connecté"""
         return user_id in self.active_connections and len(self.active_connections[user_id]) > 0
 
+    def attach(self, event_bus: EventBus) -> None:
+        """Abonne le gestionnaire au bus d'événements partagé entre les workers"""
+        self.event_bus = event_bus
+        event_bus.subscribe(self.dispatch_event)
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        """
+        Publie un événement (make_event) pour les sockets de tous les workers
+
+        Les événements de COALESCED_EVENT_TYPES sont retenus pendant la fenêtre de
+        regroupement : seul le dernier de chaque entité est publié, avec le nombre
+        d'événements fusionnés (`coalesced`).
+        """
+        message = event["message"]
+        key = coalesce_key(message)
+        if key is not None and self.coalesce_window > 0:
+            if message.get("type") in COALESCED_EVENT_TYPES:
+                self._hold(key, event)
+                return
+            # Un événement plus récent de la même entité (ex : suppression) passe après les mises à jour retenues
+            await self._flush_coalesced(lambda held_key: held_key[1] == key[1])
+        await self._publish_now(event)
+
+    def set_subscription(self, websocket: WebSocket, subscription: Optional[Subscription]) -> None:
+        """Remplace le filtre d'une connexion (None : tous les événements)"""
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.subscription = subscription
+
+    def _hold(self, key: Tuple[str, Any], event: Dict[str, Any]) -> None:
+        held = self._coalescing.get(key)
+        if held is None:
+            self._coalescing[key] = [event, 1]
+        else:
+            held[0] = event
+            held[1] += 1
+            self._stats['merged'] += 1
+        if self._coalesce_flush is None:
+            self._coalesce_flush = asyncio.get_running_loop().call_later(
+                self.coalesce_window, lambda: asyncio.ensure_future(self._flush_coalesced())
+            )
+
+    async def _flush_coalesced(self, selector=None) -> None:
+        """Publie les événements retenus (tous, ou ceux dont la clé satisfait selector)"""
+        keys = [key for key in self._coalescing if selector is None or selector(key)]
+        if selector is None and self._coalesce_flush is not None:
+            self._coalesce_flush.cancel()
+            self._coalesce_flush = None
+        for key in keys:
+            held = self._coalescing.pop(key, None)
+            if held is None:
+                continue
+            event, count = held
+            if count > 1:
+                event = dict(event, message=dict(event["message"], coalesced=count))
+            await self._publish_now(event)
+
+    async def _publish_now(self, event: Dict[str, Any]) -> None:
+        if self.event_bus is not None:
+            try:
+                await self.event_bus.publish(event)
+                return
+            except Exception as e:
+                print(f"Erreur de publication sur le bus d'événements, diffusion locale: {e}")
+        self._fan_out(event["message"], self._recipients(event), filtered=event["target"] != 'user')
+
+    def dispatch_event(self, event: Dict[str, Any]) -> None:
+        """Diffuse aux sockets de ce worker un événement reçu du bus"""
+        message = dict(event["message"], seq=event["seq"])
+        # Les notifications adressées à un utilisateur ne sont pas filtrées par son abonnement
+        self._fan_out(message, self._recipients(event), seq=event["seq"], filtered=event["target"] != 'user')
+
+    async def resume(self, websocket: WebSocket, user_id: int, last_seq: int) -> None:
+        """Rejoue à un client reconnecté les événements publiés après last_seq"""
+        client = self.clients.get(websocket)
+        if client is None or self.event_bus is None:
+            return
+        # Les événements reçus pendant la lecture de l'historique sont retenus puis fusionnés
+        client.resuming = True
+        client.last_seq = last_seq
+        replay = []
+        try:
+            events = await self.event_bus.events_since(last_seq)
+            if len(events) >= EVENT_BUS_REPLAY_LIMIT:
+                # Historique incomplet : le client doit recharger son état
+                client.enqueue(serialize_message({
+                    "type": "resync_required",
+                    "timestamp": datetime.utcnow().isoformat()
+                }))
+            for event in events:
+                if self._is_recipient(event, user_id):
+                    message = dict(event["message"], seq=event["seq"])
+                    if event["target"] != 'user' and client.subscription and not client.subscription.matches(message):
+                        continue
+                    replay.append((event["seq"], serialize_message(message), coalesce_key(message)))
+        except Exception as e:
+            print(f"Erreur lors de la reprise des événements pour l'utilisateur {user_id}: {e}")
+        finally:
+            pending, client.pending = client.pending, []
+            client.resuming = False
+            # Le client a déjà reçu les événements jusqu'à last_seq
+            for seq, payload, key in sorted(replay + pending, key=lambda item: item[0]):
+                if seq > last_seq:
+                    client.deliver(payload, key, seq)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métriques de diffusion : profondeur des files et messages perdus"""
+        depths = [len(client.queue) for client in self.clients.values()]
+        return {
+            **self._stats,
+            'connections': len(self.clients),
+            'queue_capacity': self.queue_size,
+            'queued_messages': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            'slow_consumer_policy': self.slow_consumer_policy
+        }
+
+    def _fan_out(self, message: Dict[str, Any], connections, seq: Optional[int] = None,
+                 filtered: bool = True) -> None:
+        """Sérialise le message une fois et le dépose dans la file de chaque destinataire abonné"""
+        payload = None
+        key = coalesce_key(message)
+        # Copie : une éviction modifie les ensembles de connexions
+        for connection in list(connections):
+            client = self.clients.get(connection)
+            if client is None:
+                continue
+            if filtered and client.subscription is not None and not client.subscription.matches(message):
+                self._stats['filtered'] += 1
+                continue
+            if payload is None:
+                payload = serialize_message(message)
+            if seq is None:
+                client.enqueue(payload, key)
+            else:
+                client.deliver(payload, key, seq)
+
+    def _recipients(self, event: Dict[str, Any]):
+        """Connexions de ce worker concernées par un événement du bus"""
+        target, key = event["target"], event.get("key")
+        if target == 'room':
+            return self.rooms.get(key, ())
+        return [
+            connection
+            for user_id, connections in self.active_connections.items()
+            if self._is_recipient(event, user_id)
+            for connection in connections
+        ]
+
+    @staticmethod
+    def _is_recipient(event: Dict[str, Any], user_id) -> bool:
+        """Un utilisateur est-il destinataire d'un événement (hors rooms, non rejouées) ?"""
+        if event["target"] == 'broadcast':
+            return event.get("exclude_user") is None or str(user_id) != event["exclude_user"]
+        if event["target"] == 'user':
+            return str(user_id) == event.get("key")
+        return False
+
+    def _evict(self, client: ClientConnection) -> None:
+        """Déconnecte un client trop lent (fermeture envoyée en arrière-plan)"""
+        self.disconnect(client.websocket, client.user_id)
+        asyncio.ensure_future(self._close_quietly(client.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=WS_1013_TRY_AGAIN_LATER), WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
 
 # Instance globale du gestionnaire
 manager = ConnectionManager()
 
 
 class NotificationService:
-    """Service de notifications temps réel"""
+    """Service de notifications temps réel (publiées sur le bus, diffusées par tous les workers)"""
     
     @staticmethod
-    async def notify_parcel_created(parcel_id: str, parcel_ref: str, created_by: int):
+    async def notify_parcel_created(parcel_id: str, parcel_ref: str, created_by: int,
+                                    zone: str = None, lat: float = None, lng: float = None):
         """Notifier la création d'une parcelle"""
-        await manager.broadcast({
+        await manager.publish(make_event("broadcast", {
             "type": "parcel_created",
             "data": {
                 "parcel_id": parcel_id,
                 "reference": parcel_ref,
-                "created_by": created_by
+                "created_by": created_by,
+                # Localisation pour le filtrage des abonnements (zone, bbox)
+                "zone": zone,
+                "lat": lat,
+                "lng": lng
             },
             "timestamp": datetime.utcnow().isoformat()
-        }, exclude_user=created_by)
+        }, exclude_user=created_by))
     
     @staticmethod
-    async def notify_parcel_updated(parcel_id: str, parcel_ref: str, updated_by: int):
+    async def notify_parcel_updated(parcel_id: str, parcel_ref: str, updated_by: int,
+                                    zone: str = None, lat: float = None, lng: float = None):
         """Notifier la modification d'une parcelle"""
-        await manager.broadcast({
+        await manager.publish(make_event("broadcast", {
             "type": "parcel_updated",
             "data": {
                 "parcel_id": parcel_id,
                 "reference": parcel_ref,
-                "updated_by": updated_by
+                "updated_by": updated_by,
+                "zone": zone,
+                "lat": lat,
+                "lng": lng
             },
             "timestamp": datetime.utcnow().isoformat()
-        }, exclude_user=updated_by)
+        }, exclude_user=updated_by))
 
     @staticmethod
-    async def notify_parcel_deleted(parcel_id: str, parcel_ref: str, deleted_by: int):
+    async def notify_parcel_deleted(parcel_id: str, parcel_ref: str, deleted_by: int,
+                                    zone: str = None, lat: float = None, lng: float = None):
         """Notifier la suppression d'une parcelle"""
-        await manager.broadcast({
+        await manager.publish(make_event("broadcast", {
             "type": "parcel_deleted",
             "data": {
                 "parcel_id": parcel_id,
                 "reference": parcel_ref,
-                "deleted_by": deleted_by
+                "deleted_by": deleted_by,
+                "zone": zone,
+                "lat": lat,
+                "lng": lng
             },
             "timestamp": datetime.utcnow().isoformat()
-        }, exclude_user=deleted_by)
+        }, exclude_user=deleted_by))
     
     @staticmethod
     async def notify_document_uploaded(doc_id: int, filename: str, parcel_id: int, uploaded_by: int):
         """Notifier l'upload d'un document"""
-        await manager.broadcast({
+        await manager.publish(make_event("broadcast", {
             "type": "document_uploaded",
             "data": {
                 "document_id": doc_id,
@@ -199,12 +585,12 @@ class NotificationService:
                 "uploaded_by": uploaded_by
             },
             "timestamp": datetime.utcnow().isoformat()
-        }, exclude_user=uploaded_by)
+        }, exclude_user=uploaded_by))
 
     @staticmethod
     async def notify_document_deleted(doc_id: int, filename: str, parcel_id: int, deleted_by: int):
         """Notifier la suppression d'un document"""
-        await manager.broadcast({
+        await manager.publish(make_event("broadcast", {
             "type": "document_deleted",
             "data": {
                 "document_id": doc_id,
@@ -213,21 +599,21 @@ class NotificationService:
                 "deleted_by": deleted_by
             },
             "timestamp": datetime.utcnow().isoformat()
-        }, exclude_user=deleted_by)
+        }, exclude_user=deleted_by))
     
     @staticmethod
     async def notify_user(user_id: int, notification_type: str, data: Dict[str, Any]):
         """Envoyer une notification à un utilisateur spécifique"""
-        await manager.send_to_user({
+        await manager.publish(make_event("user", {
             "type": notification_type,
             "data": data,
             "timestamp": datetime.utcnow().isoformat()
-        }, user_id)
+        }, key=user_id))
     
     @staticmethod
     async def notify_alert(alert_type: str, message: str, severity: str = "info"):
         """Envoyer une alerte système à tous les utilisateurs"""
-        await manager.broadcast({
+        await manager.publish(make_event("broadcast", {
             "type": "system_alert",
             "data": {
                 "alert_type": alert_type,
@@ -235,4 +621,4 @@ class NotificationService:
                 "severity": severity
             },
             "timestamp": datetime.utcnow().isoformat()
-        })
+        }))
@@ -6,6 +6,7 @@ from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, or_
 
+from backend.core.pagination import count_total, keyset_page, page_response
 from backend.models.zone import Zone
 from backend.models.parcel import Parcel
 
@@ -115,8 +116,8 @@ class ZoneService:
                       .all()
         return [z.to_dict() for z in zones]
 
-    def get_zone_parcels(self, zone_id: str) -> List[Dict[str, Any]]:
-        """Récupère les parcelles appartenant à une zone"""
+    def _zone_parcels_query(self, zone_id: str):
+        """Requête des parcelles d'une zone (par ID ou par code de zone)"""
         # On essaie de matcher l'ID ou le Code de la zone avec le champ zone de la parcelle
         zone_obj = self.db.query(Zone).filter(Zone.id == zone_id).first()
         
@@ -126,6 +127,26 @@ class ZoneService:
         else:
             # Si zone_id n'est pas un UUID mais peut-être un code directement
             query = query.filter(Parcel.zone == zone_id)
-            
-        parcels = query.order_by(Parcel.reference_cadastrale).all()
-        return [p.to_dict() for p in parcels]
\ No newline at end of file
+        return query
+
+    def get_zone_parcels(self, zone_id: str) -> List[Dict[str, Any]]:
+        """Récupère les parcelles appartenant à une zone"""
+        parcels = self._zone_parcels_query(zone_id).order_by(Parcel.reference_cadastrale).all()
+        return [p.to_dict() for p in parcels]
+
+    def get_zone_parcels_page(self, zone_id: str, page: int = 1, page_size: int = 50,
+                              cursor: Optional[str] = None, total_mode: str = 'cached') -> Dict[str, Any]:
+        """
+        Récupère une page des parcelles d'une zone, par référence cadastrale
+
+        La référence étant unique, elle sert seule de clé de pagination : la page
+        suivante (cursor) reprend après la dernière référence reçue.
+        """
+        query = self._zone_parcels_query(zone_id)
+        parcels, next_cursor = keyset_page(
+            query, (Parcel.reference_cadastrale,), page_size,
+            cursor=cursor, offset=(page - 1) * page_size, descending=False
+        )
+        total = count_total(query, total_mode, Parcel.__tablename__, {'zone': zone_id})
+        return page_response([p.to_dict() for p in parcels], next_cursor, page_size, total,
+                             page=None if cursor else page)
@@ -0,0 +1,145 @@
+"""
+Tests pour l'écriture asynchrone et groupée des logs d'audit
+"""
+import sys
+sys.path.insert(0, '..')
+
+import json
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.audit_log import AuditLog
+from backend.core.audit_writer import AuditLogWriter
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def _record(i):
+    return {'action': 'create', 'entity_type': 'parcel', 'entity_id': str(i), 'request_method': 'POST'}
+
+
+def _count(factory):
+    db = factory()
+    try:
+        return db.query(AuditLog).count()
+    finally:
+        db.close()
+
+
+def test_batched_writes(tmp_path):
+    """Test l'insertion par lots en une transaction par lot"""
+    engine, factory = _session_factory(tmp_path)
+    commits = []
+    event.listen(engine, 'commit', lambda conn: commits.append(1))
+
+    writer = AuditLogWriter(factory, batch_size=50, flush_interval=5, spool_path=str(tmp_path / 'spool.jsonl'))
+    for i in range(120):
+        assert writer.submit(_record(i))
+    # L'arrêt vide la file sans attendre l'intervalle de flush
+    writer.stop()
+
+    assert _count(factory) == 120
+    assert len(commits) <= 4
+    assert writer.get_stats()['written'] == 120
+    print("✅ test_batched_writes passed")
+
+
+def test_overflow_policies(tmp_path):
+    """Test les politiques drop_newest, drop_oldest et spool quand la file est pleine"""
+    _, factory = _session_factory(tmp_path)
+
+    for policy, expected_dropped in (('drop_newest', 2), ('drop_oldest', 2), ('spool', 0)):
+        spool_path = str(tmp_path / f'{policy}.jsonl')
+        writer = AuditLogWriter(factory, max_queue_size=3, overflow_policy=policy, spool_path=spool_path)
+        # Worker non démarré : la file se remplit
+        writer._thread = object()
+        for i in range(5):
+            writer.submit(_record(i))
+        stats = writer.get_stats()
+        assert stats['queue_size'] == 3
+        assert stats['dropped'] == expected_dropped
+        if policy == 'drop_oldest':
+            assert [r['entity_id'] for r in writer._queue] == ['2', '3', '4']
+        if policy == 'spool':
+            assert stats['spooled'] == 2
+    print("✅ test_overflow_policies passed")
+
+
+def test_spool_replayed_on_start(tmp_path):
+    """Test que le spool laissé par un arrêt est réinséré au démarrage suivant"""
+    _, factory = _session_factory(tmp_path)
+    spool_path = str(tmp_path / 'spool.jsonl')
+
+    writer = AuditLogWriter(factory, max_queue_size=2, overflow_policy='spool', spool_path=spool_path)
+    writer._thread = object()
+    for i in range(4):
+        writer.submit(_record(i))
+    # Arrêt sans worker : la file est spoolée avec le débordement
+    writer._thread = None
+    writer.stop()
+    assert _count(factory) == 0
+
+    restarted = AuditLogWriter(factory, spool_path=spool_path)
+    restarted.start()
+    restarted.stop()
+
+    db = factory()
+    assert sorted(int(log.entity_id) for log in db.query(AuditLog).all()) == [0, 1, 2, 3]
+    db.close()
+    assert restarted.get_stats()['replayed'] == 4
+    print("✅ test_spool_replayed_on_start passed")
+
+
+def test_orphan_spools_replayed_once(tmp_path):
+    """Test que les spools des processus arrêtés sont repris une seule fois, par un seul writer"""
+    _, factory = _session_factory(tmp_path)
+    spool_path = str(tmp_path / 'spool.jsonl')
+    # Spool partagé de l'ancien format, spool et rejeu interrompu d'un worker arrêté (pid inexistant)
+    for path, ids in ((spool_path, [0, 1]), (spool_path + '.999999999', [2]), (spool_path + '.999999998.replay', [3])):
+        with open(path, 'w', encoding='utf-8') as spool:
+            spool.writelines(json.dumps(_record(i)) + '\n' for i in ids)
+
+    first = AuditLogWriter(factory, spool_path=spool_path)
+    second = AuditLogWriter(factory, spool_path=spool_path)
+    first._replay_spool()
+    # Tout a été repris par le premier : le second ne trouve plus rien (et ne lève pas)
+    second._replay_spool()
+
+    db = factory()
+    assert sorted(int(log.entity_id) for log in db.query(AuditLog).all()) == [0, 1, 2, 3]
+    db.close()
+    assert os.listdir(tmp_path) == ['audit.db']
+    assert (first.get_stats()['replayed'], second.get_stats()['replayed']) == (4, 0)
+    print("✅ test_orphan_spools_replayed_once passed")
+
+
+def test_worker_survives_unexpected_errors(tmp_path):
+    """Test que le thread d'écriture survit à une erreur inattendue et la comptabilise"""
+    _, factory = _session_factory(tmp_path)
+    calls = []
+
+    def flaky_factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("pool épuisé")
+        return factory()
+
+    writer = AuditLogWriter(flaky_factory, flush_interval=0, spool_path=str(tmp_path / 'spool.jsonl'))
+    writer.submit(_record(0))
+    assert writer.flush(timeout=5)
+    writer.submit(_record(1))
+    assert writer.flush(timeout=5)
+    assert writer._thread.is_alive()
+    writer.stop()
+
+    stats = writer.get_stats()
+    assert (stats['worker_errors'], stats['dropped'], stats['written']) == (1, 1, 1)
+    assert _count(factory) == 1
+    print("✅ test_worker_survives_unexpected_errors passed")
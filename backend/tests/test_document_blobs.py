@@ -0,0 +1,122 @@
+"""
+Tests pour le stockage des documents adressé par contenu, avec compteur de références
+"""
+import sys
+sys.path.insert(0, '..')
+
+import io
+
+import pytest
+
+pytest.importorskip("werkzeug")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.document_blob import DocumentBlob
+from backend.services.document_service_new import DocumentService
+from backend.services.storage_service import StorageService
+
+
+@pytest.fixture
+def service(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[DocumentBlob.__table__])
+    service = DocumentService(sessionmaker(bind=engine)())
+    service.storage = StorageService(str(tmp_path))
+    return service
+
+
+def _store(service, content):
+    staged = service.storage.receive_upload(io.BytesIO(content))
+    created = service._acquire_blob(staged.checksum, staged.size)
+    return staged, created, service.storage.commit_blob(staged, replace=created)
+
+
+def test_duplicate_upload_shares_blob(service, tmp_path):
+    """Test qu'un contenu déjà stocké n'est pas réécrit mais référencé une fois de plus"""
+    staged, created, path = _store(service, b'%PDF-1.4 titre foncier')
+    duplicate, created_again, same_path = _store(service, b'%PDF-1.4 titre foncier')
+    service.db.commit()
+
+    assert (created, created_again) == (True, False)
+    assert path == same_path == f"blobs/{staged.checksum[:2]}/{staged.checksum[2:4]}/{staged.checksum}"
+    assert not duplicate.temp_path.exists()
+    assert service.db.get(DocumentBlob, staged.checksum).ref_count == 2
+    assert list((tmp_path / 'tmp').iterdir()) == []
+    print("✅ test_duplicate_upload_shares_blob passed")
+
+
+def test_sweep_removes_only_unreferenced_blobs(service):
+    """Test le balayage par compteur : seul un blob sans référence après le délai de grâce est supprimé"""
+    shared, _, _ = _store(service, b'plan commun')
+    _store(service, b'plan commun')
+    single, _, _ = _store(service, b'plan unique')
+    service.db.commit()
+
+    service._release_blob(shared.checksum)
+    service._release_blob(single.checksum)
+    service.db.commit()
+    assert service.sweep_blobs(grace_seconds=3600) == 0
+
+    assert service.sweep_blobs(grace_seconds=0) == 1
+    assert service.storage.has_blob(shared.checksum)
+    assert not service.storage.has_blob(single.checksum)
+    assert service.db.get(DocumentBlob, single.checksum) is None
+
+    # Référencé à nouveau : plus candidat au balayage
+    service._release_blob(shared.checksum)
+    _store(service, b'plan commun')
+    service.db.commit()
+    assert service.sweep_blobs(grace_seconds=0) == 0
+    assert service.db.get(DocumentBlob, shared.checksum).released_at is None
+    print("✅ test_sweep_removes_only_unreferenced_blobs passed")
+
+
+def test_rolled_back_blob_left_for_sweep(service):
+    """Test qu'un blob créé par une transaction annulée est laissé au balayage"""
+    staged, created, path = _store(service, b'photo annulee')
+    service.db.rollback()
+    service._undo_placed([path])
+
+    blob = service.db.get(DocumentBlob, staged.checksum)
+    assert created and blob.ref_count == 0 and blob.released_at is not None
+    assert service.sweep_blobs(grace_seconds=0) == 1
+    assert not service.storage.has_blob(staged.checksum)
+    print("✅ test_rolled_back_blob_left_for_sweep passed")
+
+
+def test_sweep_unlinks_before_commit(tmp_path):
+    """Test que le balayage supprime le fichier avant de valider la suppression de la ligne"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(bind=engine, tables=[DocumentBlob.__table__])
+    factory = sessionmaker(bind=engine)
+    service = DocumentService(factory())
+    service.storage = StorageService(str(tmp_path))
+    staged, _, _ = _store(service, b'plan balaye')
+    service._release_blob(staged.checksum)
+    service.db.commit()
+
+    delete_blob = service.storage.delete_blob
+    visible = []
+
+    def delete_blob_checked(checksum):
+        # Vu d'une autre connexion, la ligne existe encore : un upload concurrent attendrait
+        other = factory()
+        visible.append(other.get(DocumentBlob, checksum) is not None)
+        other.close()
+        return delete_blob(checksum)
+
+    service.storage.delete_blob = delete_blob_checked
+    assert service.sweep_blobs(grace_seconds=0) == 1
+    assert visible == [True]
+    assert factory().get(DocumentBlob, staged.checksum) is None
+
+    # Ligne recréée par un upload alors qu'un fichier orphelin est encore présent : il est remplacé
+    orphan = service.storage.blob_path(staged.checksum)
+    orphan.parent.mkdir(parents=True, exist_ok=True)
+    orphan.write_bytes(b'tronque')
+    _, created, _ = _store(service, b'plan balaye')
+    assert created and orphan.read_bytes() == b'plan balaye'
+    print("✅ test_sweep_unlinks_before_commit passed")
@@ -0,0 +1,145 @@
+"""
+Tests pour le bus d'événements temps réel partagé entre les workers
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.core.event_bus import DatabaseEventBus, InMemoryEventBus, make_event
+from backend.services.websocket_service import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        self.sent.append(json.loads(payload))
+
+    def events(self):
+        return [(m["type"], m.get("seq")) for m in self.sent if m["type"] != "connection"]
+
+
+def _parcel_event(message_type, parcel_id, by=None):
+    return make_event("broadcast", {"type": message_type, "data": {"parcel_id": parcel_id}}, exclude_user=by)
+
+
+def test_events_reach_other_workers(tmp_path):
+    """Test qu'un événement publié par un worker est diffusé par les autres, une seule fois"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+
+    async def scenario():
+        workers = []
+        for _ in range(2):
+            bus = DatabaseEventBus(factory, poll_interval=3600)
+            manager = ConnectionManager()
+            manager.attach(bus)
+            await bus.start()
+            workers.append((bus, manager))
+        (bus_a, manager_a), (bus_b, manager_b) = workers
+
+        local, remote, author = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager_a.connect(local, 'u1')
+        await manager_a.connect(author, 'u3')
+        await manager_b.connect(remote, 'u2')
+
+        await manager_a.publish(_parcel_event("parcel_created", "p1", by='u3'))
+        await manager_b.publish(make_event("user", {"type": "mutation_assigned", "data": {}}, key='u1'))
+        for bus, _ in workers:
+            await bus.poll()
+        await asyncio.sleep(0.01)
+
+        assert local.events() == [("parcel_created", 1), ("mutation_assigned", 2)]
+        assert remote.events() == [("parcel_created", 1)]
+        assert author.events() == []
+        assert bus_a.last_seq == bus_b.last_seq == 2
+        for bus, _ in workers:
+            await bus.stop()
+
+    asyncio.run(scenario())
+    print("✅ test_events_reach_other_workers passed")
+
+
+def test_resume_after_reconnect():
+    """Test la reprise après le dernier événement reçu, sans doublon"""
+    async def scenario():
+        bus = InMemoryEventBus()
+        manager = ConnectionManager(coalesce_window=0)
+        manager.attach(bus)
+
+        await manager.publish(_parcel_event("parcel_created", "p1"))
+        await manager.publish(_parcel_event("parcel_updated", "p1", by='u1'))
+        await manager.publish(make_event("user", {"type": "mutation_assigned", "data": {}}, key='u2'))
+        await manager.publish(_parcel_event("parcel_deleted", "p2"))
+
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, 'u1')
+        await manager.resume(websocket, 'u1', last_seq=1)
+        await manager.publish(_parcel_event("parcel_created", "p3"))
+        await asyncio.sleep(0.01)
+
+        # Le message de connexion annonce le point de reprise courant
+        assert websocket.sent[0]["seq"] == 4
+        # Les événements exclus pour u1 ou destinés à un autre utilisateur ne sont pas rejoués
+        assert websocket.events() == [("parcel_deleted", 4), ("parcel_created", 5)]
+
+    asyncio.run(scenario())
+    print("✅ test_resume_after_reconnect passed")
+
+
+def test_late_events_from_other_workers_are_delivered(tmp_path):
+    """Test qu'un événement d'un autre worker n'est pas perdu s'il est relevé après un numéro supérieur"""
+    from datetime import datetime
+    from backend.models.realtime_event import RealtimeEvent
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+
+    async def scenario():
+        bus_a, bus_b = DatabaseEventBus(factory, poll_interval=3600), DatabaseEventBus(factory, poll_interval=3600)
+        manager = ConnectionManager(coalesce_window=0)
+        manager.attach(bus_a)
+        await bus_a.start()
+        await bus_b.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, 'u1')
+
+        # B publie N, puis A publie N+1 avant son prochain relevé
+        await bus_b.publish(_parcel_event("parcel_created", "from_b"))
+        await manager.publish(_parcel_event("parcel_created", "from_a"))
+        await bus_a.poll()
+
+        # Numéro inférieur validé après un numéro supérieur déjà relevé (séquence PostgreSQL)
+        db = factory()
+        db.add(RealtimeEvent(id=10, target="broadcast", payload=json.dumps({"type": "parcel_deleted", "data": {}})))
+        db.commit()
+        await bus_a.poll()
+        db.add(RealtimeEvent(id=7, target="broadcast", payload=json.dumps({"type": "parcel_updated", "data": {}}),
+                             created_at=datetime.utcnow()))
+        db.commit()
+        db.close()
+        await bus_a.poll()
+        await bus_a.poll()
+        await asyncio.sleep(0.01)
+
+        received = [(m["type"], m["seq"], m["data"].get("parcel_id")) for m in websocket.sent if m["type"] != "connection"]
+        assert received == [("parcel_created", 2, "from_a"), ("parcel_created", 1, "from_b"),
+                            ("parcel_deleted", 10, None), ("parcel_updated", 7, None)]
+        assert bus_a.last_seq == 10
+        await bus_a.stop()
+        await bus_b.stop()
+
+    asyncio.run(scenario())
+    print("✅ test_late_events_from_other_workers_are_delivered passed")
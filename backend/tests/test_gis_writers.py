@@ -0,0 +1,82 @@
+"""
+Tests pour les exports Shapefile et GeoPackage natifs
+"""
+import sys
+sys.path.insert(0, '..')
+
+import io
+import sqlite3
+import struct
+import zipfile
+
+import shapely
+
+from backend.services.geospatial_export_service import GeospatialExportService
+
+SQUARE_WITH_HOLE = {'type': 'Polygon', 'coordinates': [
+    [[-1.5, 12.3], [-1.49, 12.3], [-1.49, 12.31], [-1.5, 12.31], [-1.5, 12.3]],
+    [[-1.498, 12.302], [-1.497, 12.302], [-1.497, 12.303], [-1.498, 12.302]]
+]}
+PARCELS = [
+    {'id': 'p1', 'reference': 'REF001', 'latitude': 12.305, 'longitude': -1.495, 'geometry': SQUARE_WITH_HOLE,
+     'area': 1234.5, 'owner_name': 'Awa Ouédraogo', 'address': 'Secteur 15 ' * 40},
+    {'id': 'p2', 'reference': 'REF002', 'latitude': 12.4, 'longitude': -1.6, 'geometry': None, 'area': None},
+]
+
+
+def _signed_area(points):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(points, points[1:])) / 2
+
+
+def test_shapefile_layers():
+    """Test l'archive Shapefile : en-têtes, index, anneaux orientés et attributs dBASE"""
+    archive = zipfile.ZipFile(io.BytesIO(GeospatialExportService().export_shapefile(PARCELS)))
+    assert {'parcelles.shp', 'parcelles.shx', 'parcelles.dbf', 'parcelles.prj', 'parcelles.cpg',
+            'parcelles_points.shp'} <= set(archive.namelist())
+
+    shp, shx = archive.read('parcelles.shp'), archive.read('parcelles.shx')
+    assert struct.unpack('>i', shp[24:28])[0] * 2 == len(shp)
+    assert struct.unpack('<2i4d', shp[28:68]) == (1000, 5, -1.5, 12.3, -1.49, 12.31)
+    offset, length = struct.unpack('>2i', shx[100:108])
+    content = shp[offset * 2 + 8:offset * 2 + 8 + length * 2]
+    shape_type, _, _, _, _, num_parts, num_points = struct.unpack('<i4d2i', content[:44])
+    assert (shape_type, num_parts, num_points) == (5, 2, 9)
+    parts = struct.unpack('<2i', content[44:52])
+    coordinates = struct.unpack(f'<{num_points * 2}d', content[52:])
+    points = list(zip(coordinates[::2], coordinates[1::2]))
+    exterior, hole = points[parts[0]:parts[1]], points[parts[1]:]
+    assert _signed_area(exterior) < 0 < _signed_area(hole)  # Extérieur horaire, trou anti-horaire
+
+    dbf = archive.read('parcelles_points.dbf')
+    count, header_length, record_length = struct.unpack('<IHH', dbf[4:12])
+    assert count == 2 and dbf[-1:] == b'\x1a'
+    record = dbf[header_length:header_length + record_length]
+    assert b'REF001' in record and 'Awa Ouédraogo'.encode('utf-8') in record
+    # La parcelle sans polygone n'apparaît que dans la couche de points
+    assert struct.unpack('<I', archive.read('parcelles.dbf')[4:8])[0] == 1
+    print("✅ test_shapefile_layers passed")
+
+
+def test_geopackage_with_spatial_index(tmp_path):
+    """Test le GeoPackage : métadonnées OGC, géométries et index spatial R-tree"""
+    path = tmp_path / 'parcelles.gpkg'
+    GeospatialExportService().write_geopackage(PARCELS, str(path), batch_size=1)
+
+    db = sqlite3.connect(path)
+    assert db.execute('PRAGMA application_id').fetchone()[0] == 0x47504B47
+    assert db.execute("SELECT geometry_type_name FROM gpkg_geometry_columns WHERE table_name = 'parcelles'"
+                      ).fetchone()[0] == 'MULTIPOLYGON'
+    assert db.execute("SELECT min_x, min_y, max_x, max_y FROM gpkg_contents WHERE table_name = 'parcelles_points'"
+                      ).fetchone() == (-1.6, 12.305, -1.495, 12.4)
+    assert db.execute("SELECT count(*) FROM gpkg_extensions WHERE extension_name = 'gpkg_rtree_index'").fetchone()[0] == 2
+
+    blob, reference = db.execute('SELECT geom, reference FROM parcelles').fetchone()
+    assert blob[:2] == b'GP' and reference == 'REF001'
+    shape = shapely.from_wkb(blob[8 + 32:])
+    assert shape.geom_type == 'MultiPolygon'
+    assert abs(shape.area - shapely.geometry.shape(SQUARE_WITH_HOLE).area) < 1e-12
+
+    hits = db.execute('SELECT id FROM rtree_parcelles_points_geom WHERE minx <= -1.59 AND maxx >= -1.61 '
+                      'AND miny <= 12.41 AND maxy >= 12.39').fetchall()
+    assert [db.execute('SELECT reference FROM parcelles_points WHERE fid = ?', hit).fetchone()[0] for hit in hits] == ['REF002']
+    print("✅ test_geopackage_with_spatial_index passed")
@@ -0,0 +1,123 @@
+"""
+Tests pour la pagination par curseur (keyset) des listes de parcelles, d'audit et de mutations
+"""
+import sys
+sys.path.insert(0, '..')
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.core.exceptions import InvalidDataException
+from backend.models.audit_log import AuditLog
+from backend.models.mutation import ParcelMutation, MutationType, MutationStatus
+from backend.models.parcel import Parcel
+from backend.infrastructure.repositories.audit_log_repository import SqlAuditLogRepository
+from backend.infrastructure.repositories.mutation_repository import SqlMutationRepository
+from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
+from backend.services.audit_service import AuditService
+from backend.services.mutation_service import MutationService
+from backend.services.zone_service import ZoneService
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _walk(fetch):
+    """Parcourt toutes les pages en suivant next_cursor"""
+    pages, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        pages.append(page)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_parcels_cursor_matches_offset_order():
+    """Test le parcours par curseur des parcelles (dates identiques départagées par l'ID), totaux en cache et requête indexée"""
+    db = _session()
+    start = datetime(2026, 1, 1)
+    db.add_all([
+        Parcel(id=f'p{i:02d}', reference_cadastrale=f'REF{i:02d}', coordinates_lat=12.3, coordinates_lng=-1.5,
+               area=100.0, address='Ouagadougou', category='Habitation' if i % 5 else 'Commerce',
+               zone='Z1' if i % 2 else 'Z2', created_at=start + timedelta(hours=i // 3))
+        for i in range(25)
+    ])
+    db.commit()
+    repo = SqlParcelRepository(db)
+
+    expected = [p.id for p in db.query(Parcel).order_by(Parcel.created_at.desc(), Parcel.id.desc())]
+    pages = _walk(lambda cursor: repo.search_page({'page_size': 10}, cursor=cursor))
+    assert [len(page['items']) for page in pages] == [10, 10, 5]
+    assert [p.id for page in pages for p in page['items']] == expected
+    assert pages[0]['page'] == 1 and pages[1]['page'] is None
+    assert (pages[0]['total'], pages[0]['total_pages'], pages[-1]['has_more']) == (25, 3, False)
+
+    # L'ancienne pagination par numéro de page donne les mêmes éléments
+    assert [p.id for p in repo.search_page({'page': 2, 'page_size': 10})['items']] == expected[10:20]
+
+    filtered = _walk(lambda cursor: repo.search_page({'category': 'Habitation', 'page_size': 7}, cursor=cursor))
+    assert [p.id for page in filtered for p in page['items']] == [i for i in expected if int(i[1:]) % 5]
+
+    # Total en cache, invalidé par l'écriture validée sur la table des parcelles
+    db.add(Parcel(id='p99', reference_cadastrale='REF99', coordinates_lat=12.3, coordinates_lng=-1.5,
+                  area=1.0, address='Ouagadougou', category='Habitation'))
+    db.commit()
+    assert repo.search_page({'page_size': 10})['total'] == 26
+    assert repo.search_page({'page_size': 10}, total_mode='none')['total'] is None
+
+    statements = []
+    event.listen(db.get_bind(), 'before_cursor_execute',
+                 lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters)))
+    repo.search_page({'page_size': 10}, cursor=pages[0]['next_cursor'], total_mode='none')
+    statement, parameters = statements[-1]
+    plan = db.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    assert 'ix_parcels_created_at_id' in plan[0][-1] and 'SEARCH' in plan[0][-1]
+
+    with pytest.raises(InvalidDataException):
+        repo.search_page({'page_size': 10}, cursor='pas-un-curseur')
+
+    zone_pages = _walk(lambda cursor: ZoneService(db).get_zone_parcels_page('Z1', page_size=4, cursor=cursor))
+    assert [p['reference_cadastrale'] for page in zone_pages for p in page['items']] == [f'REF{i:02d}' for i in range(1, 25, 2)]
+    print("✅ test_parcels_cursor_matches_offset_order passed")
+
+
+def test_audit_and_mutation_listings():
+    """Test la pagination par curseur des logs d'audit et des mutations (filtre de statut)"""
+    db = _session()
+    start = datetime(2026, 3, 1)
+    db.add_all([
+        AuditLog(action='UPDATE' if i % 2 else 'CREATE', entity_type='parcel', entity_id=f'p{i}',
+                 timestamp=start + timedelta(minutes=i // 4))
+        for i in range(30)
+    ])
+    db.add_all([
+        ParcelMutation(id=f'm{i:02d}', parcel_id='p1', mutation_type=MutationType.SALE, initiated_by_user_id='u1',
+                       status=MutationStatus.APPROVED if i % 3 else MutationStatus.PENDING,
+                       created_at=start + timedelta(days=i // 2))
+        for i in range(20)
+    ])
+    db.commit()
+
+    audit = AuditService(SqlAuditLogRepository(db))
+    pages = _walk(lambda cursor: audit.get_audit_logs_page({'action': 'UPDATE'}, limit=4, cursor=cursor))
+    ids = [log['id'] for page in pages for log in page['items']]
+    expected = [row.id for row in db.query(AuditLog).filter(AuditLog.action == 'UPDATE')
+                .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())]
+    assert ids == expected and len(ids) == 15 and pages[0]['total'] is None
+    assert [log['id'] for log in audit.get_audit_logs(action='UPDATE', limit=4, offset=4)] == expected[4:8]
+
+    mutations = MutationService(SqlMutationRepository(db), None, None, None)
+    pages = _walk(lambda cursor: mutations.get_all_mutations(status='approved', limit=5, cursor=cursor))
+    assert [m.id for page in pages for m in page['items']] == [f'm{i:02d}' for i in range(19, -1, -1) if i % 3]
+    assert pages[0]['total'] == 13
+    with pytest.raises(InvalidDataException):
+        mutations.get_all_mutations(status='inconnu')
+    print("✅ test_audit_and_mutation_listings passed")
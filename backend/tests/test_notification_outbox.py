@@ -0,0 +1,77 @@
+"""
+Tests pour la boîte d'envoi des notifications émises par les services synchrones
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import begin_unit_of_work, end_unit_of_work
+from backend.core.notification_outbox import NotificationOutbox
+
+SessionFactory = sessionmaker(bind=create_engine("sqlite://"))
+
+
+def test_released_only_after_commit():
+    """Test qu'une notification n'est libérée qu'au COMMIT et supprimée par une annulation"""
+    outbox = NotificationOutbox()
+    delivered = []
+
+    async def notify(value):
+        delivered.append(value)
+
+    for outcome in ('commit', 'rollback'):
+        unit, token = begin_unit_of_work(SessionFactory)
+        try:
+            unit.session.commit()  # Le repository a déjà validé ses écritures
+            queued = outbox.get_stats()['queue_size']
+            outbox.enqueue(notify, value=outcome)
+            assert outbox.get_stats()['queue_size'] == queued
+            getattr(unit, outcome)()
+        finally:
+            unit.close()
+            end_unit_of_work(token)
+
+    stats = outbox.get_stats()
+    assert (stats['released'], stats['discarded'], stats['queue_size']) == (1, 1, 1)
+
+    async def scenario():
+        await outbox.start()
+        await outbox.stop()
+
+    asyncio.run(scenario())
+    assert delivered == ['commit']
+    print("✅ test_released_only_after_commit passed")
+
+
+def test_delivery_from_threads_with_retry():
+    """Test la délivrance, dans l'ordre, des notifications déposées depuis des threads, avec reprise"""
+    outbox = NotificationOutbox(batch_size=10, retry_delay=0.01)
+    delivered = []
+    failures = {'flaky': 2}
+
+    async def notify(value):
+        if failures.get(value):
+            failures[value] -= 1
+            raise ConnectionError("bus indisponible")
+        delivered.append(value)
+
+    async def scenario():
+        await outbox.start()
+        worker = threading.Thread(target=lambda: [outbox.enqueue(notify, value=i) for i in range(50)])
+        worker.start()
+        await asyncio.to_thread(worker.join)
+        outbox.enqueue(notify, value='flaky')
+        await asyncio.sleep(0.2)
+        await outbox.stop()
+
+    asyncio.run(scenario())
+    assert delivered == list(range(50)) + ['flaky']
+    stats = outbox.get_stats()
+    assert (stats['delivered'], stats['retried'], stats['failed']) == (51, 2, 0)
+    assert stats['batches'] >= 5
+    print("✅ test_delivery_from_threads_with_retry passed")
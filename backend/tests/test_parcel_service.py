@@ -7,41 +7,44 @@ sys.path.insert(0, '..')
 from backend.models.parcel import Parcel, ParcelCategory
 
 def test_parcel_statistics():
-    """Test le calcul des statistiques"""
+    """Test le calcul des statistiques à partir des agrégats calculés en base (SQLite)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from backend.database import Base
+    from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
     from backend.services.parcel_service import ParcelService
-    
-    # Mock repository
-    class MockParcelRepository:
-        def get_all(self):
-            return [
-                type('obj', (object,), {
-                    'id': '1',
-                    'reference_cadastrale': 'REF001',
-                    'area': 1000.0,
-                    'category': 'Habitation',
-                    'zone': 'Zone A',
-                    'status': 'available'
-                })(),
-                type('obj', (object,), {
-                    'id': '2',
-                    'reference_cadastrale': 'REF002',
-                    'area': 2000.0,
-                    'category': 'Commercial',
-                    'zone': 'Zone B',
-                    'status': 'occupied'
-                })()
-            ]
-    
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Parcel(id='1', reference_cadastrale='REF001', coordinates_lat=12.37, coordinates_lng=-1.52, area=1000.0,
+               address='Ouagadougou', category='Habitation', zone='Zone A', status='available'),
+        Parcel(id='2', reference_cadastrale='REF002', coordinates_lat=12.37, coordinates_lng=-1.52, area=2000.0,
+               address='Ouagadougou', category='Commercial', zone='Zone B', status='occupied'),
+        # Surface nulle exclue du min/max, zone vide comptée sous la valeur par défaut
+        Parcel(id='3', reference_cadastrale='REF003', coordinates_lat=12.37, coordinates_lng=-1.52, area=0,
+               address='Ouagadougou', category='Habitation', zone='', status='available'),
+    ])
+    db.commit()
+
+    repository = SqlParcelRepository(db)
     service = ParcelService(None, None, None, None)
-    service.parcel_repository = MockParcelRepository()
-    
+    service.parcel_repository = repository
+
     stats = service.get_parcel_statistics()
-    
-    assert stats['total'] == 2, f"Expected 2, got {stats['total']}"
+
+    assert stats['total'] == 3, f"Expected 3, got {stats['total']}"
     assert stats['total_area'] == 3000.0, f"Expected 3000.0, got {stats['total_area']}"
-    assert stats['average_area'] == 1500.0, f"Expected 1500.0, got {stats['average_area']}"
-    assert 'by_category' in stats
-    assert 'by_status' in stats
+    assert stats['average_area'] == 1000.0, f"Expected 1000.0, got {stats['average_area']}"
+    assert (stats['min_area'], stats['max_area']) == (1000.0, 2000.0)
+    assert stats['by_category'] == {'Habitation': 2, 'Commercial': 1}
+    assert stats['by_status'] == {'available': 2, 'occupied': 1}
+    assert stats['by_zone'] == {'Zone A': 1, 'Zone B': 1, 'Non définie': 1}
+
+    filtered = repository.get_statistics_aggregates({'category': 'Habitation'})
+    assert ('total', None, 2, 1000.0, 1000.0, 1000.0) in filtered
+    assert ('zone', 'Non définie', 1, 0, None, None) in filtered
     print("✅ test_parcel_statistics passed")
 
 def test_escape_like_pattern():
@@ -0,0 +1,73 @@
+"""
+Tests pour les statistiques matérialisées des parcelles
+"""
+import sys
+sys.path.insert(0, '..')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.parcel import Parcel
+from backend.models.parcel_stats import ParcelStat, PARCELS, OWNER
+from backend.infrastructure.repositories.parcel_stats_repository import SqlParcelStatsRepository
+
+
+def _session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _parcel(ref, area, category, zone=None, status='available', owner_id=None):
+    return Parcel(reference_cadastrale=ref, coordinates_lat=12.37, coordinates_lng=-1.52, area=area,
+                  address='Ouagadougou', category=category, zone=zone, status=status, owner_id=owner_id)
+
+
+def test_counters_follow_orm_writes():
+    """Test la mise à jour transactionnelle des compteurs lors des écritures ORM"""
+    db = _session()
+    first = _parcel('REF001', 1000.0, 'Habitation', 'Zone A', owner_id='u1')
+    db.add_all([first, _parcel('REF002', 2000.0, 'Commercial', owner_id='u1')])
+    db.commit()
+
+    snapshot = SqlParcelStatsRepository(db).get_snapshot()
+    assert snapshot[PARCELS][''] == (2, 3000.0)
+    assert snapshot['zone'] == {'Zone A': (1, 1000.0), 'Non définie': (1, 2000.0)}
+    assert snapshot[OWNER] == {'u1': (2, 0.0)}
+
+    first.status = 'occupied'
+    first.area = 1500.0
+    db.commit()
+    db.delete(db.query(Parcel).filter_by(reference_cadastrale='REF002').one())
+    db.commit()
+    db.delete(first)
+    db.add(_parcel('REF003', 1500.0, 'Habitation', status='occupied'))
+    db.commit()
+
+    snapshot = SqlParcelStatsRepository(db).get_snapshot()
+    assert snapshot[PARCELS][''] == (1, 1500.0)
+    assert snapshot['status'] == {'occupied': (1, 1500.0)}
+    assert 'Commercial' not in snapshot['category']
+    print("✅ test_counters_follow_orm_writes passed")
+
+
+def test_reconcile_corrects_drift():
+    """Test la correction des compteurs faussés par des écritures hors ORM"""
+    db = _session()
+    db.add(_parcel('REF001', 1000.0, 'Habitation'))
+    db.commit()
+
+    db.query(ParcelStat).filter_by(dimension=PARCELS).update({'item_count': 42})
+    db.add(ParcelStat(dimension='category', key='Fantome', item_count=3, total_area=0))
+    db.commit()
+
+    repository = SqlParcelStatsRepository(db)
+    assert repository.reconcile() == 2
+    db.commit()
+
+    snapshot = repository.get_snapshot()
+    assert snapshot[PARCELS][''] == (1, 1000.0)
+    assert snapshot['category'] == {'Habitation': (1, 1000.0)}
+    assert repository.reconcile() == 0
+    print("✅ test_reconcile_corrects_drift passed")
@@ -0,0 +1,134 @@
+"""
+Tests pour le cache des utilisateurs authentifiés
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+import dataclasses
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.user import User, Role
+from backend.core.event_bus import DatabaseEventBus
+from backend.core.notification_outbox import notification_outbox
+from backend.core.principal_cache import PrincipalCache, UserSnapshot, principal_cache
+from backend.utils.role_helpers import is_admin
+
+
+def _session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    role = Role(name='administrator')
+    db.add(User(id='u1', username='admin', email='admin@siu.bf', password_hash='x', role=role))
+    db.commit()
+    return db
+
+
+def test_snapshot_is_immutable():
+    """Test l'instantané : attributs du modèle User, non modifiable"""
+    db = _session()
+    snapshot = UserSnapshot.from_user(db.get(User, 'u1'))
+    assert snapshot.role.name == 'administrator'
+    assert is_admin(snapshot)
+    assert snapshot.to_dict()['role'] == 'administrator'
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.username = 'other'
+    print("✅ test_snapshot_is_immutable passed")
+
+
+def test_ttl_and_token_expiry():
+    """Test l'expiration des entrées (TTL et claim exp du token)"""
+    db = _session()
+    snapshot = UserSnapshot.from_user(db.get(User, 'u1'))
+    cache = PrincipalCache(ttl=60)
+    cache.put('t1', snapshot)
+    cache.put('t2', snapshot, token_expires_at=time.time() - 1)
+    assert cache.get('t1') is snapshot
+    assert cache.get('t2') is None
+
+    short = PrincipalCache(ttl=0.01)
+    short.put('t1', snapshot)
+    time.sleep(0.02)
+    assert short.get('t1') is None
+    print("✅ test_ttl_and_token_expiry passed")
+
+
+def test_invalidation_on_user_change():
+    """Test l'invalidation après modification de l'utilisateur ou de son rôle"""
+    db = _session()
+    principal_cache.clear()
+    user = db.get(User, 'u1')
+    principal_cache.put('t1', UserSnapshot.from_user(user))
+
+    user.first_name = 'Awa'
+    db.flush()
+    assert principal_cache.get('t1') is not None
+    db.commit()
+    assert principal_cache.get('t1') is None
+
+    # Vérification commencée avant une modification : le résultat n'est pas mis en cache
+    generation = principal_cache.generation
+    db.get(User, 'u1').is_active = False
+    db.commit()
+    principal_cache.put('t1', UserSnapshot.from_user(user), generation=generation)
+    assert principal_cache.get('t1') is None
+
+    principal_cache.put('t1', UserSnapshot.from_user(user))
+    db.get(Role, user.role_id).name = 'citizen'
+    db.commit()
+    assert principal_cache.get('t1') is None
+    print("✅ test_invalidation_on_user_change passed")
+
+
+
+def test_invalidation_reaches_other_workers(tmp_path):
+    """Test qu'une modification validée par un worker invalide le cache des autres via le bus"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'siu.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([User(id='u1', username='admin', email='admin@siu.bf', password_hash='x'),
+                User(id='u2', username='agent', email='agent@siu.bf', password_hash='x')])
+    db.commit()
+    snapshots = {user_id: UserSnapshot.from_user(db.get(User, user_id)) for user_id in ('u1', 'u2')}
+    other_worker = PrincipalCache(ttl=60)
+
+    async def scenario():
+        bus_a = DatabaseEventBus(factory, poll_interval=3600)
+        bus_b = DatabaseEventBus(factory, poll_interval=3600)
+        principal_cache.attach(bus_a)
+        other_worker.attach(bus_b)
+        await bus_a.start()
+        await bus_b.start()
+        await notification_outbox.start()
+        delivered = notification_outbox.get_stats()['delivered']
+        try:
+            other_worker.put('t1', snapshots['u1'])
+            other_worker.put('t2', snapshots['u2'])
+
+            db.get(User, 'u1').is_active = False
+            db.commit()
+            # Publication par le dispatcher de la boucle, après le COMMIT
+            for _ in range(100):
+                if notification_outbox.get_stats()['delivered'] > delivered:
+                    break
+                await asyncio.sleep(0.01)
+            assert other_worker.get('t1') is not None
+
+            await bus_b.poll()
+            assert other_worker.get('t1') is None
+            assert other_worker.get('t2') is snapshots['u2']
+        finally:
+            principal_cache.event_bus = None
+            await notification_outbox.stop()
+            await bus_a.stop()
+            await bus_b.stop()
+
+    asyncio.run(scenario())
+    print("✅ test_invalidation_reaches_other_workers passed")
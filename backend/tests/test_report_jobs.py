@@ -0,0 +1,146 @@
+"""
+Tests pour la file de génération des rapports, son cache et le planificateur
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.parcel import Parcel
+from backend.models.report_schedule import ReportSchedule
+from backend.core.report_jobs import ReportJobQueue, ReportScheduler, compute_next_run, DONE
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reports.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+class FakeRenderer:
+    """Rendu simulé : compte les appels et attend d'être libéré"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, kind, params, output_path):
+        self.calls.append((kind, params))
+        self.release.wait(5)
+        with open(output_path, 'wb') as f:
+            f.write(b'%PDF-1.4 rapport')
+        return 16
+
+
+def test_cached_until_parcel_changes(tmp_path):
+    """Test la déduplication des demandes en cours et le cache tant que la parcelle est inchangée"""
+    db = _session_factory(tmp_path)()
+    parcel = Parcel(reference_cadastrale='REF001', coordinates_lat=12.37, coordinates_lng=-1.52, area=1000.0,
+                    address='Ouagadougou', category='Habitation', status='available')
+    db.add(parcel)
+    db.commit()
+
+    renderer = FakeRenderer()
+    queue = ReportJobQueue(cache_dir=str(tmp_path / 'cache'), executor=ThreadPoolExecutor(2), renderer=renderer)
+    params = {'parcel_id': parcel.id, 'include_map': 'false'}
+
+    first = queue.submit('parcel_pdf', params, db)
+    # Même demande, écrite autrement, pendant le rendu : rattachée au même job
+    second = queue.submit('parcel_pdf', dict(params, include_map=False, nearby_radius=2), db)
+    assert second is first
+    renderer.release.set()
+    asyncio.run(queue.wait(first, 5))
+    assert first.status == DONE and first.path.read_bytes() == b'%PDF-1.4 rapport'
+
+    cached = queue.submit('parcel_pdf', params, db)
+    assert cached.status == DONE and cached.id == first.id
+    # Un autre worker partageant le dossier de cache retrouve le résultat
+    assert ReportJobQueue(cache_dir=str(tmp_path / 'cache')).get(first.id).status == DONE
+
+    parcel.area = 1200.0
+    db.commit()
+    updated = queue.submit('parcel_pdf', params, db)
+    assert updated.id != first.id
+    asyncio.run(queue.wait(updated, 5))
+
+    assert len(renderer.calls) == 2
+    stats = queue.get_stats()
+    assert (stats['deduplicated'], stats['cache_hits'], stats['rendered']) == (1, 1, 2)
+
+    with pytest.raises(ValueError):
+        queue.submit('parcel_pdf', {'parcel_id': parcel.id, 'include_map': 'peut-être'}, db)
+    with pytest.raises(ValueError):
+        queue.submit('parcel_pdf', {}, db)
+    print("✅ test_cached_until_parcel_changes passed")
+
+
+def test_compute_next_run():
+    """Test le calcul de la prochaine échéance quotidienne, hebdomadaire et mensuelle"""
+    anchor = datetime(2026, 1, 31, 9, 0)  # Samedi
+    after = datetime(2026, 2, 10, 8, 0)  # Mardi
+    assert compute_next_run('daily', '07:30', after, anchor) == datetime(2026, 2, 11, 7, 30)
+    assert compute_next_run('daily', '09:00', after, anchor) == datetime(2026, 2, 10, 9, 0)
+    assert compute_next_run('weekly', '09:00', after, anchor) == datetime(2026, 2, 14, 9, 0)
+    assert compute_next_run('monthly', '06:00', after, anchor) == datetime(2026, 2, 28, 6, 0)
+    assert compute_next_run('monthly', '06:00', datetime(2026, 12, 28, 7, 0), anchor) == datetime(2027, 1, 28, 6, 0)
+    with pytest.raises(ValueError):
+        compute_next_run('hourly', '06:00', after, anchor)
+    with pytest.raises(ValueError):
+        compute_next_run('daily', '25:00', after, anchor)
+    print("✅ test_compute_next_run passed")
+
+
+def test_scheduled_report_runs_once_across_workers(tmp_path):
+    """Test qu'une échéance n'est déclenchée que par un seul worker"""
+    factory = _session_factory(tmp_path)
+    renderer = FakeRenderer()
+    renderer.release.set()
+    queue = ReportJobQueue(cache_dir=str(tmp_path / 'cache'), executor=ThreadPoolExecutor(1), renderer=renderer)
+    workers = [ReportScheduler(queue, factory), ReportScheduler(queue, factory)]
+
+    db = factory()
+    schedule = workers[0].schedule(db, 'audit_pdf', {'days': '7'}, 'daily', '06:00', created_by='u1')
+    assert schedule['parameters'] == '{"days": 7}'
+    due = datetime.fromisoformat(schedule['next_run_at'])
+
+    assert sum(worker.run_due(due) for worker in workers) == 1
+    assert sum(worker.run_due(due) for worker in workers) == 0
+
+    row = db.query(ReportSchedule).one()
+    db.refresh(row)
+    assert row.last_job_id.startswith('audit_pdf-')
+    assert row.next_run_at > due
+    queue.stop()
+    assert [call[0] for call in renderer.calls] == ['audit_pdf']
+    print("✅ test_scheduled_report_runs_once_across_workers passed")
+
+
+def test_real_process_pool_renders(tmp_path, monkeypatch):
+    """Test le pool de processus réel (spawn) : construction et rendu d'un export Excel"""
+    url = f"sqlite:///{tmp_path / 'reports.db'}"
+    factory = sessionmaker(bind=create_engine(url))
+    Base.metadata.create_all(bind=factory.kw['bind'])
+    db = factory()
+    db.add(Parcel(reference_cadastrale='REF001', coordinates_lat=12.37, coordinates_lng=-1.52, area=1000.0,
+                  address='Ouagadougou', category='Habitation', zone='Zone A', status='available'))
+    db.commit()
+    # Les processus lancés par spawn lisent la base depuis l'environnement
+    monkeypatch.setenv('DATABASE_URL', url)
+
+    queue = ReportJobQueue(cache_dir=str(tmp_path / 'cache'), workers=1)
+    try:
+        job = queue.submit('parcels_excel', {'zone': 'Zone A'}, db)
+        asyncio.run(queue.wait(job, 120))
+        assert job.status == DONE, job.error
+        assert job.path.read_bytes()[:2] == b'PK' and job.size == job.path.stat().st_size
+    finally:
+        queue.stop()
+    print("✅ test_real_process_pool_renders passed")
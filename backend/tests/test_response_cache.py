@@ -0,0 +1,84 @@
+"""
+Tests pour le cache des réponses
+"""
+import sys
+sys.path.insert(0, '..')
+
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.parcel import Parcel
+from backend.core.response_cache import InMemoryCacheBackend, cached_response, response_cache
+
+
+def test_lru_and_ttl():
+    """Test l'éviction LRU et l'expiration des entrées"""
+    backend = InMemoryCacheBackend(max_entries=2)
+    backend.set('a', 1, ttl=60)
+    backend.set('b', 2, ttl=60)
+    assert backend.get('a') == 1
+    backend.set('c', 3, ttl=60)
+    assert backend.get('a') == 1
+    assert backend.get('c') == 3
+    assert backend.get('b') != 2
+
+    backend.set('d', 4, ttl=0)
+    time.sleep(0.01)
+    assert backend.get('d') != 4
+    print("✅ test_lru_and_ttl passed")
+
+
+def test_cached_response_keys_and_invalidation():
+    """Test la clé par paramètres et rôle, et l'invalidation après écriture"""
+    response_cache.clear()
+    calls = []
+
+    class FakeUser:
+        def __init__(self, role):
+            self.role = role
+
+    @cached_response()
+    def endpoint(zone=None, current_user=None, db=None):
+        calls.append(zone)
+        return {'zone': zone, 'count': len(calls)}
+
+    admin = FakeUser('admin')
+    assert endpoint(zone='A', current_user=admin, db=object()) == {'zone': 'A', 'count': 1}
+    assert endpoint(zone='A', current_user=admin, db=object()) == {'zone': 'A', 'count': 1}
+    assert endpoint(zone='B', current_user=admin)['count'] == 2
+    assert endpoint(zone='A', current_user=FakeUser('agent'))['count'] == 3
+    assert response_cache.get_stats()['hits'] == 1
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Parcel(reference_cadastrale='REF001', coordinates_lat=12.37, coordinates_lng=-1.52,
+                  area=100.0, address='Ouagadougou', category='Habitation'))
+    db.flush()
+    assert endpoint(zone='A', current_user=admin)['count'] == 1
+    db.commit()
+    assert endpoint(zone='A', current_user=admin)['count'] == 4
+    print("✅ test_cached_response_keys_and_invalidation passed")
+
+
+def test_user_counts_invalidated_by_user_writes():
+    """Test que les compteurs d'utilisateurs du dashboard sont invalidés par une écriture sur users"""
+    from backend.controllers.analytics_controller import get_dashboard_analytics
+    from backend.models.user import User
+
+    response_cache.clear()
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    admin = User(id='u1', username='admin', email='admin@siu.bf', password_hash='x')
+    db.add(admin)
+    db.commit()
+
+    assert get_dashboard_analytics(db_session=db, current_user=admin)['totalUsers'] == 1
+    db.add(User(id='u2', username='agent', email='agent@siu.bf', password_hash='x'))
+    db.commit()
+    assert get_dashboard_analytics(db_session=db, current_user=admin)['totalUsers'] == 2
+    print("✅ test_user_counts_invalidated_by_user_writes passed")
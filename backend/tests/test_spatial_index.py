@@ -0,0 +1,156 @@
+"""
+Tests pour l'index spatial des parcelles
+"""
+import sys
+sys.path.insert(0, '..')
+
+import shapely
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import begin_unit_of_work, end_unit_of_work
+from backend.core.spatial_index import ParcelSpatialIndex, parse_geometry
+from backend.models.parcel import normalize_geometry
+
+
+def _rows():
+    return [
+        ('a', 12.3700, -1.5200, [[-1.5201, 12.3699], [-1.5199, 12.3699], [-1.5199, 12.3701], [-1.5201, 12.3699]]),
+        ('b', 12.3750, -1.5200, None),
+        ('c', 12.4500, -1.5200, {'type': 'Polygon', 'coordinates': [[[-1.52, 12.45], [-1.51, 12.45], [-1.51, 12.46]]]}),
+    ]
+
+
+def test_parse_geometry():
+    """Test l'analyse des différents formats de géométrie stockés"""
+    assert parse_geometry(None) is None
+    assert parse_geometry('not json') is None
+    assert parse_geometry([0, 0, 1, 0, 1, 1]).bounds == (0.0, 0.0, 1.0, 1.0)
+
+    multi = parse_geometry('{"type": "MultiPolygon", "coordinates": [[[[1, 2, 0], [3, 2, 0], [3, 4, 0], [1, 2, 0]]]]}')
+    assert multi.geom_type == 'MultiPolygon'
+    assert not multi.has_z
+    print("✅ test_parse_geometry passed")
+
+
+def test_normalize_geometry():
+    """Test la normalisation à l'écriture des différents formats de géométrie"""
+    flat = normalize_geometry(0.5, 0.5, [0, 0, 1, 0, 1, 1, 0, 1, 0, 0])
+    nested = normalize_geometry(0.5, 0.5, '{"type": "Polygon", "coordinates": [[[0, 0, 3], [1, 0, 3], [1, 1, 3], [0, 1, 3], [0, 0, 3]]]}')
+    assert flat['geometry_geojson'] == nested['geometry_geojson']
+    assert flat['geometry_wkb'] == nested['geometry_wkb']
+    assert parse_geometry(flat['geometry_wkb']).equals(shapely.box(0, 0, 1, 1))
+    assert flat['vertex_count'] == 5
+    assert (flat['centroid_lat'], flat['centroid_lng']) == (0.5, 0.5)
+    assert (flat['min_lat'], flat['max_lng']) == (0.0, 1.0)
+
+    # Sans géométrie : le point déclaré sert de centroïde et d'emprise
+    empty = normalize_geometry(12.0, -1.5, None)
+    assert empty['geometry_wkb'] is None
+    assert (empty['centroid_lat'], empty['min_lat'], empty['max_lng']) == (12.0, 12.0, -1.5)
+    print("✅ test_normalize_geometry passed")
+
+
+def test_exact_predicates():
+    """Test que within/intersects suivent la topologie réelle et non l'emprise"""
+    index = ParcelSpatialIndex()
+    index.ensure_built(lambda: [
+        ('inside', 0.5, 0.5, [[0.4, 0.4], [0.6, 0.4], [0.6, 0.6], [0.4, 0.6], [0.4, 0.4]]),
+        ('crossing', 1.0, 1.0, [[0.9, 0.9], [1.1, 0.9], [1.1, 1.1], [0.9, 1.1], [0.9, 0.9]]),
+        # Dans l'emprise du triangle mais hors du triangle lui-même
+        ('corner', 1.8, 0.2, [[1.7, 0.1], [1.9, 0.1], [1.9, 0.3], [1.7, 0.3], [1.7, 0.1]]),
+    ])
+    triangle = shapely.Polygon([(0, 0), (0, 2), (2, 2)])
+    square = shapely.box(0, 0, 1.0, 1.0)
+
+    assert index.query_geometry(square, 'within') == ['inside']
+    assert sorted(index.query_geometry(square, 'intersects')) == ['crossing', 'inside']
+    assert sorted(index.query_geometry(triangle, 'intersects')) == ['crossing', 'inside']
+    print("✅ test_exact_predicates passed")
+
+
+def test_nearby_sorted_by_distance():
+    """Test la recherche de proximité"""
+    index = ParcelSpatialIndex()
+    index.ensure_built(_rows)
+
+    results = index.nearby(12.3700, -1.5200, radius_km=1.0)
+    assert [r[0] for r in results] == ['a', 'b'], f"Got {results}"
+    assert results[0][1] == 0.0
+    assert 0.5 < results[1][1] < 0.6
+    print("✅ test_nearby_sorted_by_distance passed")
+
+
+def test_incremental_updates():
+    """Test les ajouts, déplacements et suppressions après construction"""
+    index = ParcelSpatialIndex(rebuild_threshold=1)
+    index.ensure_built(_rows)
+
+    index.upsert('d', 12.3701, -1.5201)
+    index.remove('a')
+    assert sorted(index.query_bbox(-1.53, 12.36, -1.51, 12.38)) == ['b', 'd']
+
+    # Le seuil dépassé a forcé la reconstruction de l'arbre
+    assert index.get_stats()['pending_updates'] == 0
+
+    # Déplacer 'b' hors de la zone
+    index.upsert('b', 13.0, -1.0)
+    assert index.query_bbox(-1.53, 12.36, -1.51, 12.38) == ['d']
+    assert index.get_stats()['pending_updates'] == 1
+    print("✅ test_incremental_updates passed")
+
+
+
+def test_updates_during_build_are_kept():
+    """Test que les modifications reçues avant et pendant la construction ne sont pas perdues"""
+    index = ParcelSpatialIndex()
+    index.upsert('e', 12.3702, -1.5202)
+
+    def loader():
+        # Requêtes concurrentes pendant la construction en arrière-plan : lignes déjà lues
+        index.upsert('d', 12.3701, -1.5201)
+        index.upsert('b', 13.0, -1.0)
+        index.remove('a')
+        return _rows()
+
+    index.ensure_built(loader)
+    assert sorted(index.query_bbox(-1.53, 12.36, -1.51, 12.38)) == ['d', 'e']
+    assert index.query_bbox(-1.01, 12.99, -0.99, 13.01) == ['b']
+    assert len(index) == 4 and index._early_changes == {}
+    print("✅ test_updates_during_build_are_kept passed")
+
+
+def test_changes_applied_only_after_commit():
+    """Test qu'une modification faite dans une unité de travail n'est appliquée qu'au COMMIT"""
+    index = ParcelSpatialIndex()
+    index.ensure_built(_rows)
+    session_factory = sessionmaker(bind=create_engine("sqlite://"))
+
+    for outcome in ('rollback', 'commit'):
+        unit, token = begin_unit_of_work(session_factory)
+        try:
+            unit.session.commit()  # Le repository a déjà validé ses écritures
+            index.upsert('d', 12.3701, -1.5201)
+            index.remove('a')
+            assert sorted(index.query_bbox(-1.53, 12.36, -1.51, 12.38)) == ['a', 'b']
+            getattr(unit, outcome)()
+        finally:
+            unit.close()
+            end_unit_of_work(token)
+        if outcome == 'rollback':
+            # L'annulation n'a laissé ni parcelle fantôme ni parcelle perdue
+            assert sorted(index.query_bbox(-1.53, 12.36, -1.51, 12.38)) == ['a', 'b']
+
+    assert sorted(index.query_bbox(-1.53, 12.36, -1.51, 12.38)) == ['b', 'd']
+    print("✅ test_changes_applied_only_after_commit passed")
+
+
+if __name__ == '__main__':
+    test_parse_geometry()
+    test_normalize_geometry()
+    test_exact_predicates()
+    test_nearby_sorted_by_distance()
+    test_incremental_updates()
+    test_updates_during_build_are_kept()
+    test_changes_applied_only_after_commit()
+    print("\n✅ Tous les tests de l'index spatial passés")
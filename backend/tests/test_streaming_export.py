@@ -0,0 +1,96 @@
+"""
+Tests pour les exports en flux (CSV, GeoJSON, KML) et leur compression gzip
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from backend.database import Base
+from backend.models.parcel import Parcel
+from backend.models.user import User
+from backend.infrastructure.repositories.parcel_repository import SqlParcelRepository
+from backend.services.geospatial_export_service import GeospatialExportService
+from backend.core.streaming_export import export_response, iter_csv
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _request(accept_encoding):
+    return Request({'type': 'http', 'headers': [(b'accept-encoding', accept_encoding.encode())]})
+
+
+def _body(response):
+    async def collect():
+        return b''.join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(collect())
+
+
+def test_exports_stream_filtered_parcels():
+    """Test les exports GeoJSON, KML et CSV des parcelles lues par lots, avec le nom du propriétaire"""
+    db = _session()
+    db.add(User(id='u1', username='owner', email='owner@siu.bf', password_hash='x', first_name='Awa', last_name='Ouédraogo'))
+    db.add_all([
+        Parcel(reference_cadastrale=f'REF{i:03d}', coordinates_lat=12.0 + i / 100, coordinates_lng=-1.5, area=100.0 + i,
+               address=f'Lot {i} & fils', category='Habitation', zone='Zone A' if i % 2 else 'Zone B',
+               owner_id='u1' if i < 3 else None)
+        for i in range(25)
+    ])
+    db.commit()
+
+    repository = SqlParcelRepository(db)
+    service = GeospatialExportService()
+
+    def records(filters=None):
+        return service.parcel_records(repository.iter_export_rows(filters, batch_size=4))
+
+    geojson = json.loads(b''.join(service.iter_geojson(records({'zone': 'Zone A'}))))
+    assert geojson['metadata']['total_features'] == len(geojson['features']) == 12
+    features = {feature['properties']['reference']: feature for feature in geojson['features']}
+    assert features['REF001']['properties']['owner_name'] == 'Awa Ouédraogo'
+    assert features['REF003']['properties']['owner_name'] is None
+    assert features['REF001']['geometry'] == {'type': 'Point', 'coordinates': [-1.5, 12.01]}
+
+    rows = list(csv.DictReader(io.StringIO(b''.join(service.iter_csv_with_coordinates(records())).decode('utf-8-sig'))))
+    assert sorted(row['reference'] for row in rows) == [f'REF{i:03d}' for i in range(25)]
+    assert all(row['address'].endswith('& fils') for row in rows)
+
+    kml = b''.join(service.iter_kml(records()))
+    assert kml.count(b'<Placemark>') == 25 and kml.endswith(b'</kml>\n')
+
+    # L'en-tête part avant toute lecture des lignes
+    def failing_rows():
+        raise AssertionError("lignes lues trop tôt")
+        yield
+    assert next(service.iter_geojson(failing_rows())).startswith(b'{"type": "FeatureCollection"')
+    print("✅ test_exports_stream_filtered_parcels passed")
+
+
+def test_export_response_gzip_negotiation():
+    """Test la compression gzip incrémentale selon l'en-tête Accept-Encoding"""
+    rows = ({'n': i, 'label': f'parcelle {i}'} for i in range(20000))
+    plain = b''.join(iter_csv(['n', 'label'], rows, chunk_size=1024))
+
+    compressed = export_response(iter_csv(['n', 'label'], ({'n': i, 'label': f'parcelle {i}'} for i in range(20000))),
+                                 'export.csv', 'text/csv', _request('gzip, deflate'))
+    assert compressed.headers['content-encoding'] == 'gzip'
+    body = _body(compressed)
+    assert gzip.decompress(body) == plain and len(body) < len(plain) / 3
+
+    identity = export_response(iter([b'a,b\r\n']), 'export.csv', 'text/csv', _request('gzip;q=0, identity'))
+    assert 'content-encoding' not in identity.headers
+    assert _body(identity) == b'a,b\r\n'
+    assert identity.headers['content-disposition'] == 'attachment; filename=export.csv'
+    print("✅ test_export_response_gzip_negotiation passed")
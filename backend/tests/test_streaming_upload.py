@@ -0,0 +1,242 @@
+"""
+Tests pour la réception des uploads en flux (validation, hachage et taille en un seul passage)
+"""
+import sys
+sys.path.insert(0, '..')
+
+import hashlib
+import io
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("werkzeug")
+
+from backend.services.document_validator import DocumentValidator
+from backend.services.storage_service import StorageService, UploadRejected
+
+
+class GeneratedStream:
+    """Flux de `size` octets produits à la demande (aucun fichier complet en mémoire)"""
+
+    def __init__(self, size, head=b'%PDF-1.4\n'):
+        self.remaining = size
+        self.head = head
+        self.read_bytes = 0
+
+    def read(self, n=-1):
+        n = self.remaining if n < 0 else min(n, self.remaining)
+        chunk = (self.head + b'x' * n)[:n] if self.read_bytes == 0 else b'x' * n
+        self.remaining -= n
+        self.read_bytes += n
+        return chunk
+
+
+def _inspect_with(validator, filename):
+    def inspect(head):
+        is_valid, error, _ = validator.validate_header(head, filename)
+        if not is_valid:
+            raise UploadRejected(error)
+    return inspect
+
+
+def test_single_pass_bounded_memory(tmp_path):
+    """Test qu'un gros upload est haché et placé sans être chargé en mémoire"""
+    storage = StorageService(str(tmp_path))
+    size = 20 * 1024 * 1024
+    expected = hashlib.sha256()
+    reference = GeneratedStream(size)
+    while chunk := reference.read(1024 * 1024):
+        expected.update(chunk)
+
+    tracemalloc.start()
+    staged = storage.receive_upload(GeneratedStream(size), size, _inspect_with(DocumentValidator(), 'plan.pdf'))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert peak < 2 * 1024 * 1024
+    assert (staged.size, staged.checksum) == (size, expected.hexdigest())
+
+    stored = storage.commit_upload(staged, storage.document_path('p1', 'd1', 'plan.pdf'))
+    assert stored == 'parcels/p1/documents/d1.pdf'
+    assert (tmp_path / stored).stat().st_size == size
+    assert list((tmp_path / 'tmp').iterdir()) == []
+    print("✅ test_single_pass_bounded_memory passed")
+
+
+def test_rejected_early(tmp_path):
+    """Test le refus d'un fichier trop volumineux ou d'un type interdit sans lire tout le flux"""
+    storage = StorageService(str(tmp_path))
+    validator = DocumentValidator(max_file_size_mb=1)
+
+    too_big = GeneratedStream(50 * 1024 * 1024)
+    with pytest.raises(UploadRejected, match="trop volumineux"):
+        storage.receive_upload(too_big, validator.max_file_size, chunk_size=64 * 1024)
+    assert too_big.read_bytes <= validator.max_file_size + 64 * 1024
+
+    executable = GeneratedStream(10 * 1024 * 1024)
+    with pytest.raises(UploadRejected, match="non autorisée"):
+        storage.receive_upload(executable, None, _inspect_with(validator, 'setup.exe'), chunk_size=64 * 1024)
+    assert executable.read_bytes == 64 * 1024
+
+    # Un fichier plus court que la zone examinée est tout de même inspecté
+    with pytest.raises(UploadRejected):
+        storage.receive_upload(io.BytesIO(b'MZ'), None, _inspect_with(validator, 'a.exe'))
+
+    assert list((tmp_path / 'tmp').iterdir()) == []
+    print("✅ test_rejected_early passed")
+
+
+def test_parallel_prepare_keeps_order(tmp_path):
+    """Test le traitement parallèle d'un lot : résultats dans l'ordre, refus par fichier"""
+    from backend.services.document_service_new import DocumentService, PreparedUpload
+
+    service = DocumentService(None)
+    service.storage = StorageService(str(tmp_path))
+    files = [(GeneratedStream(256 * 1024 + i), f'plan_{i}.pdf') for i in range(8)]
+    files[3] = (io.BytesIO(b'MZ'), 'setup.exe')
+    files[5] = (io.BytesIO(b''), 'vide.pdf')
+
+    prepared = service.prepare_uploads(files, max_workers=4)
+
+    assert [isinstance(item, PreparedUpload) for item in prepared] == [True, True, True, False, True, False, True, True]
+    assert [item.staged.size for item in prepared if isinstance(item, PreparedUpload)] == \
+        [256 * 1024 + i for i in (0, 1, 2, 4, 6, 7)]
+    assert "Fichier vide" in str(prepared[5])
+    # Seuls les fichiers acceptés restent en attente d'enregistrement
+    assert len(list((tmp_path / 'tmp').iterdir())) == 6
+    print("✅ test_parallel_prepare_keeps_order passed")
+
+
+class FailingStream:
+    """Flux dont la lecture échoue après un premier bloc (erreur inattendue, pas un refus)"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def read(self, n=-1):
+        self.calls += 1
+        if self.calls > 1:
+            raise OSError("connexion interrompue")
+        return b'%PDF-1.4\n' + b'x' * 100
+
+
+def test_parallel_prepare_isolates_unexpected_errors(tmp_path):
+    """Test qu'une erreur inattendue sur un fichier n'abandonne pas les uploads déjà reçus du lot"""
+    from backend.services.document_service_new import DocumentService, PreparedUpload
+
+    service = DocumentService(None)
+    service.storage = StorageService(str(tmp_path))
+
+    for max_workers in (1, 3):
+        files = [(GeneratedStream(64 * 1024), 'plan_0.pdf'), (FailingStream(), 'plan_1.pdf'),
+                 (GeneratedStream(64 * 1024), 'plan_2.pdf')]
+        prepared = service.prepare_uploads(files, max_workers=max_workers)
+        assert [isinstance(item, PreparedUpload) for item in prepared] == [True, False, True]
+        assert isinstance(prepared[1], UploadRejected) and "connexion interrompue" in str(prepared[1])
+        # Seuls les deux fichiers reçus restent, à enregistrer ou supprimer par l'appelant
+        assert len(list((tmp_path / 'tmp').iterdir())) == 2
+        for item in prepared[::2]:
+            service.storage.discard_upload(item.staged)
+    print("✅ test_parallel_prepare_isolates_unexpected_errors passed")
+
+
+def test_upload_multiple_endpoint(tmp_path, monkeypatch):
+    """Test l'endpoint POST /api/documents/upload-multiple : documents enregistrés et refus par fichier"""
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from backend.controllers import document_controller
+    from backend.database import Base
+    from backend.dependencies import get_db, require_admin
+    from backend.models.document import Document
+    from backend.models.parcel import Parcel
+    from backend.models.user import User
+    from backend.services import document_service_new
+
+    engine = create_engine("sqlite://", connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    admin = User(id='u1', username='admin', email='admin@siu.bf', password_hash='x')
+    db.add_all([admin, Parcel(id='p1', reference_cadastrale='REF001', coordinates_lat=12.37,
+                              coordinates_lng=-1.52, area=100.0, address='Ouagadougou', category='Habitation')])
+    db.commit()
+    monkeypatch.setattr(document_service_new, 'UPLOAD_BASE_FOLDER', str(tmp_path))
+
+    app = FastAPI()
+    app.include_router(document_controller.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[require_admin] = lambda: admin
+
+    response = TestClient(app).post('/api/documents/upload-multiple', data={
+        'parcel_id': 'p1', 'document_type': 'SURVEY_PLAN'
+    }, files=[
+        ('files', ('plan_a.pdf', b'%PDF-1.4 plan a', 'application/pdf')),
+        ('files', ('setup.exe', b'MZ' + b'\x00' * 64, 'application/octet-stream')),
+        ('files', ('plan_b.pdf', b'%PDF-1.4 plan b', 'application/pdf')),
+    ])
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert [item['filename'] for item in body['success']] == ['plan_a.pdf', 'plan_b.pdf']
+    assert [item['filename'] for item in body['errors']] == ['setup.exe']
+    assert body['stats']['stored'] == 2
+    assert sorted(doc.original_filename for doc in db.query(Document).all()) == ['plan_a.pdf', 'plan_b.pdf']
+    assert list((tmp_path / 'tmp').iterdir()) == []
+    print("✅ test_upload_multiple_endpoint passed")
+
+
+def test_upload_document_endpoint(tmp_path, monkeypatch):
+    """Test l'endpoint POST /api/documents/ : un fichier enregistré par le service documentaire complet"""
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from backend.controllers import document_controller
+    from backend.database import Base
+    from backend.dependencies import get_db, require_admin
+    from backend.models.document import Document
+    from backend.models.parcel import Parcel
+    from backend.models.user import User
+    from backend.services import document_service_new
+
+    engine = create_engine("sqlite://", connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    admin = User(id='u1', username='admin', email='admin@siu.bf', password_hash='x')
+    db.add_all([admin, Parcel(id='p1', reference_cadastrale='REF001', coordinates_lat=12.37,
+                              coordinates_lng=-1.52, area=100.0, address='Ouagadougou', category='Habitation')])
+    db.commit()
+    monkeypatch.setattr(document_service_new, 'UPLOAD_BASE_FOLDER', str(tmp_path))
+
+    app = FastAPI()
+    app.include_router(document_controller.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[require_admin] = lambda: admin
+    client = TestClient(app)
+
+    response = client.post('/api/documents/', data={'parcel_id': 'p1', 'document_type': 'SURVEY_PLAN'},
+                           files={'file': ('plan.pdf', b'%PDF-1.4 plan', 'application/pdf')})
+
+    assert response.status_code == 201, response.text
+    assert response.json()['success'] is True
+    assert [doc.original_filename for doc in db.query(Document).all()] == ['plan.pdf']
+
+    rejected = client.post('/api/documents/', data={'parcel_id': 'p1', 'document_type': 'SURVEY_PLAN'},
+                           files={'file': ('setup.exe', b'MZ' + b'\x00' * 64, 'application/octet-stream')})
+    assert rejected.status_code == 400
+
+    # Les extensions ne sont pas des types de document
+    wrong_type = client.post('/api/documents/', data={'parcel_id': 'p1', 'document_type': 'pdf'},
+                             files={'file': ('plan.pdf', b'%PDF-1.4 plan', 'application/pdf')})
+    assert wrong_type.status_code == 400
+    assert db.query(Document).count() == 1
+    assert list((tmp_path / 'tmp').iterdir()) == []
+    print("✅ test_upload_document_endpoint passed")
@@ -0,0 +1,123 @@
+"""
+Tests pour la révocation partagée des tokens
+"""
+import sys
+sys.path.insert(0, '..')
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models.revoked_token import RevokedToken
+from backend.core.token_revocation import BloomFilter, TokenRevocationStore, token_digest
+
+
+def _session_factory(tmp_path):
+    # Base fichier partagée, comme entre plusieurs workers
+    engine = create_engine(f"sqlite:///{tmp_path / 'tokens.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_bloom_filter():
+    """Test l'absence de faux négatifs et un taux de faux positifs proche de la cible"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [os.urandom(32) for _ in range(1000)]
+    for digest in added:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in added)
+
+    false_positives = sum(os.urandom(32) in bloom for _ in range(10000))
+    assert false_positives < 300
+    print("✅ test_bloom_filter passed")
+
+
+def test_revocation_shared_between_workers(tmp_path):
+    """Test qu'une révocation faite par un worker est vue par un autre"""
+    factory = _session_factory(tmp_path)
+    worker_a = TokenRevocationStore(factory, sync_interval=0)
+    worker_b = TokenRevocationStore(factory, sync_interval=0)
+
+    assert not worker_b.is_revoked('token-1')
+    worker_a.revoke('token-1', user_id='u1', expires_at=datetime.utcnow() + timedelta(hours=1))
+    assert worker_a.is_revoked('token-1')
+    assert worker_b.is_revoked('token-1')
+    assert not worker_b.is_revoked('token-2')
+
+    # Un nouveau worker charge les révocations existantes
+    assert TokenRevocationStore(factory, sync_interval=0).is_revoked('token-1')
+    print("✅ test_revocation_shared_between_workers passed")
+
+
+def test_purge_expired(tmp_path):
+    """Test la purge des révocations de tokens expirés"""
+    factory = _session_factory(tmp_path)
+    store = TokenRevocationStore(factory, sync_interval=0)
+    store.revoke('old', expires_at=datetime.utcnow() - timedelta(minutes=1))
+    store.revoke('current', expires_at=datetime.utcnow() + timedelta(hours=1))
+
+    assert store.purge_expired() == 1
+    assert token_digest('old') not in store.bloom
+    assert store.is_revoked('current')
+
+    db = factory()
+    assert [row.token_hash for row in db.query(RevokedToken).all()] == [token_digest('current').hex()]
+    db.close()
+    print("✅ test_purge_expired passed")
+
+
+def test_revocation_committed_out_of_order(tmp_path):
+    """Test qu'une révocation d'id inférieur, validée après un id supérieur déjà synchronisé, est vue"""
+    factory = _session_factory(tmp_path)
+    worker = TokenRevocationStore(factory, sync_interval=0)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    db = factory()
+    db.add(RevokedToken(id=10, token_hash=token_digest('later').hex(), expires_at=expires_at))
+    db.commit()
+    assert worker.is_revoked('later') and worker._last_id == 10
+
+    # Id attribué avant 10 par la séquence, mais transaction validée après la synchronisation
+    db.add(RevokedToken(id=7, token_hash=token_digest('earlier').hex(), expires_at=expires_at))
+    db.commit()
+    db.close()
+    assert worker.is_revoked('earlier')
+    assert worker.bloom.count == 2
+    print("✅ test_revocation_committed_out_of_order passed")
+
+
+def test_revoked_while_filter_rebuilds(tmp_path):
+    """Test qu'un token révoqué reste refusé pendant la reconstruction du filtre (purge, saturation)"""
+    factory = _session_factory(tmp_path)
+    during_rebuild = []
+    checking = []
+
+    def slow_factory():
+        # Requête concurrente pendant chaque relecture de la table
+        if store._lock.locked() and not checking:
+            checking.append(1)
+            during_rebuild.append(token_digest('live-token') in store.bloom)
+            checking.clear()
+        return factory()
+
+    store = TokenRevocationStore(slow_factory, sync_interval=0, capacity=4)
+    store.revoke('old', expires_at=datetime.utcnow() - timedelta(minutes=1))
+    store.revoke('live-token', expires_at=datetime.utcnow() + timedelta(hours=1))
+    assert store.is_revoked('live-token')
+
+    during_rebuild.clear()
+    assert store.purge_expired() == 1
+    assert during_rebuild == [True]
+
+    # Saturation : le filtre agrandi n'est publié qu'une fois rempli
+    during_rebuild.clear()
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    for i in range(6):
+        store.revoke(f'token-{i}', expires_at=expires_at)
+    assert store.is_revoked('live-token')
+    assert len(during_rebuild) >= 2 and all(during_rebuild) and store.capacity >= 7
+    assert all(store.is_revoked(f'token-{i}') for i in range(6))
+    print("✅ test_revoked_while_filter_rebuilds passed")
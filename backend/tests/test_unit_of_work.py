@@ -0,0 +1,76 @@
+"""
+Tests pour l'unité de travail par requête
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+
+from backend.database import UnitOfWork, get_request_session
+from backend.middleware.unit_of_work_middleware import UnitOfWorkMiddleware
+
+
+class FakeSession:
+    def __init__(self, events):
+        self.events = events
+
+    def commit(self):
+        self.events.append('commit')
+
+    def rollback(self):
+        self.events.append('rollback')
+
+    def close(self):
+        self.events.append('close')
+
+
+def _run(status_code, events, monkeypatch):
+    monkeypatch.setattr('backend.database.SessionLocal', lambda: FakeSession(events))
+    sessions = []
+
+    async def app(scope, receive, send):
+        # Deux résolutions pendant la même requête : même session
+        sessions.append(get_request_session())
+        sessions.append(get_request_session())
+        await send({'type': 'http.response.start', 'status': status_code, 'headers': []})
+        events.append('response')
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        pass
+
+    asyncio.run(UnitOfWorkMiddleware(app)({'type': 'http'}, receive, send))
+    return sessions
+
+
+def test_one_session_per_request(monkeypatch):
+    """Test le partage de la session et sa validation avant la réponse"""
+    events = []
+    sessions = _run(200, events, monkeypatch)
+    assert sessions[0] is sessions[1]
+    assert events == ['commit', 'response', 'commit', 'close']
+    assert UnitOfWork.active == 0
+    print("✅ test_one_session_per_request passed")
+
+
+def test_error_response_rolls_back(monkeypatch):
+    """Test l'annulation de la transaction pour une réponse en erreur"""
+    events = []
+    _run(400, events, monkeypatch)
+    assert events[:2] == ['rollback', 'response']
+    assert events[-1] == 'close'
+    print("✅ test_error_response_rolls_back passed")
+
+
+def test_no_session_outside_unit_of_work():
+    """Test le refus de résoudre une session hors unité de travail"""
+    try:
+        get_request_session()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("RuntimeError attendue")
+    print("✅ test_no_session_outside_unit_of_work passed")
@@ -0,0 +1,134 @@
+"""
+Tests pour les tuiles vectorielles (MVT) des parcelles
+"""
+import sys
+sys.path.insert(0, '..')
+
+import math
+
+import mapbox_vector_tile
+import pytest
+from fastapi import HTTPException
+
+from backend.controllers.parcel_controller import get_parcels_vector_tile
+from backend.models.parcel import Parcel
+from backend.services.map_service import MapService, MVT_EXTENT, MVT_LAYER_NAME
+
+# Tuile z14 contenant Ouagadougou (12.37, -1.52)
+Z = 14
+
+
+def _tile_of(lat, lng, z=Z):
+    n = 2 ** z
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return x, y
+
+
+def _tile_coords(lat, lng, x, y, z=Z):
+    """Projection Web Mercator de référence en coordonnées de tuile (origine en haut à gauche)"""
+    n = 2 ** z
+    px = ((lng + 180.0) / 360.0 * n - x) * MVT_EXTENT
+    py = ((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n - y) * MVT_EXTENT
+    return px, py
+
+
+def _parcel(parcel_id, lat, lng, half_side=None, **fields):
+    geometry = None
+    if half_side is not None:
+        geometry = [[lng - half_side, lat - half_side], [lng + half_side, lat - half_side],
+                    [lng + half_side, lat + half_side], [lng - half_side, lat + half_side],
+                    [lng - half_side, lat - half_side]]
+    parcel = Parcel(id=parcel_id, reference_cadastrale=f'REF-{parcel_id}', coordinates_lat=lat, coordinates_lng=lng,
+                    geometry=geometry, category=fields.pop('category', 'Habitation'), **fields)
+    parcel.normalize_geometry()
+    return parcel
+
+
+def _decode(tile):
+    layers = mapbox_vector_tile.decode(tile, default_options={'y_coord_down': True})
+    return {feature['properties']['id']: feature for feature in layers[MVT_LAYER_NAME]['features']}
+
+
+def test_polygon_projected_to_tile_extent():
+    """Test la projection d'un polygone en coordonnées de tuile et les propriétés de style"""
+    lat, lng = 12.3700, -1.5200
+    x, y = _tile_of(lat, lng)
+    # Carré d'environ 110 m de côté : plusieurs centaines d'unités de tuile à z14
+    parcel = _parcel('p1', lat, lng, half_side=0.0005, status='occupied')
+
+    features = _decode(MapService().generate_vector_tile([parcel], Z, x, y))
+
+    feature = features['p1']
+    assert feature['geometry']['type'] == 'Polygon'
+    assert feature['properties'] == {'id': 'p1', 'reference': 'REF-p1', 'category': 'Habitation', 'status': 'occupied'}
+    ring = feature['geometry']['coordinates'][0]
+    xs, ys = [point[0] for point in ring], [point[1] for point in ring]
+    expected_min_x, expected_max_y = _tile_coords(lat - 0.0005, lng - 0.0005, x, y)
+    expected_max_x, expected_min_y = _tile_coords(lat + 0.0005, lng + 0.0005, x, y)
+    # Quantification sur la grille entière de la tuile : au plus une unité d'écart
+    assert abs(min(xs) - expected_min_x) <= 1 and abs(max(xs) - expected_max_x) <= 1
+    assert abs(min(ys) - expected_min_y) <= 1 and abs(max(ys) - expected_max_y) <= 1
+    assert 0 <= min(xs) < max(xs) <= MVT_EXTENT and 0 <= min(ys) < max(ys) <= MVT_EXTENT
+    print("✅ test_polygon_projected_to_tile_extent passed")
+
+
+def test_small_and_missing_geometries_rendered_as_points():
+    """Test le rendu en point des parcelles plus petites qu'un pixel et de celles sans géométrie"""
+    lat, lng = 12.3700, -1.5200
+    x, y = _tile_of(lat, lng)
+    # Carré d'environ 1 m de côté : moins de MVT_MIN_POLYGON_AREA unités² à z14
+    tiny = _parcel('tiny', lat, lng, half_side=0.000005)
+    point_only = _parcel('point', 12.3710, -1.5190)
+    far_away = _parcel('far', 14.0, 2.0, half_side=0.0005)
+
+    features = _decode(MapService().generate_vector_tile([tiny, point_only, far_away], Z, x, y))
+
+    # La parcelle hors de la tuile (et de sa marge) est découpée puis écartée
+    assert set(features) == {'tiny', 'point'}
+    assert features['tiny']['geometry']['type'] == 'Point'
+    expected = _tile_coords(lat, lng, x, y)
+    assert all(abs(a - b) <= 1 for a, b in zip(features['tiny']['geometry']['coordinates'], expected))
+
+    assert features['point']['geometry']['type'] == 'Point'
+    expected = _tile_coords(12.3710, -1.5190, x, y)
+    assert all(abs(a - b) <= 1 for a, b in zip(features['point']['geometry']['coordinates'], expected))
+    # Sans statut, la disponibilité découle du propriétaire
+    assert features['point']['properties']['status'] == 'available'
+    print("✅ test_small_and_missing_geometries_rendered_as_points passed")
+
+
+def test_tile_endpoint_etag_revalidation():
+    """Test l'endpoint des tuiles : ETag, réponse 304 sur If-None-Match et zoom invalide"""
+    lat, lng = 12.3700, -1.5200
+    x, y = _tile_of(lat, lng)
+    calls = []
+
+    class TileParcelService:
+        def get_vector_tile(self, current_user, z, x, y, category=None):
+            calls.append((z, x, y, category))
+            return MapService().generate_vector_tile([_parcel('p1', lat, lng, half_side=0.0005)], z, x, y)
+
+    service = TileParcelService()
+    response = get_parcels_vector_tile(Z, x, y, category='Habitation', if_none_match=None,
+                                       current_user=None, parcel_service=service)
+    assert response.status_code == 200
+    assert response.media_type == 'application/vnd.mapbox-vector-tile'
+    assert response.headers['cache-control'] == 'private, no-cache'
+    etag = response.headers['etag']
+    assert set(_decode(response.body)) == {'p1'}
+    assert calls == [(Z, x, y, 'Habitation')]
+
+    not_modified = get_parcels_vector_tile(Z, x, y, category='Habitation', if_none_match=f'"autre", {etag}',
+                                           current_user=None, parcel_service=service)
+    assert not_modified.status_code == 304 and not_modified.body == b''
+    assert not_modified.headers['etag'] == etag
+
+    changed = get_parcels_vector_tile(Z, x, y, category='Habitation', if_none_match='"autre"',
+                                      current_user=None, parcel_service=service)
+    assert changed.status_code == 200 and changed.body == response.body
+
+    with pytest.raises(HTTPException) as error:
+        get_parcels_vector_tile(23, 0, 0, category=None, if_none_match=None, current_user=None, parcel_service=service)
+    assert error.value.status_code == 400
+    print("✅ test_tile_endpoint_etag_revalidation passed")
@@ -0,0 +1,213 @@
+"""
+Tests pour la diffusion WebSocket concurrente avec files d'envoi par connexion
+"""
+import sys
+sys.path.insert(0, '..')
+
+import asyncio
+import json
+
+from backend.services.websocket_service import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_code = None
+        self.release = asyncio.Event()
+        self.blocked = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        if self.blocked:
+            await self.release.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.closed_code = code
+
+
+def _event(message_type, parcel_id, version):
+    return {"type": message_type, "data": {"parcel_id": parcel_id, "version": version}}
+
+
+def test_slow_client_does_not_stall_others():
+    """Test qu'un client bloqué ne retarde pas la diffusion aux autres"""
+    async def scenario():
+        manager = ConnectionManager(queue_size=10)
+        fast, slow = FakeWebSocket(), FakeWebSocket()
+        slow.blocked = True
+        await manager.connect(fast, 1)
+        await manager.connect(slow, 2)
+
+        for i in range(3):
+            await manager.broadcast(_event("parcel_created", f"p{i}", 1))
+        await asyncio.sleep(0.01)
+
+        assert [m["type"] for m in fast.sent] == ["connection"] + ["parcel_created"] * 3
+        assert slow.sent == []
+        # Le message de bienvenue est en cours d'envoi, les trois événements attendent
+        assert manager.get_metrics()["max_queue_depth"] == 3
+
+        slow.release.set()
+        await asyncio.sleep(0.01)
+        assert len(slow.sent) == 4
+        assert manager.get_metrics()["queued_messages"] == 0
+
+    asyncio.run(scenario())
+    print("✅ test_slow_client_does_not_stall_others passed")
+
+
+def test_coalesce_policy():
+    """Test le regroupement des mises à jour d'une même parcelle pour un client en retard"""
+    async def scenario():
+        manager = ConnectionManager(queue_size=2, slow_consumer_policy='coalesce')
+        websocket = FakeWebSocket()
+        websocket.blocked = True
+        await manager.connect(websocket, 1)
+        # Laisser la tâche d'écriture prendre le message de bienvenue
+        await asyncio.sleep(0)
+
+        for version in range(1, 4):
+            await manager.broadcast(_event("parcel_updated", "p1", version))
+        await manager.broadcast(_event("parcel_updated", "p2", 1))
+
+        websocket.release.set()
+        await asyncio.sleep(0.01)
+        updates = [(m["data"]["parcel_id"], m["data"]["version"]) for m in websocket.sent[1:]]
+        assert updates == [("p1", 3), ("p2", 1)]
+        metrics = manager.get_metrics()
+        assert metrics["coalesced"] == 2
+        assert metrics["dropped"] == 0
+
+    asyncio.run(scenario())
+    print("✅ test_coalesce_policy passed")
+
+
+def test_coalesce_keeps_distinct_documents_of_a_parcel():
+    """Test que deux documents d'une même parcelle ne sont pas fusionnés pour un client en retard"""
+    async def scenario():
+        manager = ConnectionManager(queue_size=5, slow_consumer_policy='coalesce')
+        websocket = FakeWebSocket()
+        websocket.blocked = True
+        await manager.connect(websocket, 1)
+        await asyncio.sleep(0)
+
+        for document_id, filename in (("d1", "plan.pdf"), ("d2", "titre.pdf"), ("d1", "plan_v2.pdf")):
+            await manager.broadcast({"type": "document_uploaded",
+                                     "data": {"document_id": document_id, "filename": filename, "parcel_id": "p1"}})
+
+        websocket.release.set()
+        await asyncio.sleep(0.01)
+        uploads = [(m["data"]["document_id"], m["data"]["filename"]) for m in websocket.sent[1:]]
+        assert uploads == [("d2", "titre.pdf"), ("d1", "plan_v2.pdf")]
+        assert manager.get_metrics()["coalesced"] == 1
+
+    asyncio.run(scenario())
+    print("✅ test_coalesce_keeps_distinct_documents_of_a_parcel passed")
+
+
+def test_drop_and_disconnect_policies():
+    """Test l'abandon des plus anciens messages et la déconnexion d'un client lent"""
+    async def scenario():
+        dropping = ConnectionManager(queue_size=2, slow_consumer_policy='drop_oldest')
+        websocket = FakeWebSocket()
+        websocket.blocked = True
+        await dropping.connect(websocket, 1)
+        await asyncio.sleep(0)
+        for i in range(4):
+            await dropping.broadcast({"type": "system_alert", "data": {"n": i}})
+        websocket.release.set()
+        await asyncio.sleep(0.01)
+        assert [m["data"]["n"] for m in websocket.sent[1:]] == [2, 3]
+        assert dropping.get_metrics()["dropped"] == 2
+
+        disconnecting = ConnectionManager(queue_size=1, slow_consumer_policy='disconnect')
+        slow = FakeWebSocket()
+        slow.blocked = True
+        await disconnecting.connect(slow, 1)
+        await asyncio.sleep(0)
+        await disconnecting.broadcast({"type": "system_alert"})
+        await disconnecting.broadcast({"type": "system_alert"})
+        await asyncio.sleep(0.01)
+        assert not disconnecting.is_user_online(1)
+        assert slow.closed_code == 1013
+        assert disconnecting.get_metrics()["slow_disconnects"] == 1
+
+    asyncio.run(scenario())
+    print("✅ test_drop_and_disconnect_policies passed")
+
+
+def test_subscription_filters():
+    """Test le filtrage par thème, zone, bbox et identifiant de parcelle"""
+    async def scenario():
+        from backend.core.event_bus import InMemoryEventBus, make_event
+        from backend.services.websocket_service import Subscription
+
+        manager = ConnectionManager(coalesce_window=0)
+        manager.attach(InMemoryEventBus())
+        by_zone, by_bbox, documents = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        for user_id, websocket in enumerate((by_zone, by_bbox, documents)):
+            await manager.connect(websocket, str(user_id))
+        manager.set_subscription(by_zone, Subscription.from_message({"zones": ["Z1"], "parcel_ids": ["p9"]}))
+        manager.set_subscription(by_bbox, Subscription.from_message({"topics": ["parcels"], "bbox": [0, 0, 10, 10]}))
+        manager.set_subscription(documents, Subscription.from_message({"topics": ["documents"]}))
+
+        def parcel(parcel_id, zone, lat, lng):
+            return make_event("broadcast", {"type": "parcel_created", "data": {
+                "parcel_id": parcel_id, "zone": zone, "lat": lat, "lng": lng}})
+
+        await manager.publish(parcel("p1", "Z1", 50, 50))
+        await manager.publish(parcel("p2", "Z2", 5, 5))
+        await manager.publish(parcel("p9", "Z3", 50, 50))
+        await manager.publish(make_event("broadcast", {"type": "document_uploaded", "data": {"document_id": 3}}))
+        # Notification personnelle : toujours remise
+        await manager.publish(make_event("user", {"type": "mutation_assigned", "data": {}}, key="2"))
+        await asyncio.sleep(0.01)
+
+        def received(websocket):
+            return [(m["type"], m["data"].get("parcel_id")) for m in websocket.sent[1:]]
+
+        assert received(by_zone) == [("parcel_created", "p1"), ("parcel_created", "p9"), ("document_uploaded", None)]
+        assert received(by_bbox) == [("parcel_created", "p2")]
+        assert received(documents) == [("document_uploaded", None), ("mutation_assigned", None)]
+
+    asyncio.run(scenario())
+    print("✅ test_subscription_filters passed")
+
+
+def test_updates_coalesced_before_publication():
+    """Test la fusion d'une rafale de mises à jour d'une parcelle en un seul message"""
+    async def scenario():
+        from backend.core.event_bus import InMemoryEventBus, make_event
+
+        bus = InMemoryEventBus()
+        manager = ConnectionManager(coalesce_window=0.05)
+        manager.attach(bus)
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "u1")
+
+        for version in range(100):
+            for parcel_id in ("p1", "p2"):
+                await manager.publish(make_event("broadcast", {
+                    "type": "parcel_updated", "data": {"parcel_id": parcel_id, "version": version}}))
+        await manager.publish(make_event("broadcast", {"type": "parcel_deleted", "data": {"parcel_id": "p2"}}))
+        await asyncio.sleep(0.1)
+
+        received = [(m["type"], m["data"]["parcel_id"], m["data"].get("version"), m.get("coalesced"))
+                    for m in websocket.sent[1:]]
+        # La suppression de p2 publie d'abord sa dernière mise à jour retenue
+        assert received == [
+            ("parcel_updated", "p2", 99, 100),
+            ("parcel_deleted", "p2", None, None),
+            ("parcel_updated", "p1", 99, 100),
+        ]
+        assert bus.last_seq == 3
+        assert manager.get_metrics()["merged"] == 198
+
+    asyncio.run(scenario())
+    print("✅ test_updates_coalesced_before_publication passed")